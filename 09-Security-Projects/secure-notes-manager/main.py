@@ -13,6 +13,7 @@ from rich.prompt import Prompt, Confirm
 from rich import print as rprint
 
 from crypto import VaultEncryption
+from records import RecordStore
 from storage import VaultStorage
 from password import PasswordStrengthChecker, generate_secure_password
 from models.note import Note
@@ -33,6 +34,7 @@ class SecureNotesManager:
         """
         self.vault_path = vault_path
         self.storage = VaultStorage(vault_path)
+        self.records = RecordStore(vault_path, backup=self.storage.create_auto_backup)
         self.encryption = VaultEncryption()
         self.password_checker = PasswordStrengthChecker()
         self.unlocked_notes = []
@@ -65,10 +67,9 @@ class SecureNotesManager:
 
         # Crea il vault
         try:
-            vault_data = self.encryption.create_vault(password)
-            self.storage.save_vault(vault_data)
+            self.records.create(password)
             self.master_password = password
-            self._reload_notes()
+            self.unlocked_notes = []
 
             console.print("[green]✓ Vault inizializzato con successo![/green]")
             console.print(f"[cyan]Vault salvato in: {self.vault_path}[/cyan]")
@@ -89,8 +90,9 @@ class SecureNotesManager:
             True se lo sblocco ha successo
         """
         try:
-            vault_data = self.storage.load_vault()
-            self.unlocked_notes = self.encryption.unlock_vault(password, vault_data)
+            if self.storage.vault_exists() and not RecordStore.is_record_vault(self.vault_path):
+                self._migrate_vault(password)
+            self.unlocked_notes = self.records.open(password)
             self.master_password = password
             console.print("[green]✓ Vault sbloccato![/green]")
             return True
@@ -123,26 +125,20 @@ class SecureNotesManager:
             new_id = max(note_ids) + 1 if note_ids else 1
 
             # Crea la nota
+            from datetime import datetime
+            now = datetime.now().isoformat()
             note = Note(
                 id=new_id,
                 title=title,
                 content=content,
-                created_at=Note.__dict__.__get__("__data_fields__", {}).get("created_at", ""),
-                updated_at=Note.__dict__.__get__("__data_fields__", {}).get("updated_at", ""),
+                created_at=now,
+                updated_at=now,
                 tags=tags or []
             )
 
-            # Aggiungi timestamp
-            from datetime import datetime
-            now = datetime.now().isoformat()
-            note.created_at = now
-            note.updated_at = now
-
-            # Aggiungi alla lista
+            # Aggiungi alla lista e salva solo il nuovo record
             self.unlocked_notes.append(note.to_dict())
-
-            # Salva il vault
-            self._save_vault()
+            self.records.put(note.to_dict())
 
             console.print(f"[green]✓ Nota aggiunta con ID: {new_id}[/green]")
             return True
@@ -232,8 +228,8 @@ class SecureNotesManager:
             note["content"] = new_content
             note["updated_at"] = datetime.now().isoformat()
 
-            # Salva il vault
-            self._save_vault()
+            # Salva solo il record della nota
+            self.records.put(note)
 
             console.print(f"[green]✓ Nota {note_id} aggiornata![/green]")
             return True
@@ -266,7 +262,7 @@ class SecureNotesManager:
 
         try:
             self.unlocked_notes.remove(note)
-            self._save_vault()
+            self.records.delete(note_id)
 
             console.print(f"[green]✓ Nota {note_id} eliminata![/green]")
             return True
@@ -322,8 +318,12 @@ class SecureNotesManager:
             True se l'esportazione ha successo
         """
         try:
-            vault_data = self.storage.load_vault()
-            self.storage.export_backup(export_path, vault_data)
+            if RecordStore.is_record_vault(self.vault_path):
+                self.records.export(export_path)
+                console.print(f"✓ Backup esportato in: {export_path}")
+            else:
+                vault_data = self.storage.load_vault()
+                self.storage.export_backup(export_path, vault_data)
             return True
 
         except Exception as e:
@@ -341,8 +341,15 @@ class SecureNotesManager:
             True se l'importazione ha successo
         """
         try:
-            vault_data = self.storage.import_backup(backup_path)
-            self.storage.save_vault(vault_data)
+            if RecordStore.is_record_vault(backup_path):
+                # Formato 2.0: copia del log; il manifest attuale descrive
+                # il log sostituito e verrebbe rifiutato allo sblocco
+                self.storage.restore_from_backup(backup_path)
+                self.records.manifest_path.unlink(missing_ok=True)
+            else:
+                # Formato 1.0: viene migrato al prossimo sblocco
+                vault_data = self.storage.import_backup(backup_path)
+                self.storage.save_vault(vault_data)
             console.print(f"[green]✓ Backup importato![/green]")
             console.print("[yellow]Usa 'unlock' per accedere alle note.[/yellow]")
             return True
@@ -371,11 +378,9 @@ class SecureNotesManager:
             return False
 
         try:
-            vault_data = self.storage.load_vault()
-            new_vault = self.encryption.reencrypt_vault(
-                self.master_password, new_password, vault_data
-            )
-            self.storage.save_vault(new_vault)
+            # Unica operazione che ri-cifra tutte le note (nuova chiave)
+            self.storage.create_auto_backup()
+            self.records.create(new_password, self.unlocked_notes)
             self.master_password = new_password
 
             console.print("[green]✓ Password cambiata con successo![/green]")
@@ -407,20 +412,24 @@ class SecureNotesManager:
             return False
         return True
 
-    def _save_vault(self) -> None:
-        """Salva il vault crittografato."""
-        vault_data = self.encryption.create_vault(
-            self.master_password, self.unlocked_notes
-        )
-        self.storage.save_vault(vault_data)
-
-    def _reload_notes(self) -> None:
-        """Ricarica le note dal vault."""
-        if self.master_password:
-            vault_data = self.storage.load_vault()
-            self.unlocked_notes = self.encryption.unlock_vault(
-                self.master_password, vault_data
-            )
+    def close(self) -> None:
+        """Attende la compaction in corso e chiude il vault."""
+        self.records.close()
+
+    def _migrate_vault(self, password: str) -> None:
+        """
+        Converte un vault 1.0 (blob unico) nel formato a record.
+
+        Il vault originale resta nei backup automatici.
+
+        Args:
+            password: Password master
+        """
+        vault_data = self.storage.load_vault()
+        notes = self.encryption.unlock_vault(password, vault_data)
+        self.storage.create_auto_backup()
+        self.records.create(password, notes)
+        console.print(f"[cyan]Vault convertito al formato a record ({len(notes)} note).[/cyan]")
 
 
 # CLI
@@ -483,6 +492,7 @@ def add(vault, title, content, tags):
 
     # Aggiungi nota
     manager.add_note(title, content, tag_list)
+    manager.close()
 
 
 @cli.command()
@@ -528,6 +538,7 @@ def edit(vault, note_id, new_content):
         sys.exit(1)
 
     manager.edit_note(note_id, new_content)
+    manager.close()
 
 
 @cli.command()
@@ -543,6 +554,7 @@ def delete(vault, note_id):
         sys.exit(1)
 
     manager.delete_note(note_id)
+    manager.close()
 
 
 @cli.command()
@@ -660,6 +672,8 @@ def _interactive_shell(manager: SecureNotesManager):
         except Exception as e:
             console.print(f"[red]Errore: {str(e)}[/red]")
 
+    manager.close()
+
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,520 @@
+"""
+Storage a record del vault: una nota = un record crittografato.
+
+Il formato 1.0 cifrava l'intero vault come un unico blob, quindi ogni
+modifica ri-cifrava e riscriveva tutte le note. Il formato 2.0 è un log
+append-only:
+
+    riga 1      header JSON in chiaro (formato, salt, iterazioni, log_id)
+    riga 2      record "meta" cifrato (verifica della password, seq 0)
+    riga 3..N   un token Fernet per riga: {"op": "put", "note": {...}}
+                oppure {"op": "del", "id": n}
+
+Ogni record cifrato contiene anche log_id e seq (1, 2, 3, ...): righe
+rimosse, riordinate, duplicate o copiate da un altro log vengono
+rifiutate all'apertura. Accanto al log c'è un manifest cifrato
+(<vault>.manifest) con la posizione dell'ultimo record valido di ogni
+nota.
+
+Concetti insegnati:
+- Log append-only: modificare una nota = cifrare e accodare una riga
+- Manifest come checkpoint: all'apertura si decifrano solo i record
+  vivi più la coda scritta dopo il checkpoint; se manca o non
+  corrisponde al log, si rilegge tutto il log (che basta da solo)
+- Integrità del log: ogni token Fernet è autenticato, la sequenza
+  log_id/seq dentro il token lega i record tra loro
+- Compaction in background: le righe vive vengono ri-cifrate con un
+  nuovo log_id e seq contigui in un nuovo file, sostituito con os.replace
+- Crash safety: una riga troncata in coda viene scartata all'apertura
+
+Limite: senza uno stato fidato esterno non si può rilevare la rimozione
+di righe intere in fondo al log se anche il manifest viene rimosso.
+"""
+import base64
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from crypto import CryptoManager, VaultEncryption
+
+
+FORMAT_NAME = "records"
+FORMAT_VERSION = "2.0"
+
+
+class RecordStore:
+    """
+    Vault a record crittografati con compaction in background.
+
+    Ogni put/delete accoda una riga e aggiorna l'indice in memoria
+    (id nota -> offset e lunghezza della riga). Quando i byte morti
+    (versioni superate e cancellazioni) superano la soglia, un thread
+    riscrive il log con le sole righe vive.
+    """
+
+    # Compaction quando i byte morti superano entrambe le soglie
+    COMPACT_MIN_BYTES = 1024 * 1024
+    COMPACT_RATIO = 0.5
+    # Nuovo manifest se all'apertura la coda del log supera questi record
+    CHECKPOINT_RECORDS = 256
+    # Byte finali del log salvati nel manifest per riconoscerne la coda
+    TAIL_CHECK_BYTES = 64
+
+    def __init__(self, vault_path: str = "vault.enc",
+                 backup: Optional[Callable[[], None]] = None,
+                 compact_min_bytes: int = COMPACT_MIN_BYTES,
+                 compact_ratio: float = COMPACT_RATIO):
+        """
+        Inizializza lo store.
+
+        Args:
+            vault_path: Percorso del log del vault
+            backup: Funzione chiamata prima di ogni compaction (es.
+                backup automatico), con il log in uno stato coerente
+            compact_min_bytes: Byte morti minimi per la compaction
+            compact_ratio: Rapporto minimo byte morti / byte vivi
+        """
+        self.vault_path = Path(vault_path)
+        self.manifest_path = self.vault_path.with_name(self.vault_path.name + ".manifest")
+        self.backup = backup
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_ratio = compact_ratio
+        self.encryption = VaultEncryption()
+
+        self._lock = threading.Lock()
+        self._crypto: Optional[CryptoManager] = None
+        self._header: Dict[str, Any] = {}
+        self._log = None
+        self._size = 0
+        self._data_start = 0
+        self._live_bytes = 0
+        # id nota -> (offset, lunghezza, seq) della riga valida
+        self._records: Dict[int, Tuple[int, int, int]] = {}
+        self._seq = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._compact_error: Optional[BaseException] = None
+
+    @staticmethod
+    def is_record_vault(path: str) -> bool:
+        """
+        Verifica se un file è un vault nel formato a record.
+
+        Args:
+            path: Percorso del file
+
+        Returns:
+            True se la prima riga è un header del formato 2.0
+        """
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return False
+        return isinstance(header, dict) and header.get("format") == FORMAT_NAME
+
+    @property
+    def dead_bytes(self) -> int:
+        """Byte occupati da record superati o cancellati."""
+        return self._size - self._data_start - self._live_bytes
+
+    def create(self, password: str, notes: Optional[List[Dict]] = None) -> None:
+        """
+        Crea (o riscrive) il vault con una nuova chiave.
+
+        Usato per init, migrazione dal formato 1.0 e cambio password:
+        il file viene scritto a parte e sostituito in modo atomico.
+
+        Args:
+            password: Password master
+            notes: Note iniziali (opzionale)
+        """
+        self.wait_compaction()
+
+        salt = os.urandom(self.encryption.salt_length)
+        crypto = CryptoManager(self.encryption.derive_key_from_password(password, salt))
+        header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "salt": base64.b64encode(salt).decode('ascii'),
+            "iterations": self.encryption.iterations,
+            "log_id": uuid.uuid4().hex,
+        }
+
+        with self._lock:
+            self._close_log()
+            tmp_path = self.vault_path.with_name(self.vault_path.name + ".tmp")
+            records = {}
+            seq = 0
+            with open(tmp_path, 'wb') as f:
+                pos = data_start = self._write_header(f, crypto, header)
+                for note in notes or []:
+                    seq += 1
+                    line = self._encode(crypto, header, seq, {"op": "put", "note": note})
+                    f.write(line)
+                    records[note["id"]] = (pos, len(line), seq)
+                    pos += len(line)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.vault_path)
+
+            self._crypto = crypto
+            self._header = header
+            self._attach(records, data_start, pos, seq)
+            self._write_manifest()
+
+    def open(self, password: str) -> List[Dict]:
+        """
+        Sblocca il vault e restituisce le note.
+
+        Args:
+            password: Password master
+
+        Returns:
+            Lista delle note, ordinate per ID
+
+        Raises:
+            FileNotFoundError: Se il vault non esiste
+            ValueError: Se la password non è corretta o il vault è corrotto
+        """
+        if not self.vault_path.exists():
+            raise FileNotFoundError("Vault non trovato. Usa 'init' per crearne uno.")
+
+        self.wait_compaction()
+        with self._lock:
+            self._close_log()
+            data = self.vault_path.read_bytes()
+
+            header_end = data.find(b"\n") + 1
+            meta_end = data.find(b"\n", header_end) + 1
+            try:
+                header = json.loads(data[:header_end])
+                salt = base64.b64decode(header["salt"])
+            except (ValueError, KeyError) as e:
+                raise ValueError(f"Vault corrotto: {str(e)}")
+            if not header_end or not meta_end or header.get("format") != FORMAT_NAME:
+                raise ValueError("Vault corrotto: header non valido.")
+
+            self.encryption.iterations = header.get("iterations", self.encryption.iterations)
+            crypto = CryptoManager(self.encryption.derive_key_from_password(password, salt))
+            try:
+                meta = crypto.decrypt_note(data[header_end:meta_end - 1])
+            except ValueError as e:
+                raise ValueError("Impossibile sbloccare il vault: password non valida.") from e
+            if (meta.get("op") != "meta" or meta.get("log_id") != header.get("log_id")
+                    or meta.get("seq") != 0):
+                raise ValueError("Vault corrotto: record meta non valido.")
+
+            self._crypto = crypto
+            self._header = header
+
+            notes: Dict[int, Dict] = {}
+            records: Dict[int, Tuple[int, int, int]] = {}
+            start = meta_end
+            seq = 0
+            manifest = self._read_manifest(data)
+            if manifest is not None:
+                for note_id, (offset, length, record_seq) in manifest["records"].items():
+                    note_id = int(note_id)
+                    op = self._decode(crypto, header, data[offset:offset + length - 1])
+                    if (op["seq"] != record_seq or op["op"] != "put"
+                            or op["note"]["id"] != note_id):
+                        raise ValueError("Vault corrotto: record diverso dal manifest.")
+                    notes[note_id] = op["note"]
+                    records[note_id] = (offset, length, record_seq)
+                start = manifest["log_size"]
+                seq = manifest["seq"]
+
+            replayed = 0
+            end = len(data)
+            pos = start
+            while pos < end:
+                newline = data.find(b"\n", pos)
+                if newline < 0:
+                    # Riga troncata da un crash durante l'append
+                    end = pos
+                    break
+                op = self._decode(crypto, header, data[pos:newline])
+                seq += 1
+                if op["seq"] != seq:
+                    raise ValueError(
+                        f"Vault corrotto: record {op['seq']} al posto di {seq} "
+                        "(righe rimosse, duplicate o riordinate)."
+                    )
+                if op["op"] == "put":
+                    note_id = op["note"]["id"]
+                    notes[note_id] = op["note"]
+                    records[note_id] = (pos, newline + 1 - pos, seq)
+                elif op["op"] == "del":
+                    notes.pop(op["id"], None)
+                    records.pop(op["id"], None)
+                replayed += 1
+                pos = newline + 1
+
+            if end < len(data):
+                os.truncate(self.vault_path, end)
+
+            self._attach(records, meta_end, end, seq)
+            if manifest is None or replayed > self.CHECKPOINT_RECORDS:
+                self._write_manifest()
+
+        self._maybe_compact()
+        return [notes[note_id] for note_id in sorted(notes)]
+
+    def put(self, note: Dict[str, Any]) -> None:
+        """
+        Salva una nota (nuova o modificata) accodando un solo record.
+
+        Args:
+            note: Dizionario della nota (deve avere "id")
+        """
+        self._append(note["id"], {"op": "put", "note": note})
+
+    def delete(self, note_id: int) -> None:
+        """
+        Elimina una nota accodando un record di cancellazione.
+
+        Args:
+            note_id: ID della nota
+        """
+        self._append(note_id, {"op": "del", "id": note_id})
+
+    def export(self, export_path: str) -> None:
+        """
+        Copia il log su un file di backup.
+
+        Il log basta da solo a ricostruire il vault: il manifest non
+        viene copiato.
+
+        Args:
+            export_path: Percorso del file di backup
+        """
+        export_path = Path(export_path)
+        export_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(self.vault_path, 'rb') as src, open(export_path, 'wb') as dst:
+                dst.write(src.read())
+
+    def compact(self) -> None:
+        """Avvia la compaction in background (se non è già in corso)."""
+        with self._lock:
+            if self._crypto is None or self._compactor is not None:
+                return
+            self._compactor = threading.Thread(target=self._compact, name="vault-compactor")
+            self._compactor.start()
+
+    def wait_compaction(self) -> None:
+        """
+        Attende la fine della compaction in corso.
+
+        Raises:
+            Exception: L'errore della compaction in background, se è
+                fallita (il log resta quello precedente)
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        error, self._compact_error = self._compact_error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Attende la compaction e chiude il log (rilancia un suo errore)."""
+        try:
+            self.wait_compaction()
+        finally:
+            with self._lock:
+                self._close_log()
+                self._crypto = None
+
+    def _append(self, note_id: int, op: Dict[str, Any]) -> None:
+        """Accoda un record e aggiorna l'indice in memoria."""
+        with self._lock:
+            if self._crypto is None or self._log is None:
+                raise ValueError("Vault non sbloccato.")
+            seq = self._seq + 1
+            line = self._encode(self._crypto, self._header, seq, op)
+            self._log.write(line)
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+            previous = self._records.pop(note_id, None)
+            if previous is not None:
+                self._live_bytes -= previous[1]
+            if op["op"] == "put":
+                self._records[note_id] = (self._size, len(line), seq)
+                self._live_bytes += len(line)
+            self._size += len(line)
+            self._seq = seq
+
+        self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        """Avvia la compaction se i byte morti superano le soglie."""
+        dead = self.dead_bytes
+        if dead >= self.compact_min_bytes and dead > self._live_bytes * self.compact_ratio:
+            self.compact()
+
+    def _compact(self) -> None:
+        """
+        Riscrive il log con le sole righe vive.
+
+        Prima fase senza lock: ri-cifra le righe vive fino a base_size
+        con il nuovo log_id e seq contigui. Seconda fase con lock:
+        ri-cifra la coda accodata nel frattempo, sostituisce il file e
+        aggiorna l'indice. Se qualcosa fallisce il log precedente resta
+        in uso e l'errore viene rilanciato da wait_compaction().
+        """
+        tmp_path = self.vault_path.with_name(self.vault_path.name + ".compact")
+        try:
+            with self._lock:
+                if self.backup is not None:
+                    self.backup()
+                crypto = self._crypto
+                old_header = self._header
+                snapshot = dict(self._records)
+                base_size = self._size
+
+            header = dict(old_header, log_id=uuid.uuid4().hex)
+            with open(self.vault_path, 'rb') as src, open(tmp_path, 'wb') as out:
+                data_start = self._write_header(out, crypto, header)
+                pos = data_start
+                seq = 0
+                copied: Dict[int, Tuple[int, int, int]] = {}
+                for note_id, (offset, length, _) in sorted(snapshot.items(), key=lambda item: item[1][2]):
+                    src.seek(offset)
+                    op = self._decode(crypto, old_header, src.read(length)[:-1])
+                    seq += 1
+                    line = self._encode(crypto, header, seq, op)
+                    out.write(line)
+                    copied[note_id] = (pos, len(line), seq)
+                    pos += len(line)
+
+                with self._lock:
+                    # Righe accodate durante la prima fase: offset vecchio -> nuovo
+                    src.seek(base_size)
+                    moved: Dict[int, Tuple[int, int, int]] = {}
+                    old_pos = base_size
+                    for raw in src.read(self._size - base_size).splitlines(keepends=True):
+                        op = self._decode(crypto, old_header, raw[:-1])
+                        seq += 1
+                        line = self._encode(crypto, header, seq, op)
+                        out.write(line)
+                        moved[old_pos] = (pos, len(line), seq)
+                        old_pos += len(raw)
+                        pos += len(line)
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                    records = {}
+                    for note_id, (offset, _, _) in self._records.items():
+                        records[note_id] = moved[offset] if offset >= base_size else copied[note_id]
+
+                    os.replace(tmp_path, self.vault_path)
+                    self._close_log()
+                    self._header = header
+                    self._attach(records, data_start, pos, seq)
+                    self._write_manifest()
+        except Exception as e:
+            self._compact_error = e
+            with self._lock:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+                if self._log is None and self._crypto is not None:
+                    self._log = open(self.vault_path, 'ab')
+        finally:
+            self._compactor = None
+
+    def _attach(self, records: Dict[int, Tuple[int, int, int]], data_start: int,
+                size: int, seq: int) -> None:
+        """Imposta l'indice e riapre il log in append (lock acquisito)."""
+        self._records = records
+        self._live_bytes = sum(entry[1] for entry in records.values())
+        self._data_start = data_start
+        self._size = size
+        self._seq = seq
+        self._log = open(self.vault_path, 'ab')
+
+    def _close_log(self) -> None:
+        """Chiude il file del log (lock acquisito)."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _write_header(self, f, crypto: CryptoManager, header: Dict[str, Any]) -> int:
+        """Scrive header e record meta; restituisce l'offset successivo."""
+        f.write(json.dumps(header).encode('utf-8') + b"\n")
+        f.write(self._encode(crypto, header, 0, {"op": "meta"}))
+        return f.tell()
+
+    @staticmethod
+    def _encode(crypto: CryptoManager, header: Dict[str, Any], seq: int,
+                op: Dict[str, Any]) -> bytes:
+        """Cifra un record come riga del log (token Fernet + newline)."""
+        record = dict(op, log_id=header["log_id"], seq=seq)
+        return crypto.encrypt_note(record) + b"\n"
+
+    @staticmethod
+    def _decode(crypto: CryptoManager, header: Dict[str, Any], token: bytes) -> Dict[str, Any]:
+        """
+        Decifra una riga del log e verifica che appartenga a questo log.
+
+        Raises:
+            ValueError: Se la riga è corrotta o viene da un altro log
+        """
+        op = crypto.decrypt_note(token)
+        if op.get("log_id") != header["log_id"] or not isinstance(op.get("seq"), int):
+            raise ValueError("Vault corrotto: record di un altro log.")
+        return op
+
+    def _read_manifest(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Legge il manifest del log attuale.
+
+        Un manifest mancante o di un altro log (es. dopo un restore)
+        viene ignorato. Se invece appartiene a questo log, il log deve
+        contenerne tutta la parte coperta, con la stessa ultima riga.
+
+        Args:
+            data: Contenuto del log
+
+        Returns:
+            Manifest decifrato o None (mancante o di un altro log)
+
+        Raises:
+            ValueError: Se il log è più corto o diverso da quanto registrato
+        """
+        try:
+            manifest = self._crypto.decrypt_note(self.manifest_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+        if manifest.get("log_id") != self._header.get("log_id"):
+            return None
+        log_size = manifest["log_size"]
+        if log_size > len(data) or manifest.get("tail") != self._tail_check(data[:log_size]):
+            raise ValueError("Vault corrotto: il log non corrisponde al manifest "
+                             "(righe rimosse o sostituite).")
+        return manifest
+
+    def _write_manifest(self) -> None:
+        """Scrive il manifest cifrato in modo atomico (lock acquisito)."""
+        with open(self.vault_path, 'rb') as f:
+            f.seek(max(0, self._size - self.TAIL_CHECK_BYTES))
+            tail = f.read(min(self._size, self.TAIL_CHECK_BYTES))
+        manifest = {
+            "log_id": self._header["log_id"],
+            "log_size": self._size,
+            "seq": self._seq,
+            "tail": self._tail_check(tail),
+            "records": {str(note_id): list(entry) for note_id, entry in self._records.items()},
+        }
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        tmp_path.write_bytes(self._crypto.encrypt_note(manifest))
+        os.replace(tmp_path, self.manifest_path)
+
+    @classmethod
+    def _tail_check(cls, data: bytes) -> str:
+        """Ultimi byte del log coperti dal manifest (base64)."""
+        return base64.b64encode(data[-cls.TAIL_CHECK_BYTES:]).decode('ascii')
@@ -38,7 +38,7 @@ class VaultStorage:
         """
         # Crea backup automatico prima di sovrascrivere
         if self.vault_exists():
-            self._create_auto_backup()
+            self.create_auto_backup()
 
         # Salva il vault
         with open(self.vault_path, 'w', encoding='utf-8') as f:
@@ -110,7 +110,7 @@ class VaultStorage:
         except json.JSONDecodeError as e:
             raise ValueError(f"Backup corrotto: {str(e)}")
 
-    def _create_auto_backup(self) -> None:
+    def create_auto_backup(self) -> None:
         """Crea un backup automatico del vault attuale."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"auto_backup_{timestamp}.enc"
@@ -184,7 +184,7 @@ class VaultStorage:
 
         # Crea backup del vault attuale prima di ripristinare
         if self.vault_exists():
-            self._create_auto_backup()
+            self.create_auto_backup()
 
         # Copia il backup
         import shutil
@@ -220,7 +220,7 @@ class VaultStorage:
         """
         if self.vault_exists():
             # Crea ultimo backup
-            self._create_auto_backup()
+            self.create_auto_backup()
 
             # Elimina il vault
             self.vault_path.unlink()
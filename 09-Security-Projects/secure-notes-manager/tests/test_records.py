@@ -0,0 +1,235 @@
+"""Test per il modulo records."""
+import pytest
+from records import RecordStore
+
+
+PASSWORD = "TestPassword123!"
+
+
+def make_note(note_id, content="Contenuto"):
+    """Crea una nota di test."""
+    return {
+        "id": note_id,
+        "title": f"Nota {note_id}",
+        "content": content,
+        "created_at": "2024-01-01",
+        "updated_at": "2024-01-01",
+        "tags": []
+    }
+
+
+class TestRecordStore:
+    """Test per RecordStore."""
+
+    def test_create_and_open(self, tmp_path):
+        """Test la creazione e lo sblocco del vault."""
+        path = tmp_path / "vault.enc"
+        notes = [make_note(1), make_note(2)]
+
+        store = RecordStore(str(path))
+        store.create(PASSWORD, notes)
+        store.close()
+
+        assert RecordStore.is_record_vault(str(path))
+        assert RecordStore(str(path)).open(PASSWORD) == notes
+
+    def test_open_wrong_password(self, tmp_path):
+        """Test lo sblocco con password errata."""
+        path = tmp_path / "vault.enc"
+        RecordStore(str(path)).create(PASSWORD)
+
+        with pytest.raises(ValueError, match="Impossibile sbloccare"):
+            RecordStore(str(path)).open("WrongPassword")
+
+    def test_edit_appends_one_record(self, tmp_path):
+        """Test che una modifica accodi una sola riga senza toccare le altre."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(i) for i in range(1, 51)])
+        before = path.read_bytes()
+
+        store.put(make_note(7, "Modificata"))
+        after = path.read_bytes()
+
+        assert after.startswith(before)
+        assert after[len(before):].count(b"\n") == 1
+        store.close()
+
+        notes = RecordStore(str(path)).open(PASSWORD)
+        assert len(notes) == 50
+        assert notes[6]["content"] == "Modificata"
+
+    def test_delete(self, tmp_path):
+        """Test l'eliminazione di una nota."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1), make_note(2)])
+        store.delete(1)
+        store.close()
+
+        assert RecordStore(str(path)).open(PASSWORD) == [make_note(2)]
+
+    def test_open_without_manifest(self, tmp_path):
+        """Test che il log basti da solo a ricostruire il vault."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(2))
+        store.put(make_note(1, "Nuovo"))
+        store.close()
+        store.manifest_path.unlink()
+
+        assert RecordStore(str(path)).open(PASSWORD) == [make_note(1, "Nuovo"), make_note(2)]
+
+    def test_truncated_tail_discarded(self, tmp_path):
+        """Test che una riga troncata in coda (crash) venga scartata."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(2))
+        store.close()
+
+        data = path.read_bytes()
+        path.write_bytes(data[:-10])
+
+        store = RecordStore(str(path))
+        assert store.open(PASSWORD) == [make_note(1)]
+        store.put(make_note(3))
+        store.close()
+        assert RecordStore(str(path)).open(PASSWORD) == [make_note(1), make_note(3)]
+
+    def test_diverged_log_rejected(self, tmp_path):
+        """Test che un log con lo stesso log_id ma coda diversa venga rifiutato."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        old_log = path.read_bytes()
+        store.put(make_note(2))
+        store.close()
+
+        # Checkpoint che copre anche la nota 2
+        store = RecordStore(str(path))
+        store.CHECKPOINT_RECORDS = 0
+        store.open(PASSWORD)
+        store.close()
+
+        # Copia del log precedente modificata altrove: stesso log_id e
+        # stessa dimensione del checkpoint, ma coda diversa
+        other = tmp_path / "other.enc"
+        other.write_bytes(old_log)
+        store = RecordStore(str(other))
+        store.open(PASSWORD)
+        store.put(make_note(1, "Diversa"))
+        store.close()
+        path.write_bytes(other.read_bytes())
+
+        with pytest.raises(ValueError, match="non corrisponde al manifest"):
+            RecordStore(str(path)).open(PASSWORD)
+
+        # Senza manifest (es. restore di un backup) il log è coerente
+        RecordStore(str(path)).manifest_path.unlink()
+        assert RecordStore(str(path)).open(PASSWORD) == [make_note(1, "Diversa")]
+
+    def test_deleted_middle_line_rejected(self, tmp_path):
+        """Test che la rimozione di una riga in mezzo al log venga rilevata."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(2))
+        store.delete(1)
+        store.put(make_note(3))
+        store.close()
+        store.manifest_path.unlink()
+
+        # Rimuove la cancellazione della nota 1 per farla ricomparire
+        lines = path.read_bytes().splitlines(keepends=True)
+        del lines[4]
+        path.write_bytes(b"".join(lines))
+
+        with pytest.raises(ValueError, match="righe rimosse"):
+            RecordStore(str(path)).open(PASSWORD)
+
+    def test_reordered_lines_rejected(self, tmp_path):
+        """Test che lo scambio di due righe venga rilevato."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(1, "Prima"))
+        store.put(make_note(1, "Seconda"))
+        store.close()
+        store.manifest_path.unlink()
+
+        lines = path.read_bytes().splitlines(keepends=True)
+        lines[3], lines[4] = lines[4], lines[3]
+        path.write_bytes(b"".join(lines))
+
+        with pytest.raises(ValueError, match="Vault corrotto"):
+            RecordStore(str(path)).open(PASSWORD)
+
+    def test_spliced_line_rejected(self, tmp_path):
+        """Test che una riga copiata da un altro log venga rifiutata."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(2))
+        store.close()
+
+        # Stesso sale e stessa chiave, ma log precedente alla compaction
+        old_log = path.read_bytes()
+        store = RecordStore(str(path), compact_min_bytes=1, compact_ratio=0.0)
+        store.open(PASSWORD)
+        store.put(make_note(2, "Nuova"))
+        store.compact()
+        store.close()
+
+        # La riga della vecchia nota 2 (stesso seq) al posto della nuova
+        lines = path.read_bytes().splitlines(keepends=True)
+        lines[-1] = old_log.splitlines(keepends=True)[-1]
+        path.write_bytes(b"".join(lines))
+        store.manifest_path.unlink()
+
+        with pytest.raises(ValueError, match="altro log"):
+            RecordStore(str(path)).open(PASSWORD)
+
+    def test_compaction(self, tmp_path):
+        """Test che la compaction rimuova i record superati."""
+        path = tmp_path / "vault.enc"
+        backups = []
+        store = RecordStore(str(path), backup=lambda: backups.append(path.read_bytes()),
+                            compact_min_bytes=1, compact_ratio=100.0)
+        store.create(PASSWORD, [make_note(i) for i in range(1, 11)])
+        for i in range(200):
+            store.put(make_note(1 + i % 10, f"Versione {i}"))
+        size = path.stat().st_size
+
+        store.compact()
+        store.put(make_note(11))
+        store.close()
+
+        assert backups
+        assert path.stat().st_size < size / 5
+        notes = RecordStore(str(path)).open(PASSWORD)
+        assert len(notes) == 11
+        assert notes[9]["content"] == "Versione 199"
+        assert notes[10] == make_note(11)
+
+    def test_compaction_failure(self, tmp_path, monkeypatch):
+        """Test che una compaction fallita lasci il log utilizzabile."""
+        path = tmp_path / "vault.enc"
+        store = RecordStore(str(path))
+        store.create(PASSWORD, [make_note(1)])
+        store.put(make_note(1, "Nuovo"))
+
+        def fail(src, dst):
+            raise OSError("disco pieno")
+
+        monkeypatch.setattr("records.os.replace", fail)
+        store.compact()
+        with pytest.raises(OSError, match="disco pieno"):
+            store.wait_compaction()
+        monkeypatch.undo()
+
+        assert not list(tmp_path.glob("*.compact"))
+        store.put(make_note(2))
+        store.close()
+        assert RecordStore(str(path)).open(PASSWORD) == [make_note(1, "Nuovo"), make_note(2)]
@@ -8,40 +8,8 @@ per casi d'uso avanzati.
 """
 
 import time
-import json
 from pathlib import Path
 from file_monitor import FileMonitor, FileMonitorHandler
-from watchdog.events import FileSystemEventHandler
-
-
-class JSONLogHandler(FileSystemEventHandler):
-    """
-    Gestore che salva gli eventi in formato JSON.
-    Utile per integrazione con altri sistemi.
-    """
-
-    def __init__(self, log_file="events.json"):
-        super().__init__()
-        self.log_file = Path(log_file)
-        self.events = []
-
-    def on_any_event(self, event):
-        """Cattura tutti gli eventi e li salva in JSON."""
-        event_data = {
-            "timestamp": time.time(),
-            "event_type": event.event_type,
-            "src_path": event.src_path,
-            "is_directory": event.is_directory
-        }
-
-        if hasattr(event, 'dest_path'):
-            event_data["dest_path"] = event.dest_path
-
-        self.events.append(event_data)
-
-        # Salva su disco
-        with open(self.log_file, 'w') as f:
-            json.dump(self.events, f, indent=2)
 
 
 class FilteredHandler(FileMonitorHandler):
@@ -143,22 +111,28 @@ def example_json_logging():
     print("Esempio 1: JSON Logging")
     print("-" * 40)
 
-    handler = JSONLogHandler("events.json")
-
-    from watchdog.observers import Observer
-    observer = Observer()
-    observer.schedule(handler, ".", recursive=True)
-    observer.start()
+    # Un oggetto JSON per riga, scritto a blocchi (un fsync per batch);
+    # con un file .db gli eventi finiscono in SQLite
+    monitor = FileMonitor(
+        path=".",
+        recursive=True,
+        sink_file="events.ndjson",
+        flush_size=200,
+        flush_interval=1.0
+    )
 
     try:
+        monitor.start()
         print("Monitoraggio attivo... (Ctrl+C per fermare)")
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        observer.stop()
+        monitor.stop()
 
-    observer.join()
-    print(f"\nSalvati {len(handler.events)} eventi in events.json")
+    # Gli eventi restano interrogabili dopo l'arresto
+    recent = monitor.sink.query(since=time.time() - 3600)
+    print(f"\nSalvati {monitor.sink.written} eventi in events.ndjson "
+          f"({len(recent)} nell'ultima ora)")
 
 
 def example_filtered_monitoring():
@@ -173,15 +147,16 @@ def example_filtered_monitoring():
         verbose=True
     )
 
+    # Il monitor usa il handler filtrato al posto di quello standard;
+    # con exclude le directory ignorate non ricevono nemmeno un watch
     monitor = FileMonitor(
         path=".",
         recursive=True,
-        verbose=True
+        verbose=True,
+        event_handler=handler,
+        exclude=['__pycache__', '.git', 'venv']
     )
 
-    # Sostituisci il handler con quello filtrato
-    monitor.event_handler = handler
-
     try:
         monitor.start()
         while True:
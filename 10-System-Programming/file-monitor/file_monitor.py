@@ -6,18 +6,50 @@ File Monitor - Sistema di Monitoraggio File
 Questo strumento monitora una directory e registra tutti i cambiamenti dei file
 (creazione, modifica, eliminazione, spostamento) in tempo reale.
 
+Gli eventi grezzi dell'osservatore passano da un EventCoalescer che unisce
+le raffiche sullo stesso percorso (es. creazione + N modifiche durante una
+copia) e consegna i blocchi ai gestori su un thread dedicato.
+
+Sugli alberi molto grandi un WatchManager pianifica i watch prima di
+registrarli: le directory escluse (node_modules, .git, ...) vengono
+potate durante la visita e, oltre il budget di watch, i sottoalberi più
+adatti passano a un osservatore in polling.
+
+Con uno snapshot persistente dell'albero, all'avvio i cambiamenti avvenuti
+a monitor fermo vengono ricostruiti e consegnati come eventi sintetici.
+Un EventSink registra gli eventi su NDJSON o SQLite a blocchi (group
+commit), per interrogarli in seguito.
+
 Autore: System Programming Project
 Linguaggio: Python 3
 Dipendenze: watchdog
 """
 
+import os
+import re
 import sys
+import glob
+import json
+import stat
 import time
+import queue
+import bisect
+import fnmatch
+import hashlib
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileSystemEvent
+from watchdog.observers.polling import PollingObserverVFS
+from watchdog.events import (
+    FileSystemEventHandler, FileSystemEvent,
+    FileCreatedEvent, FileModifiedEvent, DirCreatedEvent, DirModifiedEvent,
+    FileDeletedEvent, DirDeletedEvent, FileMovedEvent, DirMovedEvent,
+    EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_DELETED, EVENT_TYPE_MOVED
+)
 
 
 class FileMonitorHandler(FileSystemEventHandler):
@@ -40,6 +72,7 @@ class FileMonitorHandler(FileSystemEventHandler):
         self.logger = logger or logging.getLogger(__name__)
         self.verbose = verbose
         self.event_count = 0
+        self._batch_timestamp = None
 
     def _log_event(self, event_type, path, extra_info=""):
         """
@@ -51,7 +84,7 @@ class FileMonitorHandler(FileSystemEventHandler):
             extra_info: Informazioni aggiuntive
         """
         self.event_count += 1
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = self._batch_timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         log_message = f"[{timestamp}] {event_type}: {path}"
         if extra_info:
@@ -62,6 +95,23 @@ class FileMonitorHandler(FileSystemEventHandler):
         if self.verbose:
             print(f"✓ {log_message}")
 
+    def on_batch(self, events):
+        """
+        Gestisce un blocco di eventi consegnato dall'EventCoalescer.
+
+        Il timestamp viene calcolato una volta per blocco invece che
+        per evento.
+
+        Args:
+            events: Lista di eventi già coalescenti
+        """
+        self._batch_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            for event in events:
+                self.dispatch(event)
+        finally:
+            self._batch_timestamp = None
+
     def on_created(self, event):
         """Chiamato quando un file o directory viene creato."""
         if event.is_directory:
@@ -71,7 +121,7 @@ class FileMonitorHandler(FileSystemEventHandler):
 
     def on_modified(self, event):
         """Chiamato quando un file o directory viene modificato."""
-        # Evita di loggare eventi duplicati rapidi
+        # I duplicati rapidi sono già uniti dall'EventCoalescer
         if event.is_directory:
             self._log_event("DIRECTORY MODIFICATA", event.src_path)
         else:
@@ -100,6 +150,1412 @@ class FileMonitorHandler(FileSystemEventHandler):
             )
 
 
+class _PendingEvent:
+    """Evento in attesa nel coalescer."""
+
+    __slots__ = ('event', 'first_seen', 'last_seen')
+
+    def __init__(self, event, now):
+        self.event = event
+        self.first_seen = now
+        self.last_seen = now
+
+
+class EventCoalescer(FileSystemEventHandler):
+    """
+    Stadio di coalescenza tra l'osservatore e i gestori.
+
+    Il thread dell'osservatore chiama solo dispatch(), che unisce
+    l'evento a quello in attesa per lo stesso percorso (O(1), nessun
+    I/O). Un thread worker consegna ai gestori gli eventi rimasti
+    fermi per 'window' secondi, a blocchi.
+
+    Regole di unione per percorso:
+    - creato + modificato... -> creato
+    - modificato + modificato -> modificato
+    - creato + eliminato -> nessun evento (file temporaneo)
+    - modificato + eliminato -> eliminato
+    - eliminato + creato -> modificato (file sostituito)
+    - creato + spostato -> creato nella destinazione
+    - altri tipi (opened, closed, ...) -> un evento per tipo e percorso
+
+    Un percorso modificato di continuo viene comunque consegnato dopo
+    max_delay secondi dal primo evento.
+
+    Gli eventi escono nell'ordine della coda; una creazione resta al
+    posto del primo evento, così una nuova directory viene consegnata
+    prima dei file creati al suo interno (le cui creazioni la modificano).
+    """
+
+    def __init__(self, handlers, window=0.5, max_delay=None, logger=None):
+        """
+        Inizializza il coalescer.
+
+        Args:
+            handlers: Gestori che ricevono gli eventi (on_batch se
+                presente, altrimenti dispatch per ogni evento)
+            window: Secondi di quiete prima di consegnare un percorso
+            max_delay: Ritardo massimo di consegna (default: 10 * window)
+            logger: Logger per gli errori dei gestori
+        """
+        super().__init__()
+        self.handlers = list(handlers)
+        self.window = window
+        self.max_delay = max_delay if max_delay is not None else window * 10
+        self.logger = logger or logging.getLogger(__name__)
+
+        # Ordinati per ultimo aggiornamento (le creazioni per primo
+        # evento): i pronti sono in testa
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.received = 0
+        self.emitted = 0
+
+    def start(self):
+        """Avvia il thread worker."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="event-coalescer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Ferma il worker dopo aver consegnato gli eventi in attesa."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def dispatch(self, event):
+        """Riceve un evento grezzo dall'osservatore (thread osservatore)."""
+        now = time.monotonic()
+        with self._lock:
+            self.received += 1
+            event_type = event.event_type
+
+            if event_type == EVENT_TYPE_MOVED:
+                pending = self._pending.get(event.src_path)
+                if pending and pending.event.event_type == EVENT_TYPE_CREATED:
+                    # Creato e subito rinominato: creato nella destinazione
+                    del self._pending[event.src_path]
+                    self._merge(event.dest_path, _created(event.dest_path, event.is_directory), now)
+                else:
+                    self._add(("moved", event.src_path, event.dest_path), event, now)
+            elif event_type in _MERGEABLE:
+                self._merge(event.src_path, event, now)
+            else:
+                self._add((event_type, event.src_path), event, now)
+
+    def _add(self, key, event, now):
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = _PendingEvent(event, now)
+        else:
+            pending.event = event
+            self._touch(key, pending, now)
+
+    def _touch(self, key, pending, now):
+        pending.last_seen = now
+        # Oltre max_delay l'evento resta al suo posto e viene consegnato
+        if now - pending.first_seen < self.max_delay:
+            self._pending.move_to_end(key)
+
+    def _merge(self, path, event, now):
+        pending = self._pending.get(path)
+        if pending is None:
+            self._pending[path] = _PendingEvent(event, now)
+            return
+
+        old_type = pending.event.event_type
+        new_type = event.event_type
+        if old_type == EVENT_TYPE_CREATED:
+            if new_type == EVENT_TYPE_DELETED:
+                # Creato ed eliminato nella stessa finestra
+                del self._pending[path]
+                return
+            # Resta al suo posto, davanti agli eventi del contenuto: chi
+            # lo segue in coda attende con lui la quiete del percorso
+            pending.last_seen = now
+            return
+        elif old_type == EVENT_TYPE_DELETED and new_type == EVENT_TYPE_CREATED:
+            merged = _modified(path, event.is_directory)
+        elif old_type == EVENT_TYPE_MODIFIED and new_type == EVENT_TYPE_MODIFIED:
+            merged = pending.event
+        else:
+            merged = event
+
+        pending.event = merged
+        self._touch(path, pending, now)
+
+    def _collect(self, now, flush_all=False):
+        """Estrae gli eventi pronti (fermi da window o più vecchi di max_delay)."""
+        quiet_before = now - self.window
+        oldest_allowed = now - self.max_delay
+        ready = []
+        with self._lock:
+            pending = self._pending
+            while pending:
+                key, entry = next(iter(pending.items()))
+                if not (flush_all or entry.last_seen <= quiet_before
+                        or entry.first_seen <= oldest_allowed):
+                    break
+                del pending[key]
+                ready.append(entry.event)
+        return ready
+
+    def _run(self):
+        tick = max(self.window / 2, 0.01)
+        while True:
+            stopping = self._stop.wait(tick)
+            batch = self._collect(time.monotonic(), flush_all=stopping)
+            if batch:
+                self._deliver(batch)
+            if stopping:
+                break
+
+    def _deliver(self, batch):
+        self.emitted += len(batch)
+        for handler in self.handlers:
+            try:
+                on_batch = getattr(handler, "on_batch", None)
+                if on_batch is not None:
+                    on_batch(batch)
+                else:
+                    for event in batch:
+                        handler.dispatch(event)
+            except Exception as e:
+                self.logger.error(f"Errore nel gestore {type(handler).__name__}: {e}")
+
+
+_MERGEABLE = (EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_DELETED)
+
+
+def _created(path, is_directory):
+    return DirCreatedEvent(path) if is_directory else FileCreatedEvent(path)
+
+
+def _modified(path, is_directory):
+    return DirModifiedEvent(path) if is_directory else FileModifiedEvent(path)
+
+
+class ExcludeMatcher:
+    """
+    Pattern glob di esclusione (sintassi fnmatch).
+
+    I pattern senza '/' valgono per il nome di qualsiasi componente del
+    percorso ('node_modules', '*.egg-info'); quelli con '/' per il
+    percorso relativo alla radice ('build/cache'). Tutti i pattern dello
+    stesso tipo sono compilati in un'unica regex.
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(patterns or [])
+        names = [p for p in self.patterns if "/" not in p.strip("/")]
+        paths = [p.strip("/") for p in self.patterns if "/" in p.strip("/")]
+        self._name = self._compile(names)
+        self._path = self._compile(paths)
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile("|".join(fnmatch.translate(p) for p in patterns)).match
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def matches(self, name, rel_path):
+        """True se la voce (nome e percorso relativo) è esclusa."""
+        if self._name is not None and self._name(name):
+            return True
+        return self._path is not None and self._path(rel_path) is not None
+
+    def excluded(self, rel_path):
+        """True se il percorso relativo o una sua directory è escluso."""
+        if not self.patterns or not rel_path:
+            return False
+        parts = rel_path.split("/")
+        if self._name is not None:
+            for part in parts:
+                if self._name(part):
+                    return True
+        if self._path is not None:
+            for i in range(1, len(parts) + 1):
+                if self._path("/".join(parts[:i])):
+                    return True
+        return False
+
+
+class WatchPlan:
+    """
+    Piano dei watch di un albero.
+
+    native: (percorso, ricorsivo, directory coperte) da registrare
+        sull'osservatore nativo
+    polled: radici dei sottoalberi da tenere in polling
+
+    I watch non ricorsivi sono per le directory che contengono
+    directory escluse o in polling.
+    """
+
+    def __init__(self):
+        self.native = []
+        self.polled = []
+        self.directories = 0
+        self.native_dirs = 0
+        self.polled_dirs = 0
+        self.pruned = 0
+        self.unreadable = 0
+        self.elapsed = 0.0
+
+
+def _relative(path, prefix_len):
+    rel = path[prefix_len:]
+    return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+
+def plan_watches(root, exclude=None, budget=None, recursive=True, base=None):
+    """
+    Visita l'albero e decide come osservarlo.
+
+    La visita è in ampiezza con os.scandir e non entra nelle directory
+    escluse, illeggibili o nei link simbolici. Ogni directory rimasta
+    costa un watch descriptor (inotify). Se sono più di 'budget', alcuni
+    sottoalberi passano al polling: il più piccolo che da solo basta a
+    rientrare nel budget, altrimenti il più grande e si ripete.
+
+    Un sottoalbero senza esclusioni né polling diventa un solo watch
+    ricorsivo; le directory sopra un'esclusione hanno un watch non
+    ricorsivo e i figli vengono pianificati separatamente.
+
+    Args:
+        root: Directory radice
+        exclude: ExcludeMatcher (opzionale)
+        budget: Numero massimo di directory con watch nativo (None = nessun limite)
+        recursive: False per osservare solo la radice
+        base: Radice dei percorsi relativi per le esclusioni (default: root)
+
+    Returns:
+        WatchPlan
+    """
+    start = time.perf_counter()
+    plan = WatchPlan()
+    root = os.fspath(root)
+    exclude = exclude or ExcludeMatcher()
+
+    if not recursive:
+        plan.native.append((root, False, 1))
+        plan.directories = plan.native_dirs = 1
+        plan.elapsed = time.perf_counter() - start
+        return plan
+
+    base = os.fspath(base) if base is not None else root
+    prefix_len = len(base) if base.endswith(os.sep) else len(base) + 1
+    paths = [root]
+    parents = [-1]
+    dirty = [False]
+
+    i = 0
+    while i < len(paths):
+        try:
+            with os.scandir(paths[i]) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                    except OSError:
+                        continue
+                    if exclude and exclude.matches(entry.name, _relative(entry.path, prefix_len)):
+                        plan.pruned += 1
+                        dirty[i] = True
+                        continue
+                    paths.append(entry.path)
+                    parents.append(i)
+                    dirty.append(False)
+        except OSError:
+            # Senza permesso di lettura non si può nemmeno aggiungere il watch
+            plan.unreadable += 1
+            if i:
+                dirty[parents[i]] = True
+        i += 1
+
+    count = len(paths)
+    sizes = [1] * count
+    for i in range(count - 1, 0, -1):
+        sizes[parents[i]] += sizes[i]
+
+    demoted = set()
+    if budget is not None and count > budget > 0:
+        demoted = _choose_polled(parents, sizes, count - budget)
+
+    for i in range(count - 1, 0, -1):
+        if dirty[i] or i in demoted:
+            dirty[parents[i]] = True
+
+    # Dall'alto: i sottoalberi puliti diventano un watch ricorsivo
+    expanded = [False] * count
+    for i in range(count):
+        if i and not expanded[parents[i]]:
+            continue
+        if i in demoted:
+            plan.polled.append(paths[i])
+            plan.polled_dirs += sizes[i]
+        elif dirty[i]:
+            plan.native.append((paths[i], False, 1))
+            expanded[i] = True
+        else:
+            plan.native.append((paths[i], True, sizes[i]))
+
+    plan.directories = count
+    plan.native_dirs = count - plan.polled_dirs
+    plan.elapsed = time.perf_counter() - start
+    return plan
+
+
+def _choose_polled(parents, sizes, excess):
+    """Sceglie le radici dei sottoalberi da mettere in polling."""
+    order = sorted(range(1, len(sizes)), key=sizes.__getitem__)
+    ordered_sizes = [sizes[i] for i in order]
+    demoted = set()
+
+    def available(node):
+        while node > 0:
+            if node in demoted:
+                return False
+            node = parents[node]
+        return True
+
+    while excess > 0:
+        chosen = None
+        # Il più piccolo sottoalbero che basta da solo
+        for j in range(bisect.bisect_left(ordered_sizes, excess), len(order)):
+            if available(order[j]):
+                chosen = order[j]
+                break
+        if chosen is None:
+            # Nessuno basta: il più grande, poi si ripete
+            for j in range(len(order) - 1, -1, -1):
+                if available(order[j]):
+                    chosen = order[j]
+                    break
+        if chosen is None:
+            break
+        demoted.add(chosen)
+        excess -= sizes[chosen]
+    return demoted
+
+
+def default_watch_budget():
+    """
+    Budget di watch predefinito.
+
+    Su Linux metà di fs.inotify.max_user_watches (il limite è per
+    utente, condiviso con editor e altri monitor); altrove nessun limite,
+    perché FSEvents e ReadDirectoryChangesW non usano un watch per directory.
+    """
+    try:
+        with open("/proc/sys/fs/inotify/max_user_watches") as f:
+            return max(int(f.read()) // 2, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def count_inotify_watches():
+    """
+    Watch descriptor inotify del processo (da /proc/self/fdinfo).
+
+    Returns:
+        Numero di watch, o None se non disponibile (non Linux)
+    """
+    fdinfo = "/proc/self/fdinfo"
+    try:
+        names = os.listdir(fdinfo)
+    except OSError:
+        return None
+    total = 0
+    for name in names:
+        try:
+            with open(os.path.join(fdinfo, name)) as f:
+                total += sum(1 for line in f if line.startswith("inotify wd:"))
+        except OSError:
+            continue
+    return total
+
+
+class WatchManager(FileSystemEventHandler):
+    """
+    Registra i watch secondo un WatchPlan e li mantiene aggiornati.
+
+    È il gestore registrato sull'osservatore nativo: scarta gli eventi
+    dei percorsi esclusi e inoltra gli altri al target. Le directory
+    create sotto un watch non ricorsivo vengono pianificate e osservate
+    al volo; quelle eliminate perdono i loro watch.
+
+    Le esclusioni valgono anche per le directory create dopo l'avvio.
+    Dentro un watch ricorsivo l'osservatore aggiunge da solo un watch a
+    ogni nuova sottodirectory: se ne compare una esclusa (es. un
+    node_modules), il watch ricorsivo viene ripianificato in watch per
+    directory che la saltano. Un watch per ogni directory fin dall'avvio
+    non è praticabile: con watchdog ogni watch ha un proprio thread e
+    una propria istanza inotify (max_user_instances, di solito 128).
+
+    Tutto ciò che non ha un watch nativo (sottoalberi oltre il budget,
+    watch rifiutati dal sistema, es. per il limite di istanze inotify)
+    è coperto da un unico osservatore in polling sulla radice, il cui
+    listdir salta le esclusioni e i sottoalberi nativi.
+    """
+
+    # Secondi prima di rimuovere un watch ricorsivo ripianificato
+    # (watchdog trattiene gli eventi inotify per 0.5s)
+    RETIRE_DELAY = 1.0
+
+    def __init__(self, root, target, exclude=None, budget=None,
+                 poll_interval=2.0, recursive=True, logger=None):
+        """
+        Inizializza il gestore dei watch.
+
+        Args:
+            root: Directory radice
+            target: Gestore che riceve gli eventi filtrati
+            exclude: Pattern glob da escludere
+            budget: Directory con watch nativo al massimo (None = nessun limite)
+            poll_interval: Secondi tra due scansioni in polling
+            recursive: Osserva anche le sottodirectory
+            logger: Logger
+        """
+        super().__init__()
+        self.root = os.fspath(root)
+        self.target = target
+        self.exclude = ExcludeMatcher(exclude)
+        self.budget = budget
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.logger = logger or logging.getLogger(__name__)
+        self._prefix_len = len(self.root) if self.root.endswith(os.sep) else len(self.root) + 1
+
+        self.observer = Observer()
+        self.poller = None
+        self.plan = None
+        # percorso -> (watch, directory coperte)
+        self._watches = {}
+        # Radici dei watch ricorsivi e directory con watch non ricorsivo
+        self._native_roots = set()
+        self._expanded = set()
+        # Watch di directory eliminate o ripianificate, da rimuovere alla
+        # prossima schedule() o allo scadere di RETIRE_DELAY
+        self._retired = []
+        # Directory eliminate già segnalate: l'eliminazione arriva sia dal
+        # watch della directory padre sia da quello della directory stessa
+        self._gone = set()
+        self._lock = threading.Lock()
+        self.native_dirs = 0
+        self.fallbacks = 0
+        self.started_in = 0.0
+
+    def start(self):
+        """Pianifica e registra i watch, poi avvia gli osservatori."""
+        start = time.perf_counter()
+        self.plan = plan_watches(self.root, self.exclude, self.budget, self.recursive)
+        # Avviato prima di schedule(): gli errori di un watch arrivano
+        # dalla sua schedule() invece che da start()
+        self.observer.start()
+        with self._lock:
+            self._apply(self.plan)
+        self.started_in = time.perf_counter() - start
+
+    def stop(self):
+        """Ferma gli osservatori."""
+        for observer in (self.observer, self.poller):
+            if observer is not None and observer.is_alive():
+                observer.stop()
+                observer.join()
+
+    @property
+    def native_watches(self):
+        """Watch registrati sull'osservatore nativo."""
+        return len(self._watches)
+
+    def _apply(self, plan):
+        # Rimossi solo ora: gli eventi ancora in coda per un watch
+        # rimosso verrebbero scartati dall'osservatore
+        for watch in self._retired:
+            try:
+                self.observer.unschedule(watch)
+            except KeyError:
+                pass
+        self._retired.clear()
+
+        for path, recursive, dirs in plan.native:
+            if self.fallbacks:
+                # Limite del sistema già raggiunto: il resto va al polling
+                self.fallbacks += 1
+                continue
+            try:
+                watch = self.observer.schedule(self, path, recursive=recursive)
+            except OSError as e:
+                self.logger.warning(f"Watch nativo non disponibile per {path} ({e}): uso il polling")
+                self.fallbacks += 1
+                continue
+            self._watches[path] = (watch, dirs)
+            (self._native_roots if recursive else self._expanded).add(path)
+            self.native_dirs += dirs
+
+        if (plan.polled or self.fallbacks) and self.poller is None:
+            self._start_poller()
+
+    def _start_poller(self):
+        self.poller = PollingObserverVFS(
+            os.stat, self._listdir, polling_interval=self.poll_interval
+        )
+        self.poller.schedule(_PolledEvents(self), self.root, recursive=self.recursive)
+        self.poller.start()
+
+    def _listdir(self, path):
+        """os.scandir per il polling, senza esclusioni e sottoalberi nativi."""
+        # Dei file nelle directory con watch non ricorsivo si occupa
+        # l'osservatore nativo: servono solo le sottodirectory
+        dirs_only = path in self._expanded
+        result = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.path in self._native_roots:
+                    continue
+                if dirs_only and not entry.is_dir(follow_symlinks=False):
+                    continue
+                if self.exclude and self.exclude.matches(
+                        entry.name, _relative(entry.path, self._prefix_len)):
+                    continue
+                result.append(entry)
+        return result
+
+    def _covered(self, path):
+        """True se path ha già un watch nativo (diretto o di un antenato)."""
+        parent = os.path.dirname(path)
+        if parent in self._expanded:
+            return True
+        root_len = len(self.root)
+        while len(parent) >= root_len:
+            if parent in self._native_roots:
+                return True
+            parent, previous = os.path.dirname(parent), parent
+            if parent == previous:
+                break
+        return False
+
+    def dispatch(self, event):
+        """Filtra e inoltra un evento (thread dell'osservatore nativo)."""
+        if self._excluded(event):
+            if event.is_directory and self._native_roots:
+                self._prune(event)
+            return
+        if event.is_directory and self._expanded:
+            with self._lock:
+                if not self._track(event):
+                    return
+        self.target.dispatch(event)
+
+    def dispatch_polled(self, event):
+        """Filtra e inoltra un evento del polling (thread del poller)."""
+        if self._covered(os.fsdecode(event.src_path)) or self._excluded(event):
+            return
+        self.target.dispatch(event)
+
+    def _excluded(self, event):
+        if not self.exclude:
+            return False
+        if not self.exclude.excluded(_relative(os.fsdecode(event.src_path), self._prefix_len)):
+            return False
+        # Spostato da un percorso escluso a uno osservato: va consegnato
+        return (event.event_type != EVENT_TYPE_MOVED
+                or self.exclude.excluded(_relative(os.fsdecode(event.dest_path), self._prefix_len)))
+
+    def _track(self, event):
+        """
+        Aggiorna i watch per le directory create/eliminate sotto un watch
+        non ricorsivo.
+
+        Returns:
+            False se l'evento è un duplicato da scartare
+        """
+        event_type = event.event_type
+        src_path = os.fsdecode(event.src_path)
+        if event_type == EVENT_TYPE_DELETED:
+            if src_path in self._gone:
+                self._gone.discard(src_path)
+                return False
+            if src_path in self._watches:
+                self._gone.add(src_path)
+                self._forget(src_path)
+        elif event_type == EVENT_TYPE_MOVED:
+            self._forget(src_path)
+            self._extend(os.fsdecode(event.dest_path))
+        elif event_type == EVENT_TYPE_CREATED:
+            self._gone.discard(src_path)
+            self._extend(src_path)
+        return True
+
+    def _prune(self, event):
+        """Toglie dal suo watch ricorsivo una directory esclusa comparsa a runtime."""
+        if event.event_type == EVENT_TYPE_CREATED:
+            path = os.fsdecode(event.src_path)
+        elif event.event_type == EVENT_TYPE_MOVED:
+            path = os.fsdecode(event.dest_path)
+        else:
+            return
+        with self._lock:
+            parent = os.path.dirname(path)
+            root_len = len(self.root)
+            while len(parent) >= root_len and parent not in self._native_roots:
+                parent, previous = os.path.dirname(parent), parent
+                if parent == previous:
+                    return
+            if parent in self._native_roots:
+                self._split(parent)
+
+    def _split(self, path):
+        """Sostituisce il watch ricorsivo su path con un nuovo piano."""
+        watch, dirs = self._watches[path]
+        remaining = None if self.budget is None else self.budget - self.native_dirs + dirs
+        plan = plan_watches(path, self.exclude, remaining, base=self.root)
+        if len(plan.native) == 1 and plan.native[0][1] and not plan.polled:
+            # L'esclusa è già sparita: il watch ricorsivo va bene così (uno
+            # identico verrebbe riusato da watchdog e rimosso con il vecchio)
+            self.native_dirs += plan.native[0][2] - dirs
+            self._watches[path] = (watch, plan.native[0][2])
+            return
+        del self._watches[path]
+        self._native_roots.discard(path)
+        self.native_dirs -= dirs
+        # Prima i nuovi watch, poi la rimozione del vecchio: nessun buco.
+        # Il vecchio resta attivo finché watchdog non ha consegnato gli
+        # eventi che tiene in buffer (i doppi li unisce il coalescer)
+        self._apply(plan)
+        self._retired.append(watch)
+        timer = threading.Timer(self.RETIRE_DELAY, self._reap)
+        timer.daemon = True
+        timer.start()
+
+    def _reap(self):
+        """Rimuove i watch ritirati (thread del timer)."""
+        with self._lock:
+            retired, self._retired = self._retired, []
+        # Fuori dal lock: unschedule() prende il lock dell'osservatore,
+        # che il suo thread tiene mentre chiama dispatch()
+        for watch in retired:
+            try:
+                self.observer.unschedule(watch)
+            except KeyError:
+                pass
+
+    def _extend(self, path):
+        if os.path.dirname(path) not in self._expanded or path in self._watches:
+            return
+        if self.exclude.excluded(_relative(path, self._prefix_len)):
+            return
+        if self.budget is not None and self.native_dirs >= self.budget:
+            # Budget esaurito: la nuova directory resta al poller
+            if self.poller is None:
+                self._start_poller()
+            return
+        remaining = None if self.budget is None else self.budget - self.native_dirs
+        self._apply(plan_watches(path, self.exclude, remaining, base=self.root))
+
+    def _forget(self, path):
+        # Solo le radici dei watch registrati da qui: il resto lo gestisce watchdog
+        if path not in self._watches:
+            return
+        prefix = path + os.sep
+        for watched in [p for p in self._watches if p == path or p.startswith(prefix)]:
+            watch, dirs = self._watches.pop(watched)
+            self.native_dirs -= dirs
+            self._native_roots.discard(watched)
+            self._expanded.discard(watched)
+            self._retired.append(watch)
+
+    def report(self):
+        """Righe di riepilogo dell'avvio."""
+        plan = self.plan
+        lines = [
+            f"Directory visitate: {plan.directories} in {plan.elapsed:.2f}s "
+            f"(escluse: {plan.pruned}, illeggibili: {plan.unreadable})",
+            f"Watch nativi: {self.native_watches} "
+            f"({self.native_dirs} directory, budget: {self.budget or 'nessun limite'})",
+        ]
+        if self.poller is not None:
+            lines.append(
+                f"Polling ogni {self.poll_interval}s: {plan.polled_dirs} directory oltre "
+                f"il budget, {self.fallbacks} watch rifiutati dal sistema"
+            )
+        descriptors = count_inotify_watches()
+        if descriptors is not None:
+            lines.append(f"Watch descriptor inotify: {descriptors}")
+        lines.append(f"Avvio completato in {self.started_in:.2f}s")
+        return lines
+
+
+class _PolledEvents(FileSystemEventHandler):
+    """Gestore del poller: passa gli eventi al WatchManager."""
+
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+
+    def dispatch(self, event):
+        self.manager.dispatch_polled(event)
+
+
+# Byte letti all'inizio e alla fine di un file per l'hash veloce
+HASH_SAMPLE = 64 * 1024
+# Thread della scansione parallela
+SCAN_WORKERS = 8
+SNAPSHOT_VERSION = 1
+
+
+def fast_hash(path, size):
+    """
+    Hash veloce di un file: dimensione, primi e ultimi HASH_SAMPLE byte.
+
+    Non legge l'intero file, quindi il costo è costante; basta a
+    distinguere i contenuti quando dimensione e mtime non cambiano e ad
+    accoppiare le copie nelle mosse tra file system.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(HASH_SAMPLE))
+        if size > 2 * HASH_SAMPLE:
+            f.seek(-HASH_SAMPLE, os.SEEK_END)
+            digest.update(f.read(HASH_SAMPLE))
+        elif size > HASH_SAMPLE:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def scan_tree(root, exclude=None, recursive=True, workers=None,
+              hash_files=False, previous=None):
+    """
+    Visita parallela dell'albero con os.scandir.
+
+    I thread condividono una coda di directory: ognuno ne estrae una, la
+    legge e accoda le sottodirectory. scandir e lstat rilasciano il GIL,
+    quindi le attese sul disco si sovrappongono. Le directory non
+    richiedono stat (inode e tipo arrivano da scandir).
+
+    Args:
+        root: Directory radice
+        exclude: ExcludeMatcher (opzionale)
+        recursive: False per leggere solo la radice
+        workers: Thread di scansione (default: SCAN_WORKERS)
+        hash_files: Calcola fast_hash per i file
+        previous: Voci di uno snapshot precedente: l'hash dei file con
+            inode, dimensione e mtime invariati viene riusato
+
+    Returns:
+        Dict percorso relativo -> (inode, size, mtime_ns, is_dir, hash)
+    """
+    root = os.fspath(root)
+    prefix_len = len(root) if root.endswith(os.sep) else len(root) + 1
+    exclude = exclude or ExcludeMatcher()
+    workers = workers or SCAN_WORKERS
+    previous = previous or {}
+    entries = {}
+    pending = queue.Queue()
+
+    matches = exclude.matches if exclude else None
+    is_regular = stat.S_ISREG
+
+    def scan(path):
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return
+        # Percorso caldo: una iterazione per voce, niente chiamate superflue
+        with it:
+            for entry in it:
+                entry_path = entry.path
+                if matches is not None and matches(entry.name, _relative(entry_path, prefix_len)):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        entries[entry_path[prefix_len:]] = (entry.inode(), 0, 0, True, None)
+                        if recursive:
+                            pending.put(entry_path)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    rel = entry_path[prefix_len:]
+                    digest = None
+                    if hash_files and is_regular(st.st_mode):
+                        old = previous.get(rel)
+                        if old and old[:3] == (st.st_ino, st.st_size, st.st_mtime_ns):
+                            digest = old[4]
+                        if digest is None:
+                            digest = fast_hash(entry_path, st.st_size)
+                    entries[rel] = (st.st_ino, st.st_size, st.st_mtime_ns, False, digest)
+                except OSError:
+                    # Sparito durante la visita o illeggibile
+                    continue
+
+    def worker():
+        while True:
+            path = pending.get()
+            if path is None:
+                break
+            try:
+                scan(path)
+            finally:
+                pending.task_done()
+
+    pending.put(root)
+    threads = [threading.Thread(target=worker, name=f"scan-{i}", daemon=True)
+               for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    pending.join()
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return entries
+
+
+class TreeSnapshot:
+    """
+    Snapshot persistente di un albero: percorso -> inode, size, mtime, hash.
+
+    Confrontando lo snapshot salvato all'arresto con una nuova scansione
+    si ricostruiscono i cambiamenti avvenuti mentre il monitor era fermo.
+    """
+
+    def __init__(self, root, entries=None, hashed=False, taken=None):
+        self.root = os.fspath(root)
+        self.entries = entries or {}
+        self.hashed = hashed
+        self.taken = taken or time.time()
+
+    @classmethod
+    def scan(cls, root, exclude=None, recursive=True, workers=None,
+             hash_files=False, previous=None):
+        """Crea uno snapshot con scan_tree()."""
+        entries = scan_tree(
+            root, exclude, recursive, workers, hash_files,
+            previous.entries if previous is not None and previous.hashed else None
+        )
+        return cls(root, entries, hashed=hash_files)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carica uno snapshot salvato.
+
+        Returns:
+            TreeSnapshot, o None se il file non esiste
+
+        Raises:
+            ValueError: File non valido o di un'altra versione
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot non valido o di un'altra versione: {path}")
+        entries = {rel: tuple(record) for rel, record in data["entries"].items()}
+        return cls(data["root"], entries, hashed=data["hashed"], taken=data["taken"])
+
+    def save(self, path):
+        """Salva lo snapshot (scrittura atomica: file temporaneo + rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "root": self.root,
+                "hashed": self.hashed,
+                "taken": self.taken,
+                "entries": self.entries,
+            }, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def diff(self, current):
+        """
+        Eventi sintetici per passare da questo snapshot a current.
+
+        Una voce sparita e una nuova con lo stesso inode (e tipo, e per
+        i file la stessa dimensione) sono uno spostamento; con l'hash
+        anche due file con stessa dimensione e hash. Un file con stesso
+        percorso ma inode, dimensione, mtime o hash diversi è modificato.
+        Le directory spostate includono gli spostamenti del contenuto,
+        come negli eventi live di watchdog.
+
+        Args:
+            current: Snapshot più recente dello stesso albero
+
+        Returns:
+            Lista di eventi watchdog (percorsi assoluti, is_synthetic),
+            in ordine: spostamenti, creazioni, eliminazioni, modifiche
+        """
+        old, new = self.entries, current.entries
+        root = current.root
+
+        def path(rel):
+            return os.path.join(root, rel)
+
+        deleted = {rel: old[rel] for rel in old.keys() - new.keys()}
+        created = {rel: new[rel] for rel in new.keys() - old.keys()}
+
+        moved = []
+        by_inode = {record[0]: rel for rel, record in deleted.items() if record[0]}
+        for rel in sorted(created):
+            record = created[rel]
+            source = by_inode.get(record[0])
+            if source is None:
+                continue
+            old_record = deleted[source]
+            if old_record[3] == record[3] and (record[3] or old_record[1] == record[1]):
+                moved.append((source, rel, record[3]))
+                del by_inode[record[0]]
+
+        for source, rel, _ in moved:
+            del deleted[source]
+            del created[rel]
+
+        if self.hashed and current.hashed:
+            by_content = {}
+            for rel, record in deleted.items():
+                if not record[3] and record[4]:
+                    by_content.setdefault((record[1], record[4]), []).append(rel)
+            for rel in sorted(created):
+                record = created[rel]
+                sources = by_content.get((record[1], record[4])) if not record[3] else None
+                if sources:
+                    source = sources.pop()
+                    moved.append((source, rel, False))
+                    del deleted[source]
+                    del created[rel]
+
+        events = []
+        for source, rel, is_dir in sorted(moved, key=lambda m: m[1]):
+            cls = DirMovedEvent if is_dir else FileMovedEvent
+            events.append(cls(path(source), path(rel)))
+        # Genitori prima dei figli nelle creazioni, figli prima nelle eliminazioni
+        for rel in sorted(created):
+            events.append(_created(path(rel), created[rel][3]))
+        for rel in sorted(deleted, reverse=True):
+            cls = DirDeletedEvent if deleted[rel][3] else FileDeletedEvent
+            events.append(cls(path(rel)))
+        for rel in sorted(old.keys() & new.keys()):
+            before, after = old[rel], new[rel]
+            if after[3] or before[3]:
+                continue
+            if (before[:3] != after[:3]
+                    or (before[4] and after[4] and before[4] != after[4])):
+                events.append(FileModifiedEvent(path(rel)))
+        for event in events:
+            event.is_synthetic = True
+        return events
+
+
+def _record(event, timestamp):
+    """Evento watchdog -> record del sink."""
+    return (
+        timestamp,
+        event.event_type,
+        os.fsdecode(event.src_path),
+        os.fsdecode(getattr(event, "dest_path", "") or "") or None,
+        bool(event.is_directory),
+        bool(getattr(event, "is_synthetic", False)),
+    )
+
+
+RECORD_FIELDS = ("timestamp", "event_type", "src_path", "dest_path", "is_directory", "is_synthetic")
+
+# Tipi registrati dal sink per default (opened/closed sono accessi, non cambiamenti)
+CHANGE_EVENT_TYPES = (EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_DELETED, EVENT_TYPE_MOVED)
+
+
+def _under(path, prefix):
+    return path is not None and (path == prefix or path.startswith(prefix + os.sep))
+
+
+def _directory_prefix(under):
+    """
+    Directory di una query senza separatore finale.
+
+    La radice diventa '': ogni percorso assoluto inizia con os.sep, quindi
+    la ricerca di '' + os.sep li comprende tutti (invece di cercare '//').
+    """
+    return under.rstrip(os.sep)
+
+
+class NDJSONBackend:
+    """
+    Backend JSON a righe (un oggetto per riga, file in append).
+
+    Ogni batch è una sola write(); con durable=True segue un solo fsync
+    per batch (group commit) invece di uno per evento.
+    """
+
+    def __init__(self, path, durable=True):
+        self.path = Path(path)
+        self.durable = durable
+        self._file = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, records):
+        lines = [json.dumps(dict(zip(RECORD_FIELDS, record)), ensure_ascii=False)
+                 for record in records]
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def query(self, under=None, since=None, until=None, types=None, limit=None):
+        """Scansione sequenziale del file (vedi EventSink.query)."""
+        if under is not None:
+            under = _directory_prefix(under)
+        results = []
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return results
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Riga troncata da un arresto brusco
+                    continue
+                timestamp = record["timestamp"]
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp >= until:
+                    continue
+                if types and record["event_type"] not in types:
+                    continue
+                if under is not None and not (_under(record["src_path"], under)
+                                              or _under(record["dest_path"], under)):
+                    continue
+                results.append(record)
+        if limit is not None:
+            results = results[-limit:]
+        return results
+
+
+class SQLiteBackend:
+    """
+    Backend SQLite in modalità WAL.
+
+    Ogni batch è una transazione con executemany (group commit). Gli
+    indici su timestamp e percorso rendono le query per intervallo di
+    tempo e sottoalbero delle ricerche per intervallo sull'indice.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            event_type TEXT NOT NULL,
+            src_path TEXT NOT NULL,
+            dest_path TEXT,
+            is_directory INTEGER NOT NULL,
+            is_synthetic INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+        CREATE INDEX IF NOT EXISTS events_src_path ON events (src_path);
+        CREATE INDEX IF NOT EXISTS events_dest_path ON events (dest_path);
+    """
+
+    def __init__(self, path, durable=True):
+        self.path = Path(path)
+        self.durable = durable
+        self._conn = None
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(str(self.path), check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Aperta da start(), poi usata solo dal thread writer del sink
+        self._conn = self._connect(check_same_thread=False)
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if self.durable else 'NORMAL'}")
+        self._conn.executescript(self.SCHEMA)
+
+    def write(self, records):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (timestamp, event_type, src_path, dest_path,"
+                " is_directory, is_synthetic) VALUES (?, ?, ?, ?, ?, ?)",
+                records
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def query(self, under=None, since=None, until=None, types=None, limit=None):
+        """Query SQL sugli indici (vedi EventSink.query)."""
+        if not self.path.exists():
+            return []
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if types:
+            clauses.append(f"event_type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        if under is not None:
+            # 'X' o 'X/...': intervallo [X/, X0) sull'indice, invece di LIKE
+            under = _directory_prefix(under)
+            low = under + os.sep
+            high = under + chr(ord(os.sep) + 1)
+            clauses.append(
+                "(src_path = ? OR (src_path >= ? AND src_path < ?)"
+                " OR dest_path = ? OR (dest_path >= ? AND dest_path < ?))"
+            )
+            params.extend([under, low, high, under, low, high])
+        sql = f"SELECT id, {', '.join(RECORD_FIELDS)} FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            # Gli ultimi N, restituiti in ordine di arrivo
+            sql = f"SELECT * FROM ({sql} ORDER BY id DESC LIMIT {int(limit)})"
+        sql += " ORDER BY id"
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [
+            dict(zip(RECORD_FIELDS, row[1:5] + (bool(row[5]), bool(row[6]))))
+            for row in rows
+        ]
+
+
+def open_backend(path, format=None, durable=True):
+    """
+    Crea il backend per un file di eventi.
+
+    Args:
+        path: File di destinazione
+        format: 'ndjson' o 'sqlite' (default: dall'estensione,
+            .db/.sqlite/.sqlite3 -> SQLite, altrimenti NDJSON)
+        durable: fsync a ogni batch
+
+    Raises:
+        ValueError: Formato sconosciuto
+    """
+    if format is None:
+        format = "sqlite" if Path(path).suffix.lower() in (".db", ".sqlite", ".sqlite3") else "ndjson"
+    if format == "ndjson":
+        return NDJSONBackend(path, durable)
+    if format == "sqlite":
+        return SQLiteBackend(path, durable)
+    raise ValueError(f"Formato sink sconosciuto: {format}")
+
+
+class EventSink(FileSystemEventHandler):
+    """
+    Registrazione strutturata degli eventi su NDJSON o SQLite.
+
+    dispatch()/on_batch() mettono i record in una coda limitata; un
+    thread writer li scrive a blocchi: un batch parte quando raggiunge
+    flush_size record o quando il primo record attende da flush_interval
+    secondi. Ogni batch è una sola scrittura (e un solo fsync).
+
+    Se il writer resta indietro e la coda si riempie:
+    - overflow='block': chi consegna attende (back-pressure); dietro
+      l'EventCoalescer gli eventi grezzi continuano a essere accodati e
+      uniti, quindi l'osservatore non si blocca
+    - overflow='drop': il record viene scartato e contato
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop")
+
+    def __init__(self, backend, flush_size=500, flush_interval=1.0,
+                 max_pending=10000, overflow="block",
+                 event_types=CHANGE_EVENT_TYPES, logger=None):
+        """
+        Inizializza il sink.
+
+        Args:
+            backend: NDJSONBackend o SQLiteBackend (vedi open_backend)
+            flush_size: Record per batch al massimo
+            flush_interval: Attesa massima di un record prima della scrittura
+            max_pending: Record in coda al massimo
+            overflow: 'block' o 'drop' a coda piena
+            event_types: Tipi di evento da registrare (None = tutti)
+            logger: Logger per gli errori di scrittura
+        """
+        super().__init__()
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow deve essere uno di {self.OVERFLOW_POLICIES}")
+        self.backend = backend
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.event_types = frozenset(event_types) if event_types else None
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.blocked = 0.0
+
+    def start(self):
+        """Apre il backend e avvia il writer."""
+        self.backend.open()
+        self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Scrive i record in coda, poi chiude il backend."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def dispatch(self, event):
+        if self.event_types is None or event.event_type in self.event_types:
+            self._put(_record(event, time.time()))
+
+    def on_batch(self, events):
+        """Blocco dall'EventCoalescer: un solo timestamp per blocco."""
+        now = time.time()
+        types = self.event_types
+        for event in events:
+            if types is None or event.event_type in types:
+                self._put(_record(event, now))
+
+    def _put(self, record):
+        if self.overflow == "drop":
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                if not self.dropped:
+                    self.logger.warning("Sink in ritardo: gli eventi in eccesso vengono scartati")
+                self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            start = time.monotonic()
+            self._queue.put(record)
+            self.blocked += time.monotonic() - start
+
+    def _run(self):
+        pending = self._queue
+        running = True
+        while running:
+            record = pending.get()
+            if record is None:
+                break
+            batch = [record]
+            deadline = time.monotonic() + self.flush_interval
+            # Group commit: accumula fino a flush_size o alla scadenza
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    record = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    running = False
+                    break
+                batch.append(record)
+            self._write(batch)
+        self.backend.close()
+
+    def _write(self, batch):
+        try:
+            self.backend.write(batch)
+        except Exception as e:
+            self.errors += len(batch)
+            self.logger.error(f"Scrittura sink fallita ({len(batch)} eventi persi): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def query(self, under=None, since=None, until=None, types=None, limit=None):
+        """
+        Eventi registrati, in ordine di arrivo.
+
+        Args:
+            under: Solo i percorsi sotto questa directory (sorgente o
+                destinazione di uno spostamento)
+            since: Timestamp minimo (time.time())
+            until: Timestamp massimo (escluso)
+            types: Tipi di evento ('created', 'modified', ...)
+            limit: Solo gli ultimi N eventi
+
+        Returns:
+            Lista di dict con i campi di RECORD_FIELDS
+        """
+        if under is not None:
+            under = os.path.abspath(under)
+        return self.backend.query(under, since, until, types, limit)
+
+
+def parse_duration(text):
+    """
+    Durata in secondi da '90', '30s', '15m', '1h' o '2d'.
+
+    Raises:
+        ValueError: Formato non valido
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def print_events(records):
+    """Stampa il risultato di EventSink.query()."""
+    for record in records:
+        when = datetime.fromtimestamp(record["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        line = f"{when}  {record['event_type']:<10} {record['src_path']}"
+        if record["dest_path"]:
+            line += f" -> {record['dest_path']}"
+        if record["is_synthetic"]:
+            line += "  (catch-up)"
+        print(line)
+    print(f"\n{len(records)} eventi")
+
+
+class _Fanout(FileSystemEventHandler):
+    """Consegna ogni evento a più gestori (senza coalescenza)."""
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = handlers
+
+    def dispatch(self, event):
+        for handler in self.handlers:
+            handler.dispatch(event)
+
+
 class FileMonitor:
     """
     Monitor di File System principale.
@@ -108,7 +1564,12 @@ class FileMonitor:
     i cambiamenti in una directory.
     """
 
-    def __init__(self, path, recursive=True, verbose=False, log_file=None):
+    def __init__(self, path, recursive=True, verbose=False, log_file=None,
+                 event_handler=None, window=0.5, exclude=None,
+                 watch_budget=None, poll_interval=2.0, snapshot_file=None,
+                 hash_files=False, scan_workers=None, sink_file=None,
+                 sink_format=None, flush_size=500, flush_interval=1.0,
+                 sink_overflow="block"):
         """
         Inizializza il monitor di file.
 
@@ -117,17 +1578,64 @@ class FileMonitor:
             recursive: Monitora anche le sottodirectory
             verbose: Mostra output dettagliato a console
             log_file: File di log (opzionale)
+            event_handler: Gestore degli eventi (default: FileMonitorHandler)
+            window: Finestra di coalescenza in secondi (0 = eventi grezzi)
+            exclude: Pattern glob delle directory/file da ignorare
+            watch_budget: Directory con watch nativo al massimo
+                (None = automatico, 0 = nessun limite)
+            poll_interval: Secondi tra le scansioni dei sottoalberi in polling
+            snapshot_file: Snapshot dell'albero per il catch-up all'avvio
+                (None = nessun catch-up)
+            hash_files: Includi nello snapshot l'hash veloce dei file
+            scan_workers: Thread della scansione (default: SCAN_WORKERS)
+            sink_file: File NDJSON/SQLite in cui registrare gli eventi
+            sink_format: 'ndjson' o 'sqlite' (default: dall'estensione)
+            flush_size: Eventi per batch di scrittura al massimo
+            flush_interval: Attesa massima di un evento prima della scrittura
+            sink_overflow: 'block' o 'drop' quando il sink resta indietro
         """
         self.path = Path(path).resolve()
         self.recursive = recursive
         self.verbose = verbose
         self.log_file = log_file
+        self.window = window
+        self.exclude = list(exclude or [])
+        if watch_budget is None:
+            watch_budget = default_watch_budget()
+        self.watch_budget = watch_budget or None
+        self.poll_interval = poll_interval
+        self.snapshot_file = self._own_file(snapshot_file, ".tmp")
+        self.hash_files = hash_files
+        self.scan_workers = scan_workers
+        self.sink_file = self._own_file(sink_file, "-wal", "-shm", "-journal")
+        self.sink_format = sink_format
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.sink_overflow = sink_overflow
+        self.sink = None
+        self.watches = None
         self.observer = None
-        self.event_handler = None
+        self.event_handler = event_handler
+        self.coalescer = None
 
         # Configura il logging
         self._setup_logging()
 
+    def _own_file(self, path, *suffixes):
+        """
+        Percorso assoluto di un file scritto dal monitor.
+
+        Se il file è dentro l'albero osservato viene escluso (con i suoi
+        file accessori), altrimenti ogni scrittura genererebbe eventi.
+        """
+        if not path:
+            return None
+        resolved = Path(path).expanduser().resolve()
+        if self.path in resolved.parents:
+            rel = glob.escape(resolved.relative_to(self.path).as_posix())
+            self.exclude += [rel] + [rel + suffix for suffix in suffixes]
+        return str(resolved)
+
     def _setup_logging(self):
         """Configura il sistema di logging."""
         log_format = "%(asctime)s - %(message)s"
@@ -164,42 +1672,166 @@ class FileMonitor:
             )
 
         # Crea il gestore di eventi
-        self.event_handler = FileMonitorHandler(
-            logger=self.logger,
-            verbose=self.verbose
-        )
+        if self.event_handler is None:
+            self.event_handler = FileMonitorHandler(
+                logger=self.logger,
+                verbose=self.verbose
+            )
 
-        # Crea e avvia l'osservatore
-        self.observer = Observer()
-        self.observer.schedule(
-            self.event_handler,
-            str(self.path),
-            recursive=self.recursive
+        handlers = [self.event_handler]
+        if self.sink_file:
+            self.sink = EventSink(
+                open_backend(self.sink_file, self.sink_format),
+                flush_size=self.flush_size,
+                flush_interval=self.flush_interval,
+                overflow=self.sink_overflow,
+                logger=self.logger
+            )
+            self.sink.start()
+            handlers.append(self.sink)
+
+        # Coalescenza: l'osservatore consegna al coalescer, che passa
+        # i blocchi ai gestori sul proprio thread
+        target = handlers[0] if len(handlers) == 1 else _Fanout(handlers)
+        if self.window > 0:
+            self.coalescer = EventCoalescer(
+                handlers, window=self.window, logger=self.logger
+            )
+            self.coalescer.start()
+            target = self.coalescer
+
+        # Pianifica i watch (esclusioni e budget) e avvia gli osservatori
+        self.watches = WatchManager(
+            self.path, target,
+            exclude=self.exclude,
+            budget=self.watch_budget,
+            poll_interval=self.poll_interval,
+            recursive=self.recursive,
+            logger=self.logger
         )
-        self.observer.start()
+        self.watches.start()
+        self.observer = self.watches.observer
 
         self.logger.info("=" * 70)
         self.logger.info("FILE MONITOR - AVVIATO")
         self.logger.info("=" * 70)
         self.logger.info(f"Directory monitorata: {self.path}")
         self.logger.info(f"Monitoraggio ricorsivo: {self.recursive}")
+        self.logger.info(f"Finestra di coalescenza: {self.window}s")
+        if self.exclude:
+            self.logger.info(f"Esclusioni: {', '.join(self.exclude)}")
+        for line in self.watches.report():
+            self.logger.info(line)
         self.logger.info(f"File di log: {self.log_file or 'Console'}")
+        if self.sink:
+            self.logger.info(
+                f"Sink eventi: {self.sink_file} "
+                f"(batch {self.flush_size} / {self.flush_interval}s, overflow: {self.sink_overflow})"
+            )
         self.logger.info("=" * 70)
+
+        # Dopo l'avvio dei watch: nessun cambiamento cade tra la
+        # scansione e l'inizio del monitoraggio live
+        if self.snapshot_file:
+            self._catch_up(target)
+
         self.logger.info("In attesa di eventi... (Premi Ctrl+C per interrompere)")
         self.logger.info("")
 
     def stop(self):
         """Ferma il monitoraggio."""
-        if self.observer:
-            self.observer.stop()
-            self.observer.join()
+        if self.watches:
+            self.watches.stop()
+
+        # Consegna gli eventi ancora in attesa
+        if self.coalescer:
+            self.coalescer.stop()
+
+        if self.sink:
+            self.sink.stop()
+
+        if self.snapshot_file:
+            self._save_snapshot()
 
         self.logger.info("")
         self.logger.info("=" * 70)
         self.logger.info("FILE MONITOR - FERMATO")
-        self.logger.info(f"Totale eventi registrati: {self.event_handler.event_count}")
+        self.logger.info(f"Totale eventi registrati: {getattr(self.event_handler, 'event_count', 0)}")
+        if self.coalescer:
+            self.logger.info(
+                f"Eventi grezzi: {self.coalescer.received}, "
+                f"dopo la coalescenza: {self.coalescer.emitted}"
+            )
+        if self.sink:
+            self.logger.info(
+                f"Sink: {self.sink.written} eventi in {self.sink.batches} batch, "
+                f"scartati: {self.sink.dropped}, errori: {self.sink.errors}, "
+                f"attesa per back-pressure: {self.sink.blocked:.2f}s"
+            )
         self.logger.info("=" * 70)
 
+    def _scan(self, previous=None):
+        return TreeSnapshot.scan(
+            self.path, ExcludeMatcher(self.exclude), self.recursive,
+            self.scan_workers, self.hash_files, previous
+        )
+
+    def _catch_up(self, target):
+        """
+        Emette gli eventi sintetici dei cambiamenti avvenuti a monitor fermo.
+
+        Confronta lo snapshot salvato con una nuova scansione e consegna
+        le differenze al target, come se fossero eventi live; lo snapshot
+        viene poi aggiornato.
+        """
+        start = time.perf_counter()
+        try:
+            previous = TreeSnapshot.load(self.snapshot_file)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Snapshot ignorato ({e})")
+            previous = None
+        if previous is not None and previous.root != str(self.path):
+            self.logger.warning(f"Snapshot di un'altra directory ({previous.root}): ignorato")
+            previous = None
+
+        current = self._scan(previous)
+        scanned = time.perf_counter() - start
+
+        if previous is None:
+            self.logger.info(
+                f"Catch-up: nessuno snapshot precedente, "
+                f"{len(current.entries)} voci scansionate in {scanned:.2f}s"
+            )
+        else:
+            events = previous.diff(current)
+            counts = {}
+            for event in events:
+                counts[event.event_type] = counts.get(event.event_type, 0) + 1
+                target.dispatch(event)
+            changed = ", ".join(f"{kind}: {n}" for kind, n in sorted(counts.items()))
+            since = datetime.fromtimestamp(previous.taken).strftime("%Y-%m-%d %H:%M:%S")
+            self.logger.info(
+                f"Catch-up dal {since}: {len(current.entries)} voci scansionate "
+                f"in {scanned:.2f}s, {len(events)} cambiamenti ({changed or 'nessuno'})"
+            )
+        current.save(self.snapshot_file)
+
+    def _save_snapshot(self):
+        start = time.perf_counter()
+        previous = None
+        if self.hash_files:
+            # Solo per riusare gli hash dei file invariati
+            try:
+                previous = TreeSnapshot.load(self.snapshot_file)
+            except (OSError, ValueError, KeyError):
+                pass
+        snapshot = self._scan(previous)
+        snapshot.save(self.snapshot_file)
+        self.logger.info(
+            f"Snapshot salvato: {len(snapshot.entries)} voci "
+            f"in {time.perf_counter() - start:.2f}s ({self.snapshot_file})"
+        )
+
     def run(self):
         """Esegue il monitoraggio fino a interruzione."""
         try:
@@ -249,6 +1881,21 @@ Esempi:
 
   # Monitora solo la directory (non ricorsivo)
   python file_monitor.py /percorso/directory --no-recursive
+
+  # Unisci le raffiche di eventi in finestre di 2 secondi
+  python file_monitor.py /percorso/directory --window 2
+
+  # Riporta anche i cambiamenti avvenuti mentre il monitor era fermo
+  python file_monitor.py /percorso/directory --snapshot ~/.cache/monitor-progetto.json
+
+  # Registra gli eventi in SQLite (batch da 1000 o ogni 2 secondi)
+  python file_monitor.py /percorso/directory --sink eventi.db --flush-size 1000 --flush-interval 2
+
+  # Cambiamenti sotto src/ nell'ultima ora, dal sink
+  python file_monitor.py /percorso/directory --sink eventi.db --query src --since 1h
+
+  # Albero grande: niente watch su dipendenze e build, massimo 50000 watch
+  python file_monitor.py ~/progetti -x node_modules -x .git -x 'build/*' --watch-budget 50000
         """
     )
 
@@ -277,6 +1924,113 @@ Esempi:
         help='Non monitorare le sottodirectory'
     )
 
+    parser.add_argument(
+        '-w', '--window',
+        type=float,
+        default=0.5,
+        metavar='SECONDI',
+        help='Finestra di coalescenza degli eventi (default: 0.5, 0 = disattiva)'
+    )
+
+    parser.add_argument(
+        '-x', '--exclude',
+        action='append',
+        default=[],
+        metavar='GLOB',
+        help='Ignora directory/file che corrispondono al pattern (ripetibile)'
+    )
+
+    parser.add_argument(
+        '--watch-budget',
+        type=int,
+        metavar='N',
+        help='Directory con watch nativo al massimo, le altre in polling '
+             '(default: metà di max_user_watches su Linux, 0 = nessun limite)'
+    )
+
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=2.0,
+        metavar='SECONDI',
+        help='Intervallo di polling dei sottoalberi oltre il budget (default: 2)'
+    )
+
+    parser.add_argument(
+        '--snapshot',
+        metavar='FILE',
+        help="Snapshot dell'albero: all'avvio riporta i cambiamenti avvenuti a monitor fermo"
+    )
+
+    parser.add_argument(
+        '--hash',
+        action='store_true',
+        help='Includi nello snapshot un hash veloce dei file (rileva copie e modifiche a mtime invariato)'
+    )
+
+    parser.add_argument(
+        '--scan-workers',
+        type=int,
+        metavar='N',
+        help=f'Thread della scansione dello snapshot (default: {SCAN_WORKERS})'
+    )
+
+    parser.add_argument(
+        '--sink',
+        metavar='FILE',
+        help='Registra gli eventi in un file NDJSON o SQLite (.db/.sqlite)'
+    )
+
+    parser.add_argument(
+        '--sink-format',
+        choices=['ndjson', 'sqlite'],
+        help='Formato del sink (default: dall\'estensione del file)'
+    )
+
+    parser.add_argument(
+        '--flush-size',
+        type=int,
+        default=500,
+        metavar='N',
+        help='Eventi per batch di scrittura al massimo (default: 500)'
+    )
+
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=1.0,
+        metavar='SECONDI',
+        help='Attesa massima di un evento prima della scrittura (default: 1)'
+    )
+
+    parser.add_argument(
+        '--sink-overflow',
+        choices=EventSink.OVERFLOW_POLICIES,
+        default='block',
+        help='Sink in ritardo: attendi (block) o scarta (drop) (default: block)'
+    )
+
+    parser.add_argument(
+        '--query',
+        nargs='?',
+        const='',
+        metavar='SOTTODIRECTORY',
+        help='Mostra gli eventi del sink (sotto la directory indicata) ed esci'
+    )
+
+    parser.add_argument(
+        '--since',
+        metavar='DURATA',
+        help='Con --query: solo gli eventi recenti (es. 30m, 1h, 2d)'
+    )
+
+    parser.add_argument(
+        '--event-type',
+        action='append',
+        metavar='TIPO',
+        help='Con --query: solo questi tipi (created, modified, deleted, moved)'
+    )
+
     parser.add_argument(
         '--version',
         action='version',
@@ -285,6 +2039,18 @@ Esempi:
 
     args = parser.parse_args()
 
+    if args.query is not None:
+        if not args.sink:
+            parser.error("--query richiede --sink")
+        try:
+            since = time.time() - parse_duration(args.since) if args.since else None
+        except ValueError:
+            parser.error(f"Durata non valida: {args.since}")
+        sink = EventSink(open_backend(args.sink, args.sink_format))
+        under = Path(args.path).resolve() / args.query
+        print_events(sink.query(under=str(under), since=since, types=args.event_type))
+        return
+
     # Stampa banner
     print_banner()
 
@@ -293,7 +2059,19 @@ Esempi:
         path=args.path,
         recursive=not args.no_recursive,
         verbose=args.verbose,
-        log_file=args.log_file
+        log_file=args.log_file,
+        window=args.window,
+        exclude=args.exclude,
+        watch_budget=args.watch_budget,
+        poll_interval=args.poll_interval,
+        snapshot_file=args.snapshot,
+        hash_files=args.hash,
+        scan_workers=args.scan_workers,
+        sink_file=args.sink,
+        sink_format=args.sink_format,
+        flush_size=args.flush_size,
+        flush_interval=args.flush_interval,
+        sink_overflow=args.sink_overflow
     )
 
     try:
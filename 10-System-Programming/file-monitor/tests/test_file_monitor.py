@@ -0,0 +1,573 @@
+"""
+Unit test per file_monitor
+Coalescenza degli eventi (EventCoalescer), piano dei watch con budget ed
+esclusioni (plan_watches, WatchManager), catch-up da snapshot (TreeSnapshot) e sink degli eventi (EventSink)
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from watchdog.events import (
+    FileCreatedEvent, FileModifiedEvent, FileDeletedEvent, FileMovedEvent,
+    FileClosedEvent, DirCreatedEvent, DirModifiedEvent
+)
+
+from file_monitor import (
+    EventCoalescer, EventSink, ExcludeMatcher, NDJSONBackend, SQLiteBackend,
+    TreeSnapshot, WatchManager, count_inotify_watches, plan_watches
+)
+
+
+class Recorder:
+    """Gestore che registra i blocchi ricevuti."""
+
+    def __init__(self):
+        self.batches = []
+
+    def on_batch(self, events):
+        self.batches.append(list(events))
+
+    @property
+    def events(self):
+        return [(e.event_type, e.src_path, getattr(e, 'dest_path', ''))
+                for batch in self.batches for e in batch]
+
+
+class TestEventCoalescer(unittest.TestCase):
+    """Test per le regole di unione e la consegna a blocchi"""
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.coalescer = EventCoalescer([self.recorder], window=0.05)
+
+    def feed(self, *events):
+        for event in events:
+            self.coalescer.dispatch(event)
+        self.coalescer._deliver(self.coalescer._collect(time.monotonic(), flush_all=True))
+        return self.recorder.events
+
+    def test_create_then_modifications(self):
+        """creato + N modifiche -> un solo creato"""
+        events = [FileCreatedEvent('/r/a')] + [FileModifiedEvent('/r/a')] * 50
+        self.assertEqual(self.feed(*events), [('created', '/r/a', '')])
+        self.assertEqual(self.coalescer.received, 51)
+        self.assertEqual(self.coalescer.emitted, 1)
+
+    def test_temporary_file_disappears(self):
+        """creato + eliminato -> nessun evento"""
+        self.assertEqual(self.feed(FileCreatedEvent('/r/tmp'), FileModifiedEvent('/r/tmp'),
+                                   FileDeletedEvent('/r/tmp')), [])
+
+    def test_modified_then_deleted(self):
+        """modificato + eliminato -> eliminato"""
+        self.assertEqual(self.feed(FileModifiedEvent('/r/a'), FileDeletedEvent('/r/a')),
+                         [('deleted', '/r/a', '')])
+
+    def test_replaced_file(self):
+        """eliminato + creato -> modificato"""
+        self.assertEqual(self.feed(FileDeletedEvent('/r/a'), FileCreatedEvent('/r/a')),
+                         [('modified', '/r/a', '')])
+
+    def test_create_then_rename(self):
+        """creato + spostato -> creato nella destinazione"""
+        self.assertEqual(self.feed(FileCreatedEvent('/r/a.part'), FileModifiedEvent('/r/a.part'),
+                                   FileMovedEvent('/r/a.part', '/r/a')),
+                         [('created', '/r/a', '')])
+
+    def test_moves_and_other_types_kept(self):
+        """Gli spostamenti e i tipi non unibili restano distinti per percorso"""
+        events = self.feed(FileMovedEvent('/r/a', '/r/b'), FileMovedEvent('/r/a', '/r/b'),
+                           FileClosedEvent('/r/c'), FileClosedEvent('/r/c'),
+                           FileModifiedEvent('/r/c'))
+        self.assertEqual(events, [('moved', '/r/a', '/r/b'), ('closed', '/r/c', ''),
+                                  ('modified', '/r/c', '')])
+
+    def test_paths_are_independent(self):
+        """Percorsi diversi non si uniscono; le directory restano directory"""
+        events = self.feed(DirCreatedEvent('/r/d'), FileCreatedEvent('/r/d/x'),
+                           FileDeletedEvent('/r/d/x'), FileModifiedEvent('/r/e'))
+        self.assertEqual(events, [('created', '/r/d', ''), ('modified', '/r/e', '')])
+        self.assertTrue(self.recorder.batches[0][0].is_directory)
+
+    def test_directory_created_before_contents(self):
+        """La directory creata resta prima dei suoi file anche se poi modificata"""
+        coalescer = EventCoalescer([self.recorder], window=0.5)
+        coalescer._merge('/r/new', DirCreatedEvent('/r/new'), 100.0)
+        coalescer._merge('/r/new/b.txt', FileCreatedEvent('/r/new/b.txt'), 100.01)
+        coalescer._merge('/r/new', DirModifiedEvent('/r/new'), 100.02)
+
+        # Il file è fermo da window, ma la directory davanti a lui no
+        self.assertEqual(coalescer._collect(100.515), [])
+        coalescer._deliver(coalescer._collect(100.53))
+        self.assertEqual(self.recorder.events, [
+            ('created', '/r/new', ''),
+            ('created', '/r/new/b.txt', ''),
+        ])
+        self.assertTrue(self.recorder.batches[0][0].is_directory)
+
+    def test_quiet_window(self):
+        """Un percorso viene consegnato solo dopo window secondi di quiete"""
+        coalescer = self.coalescer
+        coalescer.dispatch(FileModifiedEvent('/r/a'))
+        now = time.monotonic()
+        self.assertEqual(coalescer._collect(now), [])
+        self.assertEqual(len(coalescer._collect(now + coalescer.window)), 1)
+
+    def test_max_delay(self):
+        """Un percorso modificato di continuo esce comunque dopo max_delay"""
+        coalescer = EventCoalescer([self.recorder], window=1.0, max_delay=2.0)
+        coalescer._merge('/r/a', FileModifiedEvent('/r/a'), 100.0)
+        for now in (100.5, 101.0, 101.5, 101.9):
+            coalescer._merge('/r/a', FileModifiedEvent('/r/a'), now)
+            self.assertEqual(coalescer._collect(now + 0.05), [])
+        coalescer._merge('/r/a', FileModifiedEvent('/r/a'), 102.0)
+        self.assertEqual(len(coalescer._collect(102.05)), 1)
+
+    def test_worker_thread_and_handlers(self):
+        """Il worker consegna a blocchi; un gestore in errore non blocca gli altri"""
+
+        class Broken:
+            def on_batch(self, events):
+                raise RuntimeError("guasto")
+
+        class PerEvent:
+            def __init__(self):
+                self.seen = []
+
+            def dispatch(self, event):
+                self.seen.append(event.src_path)
+
+        per_event = PerEvent()
+        coalescer = EventCoalescer([Broken(), self.recorder, per_event], window=0.02)
+        coalescer.start()
+        for i in range(20):
+            coalescer.dispatch(FileCreatedEvent(f'/r/{i}'))
+            coalescer.dispatch(FileModifiedEvent(f'/r/{i}'))
+        coalescer.stop()
+
+        self.assertEqual(len(self.recorder.events), 20)
+        self.assertEqual(sorted(per_event.seen), sorted(f'/r/{i}' for i in range(20)))
+
+
+class EventLog:
+    """Target del WatchManager che registra i percorsi ricevuti."""
+
+    def __init__(self):
+        self.paths = []
+        self.events = []
+
+    def dispatch(self, event):
+        self.paths.append(os.fsdecode(event.src_path))
+        self.events.append((event.event_type, self.paths[-1]))
+
+
+@unittest.skipIf(count_inotify_watches() is None, "inotify non disponibile")
+class TestWatchManager(unittest.TestCase):
+    """Test delle esclusioni sulle directory create dopo l'avvio"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        for name in ('clean/sub', 'other'):
+            os.makedirs(os.path.join(self.root, name))
+        self.log = EventLog()
+        self.manager = WatchManager(self.root, self.log, exclude=['node_modules'])
+        self.manager.start()
+
+    def tearDown(self):
+        self.manager.stop()
+        self.tmp.cleanup()
+
+    def wait_for(self, path, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while path not in self.log.paths and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return path in self.log.paths
+
+    def test_runtime_excluded_directory_not_watched(self):
+        """Un node_modules creato dopo l'avvio non riceve watch né eventi"""
+        before = count_inotify_watches()
+        excluded = os.path.join(self.root, 'clean', 'node_modules')
+        os.makedirs(os.path.join(excluded, 'a', 'b'))
+        # Il nuovo watch sulla directory padre vede la creazione del marcatore
+        marker = os.path.join(self.root, 'clean', 'marker')
+        open(marker, 'w').close()
+        self.assertTrue(self.wait_for(marker))
+
+        deep = os.path.join(excluded, 'a', 'b')
+        for i in range(5):
+            open(os.path.join(deep, f'f{i}'), 'w').close()
+        late = os.path.join(self.root, 'clean', 'sub', 'late')
+        open(late, 'w').close()
+        self.assertTrue(self.wait_for(late))
+
+        # Il vecchio watch ricorsivo resta attivo per RETIRE_DELAY
+        deadline = time.monotonic() + WatchManager.RETIRE_DELAY + 2.0
+        while count_inotify_watches() > before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertLessEqual(count_inotify_watches(), before)
+        os.makedirs(os.path.join(excluded, 'c', 'd'))
+        time.sleep(0.1)
+        self.assertLessEqual(count_inotify_watches(), before)
+        self.assertFalse([p for p in self.log.paths if 'node_modules' in p])
+        self.assertNotIn(os.path.join(self.root, 'clean'), self.manager._native_roots)
+
+    def test_clean_tree_keeps_recursive_watch(self):
+        """Senza esclusioni a runtime il sottoalbero resta un solo watch ricorsivo"""
+        watches = self.manager.native_watches
+        new_dir = os.path.join(self.root, 'clean', 'new')
+        os.mkdir(new_dir)
+        path = os.path.join(new_dir, 'f')
+        time.sleep(0.1)
+        open(path, 'w').close()
+        self.assertTrue(self.wait_for(path))
+        self.assertEqual(self.manager.native_watches, watches)
+
+
+def make_tree(root):
+    """Albero di 8 directory: a (4), b (2), c (1) sotto la radice."""
+    for name in ('a/a1', 'a/a2', 'a/a3', 'b/b1', 'c'):
+        os.makedirs(os.path.join(root, name))
+
+
+class TestWatchPlan(unittest.TestCase):
+    """Test del piano dei watch con un budget inferiore alle directory"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        make_tree(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rel(self, paths):
+        return sorted(os.path.relpath(p, self.root) for p in paths)
+
+    def test_no_budget(self):
+        """Senza budget né esclusioni: un solo watch ricorsivo"""
+        plan = plan_watches(self.root)
+        self.assertEqual(plan.native, [(self.root, True, 8)])
+        self.assertEqual((plan.directories, plan.polled), (8, []))
+
+    def test_smallest_subtree_that_fits(self):
+        """Il sottoalbero più piccolo che basta da solo passa al polling"""
+        plan = plan_watches(self.root, budget=6)
+        self.assertEqual(self.rel(plan.polled), ['b'])
+        self.assertEqual((plan.native_dirs, plan.polled_dirs), (6, 2))
+        # La radice sopra il polling ha un watch non ricorsivo
+        self.assertIn((self.root, False, 1), plan.native)
+        self.assertIn((os.path.join(self.root, 'a'), True, 4), plan.native)
+
+    def test_largest_then_repeat(self):
+        """Se nessun sottoalbero basta: il più grande, poi si ripete"""
+        plan = plan_watches(self.root, budget=3)
+        self.assertLessEqual(plan.native_dirs, 3)
+        self.assertIn('a', self.rel(plan.polled))
+        self.assertEqual(plan.native_dirs + plan.polled_dirs, 8)
+        self.assertEqual(sum(dirs for _, _, dirs in plan.native), plan.native_dirs)
+
+    def test_exclusions_and_budget(self):
+        """Le directory escluse non contano nel budget"""
+        plan = plan_watches(self.root, ExcludeMatcher(['a']), budget=4)
+        self.assertEqual((plan.directories, plan.pruned, plan.polled), (4, 1, []))
+        self.assertEqual(plan.native_dirs, 4)
+
+
+@unittest.skipIf(count_inotify_watches() is None, "inotify non disponibile")
+class TestWatchBudget(unittest.TestCase):
+    """Test del polling per i sottoalberi oltre il budget"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        make_tree(self.root)
+        self.log = EventLog()
+        self.manager = WatchManager(self.root, self.log, budget=6, poll_interval=0.05)
+        self.manager.start()
+
+    def tearDown(self):
+        self.manager.stop()
+        self.tmp.cleanup()
+
+    def wait_for(self, path, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while path not in self.log.paths and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return path in self.log.paths
+
+    def test_polled_subtree_reaches_target(self):
+        """I file nel sottoalbero in polling arrivano al target, una volta sola"""
+        self.assertLessEqual(self.manager.native_dirs, 6)
+        self.assertEqual(self.manager.plan.polled, [os.path.join(self.root, 'b')])
+        self.assertIsNotNone(self.manager.poller)
+
+        polled = os.path.join(self.root, 'b', 'b1', 'polled.txt')
+        native = os.path.join(self.root, 'a', 'a2', 'native.txt')
+        open(polled, 'w').close()
+        open(native, 'w').close()
+        self.assertTrue(self.wait_for(polled))
+        self.assertTrue(self.wait_for(native))
+
+        # Un altro giro del poller: la directory nativa non viene ripetuta
+        time.sleep(0.2)
+        self.assertEqual(self.log.events.count(('created', native)), 1)
+        self.assertEqual(self.log.events.count(('created', polled)), 1)
+        self.assertLessEqual(count_inotify_watches(), 6)
+
+    def test_refused_watch_falls_back_to_polling(self):
+        """Un watch rifiutato dal sistema passa al polling con il resto del piano"""
+        self.manager.stop()
+        log = EventLog()
+        manager = WatchManager(self.root, log, exclude=['c'], poll_interval=0.05)
+        schedule = manager.observer.schedule
+
+        def refuse(handler, path, recursive=False):
+            if path.endswith(os.sep + 'b'):
+                raise OSError(24, "inotify instance limit reached")
+            return schedule(handler, path, recursive=recursive)
+
+        manager.observer.schedule = refuse
+        manager.start()
+        try:
+            self.assertGreaterEqual(manager.fallbacks, 1)
+            self.assertIsNotNone(manager.poller)
+            path = os.path.join(self.root, 'b', 'b1', 'late.txt')
+            open(path, 'w').close()
+            deadline = time.monotonic() + 3.0
+            while path not in log.paths and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertIn(path, log.paths)
+        finally:
+            manager.stop()
+
+
+class TestTreeSnapshot(unittest.TestCase):
+    """Test del diff tra snapshot (cambiamenti a monitor fermo)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        self.write('keep.txt', 'invariato')
+        self.write('edit.txt', 'prima')
+        self.write('gone.txt', 'da eliminare')
+        self.write('old/name.txt', 'spostato')
+        self.write('dir/inner.txt', 'nella directory')
+        self.write('node_modules/pkg.js', 'escluso')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, rel):
+        return os.path.join(self.root, rel)
+
+    def write(self, rel, content):
+        os.makedirs(os.path.dirname(self.path(rel)), exist_ok=True)
+        with open(self.path(rel), 'w') as f:
+            f.write(content)
+
+    def scan(self, **kwargs):
+        return TreeSnapshot.scan(self.root, ExcludeMatcher(['node_modules']), **kwargs)
+
+    def summary(self, events):
+        for event in events:
+            self.assertTrue(event.is_synthetic)
+        return [(e.event_type, os.path.relpath(e.src_path, self.root),
+                 os.path.relpath(e.dest_path, self.root) if e.dest_path else '')
+                for e in events]
+
+    def test_no_changes(self):
+        """Due scansioni dello stesso albero non producono eventi"""
+        self.assertEqual(self.scan().diff(self.scan()), [])
+
+    def test_changes_while_stopped(self):
+        """Creazioni, modifiche, eliminazioni e spostamenti per inode"""
+        tmp_snapshot = os.path.join(self.root, 'node_modules', 'snapshot.json')
+        self.scan().save(tmp_snapshot)
+
+        self.write('edit.txt', 'dopo la modifica')
+        os.remove(self.path('gone.txt'))
+        os.rename(self.path('old/name.txt'), self.path('old/renamed.txt'))
+        os.rename(self.path('dir'), self.path('moved'))
+        self.write('new/file.txt', 'nuovo')
+        self.write('node_modules/other.js', 'ignorato')
+
+        previous = TreeSnapshot.load(tmp_snapshot)
+        self.assertEqual(self.summary(previous.diff(self.scan())), [
+            # Come watchdog dal vivo: la directory e il suo contenuto
+            ('moved', 'dir', 'moved'),
+            ('moved', 'dir/inner.txt', 'moved/inner.txt'),
+            ('moved', 'old/name.txt', 'old/renamed.txt'),
+            ('created', 'new', ''),
+            ('created', 'new/file.txt', ''),
+            ('deleted', 'gone.txt', ''),
+            ('modified', 'edit.txt', ''),
+        ])
+
+    def test_same_size_rewrite(self):
+        """Stessa dimensione e mtime ripristinato: solo l'hash vede la modifica"""
+        stat = os.stat(self.path('edit.txt'))
+        before, before_hashed = self.scan(), self.scan(hash_files=True)
+        self.write('edit.txt', 'dopo!')
+        os.utime(self.path('edit.txt'), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(before.diff(self.scan()), [])
+        self.assertEqual(self.summary(before_hashed.diff(self.scan(hash_files=True))),
+                         [('modified', 'edit.txt', '')])
+
+    def test_copy_and_delete_matched_by_hash(self):
+        """Con l'hash una copia + eliminazione (nuovo inode) è uno spostamento"""
+        before = self.scan(hash_files=True)
+        self.write('copied.txt', 'da eliminare')
+        os.remove(self.path('gone.txt'))
+
+        self.assertEqual(self.summary(before.diff(self.scan(hash_files=True))),
+                         [('moved', 'gone.txt', 'copied.txt')])
+
+
+class TestEventSinkQuery(unittest.TestCase):
+    """Test del filtro under delle query, su entrambi i backend"""
+
+    EVENTS = [
+        FileCreatedEvent('/srv/app/main.py'),
+        FileModifiedEvent('/srv/app'),
+        FileMovedEvent('/tmp/build.log', '/srv/app/logs/build.log'),
+        FileDeletedEvent('/srv/application.py'),
+        FileCreatedEvent('/home/user/notes.txt'),
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sinks(self):
+        for backend in (NDJSONBackend(os.path.join(self.tmp.name, 'events.ndjson'), durable=False),
+                        SQLiteBackend(os.path.join(self.tmp.name, 'events.db'), durable=False)):
+            sink = EventSink(backend, flush_interval=0.01)
+            sink.start()
+            for event in self.EVENTS:
+                sink.dispatch(event)
+            sink.stop()
+            with self.subTest(backend=type(backend).__name__):
+                yield sink
+
+    def paths(self, records):
+        return [record['src_path'] for record in records]
+
+    def test_root_matches_everything(self):
+        """under='/' (o '//') restituisce tutti gli eventi"""
+        for sink in self.sinks():
+            self.assertEqual(len(sink.query(under='/')), len(self.EVENTS))
+            self.assertEqual(len(sink.backend.query(under='/')), len(self.EVENTS))
+            self.assertEqual(len(sink.query(under='//')), len(self.EVENTS))
+
+    def test_directory_prefix(self):
+        """Il separatore finale è ignorato e i nomi con lo stesso prefisso esclusi"""
+        expected = ['/srv/app/main.py', '/srv/app', '/tmp/build.log']
+        for sink in self.sinks():
+            self.assertEqual(self.paths(sink.query(under='/srv/app')), expected)
+            self.assertEqual(self.paths(sink.query(under='/srv/app/')), expected)
+            self.assertEqual(self.paths(sink.backend.query(under='/srv/app/')), expected)
+            self.assertEqual(self.paths(sink.query(under='/tmp')), ['/tmp/build.log'])
+
+
+class StubBackend:
+    """Backend in memoria; ogni write() può attendere 'delay' secondi."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = []
+        self.closed = False
+
+    def open(self):
+        pass
+
+    def write(self, records):
+        time.sleep(self.delay)
+        self.writes.append(list(records))
+
+    def close(self):
+        self.closed = True
+
+    def query(self, *args):
+        return []
+
+
+class TestEventSinkWriter(unittest.TestCase):
+    """Test del group commit e delle politiche a coda piena"""
+
+    def events(self, count):
+        return [FileModifiedEvent(f'/r/{i}') for i in range(count)]
+
+    def test_group_commit_by_size(self):
+        """Un batch non supera flush_size record"""
+        backend = StubBackend()
+        sink = EventSink(backend, flush_size=10, flush_interval=10.0)
+        # In coda prima dell'avvio: il writer li trova tutti insieme
+        sink.on_batch(self.events(25))
+        sink.start()
+        sink.stop()
+
+        self.assertEqual([len(batch) for batch in backend.writes], [10, 10, 5])
+        self.assertEqual((sink.written, sink.batches), (25, 3))
+        self.assertTrue(backend.closed)
+
+    def test_group_commit_by_interval(self):
+        """Sotto flush_size il batch parte dopo flush_interval"""
+        backend = StubBackend()
+        sink = EventSink(backend, flush_size=1000, flush_interval=0.05)
+        sink.start()
+        for event in self.events(5):
+            sink.dispatch(event)
+        time.sleep(0.3)
+        self.assertEqual(sink.batches, 1)
+        self.assertEqual([len(batch) for batch in backend.writes], [5])
+
+        for event in self.events(3):
+            sink.dispatch(event)
+        sink.stop()
+        self.assertEqual((sink.written, sink.batches), (8, 2))
+
+    def test_overflow_drop(self):
+        """Con overflow='drop' i record oltre max_pending sono scartati e contati"""
+        backend = StubBackend()
+        sink = EventSink(backend, max_pending=5, overflow='drop')
+        for event in self.events(12):
+            sink.dispatch(event)
+        self.assertEqual(sink.dropped, 7)
+        self.assertEqual(sink.blocked, 0.0)
+
+        sink.start()
+        sink.stop()
+        self.assertEqual(sink.written, 5)
+
+    def test_overflow_block(self):
+        """Con overflow='block' chi consegna attende un backend lento"""
+        backend = StubBackend(delay=0.02)
+        sink = EventSink(backend, flush_size=1, max_pending=2, overflow='block')
+        sink.start()
+        for event in self.events(10):
+            sink.dispatch(event)
+        sink.stop()
+
+        self.assertEqual((sink.written, sink.dropped), (10, 0))
+        self.assertGreater(sink.blocked, 0.05)
+        self.assertEqual(len(backend.writes), 10)
+
+    def test_invalid_overflow(self):
+        """Una politica sconosciuta è rifiutata"""
+        with self.assertRaises(ValueError):
+            EventSink(StubBackend(), overflow='wait')
+
+
+if __name__ == '__main__':
+    unittest.main()
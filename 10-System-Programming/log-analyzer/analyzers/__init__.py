@@ -4,12 +4,18 @@ Moduli per analizzare i log entries
 """
 
 from .filter import LogFilter, LogFilterBuilder
-from .stats import LogStatistics
+from .stats import LogStatistics, StatsAccumulator
 from .extractor import DataExtractor
+from .parallel import ParallelAnalyzer
+from .sketches import SpaceSaving, HyperLogLog
 
 __all__ = [
     'LogFilter',
     'LogFilterBuilder',
     'LogStatistics',
+    'StatsAccumulator',
     'DataExtractor',
+    'ParallelAnalyzer',
+    'SpaceSaving',
+    'HyperLogLog',
 ]
@@ -7,13 +7,20 @@ Educational - Extraction Techniques:
 - IP extraction e validation
 - Data cleaning e normalizzazione
 - Set operations per deduplicazione
+- Sketch approssimati opzionali per grandi cardinalità
 """
 
 import re
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Set, Iterable, Union
 from collections import Counter
 import logging
 
+try:
+    from .sketches import SpaceSaving, HyperLogLog
+except ImportError:
+    # Esecuzione diretta come script (python analyzers/extractor.py)
+    from sketches import SpaceSaving, HyperLogLog
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,37 +58,52 @@ class DataExtractor:
         r'"([^"]*)"$'  # Generico per quoted strings alla fine
     )
 
-    def __init__(self):
-        """Inizializza l'estrattore"""
-        logger.info("DataExtractor inizializzato")
+    def __init__(self, approximate: bool = False, top_error: float = 0.001,
+                 distinct_error: float = 0.01):
+        """
+        Inizializza l'estrattore
+
+        Args:
+            approximate: Usa sketch a memoria fissa per conteggi e valori distinti
+            top_error: Sovrastima massima dei conteggi top-N, relativa al totale
+            distinct_error: Errore relativo standard dei conteggi distinti
+        """
+        self.approximate = approximate
+        self.top_error = top_error
+        self.distinct_error = distinct_error
+        logger.info(f"DataExtractor inizializzato (approximate={approximate})")
 
-    def extract_ips(self, entries: List[Dict[str, Any]], unique: bool = True) -> List[str]:
+    def extract_ips(self, entries: Iterable[Dict[str, Any]], unique: bool = True) -> List[str]:
         """
         Estrae tutti gli IP addresses
 
         Args:
-            entries: Lista di entries
+            entries: Lista (o iterabile) di entries
             unique: Se True, restituisce solo IP unici
 
         Returns:
             Lista di IP addresses
         """
+        # Con unique=True deduplica durante la scansione: la memoria
+        # dipende dal numero di IP distinti, non dal numero di entries
+        seen = set()
         ips = []
+        add = seen.add if unique else ips.append
 
         # Prima cerca nel campo 'ip'
         for entry in entries:
             ip = entry.get('ip')
             if ip:
-                ips.append(ip)
+                add(ip)
 
             # Cerca anche nel message/raw line
             message = entry.get('message', '')
             if message:
-                found_ips = self.IPV4_PATTERN.findall(message)
-                ips.extend(found_ips)
+                for found_ip in self.IPV4_PATTERN.findall(message):
+                    add(found_ip)
 
         if unique:
-            ips = list(set(ips))
+            ips = list(seen)
 
         logger.info(f"Estratti {len(ips)} IP addresses (unique={unique})")
         return ips
@@ -203,16 +225,27 @@ class DataExtractor:
         logger.info(f"Estratti {len(unique_urls)} URLs")
         return unique_urls
 
-    def extract_user_agents(self, entries: List[Dict[str, Any]]) -> Counter:
+    def extract_user_agents(self, entries: Iterable[Dict[str, Any]]) -> Union[Counter, SpaceSaving]:
         """
         Estrae e conta user agents
 
         Args:
-            entries: Lista di entries
+            entries: Lista (o iterabile) di entries
 
         Returns:
-            Counter di user agents
+            Counter di user agents (SpaceSaving in modalità approssimata,
+            con la stessa interfaccia most_common())
         """
+        if self.approximate:
+            sketch = SpaceSaving.from_error(self.top_error)
+            add = sketch.add
+            for entry in entries:
+                ua = entry.get('user_agent')
+                if ua and ua != '-':
+                    add(ua)
+            logger.info(f"User agents: {len(sketch)} monitorati (approssimato)")
+            return sketch
+
         counter = Counter()
 
         for entry in entries:
@@ -223,6 +256,44 @@ class DataExtractor:
         logger.info(f"Estratti {len(counter)} user agents unici")
         return counter
 
+    def count_ips(self, entries: Iterable[Dict[str, Any]]) -> Union[Counter, SpaceSaving]:
+        """
+        Conta le richieste per IP (campo 'ip')
+
+        Args:
+            entries: Lista (o iterabile) di entries
+
+        Returns:
+            Counter {ip: richieste} (SpaceSaving in modalità approssimata)
+        """
+        counter = SpaceSaving.from_error(self.top_error) if self.approximate else Counter()
+        counter.update(ip for ip in (entry.get('ip') for entry in entries) if ip)
+        logger.info(f"Conteggio richieste per {len(counter)} IP")
+        return counter
+
+    def count_unique(self, entries: Iterable[Dict[str, Any]], field: str = 'ip') -> int:
+        """
+        Conta i valori distinti di un campo
+
+        Args:
+            entries: Lista (o iterabile) di entries
+            field: Nome del campo
+
+        Returns:
+            Numero di valori distinti (stimato con HyperLogLog in
+            modalità approssimata)
+        """
+        values = (entry.get(field) for entry in entries)
+        if self.approximate:
+            sketch = HyperLogLog.from_error(self.distinct_error)
+            sketch.update(value for value in values if value is not None)
+            count = sketch.count()
+        else:
+            count = len({value for value in values if value is not None})
+
+        logger.info(f"Valori distinti per campo '{field}': {count}")
+        return count
+
     def extract_paths(self, entries: List[Dict[str, Any]]) -> List[str]:
         """
         Estrae paths dalle richieste HTTP
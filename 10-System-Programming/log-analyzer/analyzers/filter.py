@@ -7,12 +7,24 @@ Educational - Filtering Techniques:
 - Lambda functions
 - Generator expressions per memory efficiency
 - Predicate composition
+- Code generation: filtri fusi in un'unica funzione compilata
 """
 
+import re
+import sys
+import fnmatch
 from datetime import datetime
-from typing import List, Dict, Any, Callable, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Iterable, Iterator, Tuple
 import logging
 
+try:
+    from parsers.levels import LOG_LEVELS, entry_severity
+except ImportError:
+    # Esecuzione diretta (python analyzers/filter.py): aggiunge la root del progetto
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from parsers.levels import LOG_LEVELS, entry_severity
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,24 +38,123 @@ class LogFilter:
     - IP address
     - Status code
     - Custom predicate functions
+
+    Ogni filtro è descritto da un'espressione Python con un costo stimato.
+    compile() fonde tutti i filtri in un'unica funzione generata, con i
+    controlli più economici per primi e short-circuit su 'and': una sola
+    chiamata per entry invece di una closure per filtro.
     """
 
     # Livelli di log ordinati per severità
-    LOG_LEVELS = {
-        'DEBUG': 0,
-        'INFO': 1,
-        'WARN': 2,
-        'WARNING': 2,
-        'ERROR': 3,
-        'CRITICAL': 4,
-        'FATAL': 4
-    }
+    LOG_LEVELS = LOG_LEVELS
+
+    # Costo relativo dei controlli (ordine di valutazione nel predicato fuso)
+    COST_INT = 1
+    COST_EQUALS = 1
+    COST_RANGE = 2
+    COST_PREFIX = 2
+    COST_REGEX = 4
+    COST_TEXT = 5
+    COST_CUSTOM = 10
 
     def __init__(self):
         """Inizializza il filtro"""
         self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._compiled: Optional[Callable[[Dict[str, Any]], bool]] = None
+        self._compiled_key: tuple = ()
+        # Finestra temporale (start, end) dei filtri by_time_range, usata
+        # per posizionarsi nel file senza parsarlo tutto (TimeIndex)
+        self.time_bounds: Optional[Tuple[datetime, datetime]] = None
         logger.info("LogFilter inizializzato")
 
+    def _add_filter(self, expression: str, cost: int, local_names: Tuple[str, ...] = (),
+                    **constants) -> None:
+        """
+        Registra un filtro come espressione compilabile
+
+        L'espressione usa 'get' (entry.get) ed 'e' (la entry); i segnaposto
+        {nome} vengono sostituiti con le costanti passate o con le variabili
+        locali dichiarate in local_names (target di ':='), rinominate in
+        modo univoco al momento della fusione.
+
+        Args:
+            expression: Espressione booleana Python
+            cost: Costo stimato (più basso = valutato prima)
+            local_names: Variabili locali assegnate dall'espressione
+            **constants: Valori usati dall'espressione
+        """
+        spec = (cost, expression, constants, local_names)
+        predicate = self._build([spec])
+        predicate.spec = spec
+        self.filters.append(predicate)
+
+    @staticmethod
+    def _build(specs: List[tuple]) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Genera una funzione predicato che valuta tutte le espressioni in 'and'
+
+        Args:
+            specs: Lista di (cost, expression, constants, local_names)
+
+        Returns:
+            Funzione entry -> bool
+        """
+        namespace: Dict[str, Any] = {}
+        clauses = []
+        for index, (_, expression, constants, local_names) in enumerate(specs):
+            # Costanti nel namespace globale, variabili come locali della funzione
+            names = {name: f"{name}_{index}" for name in local_names}
+            for name, value in constants.items():
+                unique = f"_{name}_{index}"
+                namespace[unique] = value
+                names[name] = unique
+            clauses.append(f"({expression.format(**names)})")
+
+        body = " and ".join(clauses) or "True"
+        source = f"def predicate(e):\n    get = e.get\n    return {body}\n"
+        exec(compile(source, '<log-filter>', 'exec'), namespace)
+        return namespace['predicate']
+
+    def compile(self) -> Callable[[Dict[str, Any]], bool]:
+        """
+        Fonde i filtri in un unico predicato ordinato per costo
+
+        Predicati aggiunti direttamente a self.filters (senza spec)
+        vengono trattati come filtri custom.
+
+        Returns:
+            Funzione entry -> bool
+        """
+        key = tuple(self.filters)
+        if self._compiled is not None and key == self._compiled_key:
+            return self._compiled
+
+        specs = []
+        for predicate in self.filters:
+            spec = getattr(predicate, 'spec', None)
+            if spec is None:
+                spec = (self.COST_CUSTOM, "{func}(e)", {'func': predicate}, ())
+            specs.append(spec)
+
+        # sorted è stabile: a parità di costo resta l'ordine di inserimento
+        specs.sort(key=lambda spec: spec[0])
+
+        self._compiled = self._build(specs)
+        self._compiled_key = key
+        return self._compiled
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        """
+        Verifica se una entry passa tutti i filtri
+
+        Args:
+            entry: Log entry
+
+        Returns:
+            True se la entry passa
+        """
+        return self.compile()(entry)
+
     def by_level(self, level: str) -> 'LogFilter':
         """
         Filtra per livello di log
@@ -54,13 +165,8 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        level_upper = level.upper()
-
-        def level_filter(entry: Dict[str, Any]) -> bool:
-            entry_level = entry.get('level', '').upper()
-            return entry_level == level_upper
-
-        self.filters.append(level_filter)
+        self._add_filter("(get('level') or '').upper() == {level}", self.COST_EQUALS,
+                         level=level.upper())
         logger.debug(f"Aggiunto filtro livello: {level}")
         return self
 
@@ -76,12 +182,10 @@ class LogFilter:
         """
         min_severity = self.LOG_LEVELS.get(min_level.upper(), 0)
 
-        def min_level_filter(entry: Dict[str, Any]) -> bool:
-            entry_level = entry.get('level', '').upper()
-            entry_severity = self.LOG_LEVELS.get(entry_level, 0)
-            return entry_severity >= min_severity
-
-        self.filters.append(min_level_filter)
+        # Confronto intero sul campo 'severity' precalcolato dai parser
+        self._add_filter(
+            "({sev} if ({sev} := get('severity')) is not None else {fallback}(e)) >= {min}",
+            self.COST_INT, ('sev',), fallback=entry_severity, min=min_severity)
         logger.debug(f"Aggiunto filtro livello minimo: {min_level}")
         return self
 
@@ -96,13 +200,14 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        def time_filter(entry: Dict[str, Any]) -> bool:
-            timestamp = entry.get('timestamp_parsed')
-            if not timestamp:
-                return False
-            return start <= timestamp <= end
+        self._add_filter(
+            "({ts} := get('timestamp_parsed')) is not None and {start} <= {ts} <= {end}",
+            self.COST_RANGE, ('ts',), start=start, end=end)
 
-        self.filters.append(time_filter)
+        if self.time_bounds is None:
+            self.time_bounds = (start, end)
+        else:
+            self.time_bounds = (max(self.time_bounds[0], start), min(self.time_bounds[1], end))
         logger.debug(f"Aggiunto filtro tempo: {start} - {end}")
         return self
 
@@ -116,10 +221,7 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        def ip_filter(entry: Dict[str, Any]) -> bool:
-            return entry.get('ip') == ip_address
-
-        self.filters.append(ip_filter)
+        self._add_filter("get('ip') == {ip}", self.COST_EQUALS, ip=ip_address)
         logger.debug(f"Aggiunto filtro IP: {ip_address}")
         return self
 
@@ -133,11 +235,8 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        def ip_pattern_filter(entry: Dict[str, Any]) -> bool:
-            ip = entry.get('ip', '')
-            return ip.startswith(pattern)
-
-        self.filters.append(ip_pattern_filter)
+        self._add_filter("(get('ip') or '').startswith({prefix})", self.COST_PREFIX,
+                         prefix=pattern)
         logger.debug(f"Aggiunto filtro pattern IP: {pattern}")
         return self
 
@@ -151,10 +250,7 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        def status_filter(entry: Dict[str, Any]) -> bool:
-            return entry.get('status') == status
-
-        self.filters.append(status_filter)
+        self._add_filter("get('status') == {status}", self.COST_INT, status=status)
         logger.debug(f"Aggiunto filtro status: {status}")
         return self
 
@@ -169,11 +265,8 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        def status_range_filter(entry: Dict[str, Any]) -> bool:
-            status = entry.get('status', 0)
-            return min_status <= status <= max_status
-
-        self.filters.append(status_range_filter)
+        self._add_filter("{low} <= (get('status') or 0) <= {high}", self.COST_INT,
+                         low=min_status, high=max_status)
         logger.debug(f"Aggiunto filtro range status: {min_status}-{max_status}")
         return self
 
@@ -187,13 +280,10 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        import fnmatch
-
-        def path_filter(entry: Dict[str, Any]) -> bool:
-            path = entry.get('path', '')
-            return fnmatch.fnmatch(path, path_pattern)
-
-        self.filters.append(path_filter)
+        # Wildcard tradotta in regex una sola volta (semantica fnmatchcase)
+        regex = re.compile(fnmatch.translate(path_pattern))
+        self._add_filter("{match}(get('path') or '') is not None", self.COST_REGEX,
+                         match=regex.match)
         logger.debug(f"Aggiunto filtro path: {path_pattern}")
         return self
 
@@ -207,12 +297,8 @@ class LogFilter:
         Returns:
             Self per method chaining
         """
-        method_upper = method.upper()
-
-        def method_filter(entry: Dict[str, Any]) -> bool:
-            return entry.get('method', '').upper() == method_upper
-
-        self.filters.append(method_filter)
+        self._add_filter("(get('method') or '').upper() == {method}", self.COST_EQUALS,
+                         method=method.upper())
         logger.debug(f"Aggiunto filtro method: {method}")
         return self
 
@@ -228,14 +314,10 @@ class LogFilter:
             Self per method chaining
         """
         if case_sensitive:
-            def message_filter(entry: Dict[str, Any]) -> bool:
-                return text in entry.get('message', '')
+            self._add_filter("{text} in (get('message') or '')", self.COST_TEXT, text=text)
         else:
-            text_lower = text.lower()
-            def message_filter(entry: Dict[str, Any]) -> bool:
-                return text_lower in entry.get('message', '').lower()
-
-        self.filters.append(message_filter)
+            self._add_filter("{text} in (get('message') or '').lower()", self.COST_TEXT,
+                             text=text.lower())
         logger.debug(f"Aggiunto filtro message contains: {text}")
         return self
 
@@ -266,20 +348,21 @@ class LogFilter:
         if not self.filters:
             return entries
 
-        # Usa generator per memory efficiency
-        result = entries
-        for filter_func in self.filters:
-            result = [entry for entry in result if filter_func(entry)]
+        # Un solo passaggio con il predicato fuso, una sola lista risultato
+        result = list(filter(self.compile(), entries))
 
         logger.info(f"Filtraggio: {len(entries)} -> {len(result)} entries")
         return result
 
-    def apply_iter(self, entries: List[Dict[str, Any]]):
+    def apply_iter(self, entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
         """
         Applica filtri con generator (per grandi dataset)
 
+        Accetta qualsiasi iterabile, incluso il generator di
+        parser.iter_file(): nessuna lista intermedia viene costruita.
+
         Args:
-            entries: Lista di entries
+            entries: Iterabile di entries
 
         Yields:
             Entries filtrate una alla volta
@@ -288,11 +371,7 @@ class LogFilter:
             yield from entries
             return
 
-        result = entries
-        for filter_func in self.filters:
-            result = (entry for entry in result if filter_func(entry))
-
-        yield from result
+        yield from filter(self.compile(), entries)
 
     def reset(self) -> 'LogFilter':
         """
@@ -302,6 +381,7 @@ class LogFilter:
             Self
         """
         self.filters.clear()
+        self.time_bounds = None
         logger.debug("Filtri resettati")
         return self
 
@@ -0,0 +1,299 @@
+"""
+Parallel Analysis Module
+Parsing e statistiche multi-core su file di log di grandi dimensioni
+
+Educational - Parallel Processing Techniques:
+- Suddivisione del file in range di byte allineati alle righe
+- ProcessPoolExecutor per aggirare il GIL
+- Map/reduce: ogni worker produce un aggregato parziale, poi merge
+- Passaggio di soli dati serializzabili tra processi (niente closure)
+- Risultati in ordine con un numero limitato di range in volo
+"""
+
+import os
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Tuple, Optional, Dict, Any
+
+from parsers import ApacheLogParser, NginxLogParser, CustomLogParser, iter_range, cache_row
+
+from .filter import LogFilter
+from .stats import StatsAccumulator
+
+logger = logging.getLogger(__name__)
+
+
+def split_file(filepath: str, chunks: int, start: int = 0,
+               end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Divide un file (o un suo range) in range di byte allineati all'inizio di una riga
+
+    Args:
+        filepath: Percorso del file
+        chunks: Numero di range desiderati
+        start: Offset iniziale (inizio di riga)
+        end: Offset finale escluso (None = fine file)
+
+    Returns:
+        Lista di (start, end) offset; end escluso
+    """
+    if end is None:
+        end = os.path.getsize(filepath)
+    size = end - start
+    if size <= 0:
+        return []
+
+    chunks = max(1, min(chunks, size))
+    boundaries = [start]
+
+    with open(filepath, 'rb') as f:
+        for i in range(1, chunks):
+            offset = start + size * i // chunks
+            if offset <= boundaries[-1]:
+                continue
+            # Avanza fino alla fine della riga corrente
+            f.seek(offset - 1)
+            f.readline()
+            position = f.tell()
+            if boundaries[-1] < position < end:
+                boundaries.append(position)
+
+    boundaries.append(end)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _create_parser(log_format: str):
+    """Crea il parser nel processo worker (i parser non vengono serializzati)"""
+    if log_format == 'apache':
+        return ApacheLogParser()
+    elif log_format == 'nginx':
+        return NginxLogParser()
+    elif log_format == 'custom':
+        return CustomLogParser()
+    raise ValueError(f"Formato non supportato: {log_format}")
+
+
+def _build_filter(filter_spec: Dict[str, Any]) -> LogFilter:
+    """Ricostruisce il LogFilter da una specifica serializzabile"""
+    log_filter = LogFilter()
+    if filter_spec.get('min_level'):
+        log_filter.by_min_level(filter_spec['min_level'])
+    if filter_spec.get('start') or filter_spec.get('end'):
+        log_filter.by_time_range(filter_spec.get('start') or datetime.min,
+                                 filter_spec.get('end') or datetime.max)
+    return log_filter
+
+
+def _process_range(filepath: str, start: int, end: int, log_format: str,
+                   filter_spec: Dict[str, Any], encoding: str,
+                   stats_options: Dict[str, Any]) -> StatsAccumulator:
+    """
+    Worker: parsa le righe in [start, end) e restituisce l'aggregato parziale
+
+    Args:
+        filepath: Percorso del file
+        start: Offset iniziale (inizio di riga)
+        end: Offset finale (escluso)
+        log_format: Formato log
+        filter_spec: Specifica dei filtri
+        encoding: Encoding del file
+        stats_options: Argomenti per StatsAccumulator (sketch)
+
+    Returns:
+        StatsAccumulator parziale
+    """
+    parser = _create_parser(log_format)
+    log_filter = _build_filter(filter_spec)
+
+    accumulator = StatsAccumulator(**stats_options)
+    update = accumulator.update
+    for entry in log_filter.apply_iter(iter_range(parser, filepath, start, end, encoding)):
+        update(entry)
+    return accumulator
+
+
+def _cache_rows(filepath: str, start: int, end: int, log_format: str,
+                encoding: str) -> List[Tuple[Optional[tuple], Optional[int]]]:
+    """
+    Worker: parsa le righe in [start, end) per la cache colonnare
+
+    Come LogCache._parse_from: ogni riga completa avanza l'offset anche se
+    scartata dal parser; una riga finale senza newline ha offset None.
+
+    Returns:
+        Lista di (cache_row o None, offset dopo la riga)
+    """
+    parser = _create_parser(log_format)
+    with_message = log_format == 'custom'
+    parse_line = parser.parse_line
+    rows = []
+    append = rows.append
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        position = start
+        for raw in f:
+            if position >= end:
+                break
+            position += len(raw)
+            parsed = parse_line(raw.decode(encoding, errors='ignore'))
+            complete = raw.endswith(b'\n')
+            if parsed:
+                append((cache_row(parsed, with_message), position if complete else None))
+            elif complete:
+                append((None, position))
+    return rows
+
+
+class ParallelAnalyzer:
+    """
+    Analizzatore multi-processo per file di log di grandi dimensioni
+
+    Il file viene diviso in range di byte allineati alle righe; ogni
+    range è parsato e aggregato in un processo separato, e gli
+    StatsAccumulator parziali vengono uniti con merge().
+    Funziona con i parser apache, nginx e custom.
+    """
+
+    # Range per worker: più range che processi bilanciano il carico
+    CHUNKS_PER_WORKER = 4
+
+    # Dimensione dei range per la cache: le righe tornano al processo
+    # padre, quindi i range sono piccoli e solo pochi restano in volo
+    CACHE_CHUNK_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, log_format: str, workers: Optional[int] = None,
+                 encoding: str = 'utf-8'):
+        """
+        Inizializza l'analizzatore parallelo
+
+        Args:
+            log_format: Formato ('apache', 'nginx', 'custom')
+            workers: Numero di processi (default: numero di CPU)
+            encoding: Encoding del file
+        """
+        self.log_format = log_format
+        self.workers = workers or os.cpu_count() or 1
+        self.encoding = encoding
+        self.filter_spec: Dict[str, Any] = {}
+        self.stats_options: Dict[str, Any] = {}
+        logger.info(f"ParallelAnalyzer inizializzato con {self.workers} worker")
+
+    def by_min_level(self, min_level: str) -> 'ParallelAnalyzer':
+        """
+        Filtra per livello minimo (applicato nei worker)
+
+        Args:
+            min_level: Livello minimo
+
+        Returns:
+            Self per method chaining
+        """
+        self.filter_spec['min_level'] = min_level
+        return self
+
+    def by_time_range(self, start: Optional[datetime],
+                      end: Optional[datetime]) -> 'ParallelAnalyzer':
+        """
+        Filtra per intervallo temporale (applicato nei worker)
+
+        Args:
+            start: Data/ora inizio (None = nessun limite)
+            end: Data/ora fine (None = nessun limite)
+
+        Returns:
+            Self per method chaining
+        """
+        self.filter_spec['start'] = start
+        self.filter_spec['end'] = end
+        return self
+
+    def approximate(self, top_error: float = 0.001,
+                    distinct_error: float = 0.01) -> 'ParallelAnalyzer':
+        """
+        Usa sketch a memoria fissa nei worker (uniti con merge)
+
+        Args:
+            top_error: Sovrastima massima dei top-N, relativa al totale
+            distinct_error: Errore relativo standard del conteggio IP unici
+
+        Returns:
+            Self per method chaining
+        """
+        self.stats_options = {
+            'approximate': True,
+            'top_error': top_error,
+            'distinct_error': distinct_error,
+        }
+        return self
+
+    def run(self, filepath: str, start: int = 0,
+            end: Optional[int] = None) -> StatsAccumulator:
+        """
+        Parsa e aggrega il file in parallelo
+
+        Args:
+            filepath: Percorso del file
+            start: Offset iniziale (es. da TimeIndex.byte_range)
+            end: Offset finale escluso (None = fine file)
+
+        Returns:
+            StatsAccumulator con il merge di tutti i range
+        """
+        ranges = split_file(filepath, self.workers * self.CHUNKS_PER_WORKER, start, end)
+        logger.info(f"File diviso in {len(ranges)} range su {self.workers} worker")
+
+        result = StatsAccumulator(**self.stats_options)
+        if not ranges:
+            return result
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(_process_range, filepath, range_start, range_end,
+                                self.log_format, self.filter_spec, self.encoding,
+                                self.stats_options)
+                for range_start, range_end in ranges
+            ]
+            # Merge in ordine di range per risultati deterministici
+            for future in futures:
+                result.merge(future.result())
+
+        logger.info(f"Analisi parallela completata: {result.total} entries")
+        return result
+
+    def iter_cache_rows(self, filepath: str,
+                        start: int = 0) -> Iterator[Tuple[Optional[tuple], Optional[int]]]:
+        """
+        Parsa il file da start in parallelo per LogCache.iter_file(parse_rows=...)
+
+        I range vengono consegnati in ordine di file; al massimo due per
+        worker sono in volo, così la memoria resta limitata.
+
+        Args:
+            filepath: Percorso del file
+            start: Offset iniziale (fine dei dati già in cache)
+
+        Yields:
+            (cache_row o None, offset dopo la riga)
+        """
+        size = os.path.getsize(filepath)
+        chunks = max(self.workers, (size - start) // self.CACHE_CHUNK_BYTES + 1)
+        ranges = iter(split_file(filepath, chunks, start, size))
+        logger.info(f"Parsing per la cache su {self.workers} worker")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+
+            def submit():
+                for range_start, range_end in ranges:
+                    pending.append(executor.submit(_cache_rows, filepath, range_start,
+                                                   range_end, self.log_format, self.encoding))
+                    return
+
+            for _ in range(self.workers * 2):
+                submit()
+            while pending:
+                rows = pending.popleft().result()
+                submit()
+                yield from rows
@@ -0,0 +1,279 @@
+"""
+Sketches Module
+Strutture dati approssimate a memoria fissa per top-N e conteggi distinti
+
+Educational - Streaming Algorithms:
+- Space-Saving (Metwally et al.): top-N con al più k contatori,
+  sovrastima di ogni conteggio limitata da N/k
+- HyperLogLog (Flajolet et al.): cardinalità con 2^p registri da un
+  byte, errore standard ~1.04/sqrt(2^p)
+- Sketch mergeable: risultati di file o worker diversi si combinano
+  senza rileggere i dati
+"""
+
+import heapq
+import math
+import hashlib
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Heavy hitters con Space-Saving
+
+    Tiene al più 'capacity' chiavi monitorate. Una chiave nuova, a
+    struttura piena, prende il posto di quella con conteggio minimo e
+    ne eredita il conteggio (+1). Per ogni chiave:
+        conteggio reale <= stima <= conteggio reale + N / capacity
+    dove N è il numero totale di elementi visti.
+
+    Espone most_common() e len() come collections.Counter, quindi i
+    chiamanti possono usarlo al posto di un Counter esatto.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        Inizializza lo sketch
+
+        Args:
+            capacity: Numero massimo di chiavi monitorate
+        """
+        if capacity < 1:
+            raise ValueError("capacity deve essere >= 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # Min-heap (conteggio, chiave) con voci eventualmente obsolete:
+        # gli incrementi non toccano l'heap, lo si riallinea solo quando serve
+        self._heap: List[Tuple[int, Any]] = []
+
+    @classmethod
+    def from_error(cls, epsilon: float) -> 'SpaceSaving':
+        """
+        Crea uno sketch con sovrastima massima epsilon * N
+
+        Args:
+            epsilon: Errore relativo al totale (es. 0.001)
+
+        Returns:
+            SpaceSaving con capacity = ceil(1 / epsilon)
+        """
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon deve essere in (0, 1)")
+        return cls(math.ceil(1 / epsilon))
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        """
+        Conta una occorrenza di key
+
+        Args:
+            key: Chiave osservata
+            count: Peso dell'occorrenza
+        """
+        self.total += count
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+            return
+
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self._heap, (count, key))
+            return
+
+        # Evizione del minimo: scarta le voci dell'heap non aggiornate
+        heap = self._heap
+        while True:
+            minimum, victim = heap[0]
+            current = counts[victim]
+            if current == minimum:
+                break
+            heapq.heapreplace(heap, (current, victim))
+
+        del counts[victim]
+        del self.errors[victim]
+        counts[key] = minimum + count
+        self.errors[key] = minimum
+        heapq.heapreplace(heap, (minimum + count, key))
+
+    def update(self, keys: Iterable[Hashable]) -> None:
+        """Conta tutte le chiavi di un iterabile"""
+        add = self.add
+        for key in keys:
+            add(key)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.counts
+
+    def estimate(self, key: Hashable) -> int:
+        """Conteggio stimato (sovrastima) di una chiave"""
+        return self.counts.get(key, 0)
+
+    def error_bound(self) -> int:
+        """Sovrastima massima possibile di qualsiasi conteggio"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """
+        Chiavi più frequenti con il conteggio stimato
+
+        Args:
+            n: Numero di risultati (None = tutte le chiavi monitorate)
+
+        Returns:
+            Lista di (chiave, conteggio) in ordine decrescente
+        """
+        if n is None:
+            return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Unisce un altro sketch in questo (mergeable summaries)
+
+        Le chiavi assenti in uno dei due sketch pieni ricevono il suo
+        conteggio minimo, così la garanzia di sovrastima resta valida
+        sul totale combinato.
+
+        Args:
+            other: Sketch da unire
+
+        Returns:
+            Self per method chaining
+        """
+        floor_self = self.error_bound()
+        floor_other = other.error_bound()
+
+        counts = {}
+        errors = {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = (self.counts.get(key, floor_self)
+                           + other.counts.get(key, floor_other))
+            errors[key] = (self.errors.get(key, floor_self)
+                           + other.errors.get(key, floor_other))
+
+        capacity = max(self.capacity, other.capacity)
+        if len(counts) > capacity:
+            counts = dict(heapq.nlargest(capacity, counts.items(), key=lambda item: item[1]))
+
+        self.capacity = capacity
+        self.total += other.total
+        self.counts = counts
+        self.errors = {key: errors[key] for key in counts}
+        self._heap = [(count, key) for key, count in counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+
+class HyperLogLog:
+    """
+    Conteggio approssimato di elementi distinti con HyperLogLog
+
+    Usa 2^precision registri da un byte (16 KB con precision 14):
+    la memoria non dipende dal numero di elementi. L'hash è blake2b,
+    stabile tra processi ed esecuzioni, quindi sketch creati da worker
+    o file diversi si possono unire con merge().
+    """
+
+    MIN_PRECISION = 4
+    MAX_PRECISION = 18
+
+    def __init__(self, precision: int = 14):
+        """
+        Inizializza lo sketch
+
+        Args:
+            precision: Bit di indice dei registri (4-18)
+        """
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(f"precision deve essere tra {self.MIN_PRECISION} "
+                             f"e {self.MAX_PRECISION}")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._mask = self.m - 1
+        self._width = 64 - precision
+
+    @classmethod
+    def from_error(cls, error: float) -> 'HyperLogLog':
+        """
+        Crea uno sketch con l'errore standard richiesto
+
+        Args:
+            error: Errore relativo standard (es. 0.01 = 1%)
+
+        Returns:
+            HyperLogLog con la precisione minima sufficiente
+        """
+        if not 0 < error < 1:
+            raise ValueError("error deve essere in (0, 1)")
+        precision = math.ceil(math.log2((1.04 / error) ** 2))
+        return cls(min(max(precision, cls.MIN_PRECISION), cls.MAX_PRECISION))
+
+    def add(self, value: Any) -> None:
+        """
+        Aggiunge un elemento
+
+        Args:
+            value: Elemento (convertito in stringa per l'hash)
+        """
+        digest = hashlib.blake2b(str(value).encode('utf-8', 'surrogatepass'),
+                                 digest_size=8).digest()
+        x = int.from_bytes(digest, 'little')
+        index = x & self._mask
+        rank = self._width - (x >> self.precision).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]) -> None:
+        """Aggiunge tutti gli elementi di un iterabile"""
+        add = self.add
+        for value in values:
+            add(value)
+
+    def count(self) -> int:
+        """
+        Stima il numero di elementi distinti
+
+        Returns:
+            Cardinalità stimata
+        """
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Range piccolo: linear counting sui registri vuoti
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def standard_error(self) -> float:
+        """Errore relativo standard dello sketch"""
+        return 1.04 / math.sqrt(self.m)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """
+        Unisce un altro sketch (massimo registro per registro)
+
+        Args:
+            other: Sketch con la stessa precisione
+
+        Returns:
+            Self per method chaining
+        """
+        if other.precision != self.precision:
+            raise ValueError("Impossibile unire HyperLogLog con precisione diversa")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def __len__(self) -> int:
+        return self.count()
@@ -7,16 +7,317 @@ Educational - Statistics Techniques:
 - defaultdict per aggregazione
 - Time-based grouping
 - Data aggregation patterns
+- Sketch approssimati (Space-Saving, HyperLogLog) a memoria fissa
 """
 
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable
 import logging
 
+try:
+    from .sketches import SpaceSaving, HyperLogLog
+except ImportError:
+    # Esecuzione diretta come script (python analyzers/stats.py)
+    from sketches import SpaceSaving, HyperLogLog
+
 logger = logging.getLogger(__name__)
 
 
+class StatsAccumulator:
+    """
+    Accumulatore incrementale di statistiche (single-pass, streaming)
+
+    Aggiorna tutti i contatori con una sola lettura delle entries tramite
+    update(entry), senza mai tenere in memoria la lista completa.
+    Accumulatori parziali possono essere combinati con merge(other).
+    Le ore sono bucket interi (ordinale giorno * 24 + ora): la
+    formattazione in stringa avviene una volta per bucket, non per entry.
+    Espone gli stessi metodi di LogStatistics, quindi i reporter
+    possono usarlo in modo intercambiabile.
+
+    Con approximate=True i contatori ad alta cardinalità (IP, path,
+    messaggi di errore) diventano sketch Space-Saving e gli IP unici un
+    HyperLogLog: la memoria resta fissa qualunque sia il numero di
+    chiavi distinte, al prezzo di un errore limitato e configurabile.
+    """
+
+    ERROR_LEVELS = ('ERROR', 'CRITICAL', 'FATAL')
+
+    def __init__(self, approximate: bool = False, top_error: float = 0.001,
+                 distinct_error: float = 0.01):
+        """
+        Inizializza contatori vuoti
+
+        Args:
+            approximate: Usa sketch a memoria fissa per top-N e IP unici
+            top_error: Sovrastima massima dei top-N, relativa al totale
+            distinct_error: Errore relativo standard del conteggio IP unici
+        """
+        self.total = 0
+        self.errors = 0
+        self.levels = Counter()
+        self.hours = Counter()          # chiave: ordinale giorno * 24 + ora
+        self.error_hours = Counter()
+        self.approximate = approximate
+        if approximate:
+            self.error_messages = SpaceSaving.from_error(top_error)
+            self.ips = SpaceSaving.from_error(top_error)
+            self.paths = SpaceSaving.from_error(top_error)
+            self.distinct_ips = HyperLogLog.from_error(distinct_error)
+        else:
+            self.error_messages = Counter()
+            self.ips = Counter()
+            self.paths = Counter()
+            self.distinct_ips = None
+        self.status_codes = Counter()
+        self.methods = Counter()
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.size_total = 0
+        self.size_count = 0
+
+    def update(self, entry: Dict[str, Any]) -> None:
+        """
+        Aggiorna tutti i contatori con una entry
+
+        Args:
+            entry: Log entry parsata
+        """
+        self.total += 1
+
+        level = entry.get('level', 'UNKNOWN').upper()
+        self.levels[level] += 1
+        is_error = level in self.ERROR_LEVELS
+
+        status = entry.get('status')
+        if status is not None:
+            self.status_codes[status] += 1
+
+        if is_error or (status and status >= 400):
+            self.errors += 1
+
+        timestamp = entry.get('timestamp_parsed')
+        if timestamp:
+            # Bucket orario con aritmetica intera, niente strftime per entry
+            hour_key = timestamp.toordinal() * 24 + timestamp.hour
+            self.hours[hour_key] += 1
+            if is_error:
+                self.error_hours[hour_key] += 1
+
+            if self.first_timestamp is None or timestamp < self.first_timestamp:
+                self.first_timestamp = timestamp
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+
+        approximate = self.approximate
+
+        if is_error:
+            message = entry.get('message', '')
+            if message:
+                if len(message) > 100:
+                    message = message[:100] + '...'
+                if approximate:
+                    self.error_messages.add(message)
+                else:
+                    self.error_messages[message] += 1
+
+        ip = entry.get('ip')
+        if ip:
+            if approximate:
+                self.ips.add(ip)
+                self.distinct_ips.add(ip)
+            else:
+                self.ips[ip] += 1
+
+        path = entry.get('path')
+        if path:
+            if approximate:
+                self.paths.add(path)
+            else:
+                self.paths[path] += 1
+
+        method = entry.get('method')
+        if method:
+            self.methods[method.upper()] += 1
+
+        size = entry.get('size')
+        if size is not None and isinstance(size, (int, float)):
+            self.size_total += size
+            self.size_count += 1
+
+    def consume(self, entries: Iterable[Dict[str, Any]]) -> 'StatsAccumulator':
+        """
+        Aggiorna i contatori con tutte le entries di un iterabile
+
+        Args:
+            entries: Iterabile (anche generator) di entries
+
+        Returns:
+            Self per method chaining
+        """
+        update = self.update
+        for entry in entries:
+            update(entry)
+        logger.info(f"StatsAccumulator: {self.total} entries elaborate")
+        return self
+
+    def merge(self, other: 'StatsAccumulator') -> 'StatsAccumulator':
+        """
+        Unisce i contatori di un altro accumulatore in questo
+
+        Permette di aggregare risultati parziali (es. chunk di file
+        diversi o worker paralleli) senza rileggere le entries.
+
+        Args:
+            other: Accumulatore da unire (stessa modalità, esatta o approssimata)
+
+        Returns:
+            Self per method chaining
+        """
+        if other.approximate != self.approximate:
+            raise ValueError("Impossibile unire accumulatori esatti e approssimati")
+
+        self.total += other.total
+        self.errors += other.errors
+        self.levels.update(other.levels)
+        self.hours.update(other.hours)
+        self.error_hours.update(other.error_hours)
+        if self.approximate:
+            self.error_messages.merge(other.error_messages)
+            self.ips.merge(other.ips)
+            self.paths.merge(other.paths)
+            self.distinct_ips.merge(other.distinct_ips)
+        else:
+            self.error_messages.update(other.error_messages)
+            self.ips.update(other.ips)
+            self.paths.update(other.paths)
+        self.status_codes.update(other.status_codes)
+        self.methods.update(other.methods)
+        self.size_total += other.size_total
+        self.size_count += other.size_count
+
+        if other.first_timestamp is not None:
+            if self.first_timestamp is None or other.first_timestamp < self.first_timestamp:
+                self.first_timestamp = other.first_timestamp
+        if other.last_timestamp is not None:
+            if self.last_timestamp is None or other.last_timestamp > self.last_timestamp:
+                self.last_timestamp = other.last_timestamp
+
+        return self
+
+    @staticmethod
+    def _format_hour(hour_key: int) -> str:
+        """Converte un bucket orario intero nella chiave 'YYYY-MM-DD HH:00'"""
+        day = datetime.fromordinal(hour_key // 24).strftime('%Y-%m-%d')
+        return f"{day} {hour_key % 24:02d}:00"
+
+    def count_by_level(self) -> Dict[str, int]:
+        """Conta entries per livello"""
+        return dict(self.levels)
+
+    def count_by_hour(self) -> Dict[str, int]:
+        """Conta entries per ora"""
+        return {self._format_hour(key): count for key, count in self.hours.items()}
+
+    def count_by_day(self) -> Dict[str, int]:
+        """Conta entries per giorno (derivato dai bucket orari)"""
+        days = Counter()
+        for key, count in self.hours.items():
+            days[key // 24] += count
+        return {datetime.fromordinal(day).strftime('%Y-%m-%d'): count
+                for day, count in days.items()}
+
+    def count_errors_by_hour(self) -> Dict[str, int]:
+        """Conta errori per ora"""
+        return {self._format_hour(key): count for key, count in self.error_hours.items()}
+
+    def top_errors(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Top N error messages"""
+        return self.error_messages.most_common(n)
+
+    def top_ips(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Top N IP addresses"""
+        return self.ips.most_common(n)
+
+    def top_paths(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Top N paths richiesti"""
+        return self.paths.most_common(n)
+
+    def http_status_codes(self) -> Dict[int, int]:
+        """Conta occorrenze per status code HTTP"""
+        return dict(self.status_codes)
+
+    def http_methods(self) -> Dict[str, int]:
+        """Conta occorrenze per HTTP method"""
+        return dict(self.methods)
+
+    def error_rate(self) -> Dict[str, float]:
+        """Calcola il tasso di errore"""
+        if not self.total:
+            return {'error_rate': 0.0}
+
+        rate = (self.errors / self.total) * 100
+        return {
+            'total': self.total,
+            'errors': self.errors,
+            'error_rate': round(rate, 2)
+        }
+
+    def time_range(self) -> Dict[str, datetime]:
+        """Range temporale dei log"""
+        if self.first_timestamp is None:
+            return {'first_timestamp': None, 'last_timestamp': None}
+
+        duration = self.last_timestamp - self.first_timestamp
+        return {
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'duration_seconds': duration.total_seconds()
+        }
+
+    def unique_ips(self) -> int:
+        """Numero di IP unici (stimato con HyperLogLog in modalità approssimata)"""
+        if self.approximate:
+            return self.distinct_ips.count()
+        return len(self.ips)
+
+    def average_response_size(self) -> Dict[str, float]:
+        """Size medio delle risposte"""
+        if not self.size_count:
+            return {'avg_size': 0, 'total_size': 0, 'count': 0}
+
+        return {
+            'avg_size': round(self.size_total / self.size_count, 2),
+            'total_size': self.size_total,
+            'count': self.size_count
+        }
+
+    def generate_summary(self) -> Dict[str, Any]:
+        """
+        Genera riepilogo completo (stesso formato di LogStatistics)
+
+        Returns:
+            Dict con tutte le statistiche
+        """
+        return {
+            'total_entries': self.total,
+            'by_level': self.count_by_level(),
+            'by_hour': self.count_by_hour(),
+            'by_day': self.count_by_day(),
+            'errors_by_hour': self.count_errors_by_hour(),
+            'top_errors': self.top_errors(10),
+            'top_ips': self.top_ips(10),
+            'top_paths': self.top_paths(10),
+            'http_status_codes': self.http_status_codes(),
+            'http_methods': self.http_methods(),
+            'error_rate': self.error_rate(),
+            'time_range': self.time_range(),
+            'unique_ips': self.unique_ips(),
+            'avg_response_size': self.average_response_size(),
+        }
+
+
 class LogStatistics:
     """
     Generatore di statistiche per log entries
@@ -27,18 +328,39 @@ class LogStatistics:
     - Top errori
     - Statistiche HTTP
     - IP address analytics
+
+    Tutte le metriche derivano da un unico StatsAccumulator costruito
+    alla prima richiesta: le entries vengono lette una sola volta,
+    indipendentemente da quante metriche vengono calcolate.
     """
 
-    def __init__(self, entries: List[Dict[str, Any]]):
+    def __init__(self, entries: List[Dict[str, Any]], approximate: bool = False,
+                 top_error: float = 0.001, distinct_error: float = 0.01):
         """
         Inizializza con entries
 
         Args:
             entries: Lista di log entries
+            approximate: Usa sketch a memoria fissa per top-N e IP unici
+            top_error: Sovrastima massima dei top-N, relativa al totale
+            distinct_error: Errore relativo standard del conteggio IP unici
         """
         self.entries = entries
+        self.sketch_options = {
+            'approximate': approximate,
+            'top_error': top_error,
+            'distinct_error': distinct_error,
+        }
+        self._accumulator = None
         logger.info(f"LogStatistics inizializzato con {len(entries)} entries")
 
+    @property
+    def accumulator(self) -> StatsAccumulator:
+        """Accumulatore single-pass (costruito in modo lazy)"""
+        if self._accumulator is None:
+            self._accumulator = StatsAccumulator(**self.sketch_options).consume(self.entries)
+        return self._accumulator
+
     def count_by_level(self) -> Dict[str, int]:
         """
         Conta entries per livello
@@ -46,13 +368,7 @@ class LogStatistics:
         Returns:
             Dict {level: count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            level = entry.get('level', 'UNKNOWN').upper()
-            counter[level] += 1
-
-        result = dict(counter)
+        result = self.accumulator.count_by_level()
         logger.info(f"Count by level: {result}")
         return result
 
@@ -63,15 +379,7 @@ class LogStatistics:
         Returns:
             Dict {hour: count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            timestamp = entry.get('timestamp_parsed')
-            if timestamp:
-                hour_key = timestamp.strftime('%Y-%m-%d %H:00')
-                counter[hour_key] += 1
-
-        result = dict(counter)
+        result = self.accumulator.count_by_hour()
         logger.info(f"Count by hour: {len(result)} ore diverse")
         return result
 
@@ -82,15 +390,7 @@ class LogStatistics:
         Returns:
             Dict {day: count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            timestamp = entry.get('timestamp_parsed')
-            if timestamp:
-                day_key = timestamp.strftime('%Y-%m-%d')
-                counter[day_key] += 1
-
-        result = dict(counter)
+        result = self.accumulator.count_by_day()
         logger.info(f"Count by day: {len(result)} giorni diversi")
         return result
 
@@ -101,17 +401,7 @@ class LogStatistics:
         Returns:
             Dict {hour: error_count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            level = entry.get('level', '').upper()
-            if level in ('ERROR', 'CRITICAL', 'FATAL'):
-                timestamp = entry.get('timestamp_parsed')
-                if timestamp:
-                    hour_key = timestamp.strftime('%Y-%m-%d %H:00')
-                    counter[hour_key] += 1
-
-        result = dict(counter)
+        result = self.accumulator.count_errors_by_hour()
         logger.info(f"Errors by hour: {len(result)} ore con errori")
         return result
 
@@ -125,19 +415,7 @@ class LogStatistics:
         Returns:
             Lista di (message, count) tuples
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            level = entry.get('level', '').upper()
-            if level in ('ERROR', 'CRITICAL', 'FATAL'):
-                message = entry.get('message', '')
-                if message:
-                    # Tronca messaggi lunghi
-                    if len(message) > 100:
-                        message = message[:100] + '...'
-                    counter[message] += 1
-
-        top = counter.most_common(n)
+        top = self.accumulator.top_errors(n)
         logger.info(f"Top {n} errors: {len(top)} trovati")
         return top
 
@@ -151,14 +429,7 @@ class LogStatistics:
         Returns:
             Lista di (ip, count) tuples
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            ip = entry.get('ip')
-            if ip:
-                counter[ip] += 1
-
-        top = counter.most_common(n)
+        top = self.accumulator.top_ips(n)
         logger.info(f"Top {n} IPs: {len(top)} trovati")
         return top
 
@@ -169,14 +440,7 @@ class LogStatistics:
         Returns:
             Dict {status_code: count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            status = entry.get('status')
-            if status is not None:
-                counter[status] += 1
-
-        result = dict(counter)
+        result = self.accumulator.http_status_codes()
         logger.info(f"HTTP status codes: {result}")
         return result
 
@@ -187,14 +451,7 @@ class LogStatistics:
         Returns:
             Dict {method: count}
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            method = entry.get('method')
-            if method:
-                counter[method.upper()] += 1
-
-        result = dict(counter)
+        result = self.accumulator.http_methods()
         logger.info(f"HTTP methods: {result}")
         return result
 
@@ -208,14 +465,7 @@ class LogStatistics:
         Returns:
             Lista di (path, count) tuples
         """
-        counter = Counter()
-
-        for entry in self.entries:
-            path = entry.get('path')
-            if path:
-                counter[path] += 1
-
-        top = counter.most_common(n)
+        top = self.accumulator.top_paths(n)
         logger.info(f"Top {n} paths: {len(top)} trovati")
         return top
 
@@ -226,30 +476,8 @@ class LogStatistics:
         Returns:
             Dict con error_rate (percentuale)
         """
-        if not self.entries:
-            return {'error_rate': 0.0}
-
-        total = len(self.entries)
-        errors = 0
-
-        for entry in self.entries:
-            level = entry.get('level', '').upper()
-            if level in ('ERROR', 'CRITICAL', 'FATAL'):
-                errors += 1
-            else:
-                # Anche per HTTP status codes
-                status = entry.get('status')
-                if status and status >= 400:
-                    errors += 1
-
-        rate = (errors / total) * 100 if total > 0 else 0
-
-        result = {
-            'total': total,
-            'errors': errors,
-            'error_rate': round(rate, 2)
-        }
-        logger.info(f"Error rate: {rate:.2f}%")
+        result = self.accumulator.error_rate()
+        logger.info(f"Error rate: {result['error_rate']:.2f}%")
         return result
 
     def time_range(self) -> Dict[str, datetime]:
@@ -259,25 +487,7 @@ class LogStatistics:
         Returns:
             Dict con first_timestamp e last_timestamp
         """
-        timestamps = []
-
-        for entry in self.entries:
-            timestamp = entry.get('timestamp_parsed')
-            if timestamp:
-                timestamps.append(timestamp)
-
-        if not timestamps:
-            return {'first_timestamp': None, 'last_timestamp': None}
-
-        result = {
-            'first_timestamp': min(timestamps),
-            'last_timestamp': max(timestamps)
-        }
-
-        if result['last_timestamp'] and result['first_timestamp']:
-            duration = result['last_timestamp'] - result['first_timestamp']
-            result['duration_seconds'] = duration.total_seconds()
-
+        result = self.accumulator.time_range()
         logger.info(f"Time range: {result['first_timestamp']} - {result['last_timestamp']}")
         return result
 
@@ -288,14 +498,7 @@ class LogStatistics:
         Returns:
             Numero di IP unici
         """
-        ips = set()
-
-        for entry in self.entries:
-            ip = entry.get('ip')
-            if ip:
-                ips.add(ip)
-
-        count = len(ips)
+        count = self.accumulator.unique_ips()
         logger.info(f"Unique IPs: {count}")
         return count
 
@@ -306,24 +509,8 @@ class LogStatistics:
         Returns:
             Dict con avg_size
         """
-        sizes = []
-
-        for entry in self.entries:
-            size = entry.get('size')
-            if size is not None and isinstance(size, (int, float)):
-                sizes.append(size)
-
-        if not sizes:
-            return {'avg_size': 0, 'total_size': 0, 'count': 0}
-
-        avg = sum(sizes) / len(sizes)
-
-        result = {
-            'avg_size': round(avg, 2),
-            'total_size': sum(sizes),
-            'count': len(sizes)
-        }
-        logger.info(f"Average response size: {avg:.2f} bytes")
+        result = self.accumulator.average_response_size()
+        logger.info(f"Average response size: {result['avg_size']:.2f} bytes")
         return result
 
     def generate_summary(self) -> Dict[str, Any]:
@@ -335,22 +522,8 @@ class LogStatistics:
         """
         logger.info("Generazione riepilogo statistiche...")
 
-        summary = {
-            'total_entries': len(self.entries),
-            'by_level': self.count_by_level(),
-            'by_hour': self.count_by_hour(),
-            'by_day': self.count_by_day(),
-            'errors_by_hour': self.count_errors_by_hour(),
-            'top_errors': self.top_errors(10),
-            'top_ips': self.top_ips(10),
-            'top_paths': self.top_paths(10),
-            'http_status_codes': self.http_status_codes(),
-            'http_methods': self.http_methods(),
-            'error_rate': self.error_rate(),
-            'time_range': self.time_range(),
-            'unique_ips': self.unique_ips(),
-            'avg_response_size': self.average_response_size(),
-        }
+        summary = self.accumulator.generate_summary()
+        summary['total_entries'] = len(self.entries)
 
         logger.info("Riepilogo statistiche completato")
         return summary
@@ -13,17 +13,31 @@ Educational - System Programming Concepts:
 import argparse
 import sys
 import logging
-import time
 import os
+import glob
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Iterator, Dict, Any, Tuple
 from datetime import datetime
 
 # Import moduli locali
-from parsers import ApacheLogParser, NginxLogParser, CustomLogParser
-from analyzers import LogFilter, LogFilterBuilder, LogStatistics, DataExtractor
+from parsers import (ApacheLogParser, NginxLogParser, CustomLogParser, LogCache, TimeIndex,
+                     iter_range, FileFollower)
+from analyzers import LogFilter, LogFilterBuilder, StatsAccumulator, DataExtractor, ParallelAnalyzer
 from reporters import TextReporter, HTMLReporter
 
+# Colori ANSI (colorama opzionale)
+try:
+    from colorama import Fore
+except ImportError:
+    class Fore:
+        RESET = ''
+        RED = ''
+        GREEN = ''
+        YELLOW = ''
+        CYAN = ''
+
 # Configurazione logging
 logging.basicConfig(
     level=logging.INFO,
@@ -85,6 +99,26 @@ class LogAnalyzer:
             logger.info("Formato rilevato: Custom (no match chiaro)")
             return 'custom'
 
+    def _create_parser(self, log_format: str):
+        """
+        Crea il parser per il formato indicato
+
+        Args:
+            log_format: Format ('apache', 'nginx', 'custom')
+
+        Returns:
+            Istanza parser o None se formato non supportato
+        """
+        if log_format == 'apache':
+            return ApacheLogParser()
+        elif log_format == 'nginx':
+            return NginxLogParser()
+        elif log_format == 'custom':
+            return CustomLogParser()
+
+        logger.error(f"Formato non supportato: {log_format}")
+        return None
+
     def load_file(self, filepath: str, log_format: Optional[str] = None) -> bool:
         """
         Carica e parsa il file di log
@@ -105,14 +139,8 @@ class LogAnalyzer:
             log_format = self.detect_format(filepath)
 
         # Crea parser appropriato
-        if log_format == 'apache':
-            self.parser = ApacheLogParser()
-        elif log_format == 'nginx':
-            self.parser = NginxLogParser()
-        elif log_format == 'custom':
-            self.parser = CustomLogParser()
-        else:
-            logger.error(f"Formato non supportato: {log_format}")
+        self.parser = self._create_parser(log_format)
+        if self.parser is None:
             return False
 
         # Parsa file
@@ -125,30 +153,179 @@ class LogAnalyzer:
             logger.error(f"Errore parsing: {e}")
             return False
 
+    def _seek_range(self, filepath: str, parser,
+                    time_bounds: Tuple[datetime, datetime]) -> Tuple[int, int]:
+        """
+        Range di byte del file che contiene la finestra temporale
+
+        Args:
+            filepath: Percorso file
+            parser: Parser per leggere i timestamp
+            time_bounds: (start, end); datetime.min/max = nessun limite
+
+        Returns:
+            (offset iniziale, offset finale escluso)
+        """
+        start, end = time_bounds
+        index = TimeIndex(filepath, parser)
+        return index.byte_range(start if start > datetime.min else None,
+                                end if end < datetime.max else None)
+
+    def iter_file(self, filepath: str, log_format: Optional[str] = None,
+                  use_cache: bool = False,
+                  time_bounds: Optional[Tuple[datetime, datetime]] = None,
+                  workers: int = 1) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        Apre il file di log in modalità streaming
+
+        Le entries vengono parsate on-demand mentre vengono consumate,
+        senza '_raw_line': la memoria resta costante anche su file da GB.
+
+        Args:
+            filepath: Percorso file
+            log_format: Format ('apache', 'nginx', 'custom') o None per auto-detect
+            use_cache: Se True usa (e aggiorna) la cache colonnare accanto al file
+            time_bounds: Finestra (start, end): legge solo il range di byte
+                         che la contiene (solo per log ordinati per tempo)
+            workers: Con la cache, processi che parsano le righe non in cache
+
+        Returns:
+            Generator di entries o None in caso di errore
+        """
+        if not Path(filepath).exists():
+            logger.error(f"File non trovato: {filepath}")
+            return None
+
+        cache = None
+        if use_cache:
+            cache = LogCache(filepath)
+            # Con cache valida il formato è già noto: niente detect_format
+            if cache.load() and log_format is None:
+                log_format = cache.log_format
+
+        if log_format is None:
+            log_format = self.detect_format(filepath)
+
+        self.parser = self._create_parser(log_format)
+        if self.parser is None:
+            return None
+
+        if cache is not None:
+            parse_rows = None
+            if workers > 1 and cache.state != 'hit':
+                # Miss/append: parsing parallelo, poi lettura dalla cache scritta
+                parse_rows = partial(ParallelAnalyzer(log_format, workers).iter_cache_rows, filepath)
+            return cache.iter_file(self.parser, log_format, parse_rows)
+
+        if time_bounds is not None:
+            first, last = self._seek_range(filepath, self.parser, time_bounds)
+            return iter_range(self.parser, filepath, first, last)
+
+        logger.info(f"Streaming file {filepath}...")
+        return self.parser.iter_file(filepath, keep_raw=False)
+
+    def parallel_stats(self, filepath: str, log_format: Optional[str], workers: int,
+                       min_level: Optional[str] = None, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None,
+                       sketch_options: Optional[Dict[str, Any]] = None,
+                       seek: bool = False) -> Optional[StatsAccumulator]:
+        """
+        Parsa e aggrega il file su più processi
+
+        Args:
+            filepath: Percorso file
+            log_format: Format ('apache', 'nginx', 'custom') o None per auto-detect
+            workers: Numero di processi worker
+            min_level: Livello minimo (opzionale)
+            start: Data/ora inizio (opzionale)
+            end: Data/ora fine (opzionale)
+            sketch_options: top_error/distinct_error per la modalità approssimata
+            seek: Legge solo il range di byte della finestra (log ordinati)
+
+        Returns:
+            StatsAccumulator con il merge dei risultati o None in caso di errore
+        """
+        if not Path(filepath).exists():
+            logger.error(f"File non trovato: {filepath}")
+            return None
+
+        if log_format is None:
+            log_format = self.detect_format(filepath)
+
+        parser = self._create_parser(log_format)
+        if parser is None:
+            return None
+
+        analyzer = ParallelAnalyzer(log_format, workers)
+        if min_level:
+            analyzer.by_min_level(min_level)
+        if sketch_options:
+            analyzer.approximate(**sketch_options)
+
+        first, last = 0, None
+        if start or end:
+            analyzer.by_time_range(start, end)
+            if seek:
+                first, last = self._seek_range(filepath, parser,
+                                               (start or datetime.min, end or datetime.max))
+
+        return analyzer.run(filepath, first, last)
+
+    @staticmethod
+    def _sketch_options(args) -> Optional[Dict[str, Any]]:
+        """Opzioni degli sketch approssimati dagli argomenti CLI (None = esatto)"""
+        if not getattr(args, 'approximate', False):
+            return None
+        return {'top_error': args.top_error, 'distinct_error': args.distinct_error}
+
+    def _new_accumulator(self, args) -> StatsAccumulator:
+        """StatsAccumulator esatto o approssimato secondo gli argomenti CLI"""
+        sketch_options = self._sketch_options(args)
+        if sketch_options:
+            return StatsAccumulator(approximate=True, **sketch_options)
+        return StatsAccumulator()
+
     def analyze(self, args):
         """Comando analyze"""
-        if not self.load_file(args.log_file, args.format):
-            return 1
-
-        logger.info("Analisi in corso...")
+        # Filtri (valutati lazy, una entry alla volta)
+        if args.last_hours:
+            log_filter = LogFilterBuilder.last_hours(args.last_hours)
+        else:
+            log_filter = LogFilter()
 
-        # Filtra entries se richiesto
-        entries = self.entries
         if args.level:
-            log_filter = LogFilter().by_min_level(args.level)
-            entries = log_filter.apply(entries)
-            logger.info(f"Filtrato per livello >= {args.level}: {len(entries)} entries")
+            log_filter.by_min_level(args.level)
 
         if args.start_time or args.end_time:
-            from datetime import datetime
             start = datetime.fromisoformat(args.start_time) if args.start_time else datetime.min
             end = datetime.fromisoformat(args.end_time) if args.end_time else datetime.max
-            log_filter = LogFilter().by_time_range(start, end)
-            entries = log_filter.apply(entries)
-            logger.info(f"Filtrato per tempo: {len(entries)} entries")
+            log_filter.by_time_range(start, end)
+
+        # Su log ordinati (--sorted o indice creato con 'index') si legge
+        # solo il range di byte che contiene la finestra temporale
+        time_bounds = log_filter.time_bounds
+        seek = time_bounds is not None and (args.sorted or TimeIndex.exists(args.log_file))
+
+        if args.workers > 1 and not args.cache:
+            logger.info(f"Analisi parallela con {args.workers} worker...")
+            start, end = time_bounds or (None, None)
+            stats = self.parallel_stats(args.log_file, args.format, args.workers,
+                                        args.level, start, end, self._sketch_options(args),
+                                        seek=seek)
+            if stats is None:
+                return 1
+        else:
+            entries = self.iter_file(args.log_file, args.format, args.cache,
+                                     time_bounds if seek else None, args.workers)
+            if entries is None:
+                return 1
+
+            logger.info("Analisi in corso...")
 
-        # Genera statistiche
-        stats = LogStatistics(entries)
+            # Genera statistiche in un solo passaggio
+            stats = self._new_accumulator(args).consume(log_filter.apply_iter(entries))
+            if log_filter.filters:
+                logger.info(f"Entries dopo i filtri: {stats.total}")
 
         # Genera report
         if args.output and args.output.endswith('.html'):
@@ -172,95 +349,91 @@ class LogAnalyzer:
         return 0
 
     def tail(self, args):
-        """Comando tail - follow log file in real-time"""
-        filepath = args.log_file
-
-        if not Path(filepath).exists():
-            logger.error(f"File non trovato: {filepath}")
+        """Comando tail - follow di uno o più file (o glob) in real-time"""
+        follower = FileFollower(args.log_file, poll_interval=args.interval)
+        if not follower.files and not any(glob.has_magic(p) for p in args.log_file):
+            logger.error(f"File non trovato: {', '.join(args.log_file)}")
+            follower.close()
             return 1
 
-        # Rileva formato
-        log_format = args.format or self.detect_format(filepath)
+        # I file seguiti possono avere formati diversi: un parser per formato
+        formats: Dict[str, str] = {}
+        parsers: Dict[str, Any] = {}
+
+        def parser_for(path: str):
+            log_format = formats.get(path)
+            if log_format is None:
+                log_format = formats[path] = args.format or self.detect_format(path)
+            parser = parsers.get(log_format)
+            if parser is None:
+                parser = parsers[log_format] = self._create_parser(log_format)
+            return parser
+
+        # Catena completa dei filtri, compilata in un solo predicato
+        log_filter = LogFilter()
+        if args.level:
+            log_filter.by_min_level(args.level)
+        if args.ip:
+            log_filter.by_ip(args.ip)
+        if args.contains:
+            log_filter.by_message_contains(args.contains)
+        predicate = log_filter.compile()
 
-        # Crea parser
-        if log_format == 'apache':
-            parser = ApacheLogParser()
-        elif log_format == 'nginx':
-            parser = NginxLogParser()
-        else:
-            parser = CustomLogParser()
+        multiple = len(follower.files) > 1 or any(glob.has_magic(p) for p in args.log_file)
+        mode = 'inotify' if follower.inotify else 'polling'
 
-        logger.info(f"Following {filepath} (Ctrl+C to stop)...")
+        logger.info(f"Following {len(follower.files)} file (Ctrl+C to stop)...")
         print(f"\n=== Log Tail Mode ===")
-        print(f"File: {filepath}")
-        print(f"Format: {log_format}")
+        print(f"File: {', '.join(follower.files) or ', '.join(args.log_file)}")
+        print(f"Format: {args.format or 'auto'}")
         print(f"Filter: {args.level or 'ALL'}")
+        print(f"Mode: {mode}")
         print(f"{'=' * 60}\n")
 
-        # Inizializza filtro
-        log_filter = None
-        if args.level:
-            log_filter = LogFilter().by_min_level(args.level)
-
+        line_count = 0
         try:
-            # Posiziona alla fine del file
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                # Seek to end
-                f.seek(0, 2)
-                file_size = f.tell()
-
-                # Track inode per detect log rotation
-                last_inode = os.fstat(f.fileno()).st_ino
-
-                line_count = 0
-
-                while True:
-                    line = f.readline()
-
-                    if line:
-                        # Parsa riga
-                        parsed = parser.parse_line(line)
-                        if parsed:
-                            # Applica filtro
-                            if log_filter:
-                                if not log_filter.filters[0](parsed):  # type: ignore
-                                    continue
-
-                            # Stampa
-                            timestamp = parsed.get('timestamp_parsed')
-                            ts_str = timestamp.strftime('%H:%M:%S') if timestamp else '??'
-                            level = parsed.get('level', '???')
-                            message = parsed.get('message', line.strip())[:100]
-
-                            color = self._get_level_color(level)
-                            print(f"{ts_str} [{color}{level}{Fore.RESET}] {message}")
-                            line_count += 1
-
-                    else:
-                        # Check for log rotation
-                        try:
-                            current_inode = os.fstat(f.fileno()).st_ino
-                            if current_inode != last_inode:
-                                logger.info("Log rotation detected, reopening...")
-                                f.close()
-                                f = open(filepath, 'r', encoding='utf-8', errors='ignore')
-                                f.seek(0, 2)
-                                last_inode = os.fstat(f.fileno()).st_ino
-                        except:
-                            pass
-
-                        time.sleep(0.1)
+            for batch in follower.follow():
+                output = []
+                for path, line in batch:
+                    parsed = parser_for(path).parse_line(line)
+                    if not parsed or not predicate(parsed):
+                        continue
+
+                    timestamp = parsed.get('timestamp_parsed')
+                    ts_str = timestamp.strftime('%H:%M:%S') if timestamp else '??'
+                    level = parsed.get('level', '???')
+                    message = parsed.get('message', line.strip())[:100]
+
+                    color = self._get_level_color(level)
+                    prefix = f"{os.path.basename(path)}: " if multiple else ''
+                    output.append(f"{prefix}{ts_str} [{color}{level}{Fore.RESET}] {message}")
+
+                line_count += len(output)
+                if output:
+                    # Una sola write per batch invece di una print per riga
+                    sys.stdout.write('\n'.join(output) + '\n')
+                    sys.stdout.flush()
 
         except KeyboardInterrupt:
             print(f"\n\nStopped. Processed {line_count} new lines.")
             return 0
+        finally:
+            follower.close()
 
     def stats(self, args):
         """Comando stats"""
-        if not self.load_file(args.log_file, args.format):
-            return 1
+        if args.workers > 1 and not args.cache:
+            stats = self.parallel_stats(args.log_file, args.format, args.workers,
+                                        sketch_options=self._sketch_options(args))
+            if stats is None:
+                return 1
+        else:
+            entries = self.iter_file(args.log_file, args.format, args.cache,
+                                     workers=args.workers)
+            if entries is None:
+                return 1
 
-        stats = LogStatistics(self.entries)
+            stats = self._new_accumulator(args).consume(entries)
         reporter = TextReporter()
 
         if args.by == 'hour':
@@ -283,24 +456,36 @@ class LogAnalyzer:
 
     def extract_ips(self, args):
         """Comando extract-ips"""
-        if not self.load_file(args.log_file, args.format):
+        entries = self.iter_file(args.log_file, args.format, args.cache)
+        if entries is None:
             return 1
 
-        extractor = DataExtractor()
-        ips = extractor.extract_ips(self.entries, unique=True)
-
-        print(f"\n=== IP Addresses Trovati: {len(ips)} ===\n")
+        if args.approximate:
+            # Memoria fissa: IP unici stimati (HyperLogLog), top N da Space-Saving
+            stats = self._new_accumulator(args).consume(entries)
+            top = args.top or 10
+            print(f"\n=== IP Addresses Trovati: ~{stats.unique_ips():,} (stima) ===\n")
+            print(f"Top {top} IP per richieste (sovrastima max {stats.ips.error_bound():,}):\n")
+            for ip, count in stats.top_ips(top):
+                print(f"  {ip:15} {count:6,} richieste")
+            return 0
 
-        if args.top:
-            # Count occurrences
-            from collections import Counter
-            ip_counter = Counter()
+        # Conta le richieste per IP durante la stessa scansione dell'estrazione
+        ip_counter = Counter()
 
-            for entry in self.entries:
+        def counting(entries):
+            for entry in entries:
                 ip = entry.get('ip')
                 if ip:
                     ip_counter[ip] += 1
+                yield entry
 
+        extractor = DataExtractor()
+        ips = extractor.extract_ips(counting(entries), unique=True)
+
+        print(f"\n=== IP Addresses Trovati: {len(ips)} ===\n")
+
+        if args.top:
             print(f"Top {args.top} IP per richieste:\n")
             for ip, count in ip_counter.most_common(args.top):
                 print(f"  {ip:15} {count:6,} richieste")
@@ -310,10 +495,31 @@ class LogAnalyzer:
 
         return 0
 
+    def index(self, args):
+        """Comando index - costruisce l'indice temporale sparso"""
+        filepath = args.log_file
+
+        if not Path(filepath).exists():
+            logger.error(f"File non trovato: {filepath}")
+            return 1
+
+        log_format = args.format or self.detect_format(filepath)
+        parser = self._create_parser(log_format)
+        if parser is None:
+            return 1
+
+        index = TimeIndex(filepath, parser)
+        try:
+            points = index.build(step=args.step * 1024 * 1024)
+        except ValueError as e:
+            logger.error(str(e))
+            return 1
+
+        print(f"\nIndice temporale: {points} punti salvati in {index.index_path}")
+        return 0
+
     def _get_level_color(self, level: str) -> str:
         """Ritorna codice colore ANSI per livello"""
-        from colorama import Fore
-
         level = level.upper()
         if level in ('ERROR', 'FATAL', 'CRITICAL'):
             return Fore.RED
@@ -352,6 +558,8 @@ Esempi:
   %(prog)s analyze access.log --output report.html
   %(prog)s tail access.log
   %(prog)s stats access.log --by hour
+  %(prog)s analyze huge.log --workers 8
+  %(prog)s analyze huge.log --last-hours 1
   %(prog)s extract-ips access.log --top 10
         """
     )
@@ -371,19 +579,40 @@ Esempi:
                               help='Filtra per livello minimo')
     analyze_parser.add_argument('--start-time', help='Data/ora inizio (ISO format)')
     analyze_parser.add_argument('--end-time', help='Data/ora fine (ISO format)')
+    analyze_parser.add_argument('--last-hours', type=int,
+                              help='Analizza solo le ultime N ore')
+    analyze_parser.add_argument('--sorted', action='store_true',
+                              help='Log ordinato per tempo: con una finestra temporale legge '
+                                   'solo il range di byte che la contiene (automatico se '
+                                   'esiste l\'indice creato con \'index\')')
     analyze_parser.add_argument('--output', '-o', help='File output (es. report.html)')
     analyze_parser.add_argument('--top', type=int, default=10,
                               help='Numero top results (default: 10)')
     analyze_parser.add_argument('--errors-by-hour', action='store_true',
                               help='Mostra errori per ora')
+    analyze_parser.add_argument('--workers', '-j', type=int, default=1,
+                              help='Processi per il parsing parallelo (default: 1)')
+    analyze_parser.add_argument('--cache', action='store_true',
+                              help='Usa la cache colonnare accanto al file (<file>.lacache)')
+    analyze_parser.add_argument('--approximate', action='store_true',
+                              help='Top-N e IP unici con sketch a memoria fissa')
+    analyze_parser.add_argument('--top-error', type=float, default=0.001,
+                              help='Sovrastima massima top-N, frazione del totale (default: 0.001)')
+    analyze_parser.add_argument('--distinct-error', type=float, default=0.01,
+                              help='Errore relativo del conteggio IP unici (default: 0.01)')
 
     # Comando tail
     tail_parser = subparsers.add_parser('tail', help='Follow log file in real-time')
-    tail_parser.add_argument('log_file', help='File di log da seguire')
+    tail_parser.add_argument('log_file', nargs='+',
+                           help='File di log (o pattern glob) da seguire')
     tail_parser.add_argument('--format', choices=['apache', 'nginx', 'custom'],
                            help='Formato log (default: auto-detect)')
     tail_parser.add_argument('--level', choices=['DEBUG', 'INFO', 'WARN', 'ERROR'],
                            help='Filtra per livello minimo')
+    tail_parser.add_argument('--ip', help='Mostra solo le richieste di questo IP')
+    tail_parser.add_argument('--contains', help='Mostra solo i messaggi che contengono il testo')
+    tail_parser.add_argument('--interval', type=float, default=1.0,
+                           help='Secondi tra i ricontrolli / polling senza inotify (default: 1.0)')
 
     # Comando stats
     stats_parser = subparsers.add_parser('stats', help='Genera statistiche')
@@ -392,6 +621,16 @@ Esempi:
                              help='Formato log (default: auto-detect)')
     stats_parser.add_argument('--by', choices=['hour', 'day', 'level', 'full'],
                             default='full', help='Raggruppa per (default: full)')
+    stats_parser.add_argument('--workers', '-j', type=int, default=1,
+                            help='Processi per il parsing parallelo (default: 1)')
+    stats_parser.add_argument('--cache', action='store_true',
+                            help='Usa la cache colonnare accanto al file (<file>.lacache)')
+    stats_parser.add_argument('--approximate', action='store_true',
+                            help='Top-N e IP unici con sketch a memoria fissa')
+    stats_parser.add_argument('--top-error', type=float, default=0.001,
+                            help='Sovrastima massima top-N, frazione del totale (default: 0.001)')
+    stats_parser.add_argument('--distinct-error', type=float, default=0.01,
+                            help='Errore relativo del conteggio IP unici (default: 0.01)')
 
     # Comando extract-ips
     ips_parser = subparsers.add_parser('extract-ips', help='Estrae IP addresses')
@@ -399,6 +638,22 @@ Esempi:
     ips_parser.add_argument('--format', choices=['apache', 'nginx', 'custom'],
                            help='Formato log (default: auto-detect)')
     ips_parser.add_argument('--top', type=int, help='Mostra top N IP per richieste')
+    ips_parser.add_argument('--cache', action='store_true',
+                           help='Usa la cache colonnare accanto al file (<file>.lacache)')
+    ips_parser.add_argument('--approximate', action='store_true',
+                           help='Stima IP unici e top N a memoria fissa (campo ip)')
+    ips_parser.add_argument('--top-error', type=float, default=0.001,
+                           help='Sovrastima massima top-N, frazione del totale (default: 0.001)')
+    ips_parser.add_argument('--distinct-error', type=float, default=0.01,
+                           help='Errore relativo del conteggio IP unici (default: 0.01)')
+
+    # Comando index
+    index_parser = subparsers.add_parser('index', help='Costruisce indice temporale per seek veloci')
+    index_parser.add_argument('log_file', help='File di log')
+    index_parser.add_argument('--format', choices=['apache', 'nginx', 'custom'],
+                             help='Formato log (default: auto-detect)')
+    index_parser.add_argument('--step', type=int, default=1,
+                             help='Distanza tra i campioni in MB (default: 1)')
 
     # Parse args
     args = parser.parse_args()
@@ -423,6 +678,8 @@ Esempi:
             return analyzer.stats(args)
         elif args.command == 'extract-ips':
             return analyzer.extract_ips(args)
+        elif args.command == 'index':
+            return analyzer.index(args)
         else:
             parser.print_help()
             return 1
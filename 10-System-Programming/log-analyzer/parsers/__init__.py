@@ -3,14 +3,25 @@ Log Parsers Package
 Moduli per parsare diversi formati di log
 """
 
+from .entry import LogEntry, StringPool
 from .apache import ApacheLogParser
 from .nginx import NginxLogParser
 from .custom import CustomLogParser, ApplicationLogParser, JavaLogParser
+from .cache import LogCache, cache_row
+from .timeindex import TimeIndex, iter_range
+from .follow import FileFollower
 
 __all__ = [
+    'LogEntry',
+    'StringPool',
     'ApacheLogParser',
     'NginxLogParser',
     'CustomLogParser',
     'ApplicationLogParser',
     'JavaLogParser',
+    'LogCache',
+    'cache_row',
+    'TimeIndex',
+    'iter_range',
+    'FileFollower',
 ]
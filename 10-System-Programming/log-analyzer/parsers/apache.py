@@ -6,13 +6,24 @@ Analizza log in formato Apache Common Log Format (CLF) e Combined Log Format
  - Regex compilation per performance
  - Named capture groups per estrazione dati
  - Gestione errori nel parsing
+ - Entry a slot con stringhe ripetute condivise (interning)
 """
 
 import re
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Iterator
 import logging
 
+try:
+    from .levels import LOG_LEVELS
+    from .combined import TimestampCache, split_combined
+    from .entry import LogEntry, StringPool
+except ImportError:
+    # Esecuzione diretta come script (python parsers/apache.py)
+    from levels import LOG_LEVELS
+    from combined import TimestampCache, split_combined
+    from entry import LogEntry, StringPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -64,9 +75,11 @@ class ApacheLogParser:
         """
         self.use_combined = use_combined
         self.pattern = self.COMBINED_PATTERN if use_combined else self.CLF_PATTERN
+        self.timestamps = TimestampCache()
+        self.strings = StringPool()
         logger.info(f"Apache Log Parser inizializzato con formato {'Combined' if use_combined else 'CLF'}")
 
-    def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
+    def parse_line(self, line: str) -> Optional[LogEntry]:
         """
         Parsa una riga di log Apache
 
@@ -74,42 +87,57 @@ class ApacheLogParser:
             line: Riga di log da parsare
 
         Returns:
-            Dict con i campi parsati o None se la riga non matcha il pattern
+            LogEntry con i campi parsati o None se la riga non matcha il pattern
         """
         if not line or not line.strip():
             return None
 
-        match = self.pattern.match(line.strip())
-        if not match:
-            logger.debug(f"Impossibile parsare la riga: {line[:100]}...")
-            return None
-
-        data = match.groupdict()
+        line = line.strip()
+
+        # Fast path senza regex per il Combined canonico, regex per il resto
+        data = split_combined(line) if self.use_combined else None
+        if data is None:
+            match = self.pattern.match(line)
+            if not match:
+                logger.debug(f"Impossibile parsare la riga: {line[:100]}...")
+                return None
+            data = match.groupdict()
+
+        strings = self.strings
+        strings.trim()
+        intern = strings.intern
+
+        entry = LogEntry()
+        entry.ip = intern(data['ip'], data['ip'])
+        entry.identity = intern(data['identity'], data['identity'])
+        entry.userid = intern(data['userid'], data['userid'])
+        entry.timestamp = intern(data['timestamp'], data['timestamp'])
+        entry.method = intern(data['method'], data['method'])
+        entry.path = intern(data['path'], data['path'])
+        entry.protocol = intern(data['protocol'], data['protocol'])
 
         # Parsing del timestamp
-        data['timestamp_parsed'] = self._parse_timestamp(data['timestamp'])
+        entry.timestamp_parsed = self._parse_timestamp(data['timestamp'])
 
         # Conversione tipi
-        data['status'] = int(data['status'])
-        data['size'] = int(data['size'])
+        status = int(data['status'])
+        entry.status = intern(status, status)
+        entry.size = int(data['size'])
 
-        # Aggiungi campo livello basato sullo status code
-        data['level'] = self._get_log_level(data['status'])
+        # Livello di log basato sullo status code
+        entry.level = self._get_log_level(status)
+        entry.severity = LOG_LEVELS[entry.level]
 
-        # Aggiungi campo messaggio per compatibilità
-        data['message'] = f"{data['method']} {data['path']} - {data['status']}"
+        # 'message' non viene memorizzato: LogEntry lo ricostruisce
+        # da method, path e status quando richiesto
 
         # Campi opzionali per Combined format
-        if self.use_combined:
-            if not data.get('referer'):
-                data['referer'] = '-'
-            if not data.get('user_agent'):
-                data['user_agent'] = '-'
-        else:
-            data['referer'] = '-'
-            data['user_agent'] = '-'
+        referer = data.get('referer') or '-'
+        user_agent = data.get('user_agent') or '-'
+        entry.referer = intern(referer, referer)
+        entry.user_agent = intern(user_agent, user_agent)
 
-        return data
+        return entry
 
     def _parse_timestamp(self, timestamp_str: str) -> Optional[datetime]:
         """
@@ -124,9 +152,8 @@ class ApacheLogParser:
             datetime oggetto o None
         """
         try:
-            # Rimuovi timezone per semplicità
-            ts_clean = timestamp_str.split()[0]
-            return datetime.strptime(ts_clean, '%d/%b/%Y:%H:%M:%S')
+            # Cache per secondo; timezone ignorata come in precedenza
+            return self.timestamps.parse(timestamp_str)
         except (ValueError, IndexError) as e:
             logger.warning(f"Errore parsing timestamp {timestamp_str}: {e}")
             return None
@@ -148,27 +175,48 @@ class ApacheLogParser:
         else:
             return 'INFO'
 
-    def parse_file(self, filepath: str, encoding: str = 'utf-8') -> list:
+    def parse_file(self, filepath: str, encoding: str = 'utf-8',
+                   keep_raw: bool = False) -> list:
         """
         Parsa un intero file di log
 
         Args:
             filepath: Percorso del file
             encoding: Encoding del file
+            keep_raw: Se True conserva la riga originale in '_raw_line'
 
         Returns:
             Lista di entry parsate
         """
-        entries = []
+        entries = list(self.iter_file(filepath, encoding, keep_raw))
+        logger.info(f"Parsing completato: {len(entries)} entry parsate")
+        return entries
+
+    def iter_file(self, filepath: str, encoding: str = 'utf-8',
+                  keep_raw: bool = False) -> Iterator[LogEntry]:
+        """
+        Parsa un file di log una riga alla volta (streaming)
+
+        A differenza di parse_file non costruisce la lista completa:
+        la memoria resta costante indipendentemente dalla dimensione del file.
 
+        Args:
+            filepath: Percorso del file
+            encoding: Encoding del file
+            keep_raw: Se True conserva la riga originale in '_raw_line' (opt-in)
+
+        Yields:
+            Entry parsate una alla volta
+        """
         try:
             with open(filepath, 'r', encoding=encoding, errors='ignore') as f:
                 for line_num, line in enumerate(f, 1):
                     parsed = self.parse_line(line)
                     if parsed:
-                        parsed['_line_number'] = line_num
-                        parsed['_raw_line'] = line.strip()
-                        entries.append(parsed)
+                        parsed._line_number = line_num
+                        if keep_raw:
+                            parsed._raw_line = line.strip()
+                        yield parsed
 
                     # Log progress ogni 10000 righe
                     if line_num % 10000 == 0:
@@ -178,9 +226,6 @@ class ApacheLogParser:
             logger.error(f"Errore lettura file {filepath}: {e}")
             raise
 
-        logger.info(f"Parsing completato: {len(entries)} entry parsate")
-        return entries
-
     def is_error(self, entry: Dict[str, Any]) -> bool:
         """
         Verifica se l'entry è un errore
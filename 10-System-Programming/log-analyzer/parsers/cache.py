@@ -0,0 +1,522 @@
+"""
+Columnar Parse Cache
+Cache su disco dei log già parsati, in formato colonnare
+
+Educational - System Programming Techniques:
+- Identità di un file tramite (st_dev, st_ino, st_size, st_mtime_ns)
+- Layout colonnare con array tipizzati (module array)
+- Dictionary encoding delle stringhe ripetute
+- mmap + memoryview.cast per leggere le colonne senza copie
+- Scrittura atomica (file temporaneo + os.replace)
+- Parsing incrementale della sola coda di un file in append
+
+Layout del file cache:
+    MAGIC | colonna 1 | colonna 2 | ... | header JSON | footer
+
+Il footer (ultimi 16 byte) contiene offset e lunghezza dell'header;
+l'header descrive identità del file sorgente, dizionari e posizione
+di ogni colonna.
+"""
+
+import os
+import json
+import mmap
+import struct
+import zlib
+import tempfile
+import logging
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+from .levels import LOG_LEVELS
+from .entry import LogEntry
+
+logger = logging.getLogger(__name__)
+
+
+class LogCache:
+    """
+    Cache colonnare dei campi parsati, salvata accanto al file di log
+
+    Colonne memorizzate:
+    - timestamp: epoch in microsecondi (int64)
+    - status, size: interi
+    - ip, method, path, level: indici in un dizionario di stringhe
+    - message: stringhe a lunghezza variabile (solo formato custom;
+      per apache/nginx viene ricostruito da method, path e status)
+
+    Le entry lette dalla cache contengono solo questi campi.
+    """
+
+    SUFFIX = '.lacache'
+    MAGIC = b'LACACHE1'
+    VERSION = 1
+    FOOTER = struct.Struct('<QQ')
+
+    # Righe accumulate in memoria prima di scrivere su file temporaneo
+    FLUSH_ROWS = 65536
+
+    # Byte prima della fine dei dati cachati usati per verificare un append
+    FINGERPRINT_BYTES = 4096
+
+    EPOCH = datetime(1970, 1, 1)
+    MISSING_TS = -(2 ** 63)
+
+    INT_COLUMNS = {'timestamp': 'q', 'status': 'i', 'size': 'q'}
+    DICT_COLUMNS = ('ip', 'method', 'path', 'level')
+
+    def __init__(self, filepath: str, cache_path: Optional[str] = None):
+        """
+        Inizializza la cache per un file di log
+
+        Args:
+            filepath: Percorso del file di log sorgente
+            cache_path: Percorso del file cache (default: filepath + SUFFIX)
+        """
+        self.filepath = filepath
+        self.cache_path = cache_path or filepath + self.SUFFIX
+        self.header: Optional[Dict[str, Any]] = None
+        self.state = 'miss'
+
+    @property
+    def log_format(self) -> Optional[str]:
+        """Formato del log registrato nella cache (se valida)"""
+        return self.header['format'] if self.header else None
+
+    def load(self) -> bool:
+        """
+        Legge l'header della cache e lo confronta con il file sorgente
+
+        Imposta self.state a:
+        - 'hit': file invariato, tutte le righe sono in cache
+        - 'append': stesso file con nuovi dati in coda
+        - 'miss': cache assente, corrotta o non più valida
+
+        Returns:
+            True se la cache è utilizzabile (hit o append)
+        """
+        self.header = None
+        self.state = 'miss'
+
+        try:
+            header = self._read_header()
+        except (OSError, ValueError, struct.error) as e:
+            logger.debug(f"Cache non utilizzabile {self.cache_path}: {e}")
+            return False
+
+        if header is None or header.get('version') != self.VERSION:
+            return False
+
+        st = os.stat(self.filepath)
+        source = header['source']
+        if (st.st_dev, st.st_ino) != (source['dev'], source['ino']):
+            logger.info("Cache non valida: file sorgente sostituito")
+            return False
+
+        if st.st_size == source['size'] and st.st_mtime_ns == source['mtime_ns']:
+            self.state = 'hit'
+        elif st.st_size >= source['size'] and self._fingerprint(source['size']) == source['fingerprint']:
+            self.state = 'append'
+        else:
+            logger.info("Cache non valida: file sorgente modificato")
+            return False
+
+        self.header = header
+        logger.info(f"Cache {self.state}: {header['rows']} righe in {self.cache_path}")
+        return True
+
+    def iter_file(self, parser, log_format: str,
+                  parse_rows: Optional[Callable[[int], Iterator[Tuple[Optional[tuple], Optional[int]]]]] = None
+                  ) -> Iterator[LogEntry]:
+        """
+        Restituisce le entries del file usando la cache quando possibile
+
+        - hit: legge solo le colonne memory-mapped, nessuna regex
+        - append: legge la cache, poi parsa solo la coda nuova
+        - miss: parsa tutto il file
+        In append e miss la cache viene riscritta al termine della lettura.
+
+        Con parse_rows (es. ParallelAnalyzer.iter_cache_rows) le righe non
+        in cache vengono parsate altrove, scritte nella cache e poi lette
+        dalla cache come in un hit.
+
+        Args:
+            parser: Parser da usare per le righe non in cache
+            log_format: Formato ('apache', 'nginx', 'custom')
+            parse_rows: Funzione offset -> (cache_row o None, fine riga)
+                        per le righe dall'offset in poi (opzionale)
+
+        Yields:
+            Entries parsate
+        """
+        if self.header and self.header['format'] != log_format:
+            self.header = None
+            self.state = 'miss'
+
+        if self.state == 'hit':
+            yield from self._iter_cached()
+            return
+
+        if parse_rows is not None:
+            self._fill(log_format, parse_rows)
+            # Dopo il fill: hit, oppure append se il file è cresciuto (o ha
+            # una riga incompleta in coda); miss se la scrittura è fallita
+            self.load()
+            yield from self.iter_file(parser, log_format)
+            return
+
+        writer = _CacheWriter(self, log_format, self.header)
+        start = self.header['source']['size'] if self.header else 0
+        try:
+            if self.header:
+                yield from self._iter_cached()
+
+            for entry, end in self._parse_from(parser, start):
+                if end is not None:
+                    writer.add(entry, end)
+                if entry is not None:
+                    yield entry
+
+            writer.commit()
+        finally:
+            writer.close()
+
+    def _fill(self, log_format: str, parse_rows) -> None:
+        """Scrive nella cache le righe prodotte da parse_rows"""
+        writer = _CacheWriter(self, log_format, self.header)
+        start = self.header['source']['size'] if self.header else 0
+        try:
+            add_row = writer.add_row
+            for row, end in parse_rows(start):
+                if end is not None:
+                    add_row(row, end)
+            writer.commit()
+        finally:
+            writer.close()
+
+    def _read_header(self) -> Optional[Dict[str, Any]]:
+        """Legge header e footer dal file cache"""
+        if not os.path.exists(self.cache_path):
+            return None
+
+        with open(self.cache_path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("magic non valido")
+            f.seek(-self.FOOTER.size, os.SEEK_END)
+            offset, length = self.FOOTER.unpack(f.read(self.FOOTER.size))
+            f.seek(offset)
+            return json.loads(f.read(length).decode('utf-8'))
+
+    def _fingerprint(self, size: int) -> int:
+        """CRC32 degli ultimi byte prima dell'offset indicato"""
+        start = max(0, size - self.FINGERPRINT_BYTES)
+        with open(self.filepath, 'rb') as f:
+            f.seek(start)
+            return zlib.crc32(f.read(size - start))
+
+    def _parse_from(self, parser, offset: int):
+        """
+        Parsa il file sorgente a partire da un offset in byte
+
+        Yields:
+            (entry, end) dove end è l'offset dopo la riga, oppure None
+            se la riga è incompleta (senza newline) e non va in cache
+        """
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                offset += len(raw)
+                parsed = parser.parse_line(raw.decode('utf-8', errors='ignore'))
+                complete = raw.endswith(b'\n')
+                if parsed:
+                    yield parsed, offset if complete else None
+                elif complete:
+                    # Riga scartata: fa comunque avanzare l'offset cachato
+                    yield None, offset
+
+    def _iter_cached(self) -> Iterator[LogEntry]:
+        """Ricostruisce le entries dalle colonne memory-mapped"""
+        header = self.header
+        rows = header['rows']
+        if not rows:
+            return
+
+        with open(self.cache_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buffer = memoryview(mm)
+            views = {}
+            try:
+                for name, (offset, typecode, count) in header['columns'].items():
+                    itemsize = array(typecode).itemsize
+                    views[name] = buffer[offset:offset + count * itemsize].cast(typecode)
+
+                yield from self._rows(views, rows)
+            finally:
+                for view in views.values():
+                    view.release()
+                buffer.release()
+
+    def _rows(self, views: Dict[str, memoryview], rows: int) -> Iterator[LogEntry]:
+        """Genera una entry per riga a partire dalle colonne"""
+        header = self.header
+        dicts = header['dicts']
+
+        timestamps = views['timestamp']
+        statuses = views['status']
+        sizes = views['size']
+        dict_columns = [(name, views[name], dicts[name]) for name in self.DICT_COLUMNS]
+        levels = views['level']
+        severities = [LOG_LEVELS.get(level, 0) for level in dicts['level']]
+        msg_offsets = views.get('message_offsets')
+        msg_data = views.get('message_data')
+
+        epoch = self.EPOCH
+        missing_ts = self.MISSING_TS
+        last_us = None
+        last_ts = None
+
+        # Le stringhe dei dizionari sono condivise da tutte le entry;
+        # per apache/nginx 'message' è ricostruito da LogEntry al bisogno
+        for i in range(rows):
+            entry = LogEntry()
+
+            us = timestamps[i]
+            if us != missing_ts:
+                if us != last_us:
+                    last_us, last_ts = us, epoch + timedelta(microseconds=us)
+                entry.timestamp_parsed = last_ts
+
+            status = statuses[i]
+            if status >= 0:
+                entry.status = status
+            size = sizes[i]
+            if size >= 0:
+                entry.size = size
+
+            for name, column, values in dict_columns:
+                index = column[i]
+                if index >= 0:
+                    setattr(entry, name, values[index])
+
+            index = levels[i]
+            if index >= 0:
+                entry.severity = severities[index]
+
+            if msg_offsets is not None:
+                start, end = msg_offsets[i], msg_offsets[i + 1]
+                if end > start:
+                    entry.message = bytes(msg_data[start:end]).decode('utf-8')
+
+            yield entry
+
+
+def cache_row(entry: Dict[str, Any], with_message: bool = False) -> tuple:
+    """
+    Riduce una entry ai campi della cache
+
+    La tupla è piccola e serializzabile: i worker paralleli la passano al
+    processo che scrive la cache al posto dell'intera entry.
+
+    Args:
+        entry: Entry parsata
+        with_message: Include il messaggio (solo formato custom)
+
+    Returns:
+        (timestamp µs, status, size, ip, method, path, level, message)
+    """
+    timestamp = entry.get('timestamp_parsed')
+    if timestamp is not None:
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.replace(tzinfo=None)
+        micros = (timestamp - LogCache.EPOCH) // timedelta(microseconds=1)
+    else:
+        micros = LogCache.MISSING_TS
+    status = entry.get('status')
+    size = entry.get('size')
+    return (micros,
+            status if isinstance(status, int) else -1,
+            size if isinstance(size, int) else -1,
+            entry.get('ip'), entry.get('method'), entry.get('path'), entry.get('level'),
+            entry.get('message') if with_message else None)
+
+
+class _CacheWriter:
+    """
+    Scrittore incrementale del file cache
+
+    Le colonne vengono accumulate in array e scaricate periodicamente
+    su file temporanei, quindi la memoria resta limitata ai dizionari.
+    """
+
+    def __init__(self, cache: LogCache, log_format: str, previous: Optional[Dict[str, Any]]):
+        self.cache = cache
+        self.log_format = log_format
+        self.previous = previous
+        self.rows = 0
+        self.end = 0
+        self.enabled = True
+
+        self.typecodes = dict(LogCache.INT_COLUMNS)
+        for name in LogCache.DICT_COLUMNS:
+            self.typecodes[name] = 'i'
+        if log_format == 'custom':
+            self.typecodes['message_offsets'] = 'q'
+            self.typecodes['message_data'] = 'B'
+
+        self.dicts: Dict[str, List[str]] = {name: [] for name in LogCache.DICT_COLUMNS}
+        self.message_size = 0
+
+        if previous:
+            self.dicts = {name: list(values) for name, values in previous['dicts'].items()}
+            self.rows = previous['rows']
+            self.end = previous['source']['size']
+            if 'message_offsets' in previous['columns']:
+                self.message_size = previous['columns']['message_data'][2]
+        self.indexes = {name: {value: i for i, value in enumerate(values)}
+                        for name, values in self.dicts.items()}
+
+        self.buffers = {name: array(code) for name, code in self.typecodes.items()}
+        self.spills = {}
+        try:
+            self.spills = {name: tempfile.TemporaryFile() for name in self.typecodes}
+            if previous:
+                self._copy_previous()
+            elif 'message_offsets' in self.buffers:
+                self.buffers['message_offsets'].append(0)
+        except OSError as e:
+            logger.warning(f"Impossibile preparare la cache: {e}")
+            self.enabled = False
+
+    def _copy_previous(self):
+        """Copia le colonne della cache precedente (modalità append)"""
+        with open(self.cache.cache_path, 'rb') as f:
+            for name, (offset, typecode, count) in self.previous['columns'].items():
+                remaining = count * array(typecode).itemsize
+                f.seek(offset)
+                while remaining:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        raise OSError("cache troncata")
+                    self.spills[name].write(chunk)
+                    remaining -= len(chunk)
+
+    def add(self, entry: Optional[Dict[str, Any]], end: int):
+        """
+        Aggiunge una riga alle colonne
+
+        Args:
+            entry: Entry parsata (None per righe scartate dal parser)
+            end: Offset nel file sorgente dopo questa riga
+        """
+        if entry is None:
+            self.add_row(None, end)
+        else:
+            self.add_row(cache_row(entry, 'message_offsets' in self.buffers), end)
+
+    def add_row(self, row: Optional[tuple], end: int):
+        """
+        Aggiunge una riga già ridotta alle colonne della cache
+
+        Args:
+            row: Tupla di cache_row() (None per righe scartate dal parser)
+            end: Offset nel file sorgente dopo questa riga
+        """
+        if not self.enabled:
+            return
+        self.end = end
+        if row is None:
+            return
+
+        buffers = self.buffers
+        timestamp, status, size = row[0], row[1], row[2]
+        buffers['timestamp'].append(timestamp)
+        buffers['status'].append(status)
+        buffers['size'].append(size)
+
+        for name, value in zip(LogCache.DICT_COLUMNS, row[3:7]):
+            if value is None:
+                buffers[name].append(-1)
+                continue
+            index = self.indexes[name].get(value)
+            if index is None:
+                index = len(self.dicts[name])
+                self.dicts[name].append(value)
+                self.indexes[name][value] = index
+            buffers[name].append(index)
+
+        if 'message_offsets' in buffers:
+            message = (row[7] or '').encode('utf-8')
+            buffers['message_data'].frombytes(message)
+            self.message_size += len(message)
+            buffers['message_offsets'].append(self.message_size)
+
+        self.rows += 1
+        if len(buffers['timestamp']) >= LogCache.FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        """Scarica i buffer in memoria sui file temporanei"""
+        for name, buffer in self.buffers.items():
+            buffer.tofile(self.spills[name])
+            del buffer[:]
+
+    def commit(self):
+        """Scrive il file cache finale in modo atomico"""
+        if not self.enabled:
+            return
+
+        try:
+            st = os.stat(self.cache.filepath)
+            self._flush()
+
+            directory = os.path.dirname(os.path.abspath(self.cache.cache_path))
+            fd, tmp_path = tempfile.mkstemp(prefix='.lacache-', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    out.write(LogCache.MAGIC)
+                    columns = {}
+                    for name, code in self.typecodes.items():
+                        # Allinea ogni colonna a 8 byte per memoryview.cast
+                        out.write(b'\0' * (-out.tell() % 8))
+                        spill = self.spills[name]
+                        nbytes = spill.tell()
+                        columns[name] = [out.tell(), code, nbytes // array(code).itemsize]
+                        spill.seek(0)
+                        while True:
+                            chunk = spill.read(1 << 20)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+
+                    header = {
+                        'version': LogCache.VERSION,
+                        'format': self.log_format,
+                        'rows': self.rows,
+                        'source': {
+                            'dev': st.st_dev,
+                            'ino': st.st_ino,
+                            'size': self.end,
+                            'mtime_ns': st.st_mtime_ns if self.end == st.st_size else 0,
+                            'fingerprint': self.cache._fingerprint(self.end),
+                        },
+                        'columns': columns,
+                        'dicts': self.dicts,
+                    }
+                    data = json.dumps(header, separators=(',', ':')).encode('utf-8')
+                    offset = out.tell()
+                    out.write(data)
+                    out.write(LogCache.FOOTER.pack(offset, len(data)))
+                os.replace(tmp_path, self.cache.cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+            logger.info(f"Cache scritta: {self.rows} righe in {self.cache.cache_path}")
+        except OSError as e:
+            logger.warning(f"Impossibile scrivere la cache {self.cache.cache_path}: {e}")
+
+    def close(self):
+        """Chiude i file temporanei"""
+        for spill in self.spills.values():
+            spill.close()
@@ -7,14 +7,23 @@ Educational - Log Parser Techniques:
 - Config-driven parsing
 - Gestione di molteplici formati
 - Configurazione da YAML
+- Entry a slot con stringhe ripetute condivise (interning)
 """
 
 import re
 from datetime import datetime
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Iterator
 import logging
 import yaml
 
+try:
+    from .levels import LOG_LEVELS
+    from .entry import LogEntry, StringPool
+except ImportError:
+    # Esecuzione diretta come script (python parsers/custom.py)
+    from levels import LOG_LEVELS
+    from entry import LogEntry, StringPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,6 +62,9 @@ class CustomLogParser:
         ),
     }
 
+    # Campi a bassa cardinalità condivisi tra le entry (interning)
+    INTERNED_FIELDS = frozenset(('level', 'module', 'logger', 'thread'))
+
     TIMESTAMP_FORMATS = [
         '%Y-%m-%d %H:%M:%S',
         '%Y-%m-%d %H:%M:%S.%f',
@@ -76,6 +88,7 @@ class CustomLogParser:
         """
         self.patterns = {}
         self.pattern_names = []
+        self.strings = StringPool()
 
         # Carica formati predefiniti
         for name, pattern in self.DEFAULT_FORMATS.items():
@@ -124,7 +137,7 @@ class CustomLogParser:
             logger.error(f"Errore lettura config {config_path}: {e}")
             raise
 
-    def parse_line(self, line: str, pattern_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def parse_line(self, line: str, pattern_name: Optional[str] = None) -> Optional[LogEntry]:
         """
         Parsa una riga di log
 
@@ -135,7 +148,7 @@ class CustomLogParser:
             pattern_name: Nome pattern specifico (opzionale)
 
         Returns:
-            Dict con campi parsati o None
+            LogEntry con campi parsati o None
         """
         if not line or not line.strip():
             return None
@@ -154,7 +167,7 @@ class CustomLogParser:
         logger.debug(f"Nessun pattern match per: {line[:100]}...")
         return None
 
-    def _parse_with_pattern(self, line: str, pattern: re.Pattern) -> Optional[Dict[str, Any]]:
+    def _parse_with_pattern(self, line: str, pattern: re.Pattern) -> Optional[LogEntry]:
         """
         Parsa con uno specifico pattern
 
@@ -163,7 +176,7 @@ class CustomLogParser:
             pattern: Pattern regex
 
         Returns:
-            Dict o None
+            LogEntry o None
         """
         match = pattern.match(line.strip())
         if not match:
@@ -171,18 +184,27 @@ class CustomLogParser:
 
         data = match.groupdict()
 
+        strings = self.strings
+        strings.trim()
+        intern = strings.intern
+
+        entry = LogEntry()
+        for key, value in data.items():
+            if key in self.INTERNED_FIELDS and value is not None:
+                value = intern(value, value)
+            entry[key] = value
+
         # Parsing timestamp se presente
         if 'timestamp' in data:
-            data['timestamp_parsed'] = self._parse_timestamp(data['timestamp'])
+            entry.timestamp_parsed = self._parse_timestamp(data['timestamp'])
 
-        # Normalizza livello
+        # Normalizza livello (stringa maiuscola + severità numerica)
         if 'level' in data:
-            data['level'] = data['level'].upper()
-
-        # Aggiungi raw line
-        data['_raw_line'] = line.strip()
+            level = data['level'].upper()
+            entry.level = intern(level, level)
+            entry.severity = LOG_LEVELS.get(level, 0)
 
-        return data
+        return entry
 
     def _parse_timestamp(self, timestamp_str: str) -> Optional[datetime]:
         """
@@ -207,7 +229,8 @@ class CustomLogParser:
         return None
 
     def parse_file(self, filepath: str, encoding: str = 'utf-8',
-                   pattern_name: Optional[str] = None) -> List[Dict[str, Any]]:
+                   pattern_name: Optional[str] = None,
+                   keep_raw: bool = False) -> List[LogEntry]:
         """
         Parsa un intero file
 
@@ -215,19 +238,39 @@ class CustomLogParser:
             filepath: Percorso file
             encoding: Encoding file
             pattern_name: Pattern specifico (opzionale)
+            keep_raw: Se True conserva la riga originale in '_raw_line'
 
         Returns:
             Lista entry parsate
         """
-        entries = []
+        entries = list(self.iter_file(filepath, encoding, pattern_name, keep_raw))
+        logger.info(f"Parsing completato: {len(entries)} entry")
+        return entries
+
+    def iter_file(self, filepath: str, encoding: str = 'utf-8',
+                  pattern_name: Optional[str] = None,
+                  keep_raw: bool = False) -> Iterator[LogEntry]:
+        """
+        Parsa un file in streaming (una entry alla volta)
 
+        Args:
+            filepath: Percorso file
+            encoding: Encoding file
+            pattern_name: Pattern specifico (opzionale)
+            keep_raw: Se True conserva la riga originale in '_raw_line' (opt-in)
+
+        Yields:
+            Entry parsate una alla volta
+        """
         try:
             with open(filepath, 'r', encoding=encoding, errors='ignore') as f:
                 for line_num, line in enumerate(f, 1):
                     parsed = self.parse_line(line, pattern_name)
                     if parsed:
-                        parsed['_line_number'] = line_num
-                        entries.append(parsed)
+                        parsed._line_number = line_num
+                        if keep_raw:
+                            parsed._raw_line = line.strip()
+                        yield parsed
 
                     if line_num % 10000 == 0:
                         logger.info(f"Parsate {line_num} righe...")
@@ -236,9 +279,6 @@ class CustomLogParser:
             logger.error(f"Errore lettura file {filepath}: {e}")
             raise
 
-        logger.info(f"Parsing completato: {len(entries)} entry")
-        return entries
-
     def detect_format(self, sample_lines: List[str]) -> str:
         """
         Rileva il formato automaticamente da sample lines
@@ -0,0 +1,206 @@
+"""
+Log Entry
+Record compatto per le entry parsate, compatibile con l'API dei dict
+
+Educational - Memory Optimization Techniques:
+- __slots__: niente __dict__ per istanza, i campi sono puntatori fissi
+- String interning: i valori ripetuti (metodo, user agent, IP, ...)
+  sono condivisi tra le entry invece di essere copiati per riga
+- Campi derivati calcolati al bisogno (message) invece che memorizzati
+- Riga originale conservata solo su richiesta (keep_raw)
+
+Una entry a dict con ~15 chiavi occupa diverse centinaia di byte più le
+stringhe; un LogEntry occupa un oggetto a dimensione fissa e condivide
+le stringhe con le altre entry.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class LogEntry:
+    """
+    Entry di log con campi a slot e interfaccia compatibile con dict
+
+    Supporta get(), [], 'in', keys(), items() e to_dict(), quindi filtri,
+    statistiche ed estrattori funzionano senza modifiche. I campi non
+    previsti (es. gruppi di pattern custom) finiscono nel dict 'extra',
+    creato solo se serve. 'message' per le entry HTTP, se non impostato,
+    viene ricostruito da method, path e status quando richiesto.
+    """
+
+    FIELDS = (
+        # Campi HTTP (Apache / Nginx)
+        'ip', 'identity', 'userid', 'timestamp', 'method', 'path', 'protocol',
+        'status', 'size', 'referer', 'user_agent', 'x_forwarded_for', 'request_time',
+        # Campi comuni
+        'timestamp_parsed', 'level', 'severity', 'message',
+        # Campi dei log applicativi
+        'module', 'logger', 'thread',
+        # Metadati del parsing
+        '_line_number', '_raw_line', '_pattern_used',
+    )
+
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        """
+        Crea una entry, opzionalmente dai campi di un dict
+
+        Args:
+            data: Campi iniziali (chiavi qualsiasi)
+        """
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LogEntry':
+        """Crea una entry dai campi di un dict"""
+        return cls(data)
+
+    def _derived_message(self) -> Optional[str]:
+        """Messaggio delle entry HTTP, ricostruito al bisogno"""
+        method = getattr(self, 'method', None)
+        path = getattr(self, 'path', None)
+        status = getattr(self, 'status', None)
+        if method is None or path is None or status is None:
+            return None
+        return f"{method} {path} - {status}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Valore di un campo o default se assente (come dict.get)"""
+        if key in _FIELD_SET:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if key == 'message':
+                message = self._derived_message()
+                if message is not None:
+                    return message
+            return default
+        extra = getattr(self, 'extra', None)
+        if extra:
+            return extra.get(key, default)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+            return
+        extra = getattr(self, 'extra', None)
+        if extra is None:
+            extra = self.extra = {}
+        extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _FIELD_SET:
+            if getattr(self, key, _MISSING) is _MISSING:
+                raise KeyError(key)
+            delattr(self, key)
+            return
+        extra = getattr(self, 'extra', None)
+        if not extra or key not in extra:
+            raise KeyError(key)
+        del extra[key]
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def pop(self, key: str, default: Any = _MISSING) -> Any:
+        """Rimuove un campo e ne restituisce il valore (come dict.pop)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        if key != 'message' or getattr(self, 'message', _MISSING) is not _MISSING:
+            del self[key]
+        return value
+
+    def keys(self) -> List[str]:
+        """Campi presenti, nell'ordine di FIELDS seguiti dagli extra"""
+        return [key for key, _ in self.items()]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.items()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Coppie (campo, valore), incluso il message derivato"""
+        result = []
+        for key in self.FIELDS:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                result.append((key, value))
+        extra = getattr(self, 'extra', None)
+        if extra:
+            result.extend(extra.items())
+        return result
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.items())
+
+    def __bool__(self) -> bool:
+        # 'if parsed:' non deve costruire items() per ogni riga
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copia della entry come dict"""
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LogEntry):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LogEntry({self.to_dict()!r})"
+
+
+_FIELD_SET = frozenset(LogEntry.FIELDS)
+
+
+class StringPool:
+    """
+    Pool di interning per i valori ripetuti delle entry
+
+    intern(value, value) restituisce l'istanza già vista uguale a
+    value (dict.setdefault, in C). Il pool ha una dimensione massima:
+    superata, viene svuotato, così valori unici (es. path con query
+    string durante uno scraping) non lo fanno crescere senza limite.
+    """
+
+    MAX_SIZE = 100000
+
+    def __init__(self, max_size: int = MAX_SIZE):
+        """
+        Inizializza il pool
+
+        Args:
+            max_size: Numero massimo di valori memorizzati
+        """
+        self.max_size = max_size
+        self._values: Dict[Any, Any] = {}
+        self.intern = self._values.setdefault
+
+    def trim(self) -> None:
+        """Svuota il pool se ha superato la dimensione massima"""
+        if len(self._values) > self.max_size:
+            self._values.clear()
+
+    def __len__(self) -> int:
+        return len(self._values)
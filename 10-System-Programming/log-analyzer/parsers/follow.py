@@ -0,0 +1,333 @@
+"""
+File Follower
+Segue uno o più file di log in tempo reale (tail -f) in modo event-driven
+
+Educational - System Programming Techniques:
+- inotify (Linux) via ctypes: il processo dorme finché il kernel non
+  segnala modifiche, zero CPU quando il log è fermo
+- select() con timeout su un file descriptor
+- Letture a blocchi grandi invece di readline() per riga
+- Rilevamento rotazione: cambio di inode (rename) e troncamento
+  (copytruncate, la dimensione torna sotto l'offset letto)
+- Fallback a polling sui sistemi senza inotify
+"""
+
+import os
+import glob
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Inotify:
+    """
+    Wrapper minimale di inotify(7) tramite ctypes
+
+    Si osservano le directory che contengono i file seguiti: un solo
+    watch copre modifiche, creazioni e rename dei file al suo interno.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    DIRECTORY_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+                      IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        """Crea l'istanza inotify (OSError se non disponibile)"""
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError(errno.ENOSYS, "libc non trovata")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify non disponibile")
+
+        self.fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fallita")
+        self.watches: Dict[int, str] = {}
+
+    @classmethod
+    def available(cls) -> bool:
+        """True se inotify è utilizzabile su questo sistema"""
+        try:
+            cls().close()
+            return True
+        except OSError:
+            return False
+
+    def add_watch(self, path: str, mask: int = DIRECTORY_MASK) -> int:
+        """
+        Aggiunge un watch su un path
+
+        Args:
+            path: File o directory
+            mask: Eventi da osservare
+
+        Returns:
+            Watch descriptor
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.watches[wd] = path
+        return wd
+
+    def read_events(self, timeout: float) -> Optional[List[Tuple[str, int, str]]]:
+        """
+        Attende eventi fino a timeout secondi
+
+        Args:
+            timeout: Attesa massima in secondi
+
+        Returns:
+            Lista di (directory, mask, nome file); None se la coda
+            del kernel è andata in overflow (stato da riallineare)
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        events = []
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                elif wd in self.watches:
+                    events.append((self.watches[wd], mask, os.fsdecode(name)))
+
+        return None if overflow else events
+
+    def close(self):
+        """Chiude il file descriptor inotify"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _TrackedFile:
+    """Stato di lettura di un singolo file seguito"""
+
+    def __init__(self, path: str, from_start: bool):
+        self.path = path
+        self.handle = None
+        self.inode = None
+        self.position = 0
+        self.partial = b''
+        self.open(from_start)
+
+    def open(self, from_start: bool) -> bool:
+        """Apre (o riapre) il file; False se non esiste"""
+        self.close()
+        try:
+            self.handle = open(self.path, 'rb')
+        except OSError:
+            return False
+        st = os.fstat(self.handle.fileno())
+        self.inode = (st.st_dev, st.st_ino)
+        self.position = 0 if from_start else st.st_size
+        self.handle.seek(self.position)
+        self.partial = b''
+        return True
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def read_lines(self, chunk_size: int) -> List[str]:
+        """
+        Legge tutti i dati nuovi e restituisce le righe complete
+
+        Gestisce rotazione per rename (nuovo inode sul path: finisce di
+        leggere il vecchio file, poi riapre dall'inizio) e copytruncate
+        (il file è più corto dell'offset letto: riparte da 0).
+        """
+        lines = []
+        if self.handle is None and not self.open(from_start=True):
+            return lines
+
+        if os.fstat(self.handle.fileno()).st_size < self.position:
+            logger.info(f"{self.path}: troncato (copytruncate), riparto dall'inizio")
+            self.handle.seek(0)
+            self.position = 0
+            self.partial = b''
+
+        lines.extend(self._drain(chunk_size))
+
+        try:
+            st = os.stat(self.path)
+            rotated = (st.st_dev, st.st_ino) != self.inode
+        except FileNotFoundError:
+            rotated = False  # rinominato, il nuovo file non esiste ancora
+
+        if rotated:
+            logger.info(f"{self.path}: rotazione rilevata, riapro il file")
+            if self.partial:
+                lines.append(self.partial.decode('utf-8', errors='ignore'))
+            if self.open(from_start=True):
+                lines.extend(self._drain(chunk_size))
+
+        return lines
+
+    def _drain(self, chunk_size: int) -> List[str]:
+        """Legge a blocchi fino a EOF e separa le righe complete"""
+        lines = []
+        while True:
+            chunk = self.handle.read(chunk_size)
+            if not chunk:
+                break
+            self.position += len(chunk)
+            data = self.partial + chunk
+            parts = data.split(b'\n')
+            self.partial = parts.pop()
+            lines.extend(part.decode('utf-8', errors='ignore') for part in parts)
+        return lines
+
+
+class FileFollower:
+    """
+    Segue più file (o pattern glob) e produce le nuove righe a batch
+
+    Usa inotify quando disponibile, altrimenti polling. I nuovi file
+    che corrispondono ai pattern vengono aggiunti automaticamente e
+    letti dall'inizio.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, patterns: List[str], from_start: bool = False,
+                 poll_interval: float = 1.0, use_inotify: bool = True):
+        """
+        Inizializza il follower
+
+        Args:
+            patterns: Percorsi di file o pattern glob
+            from_start: Se True legge i file esistenti dall'inizio
+            poll_interval: Intervallo di polling / ricontrollo in secondi
+            use_inotify: Se False forza il polling
+        """
+        self.patterns = [os.path.abspath(p) for p in patterns]
+        self.poll_interval = poll_interval
+        self.files: Dict[str, _TrackedFile] = {}
+        self.inotify: Optional[Inotify] = None
+
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except OSError as e:
+                logger.info(f"inotify non disponibile ({e}), uso polling")
+
+        self._scan(from_start)
+        for directory in {os.path.dirname(p) for p in self.patterns}:
+            self._watch(directory)
+
+        mode = 'inotify' if self.inotify else 'polling'
+        logger.info(f"FileFollower: {len(self.files)} file seguiti ({mode})")
+
+    def _watch(self, directory: str):
+        """Aggiunge un watch inotify sulla directory"""
+        if self.inotify is None:
+            return
+        try:
+            self.inotify.add_watch(directory)
+        except OSError as e:
+            logger.warning(f"Impossibile osservare {directory}: {e}")
+
+    def _matches(self, path: str) -> bool:
+        return any(fnmatch.fnmatch(path, pattern) for pattern in self.patterns)
+
+    def _scan(self, from_start: bool) -> List[str]:
+        """Aggiunge i file che corrispondono ai pattern e non sono ancora seguiti"""
+        added = []
+        for pattern in self.patterns:
+            for path in glob.glob(pattern) if glob.has_magic(pattern) else [pattern]:
+                if path not in self.files and os.path.isfile(path):
+                    self.files[path] = _TrackedFile(path, from_start)
+                    added.append(path)
+        return added
+
+    def _read(self, paths) -> List[Tuple[str, str]]:
+        """Legge le nuove righe dei file indicati"""
+        batch = []
+        for path in paths:
+            tracked = self.files.get(path)
+            if tracked is not None:
+                batch.extend((path, line) for line in tracked.read_lines(self.CHUNK_SIZE))
+        return batch
+
+    def _wait(self) -> set:
+        """Attende modifiche e restituisce i path da rileggere"""
+        if self.inotify is None:
+            time.sleep(self.poll_interval)
+            self._scan(from_start=True)
+            return set(self.files)
+
+        events = self.inotify.read_events(self.poll_interval)
+        if not events:
+            # Timeout o overflow: ricontrollo completo (stat, nessuna lettura se invariati)
+            self._scan(from_start=True)
+            return set(self.files)
+
+        dirty = set()
+        for directory, mask, name in events:
+            path = os.path.join(directory, name)
+            if path in self.files:
+                dirty.add(path)
+            elif mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO) and self._matches(path):
+                if os.path.isfile(path):
+                    self.files[path] = _TrackedFile(path, from_start=True)
+                    logger.info(f"Nuovo file seguito: {path}")
+                    dirty.add(path)
+        return dirty
+
+    def follow(self) -> Iterator[List[Tuple[str, str]]]:
+        """
+        Produce batch di nuove righe, bloccando finché non arrivano dati
+
+        Yields:
+            Liste di (path, riga) con tutte le righe disponibili
+        """
+        dirty = set(self.files)
+        while True:
+            batch = self._read(dirty)
+            if batch:
+                yield batch
+            dirty = self._wait()
+
+    def close(self):
+        """Chiude file e inotify"""
+        for tracked in self.files.values():
+            tracked.close()
+        if self.inotify is not None:
+            self.inotify.close()
@@ -0,0 +1,52 @@
+"""
+Log Levels
+Severità numerica dei livelli di log, condivisa da parser e filtri
+
+I parser aggiungono a ogni entry il campo 'severity' (int) calcolato
+una sola volta al parsing: i filtri confrontano interi invece di
+normalizzare stringhe a ogni controllo.
+"""
+
+from typing import Dict, Any, Optional
+
+# Livelli di log ordinati per severità
+LOG_LEVELS = {
+    'DEBUG': 0,
+    'INFO': 1,
+    'WARN': 2,
+    'WARNING': 2,
+    'ERROR': 3,
+    'CRITICAL': 4,
+    'FATAL': 4
+}
+
+
+def severity(level: Optional[str]) -> int:
+    """
+    Converte un livello testuale nella severità numerica
+
+    Args:
+        level: Livello (case insensitive)
+
+    Returns:
+        Severità (0 se livello sconosciuto)
+    """
+    if not level:
+        return 0
+    return LOG_LEVELS.get(level.upper(), 0)
+
+
+def entry_severity(entry: Dict[str, Any]) -> int:
+    """
+    Severità di una entry, usando il campo precalcolato se presente
+
+    Args:
+        entry: Entry parsata
+
+    Returns:
+        Severità numerica
+    """
+    value = entry.get('severity')
+    if value is None:
+        return severity(entry.get('level'))
+    return value
@@ -6,13 +6,24 @@ Educational - Log Parser Techniques:
 - Parsing di formati web server custom
 - Gestione di campi opzionali
 - Estrazione user agent
+- Entry a slot con stringhe ripetute condivise (interning)
 """
 
 import re
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Iterator
 import logging
 
+try:
+    from .levels import LOG_LEVELS
+    from .combined import TimestampCache, split_combined
+    from .entry import LogEntry, StringPool
+except ImportError:
+    # Esecuzione diretta come script (python parsers/nginx.py)
+    from levels import LOG_LEVELS
+    from combined import TimestampCache, split_combined
+    from entry import LogEntry, StringPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,10 +74,14 @@ class NginxLogParser:
             self.pattern = re.compile(pattern)
         else:
             self.pattern = self.DEFAULT_PATTERN
+        # Il tokenizer veloce vale solo per il formato di default
+        self.fast_path = not pattern
+        self.timestamps = TimestampCache()
+        self.strings = StringPool()
 
         logger.info("Nginx Log Parser inizializzato")
 
-    def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
+    def parse_line(self, line: str) -> Optional[LogEntry]:
         """
         Parsa una riga di log Nginx
 
@@ -74,53 +89,73 @@ class NginxLogParser:
             line: Riga di log da parsare
 
         Returns:
-            Dict con i campi parsati o None se la riga non matcha
+            LogEntry con i campi parsati o None se la riga non matcha
         """
-        if not line or not line.strip():
+        line = line.strip()
+        if not line:
             return None
 
         # Prova prima JSON se disponibile
-        if self.JSON_AVAILABLE and line.strip().startswith('{'):
+        if self.JSON_AVAILABLE and line.startswith('{'):
             return self._parse_json_line(line)
 
-        # Altrimenti regex
-        match = self.pattern.match(line.strip())
-        if not match:
-            logger.debug(f"Impossibile parsare la riga: {line[:100]}...")
-            return None
-
-        data = match.groupdict()
+        # Fast path senza regex per il formato canonico, altrimenti regex
+        data = split_combined(line, nginx=True) if self.fast_path else None
+        if data is None:
+            match = self.pattern.match(line)
+            if not match:
+                logger.debug(f"Impossibile parsare la riga: {line[:100]}...")
+                return None
+            data = match.groupdict()
+
+        strings = self.strings
+        strings.trim()
+        intern = strings.intern
+
+        entry = LogEntry()
+        if not self.fast_path:
+            # Pattern custom: eventuali gruppi aggiuntivi finiscono in 'extra'
+            for key, value in data.items():
+                entry[key] = value
+
+        entry.ip = intern(data['ip'], data['ip'])
+        entry.identity = intern(data['identity'], data['identity'])
+        entry.userid = intern(data['userid'], data['userid'])
+        entry.timestamp = intern(data['timestamp'], data['timestamp'])
+        entry.method = intern(data['method'], data['method'])
+        entry.path = intern(data['path'], data['path'])
+        entry.protocol = intern(data['protocol'], data['protocol'])
 
         # Parsing del timestamp
-        data['timestamp_parsed'] = self._parse_timestamp(data['timestamp'])
+        entry.timestamp_parsed = self._parse_timestamp(data['timestamp'])
 
         # Conversione tipi
-        data['status'] = int(data['status'])
-        data['size'] = int(data['size'])
+        status = int(data['status'])
+        entry.status = intern(status, status)
+        entry.size = int(data['size'])
 
         # Campi opzionali
-        if data.get('request_time'):
-            data['request_time'] = float(data['request_time'])
-        else:
-            data['request_time'] = None
+        request_time = data.get('request_time')
+        entry.request_time = float(request_time) if request_time else None
 
         # Livello di log
-        data['level'] = self._get_log_level(data['status'])
+        entry.level = self._get_log_level(status)
+        entry.severity = LOG_LEVELS[entry.level]
 
-        # Messaggio
-        data['message'] = f"{data['method']} {data['path']} - {data['status']}"
+        # 'message' non viene memorizzato: LogEntry lo ricostruisce
+        # da method, path e status quando richiesto
 
         # Valori di default
-        if not data.get('referer'):
-            data['referer'] = '-'
-        if not data.get('user_agent'):
-            data['user_agent'] = '-'
-        if not data.get('x_forwarded_for'):
-            data['x_forwarded_for'] = None
+        referer = data.get('referer') or '-'
+        user_agent = data.get('user_agent') or '-'
+        entry.referer = intern(referer, referer)
+        entry.user_agent = intern(user_agent, user_agent)
+        forwarded = data.get('x_forwarded_for') or None
+        entry.x_forwarded_for = intern(forwarded, forwarded) if forwarded else None
 
-        return data
+        return entry
 
-    def _parse_json_line(self, line: str) -> Optional[Dict[str, Any]]:
+    def _parse_json_line(self, line: str) -> Optional[LogEntry]:
         """
         Parsa una riga di log in formato JSON
 
@@ -128,7 +163,7 @@ class NginxLogParser:
             line: Riga JSON
 
         Returns:
-            Dict o None
+            LogEntry o None
         """
         try:
             import json
@@ -140,8 +175,9 @@ class NginxLogParser:
 
             if 'status' in data:
                 data['level'] = self._get_log_level(data['status'])
+                data['severity'] = LOG_LEVELS[data['level']]
 
-            return data
+            return LogEntry(data)
 
         except (json.JSONDecodeError, ValueError) as e:
             logger.warning(f"Errore parsing JSON: {e}")
@@ -158,9 +194,8 @@ class NginxLogParser:
             datetime oggetto o None
         """
         try:
-            # Rimuovi timezone
-            ts_clean = timestamp_str.split()[0]
-            return datetime.strptime(ts_clean, '%d/%b/%Y:%H:%M:%S')
+            # Cache per secondo; timezone ignorata come in precedenza
+            return self.timestamps.parse(timestamp_str)
         except (ValueError, IndexError) as e:
             logger.warning(f"Errore parsing timestamp {timestamp_str}: {e}")
             return None
@@ -198,27 +233,45 @@ class NginxLogParser:
         else:
             return 'INFO'
 
-    def parse_file(self, filepath: str, encoding: str = 'utf-8') -> list:
+    def parse_file(self, filepath: str, encoding: str = 'utf-8',
+                   keep_raw: bool = False) -> list:
         """
         Parsa un intero file di log Nginx
 
         Args:
             filepath: Percorso del file
             encoding: Encoding del file
+            keep_raw: Se True conserva la riga originale in '_raw_line'
 
         Returns:
             Lista di entry parsate
         """
-        entries = []
+        entries = list(self.iter_file(filepath, encoding, keep_raw))
+        logger.info(f"Parsing completato: {len(entries)} entry")
+        return entries
+
+    def iter_file(self, filepath: str, encoding: str = 'utf-8',
+                  keep_raw: bool = False) -> Iterator[LogEntry]:
+        """
+        Parsa un file di log Nginx in streaming (una entry alla volta)
 
+        Args:
+            filepath: Percorso del file
+            encoding: Encoding del file
+            keep_raw: Se True conserva la riga originale in '_raw_line' (opt-in)
+
+        Yields:
+            Entry parsate una alla volta
+        """
         try:
             with open(filepath, 'r', encoding=encoding, errors='ignore') as f:
                 for line_num, line in enumerate(f, 1):
                     parsed = self.parse_line(line)
                     if parsed:
                         parsed['_line_number'] = line_num
-                        parsed['_raw_line'] = line.strip()
-                        entries.append(parsed)
+                        if keep_raw:
+                            parsed['_raw_line'] = line.strip()
+                        yield parsed
 
                     if line_num % 10000 == 0:
                         logger.info(f"Parsate {line_num} righe...")
@@ -227,9 +280,6 @@ class NginxLogParser:
             logger.error(f"Errore lettura file {filepath}: {e}")
             raise
 
-        logger.info(f"Parsing completato: {len(entries)} entry")
-        return entries
-
     def get_user_agent_info(self, entry: Dict[str, Any]) -> Dict[str, str]:
         """
         Estrae informazioni dallo User Agent
@@ -0,0 +1,336 @@
+"""
+Time Index
+Ricerca per tempo dentro file di log ordinati, senza parsing completo
+
+Educational - System Programming Techniques:
+- seek() su offset arbitrari e riallineamento all'inizio di riga
+- Ricerca binaria sugli offset in byte del file
+- Indice sparso offset -> timestamp salvato su file sidecar
+- Lettura di un sotto-range di byte del file
+
+I log sono scritti in ordine temporale: per trovare l'inizio di una
+finestra temporale basta leggere una riga per ogni passo della ricerca
+binaria (O(log n) righe) invece di parsare tutto il file.
+"""
+
+import os
+import json
+import zlib
+import bisect
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def iter_range(parser, filepath: str, start: int = 0, end: Optional[int] = None,
+               encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+    """
+    Parsa le righe che iniziano nel range di byte [start, end)
+
+    Args:
+        parser: Parser con metodo parse_line
+        filepath: Percorso del file
+        start: Offset iniziale (deve essere un inizio di riga)
+        end: Offset finale escluso (None = fine file)
+        encoding: Encoding del file
+
+    Yields:
+        Entries parsate
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        position = start
+        for raw in f:
+            if end is not None and position >= end:
+                break
+            position += len(raw)
+            parsed = parser.parse_line(raw.decode(encoding, errors='ignore'))
+            if parsed:
+                yield parsed
+
+
+class TimeIndex:
+    """
+    Indice temporale di un file di log ordinato per tempo
+
+    find() esegue una ricerca binaria sugli offset del file leggendo una
+    sola riga per sonda. Ogni sonda viene memorizzata in un indice sparso
+    (offset -> timestamp); build() lo salva in <file>.laindex, che
+    restringe l'intervallo di ricerca nelle esecuzioni successive.
+    Con righe fuori ordine il range trovato può escludere righe della
+    finestra: va usato solo su file ordinati. build() verifica l'ordine
+    sui campioni e rifiuta i file non ordinati.
+
+    Il sidecar registra dev/ino, dimensione e un CRC delle righe campionate:
+    dopo una rotazione copytruncate o una riscrittura sul posto le righe
+    agli offset salvati cambiano e l'indice viene scartato.
+    """
+
+    SUFFIX = '.laindex'
+    VERSION = 2
+
+    # Sotto questa distanza la ricerca si ferma: il resto lo fa il filtro
+    SCAN_THRESHOLD = 64 * 1024
+
+    # Distanza dalla fine del file dell'ultimo campione di build()
+    TAIL_SAMPLE = 4096
+
+    # Righe lette al massimo per trovare un timestamp dopo un offset
+    MAX_PROBE_LINES = 1000
+
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, filepath: str, parser, index_path: Optional[str] = None,
+                 encoding: str = 'utf-8'):
+        """
+        Inizializza l'indice
+
+        Args:
+            filepath: Percorso del file di log
+            parser: Parser usato per leggere il timestamp delle righe
+            index_path: Percorso del sidecar (default: filepath + SUFFIX)
+            encoding: Encoding del file
+        """
+        self.filepath = filepath
+        self.parser = parser
+        self.index_path = index_path or filepath + self.SUFFIX
+        self.encoding = encoding
+        self.size = os.path.getsize(filepath)
+        self.offsets: List[int] = []
+        self.times: List[int] = []
+        self.dirty = False
+        self._load()
+
+    @classmethod
+    def exists(cls, filepath: str) -> bool:
+        """True se per il file esiste un sidecar valido creato con build()"""
+        return cls._read(filepath, filepath + cls.SUFFIX) is not None
+
+    @classmethod
+    def _read(cls, filepath: str, index_path: str) -> Optional[List[List[int]]]:
+        """
+        Legge il sidecar e lo confronta con il file
+
+        Returns:
+            Punti [offset, microsecondi], o None se il sidecar manca o
+            appartiene a un altro contenuto
+        """
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        st = os.stat(filepath)
+        source = data.get('source', {})
+        points = data.get('points', [])
+        if (data.get('version') != cls.VERSION
+                or (source.get('dev'), source.get('ino')) != (st.st_dev, st.st_ino)
+                or source.get('size', 0) > st.st_size
+                or source.get('fingerprint') != cls._fingerprint(filepath, [p[0] for p in points])):
+            logger.info("Indice temporale non valido (file ruotato o riscritto), ignorato")
+            return None
+        return points
+
+    @staticmethod
+    def _fingerprint(filepath: str, offsets: List[int]) -> int:
+        """CRC32 delle righe che iniziano agli offset indicati"""
+        crc = 0
+        with open(filepath, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                crc = zlib.crc32(f.readline(), crc)
+        return crc
+
+    def _load(self):
+        """Carica il sidecar se appartiene allo stesso contenuto"""
+        points = self._read(self.filepath, self.index_path)
+        if points is None:
+            return
+
+        # File solo cresciuto: i punti esistenti restano validi
+        for offset, micros in points:
+            self.offsets.append(offset)
+            self.times.append(micros)
+        logger.debug(f"Indice temporale caricato: {len(self.offsets)} punti")
+
+    def save(self):
+        """Salva il sidecar (solo se sono stati aggiunti punti)"""
+        if not self.dirty:
+            return
+
+        st = os.stat(self.filepath)
+        data = {
+            'version': self.VERSION,
+            'source': {
+                'dev': st.st_dev,
+                'ino': st.st_ino,
+                'size': st.st_size,
+                'fingerprint': self._fingerprint(self.filepath, self.offsets),
+            },
+            'points': list(zip(self.offsets, self.times)),
+        }
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Impossibile salvare l'indice {self.index_path}: {e}")
+
+    def _to_micros(self, timestamp: datetime) -> int:
+        """Converte un datetime (naive) in microsecondi dall'epoch"""
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.replace(tzinfo=None)
+        return (timestamp - self.EPOCH) // timedelta(microseconds=1)
+
+    def _remember(self, offset: int, micros: int):
+        """Aggiunge un punto all'indice sparso"""
+        position = bisect.bisect_left(self.offsets, offset)
+        if position < len(self.offsets) and self.offsets[position] == offset:
+            return
+        self.offsets.insert(position, offset)
+        self.times.insert(position, micros)
+        self.dirty = True
+
+    def timestamp_at(self, offset: int) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Timestamp della prima riga con data che inizia a partire da offset
+
+        Args:
+            offset: Offset in byte (anche a metà riga)
+
+        Returns:
+            (offset inizio riga, timestamp in microsecondi), (offset, None)
+            se nessuna delle MAX_PROBE_LINES righe ha un timestamp,
+            (None, None) a fine file
+        """
+        with open(self.filepath, 'rb') as f:
+            if offset > 0:
+                # Riallinea: salta il resto della riga in cui cade offset
+                f.seek(offset - 1)
+                f.readline()
+            position = f.tell()
+
+            for _ in range(self.MAX_PROBE_LINES):
+                raw = f.readline()
+                if not raw:
+                    break
+                parsed = self.parser.parse_line(raw.decode(self.encoding, errors='ignore'))
+                timestamp = parsed.get('timestamp_parsed') if parsed else None
+                if timestamp is not None:
+                    micros = self._to_micros(timestamp)
+                    self._remember(position, micros)
+                    return position, micros
+                position += len(raw)
+            else:
+                return position, None
+
+        return None, None
+
+    def find(self, target: datetime, after: bool = False) -> int:
+        """
+        Offset di inizio riga da cui leggere per raggiungere target
+
+        Con after=False restituisce un offset <= della prima riga con
+        timestamp >= target (inizio finestra). Con after=True un offset
+        >= della prima riga con timestamp > target (fine finestra).
+        L'offset è approssimato entro SCAN_THRESHOLD: le righe in più
+        vengono scartate dal filtro temporale.
+
+        Args:
+            target: Data/ora cercata
+            after: Cerca la fine invece dell'inizio della finestra
+
+        Returns:
+            Offset in byte
+        """
+        goal = self._to_micros(target)
+
+        def before_target(micros: int) -> bool:
+            return micros <= goal if after else micros < goal
+
+        # Restringe l'intervallo con i punti già noti dell'indice
+        lo, hi = 0, self.size
+        for offset, micros in zip(self.offsets, self.times):
+            if before_target(micros):
+                lo = max(lo, offset)
+            else:
+                hi = min(hi, offset)
+                break
+
+        probes = 0
+        while hi - lo > self.SCAN_THRESHOLD:
+            mid = (lo + hi) // 2
+            line_offset, micros = self.timestamp_at(mid)
+            probes += 1
+            if line_offset is not None and micros is None:
+                # Troppe righe senza timestamp: ci si ferma, range conservativo
+                break
+            if line_offset is None or line_offset >= hi:
+                hi = mid
+            elif before_target(micros):
+                lo = line_offset
+            else:
+                hi = line_offset
+
+        logger.debug(f"Ricerca {target}: {probes} sonde, range [{lo}, {hi}]")
+        return hi if after else lo
+
+    def byte_range(self, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Tuple[int, int]:
+        """
+        Range di byte che contiene la finestra temporale [start, end]
+
+        Le sonde restano in memoria: il sidecar viene scritto solo da build().
+
+        Args:
+            start: Inizio finestra (None = inizio file)
+            end: Fine finestra (None = fine file)
+
+        Returns:
+            (offset iniziale, offset finale escluso)
+        """
+        first = self.find(start) if start is not None else 0
+        last = self.find(end, after=True) if end is not None else self.size
+        logger.info(f"Finestra temporale: byte {first}-{last} di {self.size}")
+        return first, max(first, last)
+
+    def build(self, step: int = 1024 * 1024) -> int:
+        """
+        Costruisce l'indice sparso campionando una riga ogni 'step' byte
+
+        Il sidecar fa usare la ricerca binaria anche senza --sorted, quindi
+        viene salvato solo se i timestamp campionati non decrescono mai.
+
+        Args:
+            step: Distanza in byte tra i campioni
+
+        Returns:
+            Numero di punti nell'indice
+
+        Raises:
+            ValueError: Il file non è ordinato per tempo
+        """
+        for offset in range(0, self.size, step):
+            self.timestamp_at(offset)
+        # Anche la coda: le righe in ritardo finiscono di solito in fondo
+        self.timestamp_at(max(0, self.size - self.TAIL_SAMPLE))
+
+        for position in range(1, len(self.times)):
+            if self.times[position] < self.times[position - 1]:
+                # Un sidecar precedente non deve più attivare la ricerca
+                try:
+                    os.remove(self.index_path)
+                except FileNotFoundError:
+                    pass
+                raise ValueError(
+                    f"File non ordinato per tempo (il campione all'offset "
+                    f"{self.offsets[position]} è anteriore al precedente): indice non creato"
+                )
+        self.save()
+        logger.info(f"Indice temporale: {len(self.offsets)} punti in {self.index_path}")
+        return len(self.offsets)
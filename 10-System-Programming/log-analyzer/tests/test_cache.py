@@ -0,0 +1,145 @@
+"""
+Unit test per la cache colonnare
+Riempimento della cache con il parsing parallelo (--cache --workers N)
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from analyzers import ParallelAnalyzer
+from parsers import ApacheLogParser, CustomLogParser, LogCache
+
+BASE = datetime(2024, 3, 1, 8, 0, 0)
+
+
+def apache_lines(count, offset=0):
+    """Righe Apache, con qualche riga non valida"""
+    lines = []
+    for i in range(offset, offset + count):
+        if i % 97 == 0:
+            lines.append("riga non valida\n")
+            continue
+        ts = (BASE + timedelta(seconds=i)).strftime('%d/%b/%Y:%H:%M:%S')
+        lines.append(f'10.0.{i % 7}.{i % 250} - - [{ts} +0000] "GET /p{i % 50} HTTP/1.1" '
+                     f'{(200, 404, 500)[i % 3]} {i * 3} "-" "ua"\n')
+    return lines
+
+
+def custom_lines(count):
+    levels = ('INFO', 'WARN', 'ERROR')
+    return [f"{levels[i % 3]} {(BASE + timedelta(seconds=i)):%Y-%m-%d %H:%M:%S} "
+            f"Messaggio {i} àè\n" for i in range(count)]
+
+
+class TestParallelCacheFill(unittest.TestCase):
+    """La cache riempita dai worker è identica a quella sequenziale"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'access.log')
+        self.copy = os.path.join(self.tmpdir.name, 'copy.log')
+        # Range piccoli: più range che worker anche su file di test
+        patcher = mock.patch.object(ParallelAnalyzer, 'CACHE_CHUNK_BYTES', 8192)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, path, lines, mode='w'):
+        with open(path, mode, encoding='utf-8') as f:
+            f.writelines(lines)
+
+    def read(self, path, parser, log_format, workers=1):
+        """Legge il file con la cache; con workers > 1 il miss va ai worker"""
+        cache = LogCache(path)
+        cache.load()
+        parse_rows = None
+        if workers > 1:
+            parse_rows = lambda start: ParallelAnalyzer(log_format, workers).iter_cache_rows(path, start)
+        return [entry.to_dict() for entry in cache.iter_file(parser, log_format, parse_rows)]
+
+    def assert_same_cache(self, parser, log_format):
+        # Sequenziale: il miss parsa, il secondo giro legge la cache
+        self.read(self.path, parser, log_format)
+        expected = self.read(self.path, parser, log_format)
+
+        parallel = self.read(self.copy, parser, log_format, workers=2)
+        self.assertEqual(LogCache(self.copy).load(), True)
+        self.assertEqual(parallel, expected)
+        self.assertEqual(self.read(self.copy, parser, log_format), expected)
+
+    def test_miss_apache(self):
+        """Miss: stesse righe, stesse righe scartate, stessa fine dei dati"""
+        lines = apache_lines(3000)
+        self.write(self.path, lines)
+        shutil.copy(self.path, self.copy)
+        self.assert_same_cache(ApacheLogParser(), 'apache')
+
+        cache = LogCache(self.copy)
+        cache.load()
+        self.assertEqual(cache.state, 'hit')
+        self.assertEqual(cache.header['rows'], 3000 - len(range(0, 3000, 97)))
+        self.assertEqual(cache.header['source']['size'], os.path.getsize(self.copy))
+
+    def test_append_and_incomplete_tail(self):
+        """Append: solo la coda ai worker; la riga senza newline non va in cache"""
+        lines = apache_lines(3000)
+        for path in (self.path, self.copy):
+            self.write(path, lines[:1000])
+        self.read(self.path, ApacheLogParser(), 'apache')
+        self.read(self.copy, ApacheLogParser(), 'apache', workers=2)
+
+        tail = lines[1000:] + [lines[-1].rstrip('\n')]
+        for path in (self.path, self.copy):
+            self.write(path, tail, mode='a')
+        appended = self.read(self.path, ApacheLogParser(), 'apache')
+        parallel = self.read(self.copy, ApacheLogParser(), 'apache', workers=2)
+        # L'ultima riga incompleta è restituita ma non salvata
+        self.assertEqual(len(parallel), len(appended))
+        self.assertEqual(len(parallel), len([l for l in lines if 'valida' not in l]) + 1)
+        self.assertEqual(parallel[-1]['path'], appended[-1]['path'])
+        self.assertLess(LogCache(self.copy)._read_header()['source']['size'],
+                        os.path.getsize(self.copy))
+
+        # Il contenuto in cache coincide con quello del riempimento sequenziale
+        self.assertEqual(self.read(self.copy, ApacheLogParser(), 'apache'),
+                         self.read(self.path, ApacheLogParser(), 'apache'))
+
+    def test_custom_messages(self):
+        """Formato custom: i messaggi (non ASCII) passano dai worker alla cache"""
+        self.write(self.path, custom_lines(2000))
+        shutil.copy(self.path, self.copy)
+        self.assert_same_cache(CustomLogParser(), 'custom')
+
+    def test_cli_cache_with_workers(self):
+        """stats --cache --workers 2: stesso report, cache scritta"""
+        self.write(self.path, apache_lines(3000))
+
+        def report(argv):
+            out = io.StringIO()
+            with mock.patch.object(sys, 'argv', ['main.py'] + argv), redirect_stdout(out):
+                self.assertEqual(main.main(), 0)
+            return out.getvalue()
+
+        expected = report(['stats', self.path, '--format', 'apache'])
+        self.assertEqual(report(['stats', self.path, '--format', 'apache',
+                                 '--cache', '--workers', '2']), expected)
+        self.assertTrue(os.path.exists(self.path + LogCache.SUFFIX))
+        self.assertEqual(report(['stats', self.path, '--cache', '--workers', '2']), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit test per il tokenizer Combined Log Format
+split_combined deve restituire gli stessi campi delle regex o None
+"""
+
+import random
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from parsers import ApacheLogParser, NginxLogParser
+from parsers.combined import TimestampCache, split_combined
+
+CANONICAL = [
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET /index.html HTTP/1.1" '
+    '200 2326 "http://example.com/" "Mozilla/5.0 (X11; Linux x86_64)"',
+    '10.0.0.5 - frank [01/Jan/2024:00:00:00 +0100] "POST /api/login?x=1 HTTP/2.0" '
+    '401 0 "-" "curl/8.0"',
+    '127.0.0.1 ident user [31/Dec/1999:23:59:59 -0500] "DELETE /a/b HTTP/1.0" '
+    '500 17 "" ""',
+]
+
+NGINX_EXTRA = [
+    CANONICAL[0] + ' "203.0.113.7"',
+    CANONICAL[1] + ' "-" 0.125',
+    CANONICAL[2] + ' 12.5',
+]
+
+# Righe non canoniche: il fast path deve rinunciare o coincidere con la regex
+UNUSUAL = [
+    '192.168.1.1  - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000]  "GET / HTTP/1.1" 200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1"\t200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET /a b HTTP/1.1" 200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 - "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "u"a"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-"',
+    '192.168.1.x - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua"',
+    '::1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua"',
+    '192.168.1.1 - - [] "GET / HTTP/1.1" 200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "" 200 1 "-" "ua"',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua" 1',
+    '192.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua" "a" "b"',
+    '１92.168.1.1 - - [10/Oct/2023:13:55:36 +0000] "GET / HTTP/1.1" 200 1 "-" "ua"',
+]
+
+
+def regex_fields(line, nginx=False):
+    parser = NginxLogParser.DEFAULT_PATTERN if nginx else ApacheLogParser.COMBINED_PATTERN
+    match = parser.match(line)
+    return match.groupdict() if match else None
+
+
+class TestSplitCombined(unittest.TestCase):
+    """Test per split_combined"""
+
+    def test_canonical_lines_match_regex(self):
+        """Le righe canoniche producono gli stessi campi della regex"""
+        for line in CANONICAL:
+            self.assertIsNotNone(split_combined(line), line)
+            self.assertEqual(split_combined(line), regex_fields(line))
+            self.assertEqual(split_combined(line, nginx=True), regex_fields(line, nginx=True))
+
+    def test_nginx_optional_fields(self):
+        """x_forwarded_for e request_time solo con nginx=True"""
+        for line in NGINX_EXTRA:
+            self.assertIsNone(split_combined(line), line)
+            self.assertEqual(split_combined(line, nginx=True), regex_fields(line, nginx=True))
+
+    def test_unusual_lines_never_disagree(self):
+        """Una riga non canonica dà None oppure esattamente i campi della regex"""
+        for line in UNUSUAL:
+            for nginx in (False, True):
+                fields = split_combined(line, nginx=nginx)
+                if fields is not None:
+                    self.assertEqual(fields, regex_fields(line, nginx=nginx), line)
+
+    def test_mutated_lines_never_disagree(self):
+        """Mutazioni casuali di una riga valida non producono campi diversi"""
+        rng = random.Random(7)
+        alphabet = ' "[]-/.:\t0aZ'
+        base = CANONICAL[0]
+        for _ in range(3000):
+            chars = list(base)
+            for _ in range(rng.randint(1, 3)):
+                position = rng.randrange(len(chars))
+                action = rng.random()
+                if action < 0.4:
+                    chars[position] = rng.choice(alphabet)
+                elif action < 0.7:
+                    chars.insert(position, rng.choice(alphabet))
+                else:
+                    del chars[position]
+            line = ''.join(chars).strip()
+            for nginx in (False, True):
+                fields = split_combined(line, nginx=nginx)
+                if fields is not None:
+                    self.assertEqual(fields, regex_fields(line, nginx=nginx), line)
+
+    def test_parser_result_unchanged(self):
+        """Il parser Apache dà lo stesso risultato con e senza fast path"""
+        parser = ApacheLogParser()
+        for line in CANONICAL + UNUSUAL:
+            entry = parser.parse_line(line)
+            expected = regex_fields(line)
+            if expected is None:
+                self.assertIsNone(entry, line)
+            else:
+                self.assertEqual(entry['status'], int(expected['status']))
+                self.assertEqual(entry['path'], expected['path'])
+                self.assertEqual(entry['user_agent'], expected['user_agent'] or '-')
+
+
+class TestTimestampCache(unittest.TestCase):
+    """Test per TimestampCache"""
+
+    def test_matches_strptime(self):
+        """La conversione manuale coincide con strptime"""
+        cache = TimestampCache()
+        for value in ('10/Oct/2023:13:55:36 +0000', '01/Jan/2024:00:00:00 -0800',
+                      '29/Feb/2024:23:59:59 +0000'):
+            expected = datetime.strptime(value.split()[0], '%d/%b/%Y:%H:%M:%S')
+            self.assertEqual(cache.parse(value), expected)
+            self.assertIs(cache.parse(value), cache.parse(value))
+
+    def test_invalid_raises(self):
+        """I timestamp non validi sollevano come strptime"""
+        cache = TimestampCache()
+        for value in ('31/Feb/2024:00:00:00 +0000', '10/Foo/2023:13:55:36', '1/Oct/2023:1:2:3x'):
+            with self.assertRaises(ValueError):
+                cache.parse(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
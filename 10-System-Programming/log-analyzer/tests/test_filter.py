@@ -0,0 +1,97 @@
+"""
+Unit test per LogFilter
+Predicato fuso generato da compile() contro i filtri del baseline
+"""
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from analyzers import LogFilter
+from parsers import ApacheLogParser, LogEntry
+
+ENTRIES = [
+    {'level': 'INFO', 'severity': 1, 'timestamp_parsed': datetime(2024, 1, 15, 10, 30),
+     'ip': '192.168.1.1', 'status': 200, 'path': '/index.html', 'method': 'GET',
+     'message': 'Request successful'},
+    {'level': 'ERROR', 'timestamp_parsed': datetime(2024, 1, 15, 10, 31),
+     'ip': '192.168.1.2', 'status': 500, 'path': '/api/users', 'method': 'post',
+     'message': 'Database connection FAILED'},
+    {'level': 'wArN', 'timestamp_parsed': datetime(2024, 1, 15, 10, 32),
+     'ip': '10.0.0.1', 'status': 404, 'path': '/missing', 'method': 'Get',
+     'message': 'File not found'},
+    {'level': 'Critical', 'ip': '10.0.0.2', 'status': 503, 'path': '/api/health',
+     'message': 'Upstream down'},
+]
+
+
+def ips(log_filter):
+    return [entry['ip'] for entry in log_filter.apply(ENTRIES)]
+
+
+class TestLogFilter(unittest.TestCase):
+    """Test per il predicato compilato di LogFilter"""
+
+    def test_level_case_insensitive(self):
+        """by_level confronta senza distinguere maiuscole/minuscole"""
+        self.assertEqual(ips(LogFilter().by_level('warn')), ['10.0.0.1'])
+        self.assertEqual(ips(LogFilter().by_level('WARN')), ['10.0.0.1'])
+        self.assertEqual(ips(LogFilter().by_level('critical')), ['10.0.0.2'])
+
+    def test_method_case_insensitive(self):
+        """by_method accetta metodi scritti in qualsiasi modo"""
+        self.assertEqual(ips(LogFilter().by_method('get')), ['192.168.1.1', '10.0.0.1'])
+        self.assertEqual(ips(LogFilter().by_method('POST')), ['192.168.1.2'])
+
+    def test_min_level_with_and_without_severity(self):
+        """by_min_level usa 'severity' se presente, altrimenti 'level'"""
+        self.assertEqual(ips(LogFilter().by_min_level('WARN')),
+                         ['192.168.1.2', '10.0.0.1', '10.0.0.2'])
+        self.assertEqual(ips(LogFilter().by_min_level('error')),
+                         ['192.168.1.2', '10.0.0.2'])
+
+    def test_time_range_and_walrus_locals(self):
+        """Due filtri con variabili locali non si sovrascrivono"""
+        log_filter = (LogFilter()
+                      .by_time_range(datetime(2024, 1, 15, 10, 31), datetime(2024, 1, 15, 11, 0))
+                      .by_time_range(datetime(2024, 1, 15, 10, 0), datetime(2024, 1, 15, 10, 31))
+                      .by_min_level('INFO'))
+        self.assertEqual(ips(log_filter), ['192.168.1.2'])
+        self.assertEqual(log_filter.time_bounds,
+                         (datetime(2024, 1, 15, 10, 31), datetime(2024, 1, 15, 10, 31)))
+
+    def test_combined_filters_match_baseline(self):
+        """Il predicato fuso equivale all'AND dei singoli filtri"""
+        log_filter = (LogFilter()
+                      .by_status_range(400, 599)
+                      .by_path('/api/*')
+                      .by_message_contains('failed')
+                      .by_ip_pattern('192.168.'))
+        self.assertEqual(ips(log_filter), ['192.168.1.2'])
+        for predicate in log_filter.filters:
+            self.assertTrue(predicate(ENTRIES[1]))
+
+    def test_custom_predicate_and_recompile(self):
+        """I predicati custom vengono valutati e compile() si aggiorna"""
+        log_filter = LogFilter().by_min_level('DEBUG')
+        first = log_filter.compile()
+        log_filter.by_custom(lambda entry: entry['status'] >= 500)
+        self.assertIsNot(log_filter.compile(), first)
+        self.assertEqual(ips(log_filter), ['192.168.1.2', '10.0.0.2'])
+
+    def test_log_entry(self):
+        """Il predicato funziona anche con i LogEntry dei parser"""
+        line = ('10.0.0.9 - - [10/Oct/2023:13:55:36 +0000] "get /api/x HTTP/1.1" '
+                '404 0 "-" "ua"')
+        entry = ApacheLogParser().parse_line(line)
+        self.assertIsInstance(entry, LogEntry)
+        log_filter = LogFilter().by_method('GET').by_level('warn').by_status_code(404)
+        self.assertTrue(log_filter.matches(entry))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Unit test per StatsAccumulator
+Confronto dell'accumulatore streaming con i conteggi list-based
+"""
+
+import random
+import sys
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from analyzers import LogStatistics, StatsAccumulator
+
+ERROR_LEVELS = ('ERROR', 'CRITICAL', 'FATAL')
+
+
+def make_entries(count=2000, seed=42):
+    """Entries miste: livelli in minuscolo, campi mancanti, status e size"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 15, 22, 0)
+    entries = []
+    for i in range(count):
+        entry = {
+            'level': rng.choice(['info', 'INFO', 'Warn', 'error', 'CRITICAL']),
+            'message': rng.choice(['Disk full', 'Timeout', 'x' * 150, '']),
+            'ip': f"10.0.{rng.randint(0, 3)}.{rng.randint(1, 50)}",
+            'path': rng.choice(['/', '/api', '/login', '/static/app.js']),
+            'method': rng.choice(['get', 'POST', 'Put']),
+            'status': rng.choice([200, 200, 301, 404, 500]),
+            'size': rng.choice([0, 512, 1024, None, '-']),
+        }
+        if i % 7:
+            entry['timestamp_parsed'] = start + timedelta(minutes=rng.randint(0, 600))
+        if i % 11 == 0:
+            del entry['level']
+            del entry['ip']
+        entries.append(entry)
+    return entries
+
+
+def reference_stats(entries):
+    """Conteggi calcolati come nella versione list-based originale"""
+    levels, hours, days, error_hours = Counter(), Counter(), Counter(), Counter()
+    messages, ips, paths, methods, statuses = Counter(), Counter(), Counter(), Counter(), Counter()
+    errors, sizes, timestamps = 0, [], []
+    for entry in entries:
+        level = entry.get('level', 'UNKNOWN').upper()
+        levels[level] += 1
+        timestamp = entry.get('timestamp_parsed')
+        if timestamp:
+            timestamps.append(timestamp)
+            hours[timestamp.strftime('%Y-%m-%d %H:00')] += 1
+            days[timestamp.strftime('%Y-%m-%d')] += 1
+        if level in ERROR_LEVELS:
+            errors += 1
+            if timestamp:
+                error_hours[timestamp.strftime('%Y-%m-%d %H:00')] += 1
+            message = entry.get('message', '')
+            if message:
+                messages[message[:100] + '...' if len(message) > 100 else message] += 1
+        elif entry.get('status') and entry['status'] >= 400:
+            errors += 1
+        if entry.get('ip'):
+            ips[entry['ip']] += 1
+        if entry.get('path'):
+            paths[entry['path']] += 1
+        if entry.get('method'):
+            methods[entry['method'].upper()] += 1
+        if entry.get('status') is not None:
+            statuses[entry['status']] += 1
+        if isinstance(entry.get('size'), (int, float)):
+            sizes.append(entry['size'])
+    return {
+        'by_level': dict(levels), 'by_hour': dict(hours), 'by_day': dict(days),
+        'errors_by_hour': dict(error_hours), 'top_errors': dict(messages),
+        'top_ips': dict(ips), 'top_paths': dict(paths), 'http_methods': dict(methods),
+        'http_status_codes': dict(statuses), 'errors': errors,
+        'first': min(timestamps), 'last': max(timestamps),
+        'unique_ips': len(ips), 'total_size': sum(sizes), 'size_count': len(sizes),
+    }
+
+
+class TestStatsAccumulator(unittest.TestCase):
+    """Test per l'accumulatore single-pass"""
+
+    def setUp(self):
+        self.entries = make_entries()
+        self.expected = reference_stats(self.entries)
+
+    def assert_matches_reference(self, summary):
+        expected = self.expected
+        for key in ('by_level', 'by_hour', 'by_day', 'errors_by_hour',
+                    'http_methods', 'http_status_codes', 'unique_ips'):
+            self.assertEqual(summary[key], expected[key], key)
+        self.assertEqual(summary['total_entries'], len(self.entries))
+        self.assertEqual(summary['error_rate']['errors'], expected['errors'])
+        self.assertEqual(summary['time_range']['first_timestamp'], expected['first'])
+        self.assertEqual(summary['time_range']['last_timestamp'], expected['last'])
+        self.assertEqual(summary['avg_response_size']['total_size'], expected['total_size'])
+        self.assertEqual(summary['avg_response_size']['count'], expected['size_count'])
+
+    def test_streaming_matches_list_based(self):
+        """Un generator consumato una volta dà gli stessi conteggi della lista"""
+        accumulator = StatsAccumulator().consume(entry for entry in self.entries)
+        self.assert_matches_reference(accumulator.generate_summary())
+        self.assertEqual(dict(accumulator.top_ips(1000)), self.expected['top_ips'])
+        self.assertEqual(dict(accumulator.top_paths(1000)), self.expected['top_paths'])
+        self.assertEqual(dict(accumulator.top_errors(1000)), self.expected['top_errors'])
+
+    def test_log_statistics_facade(self):
+        """LogStatistics restituisce lo stesso riepilogo dell'accumulatore"""
+        summary = LogStatistics(self.entries).generate_summary()
+        self.assert_matches_reference(summary)
+        self.assertEqual(summary, StatsAccumulator().consume(self.entries).generate_summary())
+
+    def test_merge_equals_single_pass(self):
+        """Accumulatori parziali uniti equivalgono a un'unica passata"""
+        merged = StatsAccumulator()
+        for start in range(0, len(self.entries), 300):
+            merged.merge(StatsAccumulator().consume(self.entries[start:start + 300]))
+        self.assert_matches_reference(merged.generate_summary())
+        self.assertEqual(dict(merged.top_ips(1000)), self.expected['top_ips'])
+
+    def test_merge_mixed_modes_rejected(self):
+        """Non si possono unire accumulatori esatti e approssimati"""
+        with self.assertRaises(ValueError):
+            StatsAccumulator().merge(StatsAccumulator(approximate=True))
+
+    def test_empty(self):
+        """Senza entries le metriche restano ai valori neutri"""
+        summary = StatsAccumulator().consume([]).generate_summary()
+        self.assertEqual(summary['total_entries'], 0)
+        self.assertEqual(summary['error_rate'], {'error_rate': 0.0})
+        self.assertIsNone(summary['time_range']['first_timestamp'])
+
+    def test_approximate_within_bounds(self):
+        """In modalità approssimata i top-N e gli IP unici restano vicini"""
+        accumulator = StatsAccumulator(approximate=True).consume(self.entries)
+        top_path, count = accumulator.top_paths(1)[0]
+        exact = self.expected['top_paths']
+        self.assertEqual(top_path, max(exact, key=exact.get))
+        self.assertLessEqual(abs(count - exact[top_path]), len(self.entries) * 0.001 + 1)
+        unique = accumulator.unique_ips()
+        self.assertLess(abs(unique - self.expected['unique_ips']),
+                        self.expected['unique_ips'] * 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Unit test per l'indice temporale
+Ricerca binaria sugli offset e finestra temporale su log non ordinati
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import main
+from parsers import ApacheLogParser, TimeIndex, iter_range
+
+BASE = datetime(2023, 10, 10, 12, 0, 0)
+
+
+def apache_lines(count, offset=0):
+    """Righe Apache con un secondo tra una riga e la successiva"""
+    lines = []
+    for i in range(offset, offset + count):
+        ts = (BASE + timedelta(seconds=i)).strftime('%d/%b/%Y:%H:%M:%S')
+        lines.append(f'10.0.0.{i % 250} - - [{ts} +0000] "GET /p{i % 50} HTTP/1.1" '
+                     f'200 123 "-" "ua"\n')
+    return lines
+
+
+def count_entries(argv):
+    """Esegue la CLI e restituisce 'Totale Entries' del report"""
+    out = io.StringIO()
+    with mock.patch.object(sys, 'argv', ['main.py'] + argv), redirect_stdout(out):
+        main.main()
+    for line in out.getvalue().splitlines():
+        if 'Totale Entries' in line:
+            return int(line.split(':')[1].replace(',', ''))
+    raise AssertionError(out.getvalue())
+
+
+class TestTimeIndex(unittest.TestCase):
+    """Test per TimeIndex e per la finestra temporale della CLI"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'access.log')
+        self.parser = ApacheLogParser()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, lines):
+        with open(self.path, 'w') as f:
+            f.writelines(lines)
+
+    def test_byte_range_sorted(self):
+        """Su un file ordinato il range contiene tutta la finestra"""
+        self.write(apache_lines(5000))
+        start = BASE + timedelta(seconds=2000)
+        end = BASE + timedelta(seconds=2999)
+
+        with mock.patch.object(TimeIndex, 'SCAN_THRESHOLD', 1024):
+            first, last = TimeIndex(self.path, self.parser).byte_range(start, end)
+
+        self.assertLess(last - first, os.path.getsize(self.path) // 2)
+        entries = [e for e in iter_range(self.parser, self.path, first, last)
+                   if start <= e['timestamp_parsed'] <= end]
+        self.assertEqual(len(entries), 1000)
+
+    def test_byte_range_does_not_write_sidecar(self):
+        """Solo build() (comando index) scrive <file>.laindex"""
+        self.write(apache_lines(2000))
+        index = TimeIndex(self.path, self.parser)
+        index.byte_range(BASE + timedelta(seconds=100), None)
+        self.assertFalse(TimeIndex.exists(self.path))
+
+        index.build(step=4096)
+        self.assertTrue(TimeIndex.exists(self.path))
+
+    def test_unsorted_window_reads_whole_file(self):
+        """Senza --sorted le righe fuori ordine della finestra non si perdono"""
+        # File ruotati e concatenati: la seconda metà del giorno viene prima
+        lines = apache_lines(5000)
+        self.write(lines[2500:] + lines[:2500])
+        window = ['--start-time', (BASE + timedelta(seconds=2000)).isoformat(),
+                  '--end-time', (BASE + timedelta(seconds=2999)).isoformat()]
+
+        with mock.patch.object(TimeIndex, 'SCAN_THRESHOLD', 1024):
+            total = count_entries(['analyze', self.path, '--format', 'apache'] + window)
+            seeked = count_entries(['analyze', self.path, '--format', 'apache',
+                                    '--sorted'] + window)
+
+        self.assertEqual(total, 1000)
+        # Con --sorted su un file non ordinato la ricerca binaria perde righe
+        self.assertLess(seeked, 1000)
+        self.assertFalse(TimeIndex.exists(self.path))
+
+    def test_rewritten_file_discards_index(self):
+        """Dopo copytruncate e nuove righe oltre la vecchia dimensione l'indice è scartato"""
+        self.write(apache_lines(3000))
+        TimeIndex(self.path, self.parser).build(step=4096)
+        self.assertTrue(TimeIndex.exists(self.path))
+
+        # Stesso inode (truncate + scrittura sul posto), un giorno dopo
+        with open(self.path, 'r+') as f:
+            f.truncate(0)
+            f.writelines(apache_lines(8000, offset=86400))
+        self.assertFalse(TimeIndex.exists(self.path))
+        self.assertEqual(TimeIndex(self.path, self.parser).offsets, [])
+
+        window = ['--start-time', (BASE + timedelta(seconds=90000)).isoformat(),
+                  '--end-time', (BASE + timedelta(seconds=90999)).isoformat()]
+        self.assertEqual(count_entries(['analyze', self.path, '--format', 'apache'] + window),
+                         1000)
+
+    def test_grown_file_keeps_index(self):
+        """Un file cresciuto solo in coda mantiene i punti dell'indice"""
+        lines = apache_lines(4000)
+        self.write(lines[:3000])
+        points = TimeIndex(self.path, self.parser).build(step=4096)
+        with open(self.path, 'a') as f:
+            f.writelines(lines[3000:])
+        self.assertTrue(TimeIndex.exists(self.path))
+        self.assertEqual(len(TimeIndex(self.path, self.parser).offsets), points)
+
+    def test_unsorted_file_not_indexed(self):
+        """index rifiuta un file non ordinato e analyze legge tutto il file"""
+        # Indice creato quando il file era ordinato (oltre 1 MiB: più
+        # campioni anche con lo step di default del comando index)
+        lines = apache_lines(15000)
+        self.write(lines[:1000] + lines[2000:])
+        TimeIndex(self.path, self.parser).build(step=4096)
+        self.assertTrue(TimeIndex.exists(self.path))
+
+        # Le righe 1000-1999 arrivano in ritardo, in fondo al file
+        with open(self.path, 'a') as f:
+            f.writelines(lines[1000:2000])
+        with self.assertRaises(ValueError):
+            TimeIndex(self.path, self.parser).build(step=4096)
+        self.assertFalse(TimeIndex.exists(self.path))
+
+        with mock.patch.object(sys, 'argv', ['main.py', 'index', self.path,
+                                             '--format', 'apache']):
+            self.assertEqual(main.main(), 1)
+        self.assertFalse(TimeIndex.exists(self.path))
+
+        window = ['--start-time', (BASE + timedelta(seconds=1000)).isoformat(),
+                  '--end-time', (BASE + timedelta(seconds=1999)).isoformat()]
+        with mock.patch.object(TimeIndex, 'SCAN_THRESHOLD', 1024):
+            self.assertEqual(count_entries(['analyze', self.path, '--format', 'apache']
+                                           + window), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,8 @@ Server TCP/UDP echo service per apprendimento socket programming.
 Caratteristiche:
 - Server TCP echo (connection-oriented)
 - Server UDP echo (connectionless)
-- Multi-client con multiprocessing
+- Multi-client con event loop (selectors/epoll) o multiprocessing
+- Modalità multi-worker con SO_REUSEPORT (un event loop per core)
 - Signal handling per graceful shutdown
 - Daemonization completa
 - Configurazione via YAML
@@ -16,7 +17,8 @@ Caratteristiche:
 Concetti insegnati:
 - Socket API (socket, bind, listen, accept, recv, send)
 - Protocolli TCP vs UDP
-- Multiprocessing per concorrenza
+- I/O multiplexing non bloccante (select/epoll) per concorrenza
+- Multiprocessing per concorrenza (modalità fork)
 - Signal handling in UNIX/Linux
 - Daemonizzazione
 - PID file management
@@ -28,6 +30,9 @@ import socket
 import argparse
 import yaml
 import signal
+import logging
+import selectors
+import time
 from multiprocessing import Process, Queue
 from typing import Dict, Any, Optional
 from pathlib import Path
@@ -40,8 +45,29 @@ from utils.daemon import (
     daemonize, create_pid_file, remove_pid_file,
     get_pid_from_file, is_process_running
 )
-from utils.signal import setup_signal_handlers
-from utils.log import setup_logging, log_client_connection, log_server_start
+from utils.signal import (
+    setup_signal_handlers, create_wakeup_socket, close_wakeup_socket
+)
+from utils.log import (
+    setup_logging, shutdown_logging, log_client_connection, log_server_start
+)
+from utils.metrics import (
+    MetricsRegistry, MetricsServer, WorkerMetrics, fetch_metrics, sum_samples
+)
+
+
+class TCPConnection:
+    """Stato di un client nell'engine ad eventi."""
+
+    __slots__ = ('sock', 'addr', 'started', 'last_active', 'pending')
+
+    def __init__(self, sock: socket.socket, addr: tuple, now: float):
+        self.sock = sock
+        self.addr = addr
+        self.started = now
+        self.last_active = now
+        # Byte di echo non ancora accettati dal kernel (memoryview)
+        self.pending: Optional[memoryview] = None
 
 
 class TCPEchoServer:
@@ -61,22 +87,54 @@ class TCPEchoServer:
     4. accept() - attendi nuova connessione
     5. recv()/send() - trasferimento dati
     6. close() - chiudi connection
+
+    Engine (chiave 'engine' della config):
+    - event: un solo processo, socket non bloccanti e selectors
+      (epoll su Linux); regge decine di migliaia di connessioni
+    - fork: un processo per client (modello classico, didattico)
     """
 
+    ENGINES = ('event', 'fork')
+
+    # Connessioni accettate al massimo per ogni evento sul socket di
+    # ascolto, per non affamare i client già connessi
+    ACCEPT_BATCH = 128
+
+    # Ogni quanto (secondi) cercare i client inattivi nel loop ad eventi
+    IDLE_SWEEP_INTERVAL = 1.0
+
     def __init__(self, config: Dict[str, Any], logger):
         self.host = config['bind_host']
         self.port = config['port']
         self.max_clients = config['max_clients']
         self.buffer_size = config['buffer_size']
         self.client_timeout = config.get('client_timeout', 300)
+        self.engine = config.get('engine', 'event')
+        self.backlog = config.get('backlog', socket.SOMAXCONN)
+
+        if self.engine not in self.ENGINES:
+            raise ValueError(f"Engine TCP non valido: {self.engine} "
+                             f"(valori: {', '.join(self.ENGINES)})")
 
         self.server_socket: Optional[socket.socket] = None
         self.clients: list[Process] = []
+        self.connections: Dict[int, TCPConnection] = {}
+        self.selector: Optional[selectors.BaseSelector] = None
         self.logger = logger
         self.running = False
 
-    def start(self) -> None:
-        """Avvia il server TCP."""
+        # Sostituite dal daemon con la riga del registry condiviso
+        self.metrics = WorkerMetrics()
+
+    def start(self, reuse_port: bool = False) -> None:
+        """
+        Avvia il server TCP.
+
+        Args:
+            reuse_port: Imposta SO_REUSEPORT, così più worker possono fare
+                bind sulla stessa porta; il kernel distribuisce le nuove
+                connessioni tra i loro socket di ascolto
+        """
         try:
             # Crea TCP socket
             # AF_INET = IPv4
@@ -87,15 +145,18 @@ class TCPEchoServer:
             # Senza: bind() fallisce con "Address already in use" per TIME_WAIT
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
+            if reuse_port:
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
             # Bind socket all'address:port
             self.server_socket.bind((self.host, self.port))
 
             # Listen: marca socket come passive
-            # backlog = max pending connections queue
-            self.server_socket.listen(self.max_clients)
+            # backlog = max pending connections queue (non limita i client attivi)
+            self.server_socket.listen(self.backlog)
 
             self.running = True
-            log_server_start(self.logger, self.host, self.port, "TCP")
+            log_server_start(self.logger, self.host, self.port, f"TCP ({self.engine})")
 
         except OSError as e:
             self.logger.error(f"Errore avvio server TCP: {e}")
@@ -114,6 +175,13 @@ class TCPEchoServer:
             except OSError as e:
                 self.logger.error(f"Errore chiusura server socket: {e}")
 
+        # Chiudi le connessioni dell'event loop
+        for conn in list(self.connections.values()):
+            self._close_connection(conn)
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+
         # Termina tutti i processi client
         for client_proc in self.clients:
             if client_proc.is_alive():
@@ -138,6 +206,10 @@ class TCPEchoServer:
             client_socket: Socket della connessione client
             client_addr: (IP, port) del client
         """
+        # Processo figlio: contatori propri sulla riga del worker
+        metrics = self.metrics.fork()
+        started = time.monotonic()
+
         try:
             # Set timeout per evitare client zombie
             if self.client_timeout > 0:
@@ -157,6 +229,8 @@ class TCPEchoServer:
 
                     # Echo: ritrasmessi identici
                     client_socket.sendall(data)
+                    metrics.bytes_in += len(data)
+                    metrics.bytes_out += len(data)
 
                     # Log data (opzionale, verbose)
                     # self.logger.debug(f"Echoed {len(data)} bytes")
@@ -171,10 +245,191 @@ class TCPEchoServer:
         finally:
             client_socket.close()
             log_client_connection(self.logger, client_addr, "disconnected")
+            metrics.observe_duration(time.monotonic() - started)
+            metrics.publish()
+
+    def serve(self, signal_handler) -> None:
+        """
+        Esegue il main loop dell'engine configurato.
+
+        Args:
+            signal_handler: Per controllare shutdown
+        """
+        if self.engine == 'event':
+            self.event_loop(signal_handler)
+        else:
+            self.accept_loop(signal_handler)
+
+    def event_loop(self, signal_handler) -> None:
+        """
+        Main loop ad eventi: tutte le connessioni in un solo processo.
+
+        Pattern (reactor):
+        - Socket non bloccanti registrati in un selector (epoll/kqueue)
+        - select() restituisce solo i socket pronti: nessun thread o
+          processo per client, costo proporzionale all'attività
+        - Listen socket pronto → accept() a raffica fino a EAGAIN
+        - Client pronto in lettura → recv() + send() immediato
+        - Se il kernel non accetta tutti i byte, il resto viene
+          conservato e il client passa in attesa di EVENT_WRITE
+          (backpressure: non si legge finché l'echo non è stato inviato)
+
+        I segnali svegliano select() tramite il self-pipe di
+        create_wakeup_socket(), senza polling a timeout.
+
+        Args:
+            signal_handler: Per controllare shutdown
+        """
+        self.server_socket.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server_socket, selectors.EVENT_READ)
+
+        wakeup, wakeup_writer, previous_wakeup = create_wakeup_socket()
+        self.selector.register(wakeup, selectors.EVENT_READ)
+
+        # Il timeout serve solo per cercare i client inattivi
+        timeout = self.IDLE_SWEEP_INTERVAL if self.client_timeout > 0 else None
+        next_sweep = time.monotonic() + self.IDLE_SWEEP_INTERVAL
+
+        metrics = self.metrics
+
+        try:
+            while self.running and not signal_handler.should_shutdown():
+                events = self.selector.select(timeout)
+                now = time.monotonic()
+
+                for key, mask in events:
+                    conn = key.data
+                    if conn is not None:
+                        if mask & selectors.EVENT_READ:
+                            self._on_readable(conn, now)
+                        elif mask & selectors.EVENT_WRITE:
+                            self._on_writable(conn, now)
+                    elif key.fileobj is self.server_socket:
+                        self._accept_ready(now)
+                    else:
+                        # Byte di un segnale: svuota il self-pipe
+                        try:
+                            wakeup.recv(64)
+                        except BlockingIOError:
+                            pass
+
+                if timeout is not None and now >= next_sweep:
+                    self._close_idle(now)
+                    next_sweep = now + self.IDLE_SWEEP_INTERVAL
+
+                # Lag: quanto attende un evento arrivato durante questo giro
+                done = time.monotonic()
+                metrics.observe_lag(done - now, done)
+                metrics.connections_active = len(self.connections)
+                metrics.publish()
+        finally:
+            if self.selector:
+                self.selector.unregister(wakeup)
+            close_wakeup_socket(wakeup, wakeup_writer, previous_wakeup)
+
+    def _accept_ready(self, now: float) -> None:
+        """Accetta le connessioni in attesa sul socket di ascolto."""
+        for _ in range(self.ACCEPT_BATCH):
+            try:
+                client_socket, client_addr = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # Es. EMFILE: troppi file descriptor aperti
+                if self.running:
+                    self.logger.error(f"Errore accept: {e}")
+                return
+
+            if len(self.connections) >= self.max_clients:
+                self.logger.warning(f"Max clients ({self.max_clients}) reached, rejecting {client_addr}")
+                client_socket.close()
+                self.metrics.connections_rejected += 1
+                continue
+
+            self.metrics.connections_total += 1
+            client_socket.setblocking(False)
+            conn = TCPConnection(client_socket, client_addr, now)
+            self.connections[client_socket.fileno()] = conn
+            self.selector.register(client_socket, selectors.EVENT_READ, conn)
+            log_client_connection(self.logger, client_addr, "connected")
+
+    def _on_readable(self, conn: 'TCPConnection', now: float) -> None:
+        """Riceve dati da un client e ne invia subito l'echo."""
+        try:
+            data = conn.sock.recv(self.buffer_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.logger.error(f"Errore I/O client {conn.addr}: {e}")
+            self._close_connection(conn)
+            return
+
+        if not data:
+            # Client ha chiuso connection (FIN packet)
+            self._close_connection(conn)
+            return
+
+        conn.last_active = now
+        metrics = self.metrics
+        metrics.bytes_in += len(data)
+        try:
+            sent = conn.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError as e:
+            self.logger.error(f"Errore I/O client {conn.addr}: {e}")
+            self._close_connection(conn)
+            return
+
+        metrics.bytes_out += sent
+        if sent < len(data):
+            # Buffer di invio pieno: attendi che il socket sia scrivibile
+            conn.pending = memoryview(data)[sent:]
+            self.selector.modify(conn.sock, selectors.EVENT_WRITE, conn)
+
+    def _on_writable(self, conn: 'TCPConnection', now: float) -> None:
+        """Invia la parte di echo rimasta in sospeso."""
+        try:
+            sent = conn.sock.send(conn.pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.logger.error(f"Errore I/O client {conn.addr}: {e}")
+            self._close_connection(conn)
+            return
+
+        conn.last_active = now
+        self.metrics.bytes_out += sent
+        conn.pending = conn.pending[sent:]
+        if not conn.pending:
+            conn.pending = None
+            self.selector.modify(conn.sock, selectors.EVENT_READ, conn)
+
+    def _close_idle(self, now: float) -> None:
+        """Chiude i client inattivi da più di client_timeout secondi."""
+        deadline = now - self.client_timeout
+        idle = [conn for conn in self.connections.values() if conn.last_active < deadline]
+        for conn in idle:
+            self.logger.warning(f"Client {conn.addr} timeout")
+            self._close_connection(conn)
+
+    def _close_connection(self, conn: 'TCPConnection') -> None:
+        """Rimuove un client dal selector e chiude il socket."""
+        if self.connections.pop(conn.sock.fileno(), None) is None:
+            return
+        if self.selector:
+            try:
+                self.selector.unregister(conn.sock)
+            except (KeyError, ValueError):
+                pass
+        conn.sock.close()
+        log_client_connection(self.logger, conn.addr, "disconnected")
+        self.metrics.observe_duration(time.monotonic() - conn.started)
 
     def accept_loop(self, signal_handler) -> None:
         """
-        Main loop: accetta nuove connessioni.
+        Main loop (engine fork): accetta nuove connessioni.
 
         Pattern:
         - accept() blocca finché non arriva connessione
@@ -184,6 +439,8 @@ class TCPEchoServer:
         Args:
             signal_handler: Per controllare shutdown
         """
+        metrics = self.metrics
+
         while self.running and not signal_handler.should_shutdown():
             try:
                 # Set timeout su accept per controllare signal periodicamente
@@ -202,6 +459,8 @@ class TCPEchoServer:
                     if len(self.clients) >= self.max_clients:
                         self.logger.warning(f"Max clients ({self.max_clients}) reached, rejecting {client_addr}")
                         client_socket.close()
+                        metrics.connections_rejected += 1
+                        metrics.publish()
                         continue
 
                     # Fork processo per gestire client
@@ -217,9 +476,16 @@ class TCPEchoServer:
                     client_socket.close()
 
                     self.clients.append(process)
+                    metrics.connections_total += 1
+                    metrics.connections_active = len(self.clients)
+                    metrics.publish()
 
                 except socket.timeout:
                     # Timeout normale, ripeti per check signal
+                    # (e aggiorna il numero di client ancora attivi)
+                    self.clients = [p for p in self.clients if p.is_alive()]
+                    metrics.connections_active = len(self.clients)
+                    metrics.publish()
                     continue
                 except OSError as e:
                     if self.running:
@@ -247,8 +513,19 @@ class UDPEchoServer:
     - recvfrom()/sendto() invece di recv()/send()
     - No connection state
     - Packet loss possibile
+
+    I/O ad alto throughput:
+    - recvmsg_into() scrive il datagram in un bytearray allocato una
+      volta sola; l'echo parte da una memoryview dello stesso buffer
+      (nessun oggetto bytes per pacchetto)
+    - Socket non bloccante svuotato a raffica dopo ogni risveglio del
+      selector, invece di un settimeout() + recvfrom() per pacchetto
     """
 
+    # Datagram letti al massimo per risveglio prima di ricontrollare
+    # il flag di shutdown
+    RECV_BATCH = 256
+
     def __init__(self, config: Dict[str, Any], logger):
         self.host = config['bind_host']
         self.port = config['udp_port']
@@ -258,8 +535,17 @@ class UDPEchoServer:
         self.logger = logger
         self.running = False
 
-    def start(self) -> None:
-        """Avvia il server UDP."""
+        # Sostituite dal daemon con la riga del registry condiviso
+        self.metrics = WorkerMetrics()
+
+    def start(self, reuse_port: bool = False) -> None:
+        """
+        Avvia il server UDP.
+
+        Args:
+            reuse_port: Imposta SO_REUSEPORT; con più worker il kernel
+                distribuisce i datagram tra i loro socket (per sorgente)
+        """
         try:
             # Crea UDP socket
             # SOCK_DGRAM = UDP (datagram-oriented)
@@ -268,6 +554,9 @@ class UDPEchoServer:
             # SO_REUSEADDR permette più bind sullo stesso port
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
+            if reuse_port:
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
             # Bind all'address:port
             self.server_socket.bind((self.host, self.port))
 
@@ -294,39 +583,99 @@ class UDPEchoServer:
 
         UDP non ha connessioni:
         - Ogni packet è indipendente
-        - recvfrom() restituisce address del sender
+        - recvmsg_into() restituisce address del sender
         - sendto() invia a specific address
 
+        Il loop dorme in select() finché arriva un datagram o un segnale
+        (self-pipe di create_wakeup_socket()), poi legge fino a
+        RECV_BATCH datagram senza tornare nel selector.
+
         Args:
             signal_handler: Per controllare shutdown
         """
-        while self.running and not signal_handler.should_shutdown():
-            try:
-                # Set timeout per check signal
-                self.server_socket.settimeout(1.0)
+        sock = self.server_socket
+        sock.setblocking(False)
+
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        # recvmsg_into non esiste su Windows: recvfrom_into è equivalente
+        if hasattr(sock, 'recvmsg_into'):
+            buffers = [buffer]
+
+            def receive():
+                nbytes, _, _, addr = sock.recvmsg_into(buffers)
+                return nbytes, addr
+        else:
+            def receive():
+                return sock.recvfrom_into(buffer)
 
-                try:
-                    # Ricevi datagram + sender address
-                    data, client_addr = self.server_socket.recvfrom(self.buffer_size)
+        sendto = sock.sendto
+        batch = range(self.RECV_BATCH)
+        # Il livello non cambia a runtime: niente formattazione per pacchetto
+        debug = self.logger.isEnabledFor(logging.DEBUG)
 
-                    if data:
-                        # Echo: ritrasmessi al sender
-                        self.server_socket.sendto(data, client_addr)
+        metrics = self.metrics
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        wakeup, wakeup_writer, previous_wakeup = create_wakeup_socket()
+        selector.register(wakeup, selectors.EVENT_READ)
 
-                        # Log
-                        ip, port = client_addr
-                        self.logger.debug(f"UDP: {len(data)} bytes from {ip}:{port}")
+        try:
+            while self.running and not signal_handler.should_shutdown():
+                for key, _ in selector.select():
+                    if key.fileobj is wakeup:
+                        try:
+                            wakeup.recv(64)
+                        except BlockingIOError:
+                            pass
+                        continue
 
-                except socket.timeout:
-                    continue
-                except OSError as e:
-                    if self.running:
-                        self.logger.error(f"Errore UDP I/O: {e}")
-                    break
+                    # Contatori locali del blocco, pubblicati alla fine
+                    started = time.monotonic()
+                    received = sent = bytes_in = bytes_out = 0
+
+                    for _ in batch:
+                        try:
+                            nbytes, client_addr = receive()
+                        except (BlockingIOError, InterruptedError):
+                            break
+
+                        received += 1
+                        bytes_in += nbytes
+                        if nbytes:
+                            try:
+                                # Echo: ritrasmessi al sender
+                                sendto(view[:nbytes], client_addr)
+                                sent += 1
+                                bytes_out += nbytes
+                            except (BlockingIOError, InterruptedError):
+                                # Buffer di invio pieno: UDP può perdere l'echo
+                                pass
+                            except OSError as e:
+                                # Es. ICMP port unreachable del client precedente
+                                if debug:
+                                    self.logger.debug("UDP sendto %s: %s", client_addr, e)
+                                continue
+
+                            if debug:
+                                self.logger.debug("UDP: %d bytes from %s:%d", nbytes, *client_addr)
+
+                    done = time.monotonic()
+                    metrics.packets_in += received
+                    metrics.packets_out += sent
+                    metrics.bytes_in += bytes_in
+                    metrics.bytes_out += bytes_out
+                    metrics.observe_lag(done - started, done)
+                    metrics.publish()
 
-            except Exception as e:
-                self.logger.error(f"Errore imprevisto UDP: {e}")
-                break
+        except OSError as e:
+            if self.running:
+                self.logger.error(f"Errore UDP I/O: {e}")
+        except Exception as e:
+            self.logger.error(f"Errore imprevisto UDP: {e}")
+        finally:
+            selector.close()
+            close_wakeup_socket(wakeup, wakeup_writer, previous_wakeup)
 
 
 class EchoDaemon:
@@ -339,6 +688,7 @@ class EchoDaemon:
     - Server TCP e UDP
     - Signal handling
     - PID file management
+    - Metriche runtime (registry condiviso + endpoint HTTP)
     """
 
     def __init__(self, config_file: str):
@@ -349,8 +699,10 @@ class EchoDaemon:
 
         self.tcp_server: Optional[TCPEchoServer] = None
         self.udp_server: Optional[UDPEchoServer] = None
-        self.tcp_process: Optional[Process] = None
-        self.udp_process: Optional[Process] = None
+        self.tcp_processes: list[Process] = []
+        self.udp_processes: list[Process] = []
+        self.metrics: Optional[MetricsRegistry] = None
+        self.metrics_server: Optional[MetricsServer] = None
 
     def _load_config(self) -> Dict[str, Any]:
         """Carica configurazione da file YAML."""
@@ -384,7 +736,11 @@ class EchoDaemon:
             log_level=log_level,
             console=console,
             max_bytes=max_size,
-            backup_count=backup_count
+            backup_count=backup_count,
+            async_mode=self.config.get('log_async', False),
+            queue_size=self.config.get('log_queue_size', 10000),
+            overflow=self.config.get('log_overflow', 'drop'),
+            batch_size=self.config.get('log_batch_size', 256)
         )
 
     def daemonize_if_needed(self) -> None:
@@ -406,6 +762,15 @@ class EchoDaemon:
             # Daemonizza
             daemonize()
 
+            # daemonize() chiude tutti i file descriptor e il thread del
+            # logging asincrono non sopravvive al fork: riapri il logging
+            self._setup_logging()
+
+            # Il PID file contiene ancora il PID del processo prima del
+            # doppio fork: scrivi quello del daemon
+            with open(pid_file, 'w') as f:
+                f.write(str(os.getpid()))
+
             self.logger.info(f"Daemon avviato con PID {os.getpid()}")
             self.logger.info(f"PID file: {pid_file}")
         else:
@@ -430,14 +795,41 @@ class EchoDaemon:
         self.tcp_server = TCPEchoServer(self.config, self.logger)
         self.udp_server = UDPEchoServer(self.config, self.logger)
 
-        # Avvia TCP e UDP in processi separati
-        self.tcp_process = Process(target=self._run_tcp_server)
-        self.udp_process = Process(target=self._run_udp_server)
+        # Avvia TCP e UDP (uno o più worker ciascuno) in processi separati
+        tcp_workers = self._worker_count('workers')
+        udp_workers = self._worker_count('udp_workers')
 
-        self.tcp_process.start()
-        self.udp_process.start()
+        # Registry in memoria condivisa, ereditato dai worker
+        self.metrics = MetricsRegistry(
+            [('tcp', i) for i in range(tcp_workers)] +
+            [('udp', i) for i in range(udp_workers)]
+        )
 
-        self.logger.info("Server TCP e UDP attivi")
+        self.tcp_processes = [
+            Process(target=self._run_tcp_server, args=(tcp_workers > 1, i))
+            for i in range(tcp_workers)
+        ]
+        self.udp_processes = [
+            Process(target=self._run_udp_server, args=(udp_workers > 1, i))
+            for i in range(udp_workers)
+        ]
+
+        for process in self.tcp_processes + self.udp_processes:
+            process.start()
+
+        self.logger.info(f"Server TCP ({tcp_workers} worker) e UDP ({udp_workers} worker) attivi")
+
+        # Endpoint metriche (thread del processo principale)
+        metrics_port = self.config.get('metrics_port', 0)
+        if metrics_port:
+            self.metrics_server = MetricsServer(
+                self.metrics, self.config.get('metrics_host', '127.0.0.1'),
+                metrics_port, self.logger)
+            try:
+                self.metrics_server.start()
+            except OSError as e:
+                self.logger.error(f"Errore avvio endpoint metriche: {e}")
+                self.metrics_server = None
 
         # Attendi segnale di shutdown
         self._wait_for_shutdown()
@@ -445,7 +837,25 @@ class EchoDaemon:
         # Cleanup
         self._cleanup()
 
-    def _run_tcp_server(self) -> None:
+    def _worker_count(self, key: str) -> int:
+        """
+        Numero di processi worker dalla config ('workers' per TCP,
+        'udp_workers' per UDP).
+
+        0 = uno per core. Con più worker ognuno apre il proprio socket
+        con SO_REUSEPORT e ha il proprio loop: niente stato condiviso,
+        il kernel bilancia connessioni e datagram.
+        """
+        workers = self.config.get(key, 1)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+
+        if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+            self.logger.warning(f"SO_REUSEPORT non disponibile, {key}: 1")
+            return 1
+        return workers
+
+    def _run_tcp_server(self, reuse_port: bool = False, index: int = 0) -> None:
         """Wrapper per eseguire TCP server con signal handler."""
         # Setup logging nel processo child
         self._setup_logging()
@@ -453,12 +863,17 @@ class EchoDaemon:
         # Setup signal handlers nel child
         self.signal_handler = setup_signal_handlers(self.logger)
 
+        # Con engine fork anche i processi client scrivono la riga
+        self.tcp_server.metrics = self.metrics.worker(
+            'tcp', index, shared=self.tcp_server.engine == 'fork')
+
         # Avvia server
-        self.tcp_server.start()
-        self.tcp_server.accept_loop(self.signal_handler)
+        self.tcp_server.start(reuse_port=reuse_port)
+        self.tcp_server.serve(self.signal_handler)
         self.tcp_server.stop()
+        shutdown_logging()
 
-    def _run_udp_server(self) -> None:
+    def _run_udp_server(self, reuse_port: bool = False, index: int = 0) -> None:
         """Wrapper per eseguire UDP server con signal handler."""
         # Setup logging nel processo child
         self._setup_logging()
@@ -466,10 +881,13 @@ class EchoDaemon:
         # Setup signal handlers nel child
         self.signal_handler = setup_signal_handlers(self.logger)
 
+        self.udp_server.metrics = self.metrics.worker('udp', index)
+
         # Avvia server
-        self.udp_server.start()
+        self.udp_server.start(reuse_port=reuse_port)
         self.udp_server.serve_loop(self.signal_handler)
         self.udp_server.stop()
+        shutdown_logging()
 
     def _wait_for_shutdown(self) -> None:
         """Attende segnale di shutdown."""
@@ -485,14 +903,16 @@ class EchoDaemon:
         """Pulizia risorse."""
         self.logger.info("Cleanup in corso...")
 
-        # Termina processi server
-        if self.tcp_process and self.tcp_process.is_alive():
-            self.tcp_process.terminate()
-            self.tcp_process.join()
+        if self.metrics_server:
+            self.metrics_server.stop()
 
-        if self.udp_process and self.udp_process.is_alive():
-            self.udp_process.terminate()
-            self.udp_process.join()
+        # Termina processi server
+        processes = self.tcp_processes + self.udp_processes
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
 
         # Rimuovi PID file
         pid_file = self.config['pid_file']
@@ -502,6 +922,7 @@ class EchoDaemon:
         remove_pid_file(pid_file)
 
         self.logger.info("Daemon terminato")
+        shutdown_logging()
 
 
 def load_config(config_file: str) -> Dict[str, Any]:
@@ -562,17 +983,69 @@ def cmd_status(args) -> None:
     pid = get_pid_from_file(pid_file)
 
     if not pid:
-        print("Status: STOPPED")
+        # In foreground non c'è PID file: l'endpoint metriche dice se è attivo
+        samples = read_live_metrics(config)
+        if samples is None:
+            print("Status: STOPPED")
+        else:
+            print("Status: RUNNING (foreground, nessun PID file)")
+            print_metrics(samples, config)
         return
 
     if is_process_running(pid):
         print(f"Status: RUNNING (PID {pid})")
+        samples = read_live_metrics(config, verbose=True)
+        if samples is not None:
+            print_metrics(samples, config)
     else:
         print(f"Status: STOPPED (PID file obsoleto)")
         print(f"Pulisco PID file obsoleto...")
         remove_pid_file(pid_file)
 
 
+def read_live_metrics(config: Dict[str, Any], verbose: bool = False) -> Optional[Dict[str, float]]:
+    """Legge le metriche dall'endpoint del daemon (None se non disponibili)."""
+    port = config.get('metrics_port', 0)
+    if not port:
+        return None
+
+    host = config.get('metrics_host', '127.0.0.1')
+    try:
+        return fetch_metrics(host, port)
+    except OSError as e:
+        if verbose:
+            print(f"Metriche non disponibili su {host}:{port}: {e}")
+        return None
+
+
+def print_metrics(samples: Dict[str, float], config: Dict[str, Any]) -> None:
+    """Stampa un riepilogo delle metriche live."""
+    def total(name: str, protocol: Optional[str] = None) -> float:
+        return sum_samples(samples, name, protocol)
+
+    uptime = int(total('echo_uptime_seconds'))
+    count = total('echo_connection_duration_seconds_count')
+    mean = total('echo_connection_duration_seconds_sum') / count if count else 0.0
+    lag = max((v for k, v in samples.items() if k.startswith('echo_loop_lag_seconds')),
+              default=0.0)
+
+    print(f"Uptime: {uptime // 3600}h {uptime % 3600 // 60}m {uptime % 60}s")
+    print(f"TCP: {total('echo_connections_active'):.0f} connessioni attive "
+          f"(max_clients {config['max_clients']} per worker), "
+          f"{total('echo_connections_total'):.0f} totali, "
+          f"{total('echo_connections_rejected_total'):.0f} rifiutate, "
+          f"{total('echo_connections_per_second'):.1f}/s")
+    print(f"     {total('echo_bytes_received_total', 'tcp') / 1e6:.2f} MB in, "
+          f"{total('echo_bytes_sent_total', 'tcp') / 1e6:.2f} MB out, "
+          f"durata media connessione {mean:.2f}s")
+    print(f"UDP: {total('echo_packets_per_second'):.0f} pacchetti/s, "
+          f"{total('echo_packets_received_total'):.0f} ricevuti, "
+          f"{total('echo_packets_sent_total'):.0f} inviati, "
+          f"{total('echo_bytes_received_total', 'udp') / 1e6:.2f} MB in")
+    print(f"Loop lag max: {lag * 1000:.2f} ms")
+    print(f"Log scartati: {total('echo_log_records_dropped_total'):.0f}")
+
+
 def main():
     """Entry point."""
     parser = argparse.ArgumentParser(description="Echo Network Daemon")
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Benchmark per Echo Daemon
+=========================
+Load generator asyncio per misurare throughput e latenza del daemon.
+
+Funzionalità:
+- N client TCP/UDP concorrenti in un solo processo (asyncio)
+- Sweep di dimensioni payload e livelli di concorrenza
+- Report JSON: req/s, MB/s, percentili e istogramma latenza, errori
+- Confronto con un report precedente per trovare regressioni
+
+Concetti insegnati:
+- asyncio: migliaia di client senza thread (streams e datagram endpoint)
+- Closed-loop load: ogni client attende l'echo prima della richiesta
+  successiva, quindi concorrenza = richieste in volo
+- Percentili (p50/p99) invece della sola media
+
+Uso:
+    python tests/benchmark.py --protocol tcp --concurrency 1,10,100
+    python tests/benchmark.py --payloads 64,4096 --duration 5 -o report.json
+    python tests/benchmark.py --baseline report.json --tolerance 0.10
+"""
+
+import asyncio
+import argparse
+import bisect
+import json
+import socket
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+
+# Limiti superiori dei bucket dell'istogramma (microsecondi)
+HISTOGRAM_BOUNDS_US = [
+    50, 100, 250, 500, 1000, 2500, 5000, 10000,
+    25000, 50000, 100000, 250000, 500000, 1000000,
+]
+
+# Numero di sequenza in testa a ogni datagram UDP (abbina risposta e richiesta)
+UDP_TAG = struct.Struct('!Q')
+
+
+def load_config(config_file: str) -> dict:
+    """Carica configurazione."""
+    with open(config_file, 'r') as f:
+        return yaml.safe_load(f)
+
+
+class RunStats:
+    """Risultati di una singola combinazione (payload, concorrenza)."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.bytes = 0
+        # Echo UDP arrivati dopo il timeout della loro richiesta (scartati)
+        self.late = 0
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """
+        Riassume la run.
+
+        Args:
+            elapsed: Durata effettiva in secondi
+
+        Returns:
+            Dict serializzabile in JSON
+        """
+        requests = len(self.latencies)
+        latencies = sorted(self.latencies)
+
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_US) + 1)
+        for value in latencies:
+            histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_US, value * 1e6)] += 1
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(requests - 1, int(p / 100 * requests))
+            return round(latencies[index] * 1000, 3)
+
+        return {
+            'requests': requests,
+            'errors': sum(self.errors.values()),
+            'error_kinds': self.errors,
+            'late_replies': self.late,
+            'elapsed_s': round(elapsed, 3),
+            'req_per_s': round(requests / elapsed, 1) if elapsed else 0.0,
+            # Byte inviati + ricevuti
+            'mb_per_s': round(self.bytes * 2 / elapsed / 1e6, 3) if elapsed else 0.0,
+            'latency_ms': {
+                'min': percentile(0),
+                'mean': round(sum(latencies) / requests * 1000, 3) if requests else None,
+                'p50': percentile(50),
+                'p90': percentile(90),
+                'p99': percentile(99),
+                'max': round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+            'histogram_us': [
+                {'le': bound, 'count': count}
+                for bound, count in zip(HISTOGRAM_BOUNDS_US + ['+Inf'], histogram)
+            ],
+        }
+
+
+async def tcp_client(host: str, port: int, payload: bytes, deadline: float,
+                     stats: RunStats, timeout: float) -> None:
+    """Client TCP: una connessione, richieste in sequenza fino a deadline."""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        stats.error(f"connect:{type(e).__name__}")
+        return
+
+    size = len(payload)
+    clock = time.perf_counter
+    try:
+        while clock() < deadline:
+            start = clock()
+            writer.write(payload)
+            try:
+                data = await asyncio.wait_for(reader.readexactly(size), timeout)
+            except asyncio.TimeoutError:
+                stats.error('timeout')
+                break
+            except asyncio.IncompleteReadError:
+                # Il server ha chiuso (es. max_clients raggiunto)
+                stats.error('closed')
+                break
+            if data != payload:
+                stats.error('mismatch')
+                continue
+            stats.latencies.append(clock() - start)
+            stats.bytes += size
+    except OSError as e:
+        stats.error(type(e).__name__)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+class UDPClientProtocol(asyncio.DatagramProtocol):
+    """
+    Protocollo datagram: consegna alla future in attesa solo la risposta
+    con il numero di sequenza atteso; gli echo tardivi di richieste già
+    scadute vengono contati e scartati.
+    """
+
+    def __init__(self, stats: RunStats):
+        self.stats = stats
+        self.waiter: Optional[asyncio.Future] = None
+        self.tag = b''
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if data[:UDP_TAG.size] != self.tag:
+            self.stats.late += 1
+            return
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_exception(exc)
+
+
+async def udp_client(host: str, port: int, payload: bytes, deadline: float,
+                     stats: RunStats, timeout: float) -> None:
+    """
+    Client UDP: un socket, un datagram in volo alla volta fino a deadline.
+
+    I primi UDP_TAG.size byte del payload sono sostituiti dal numero di
+    sequenza della richiesta, così un echo tardivo non viene scambiato
+    per la risposta alla richiesta successiva.
+    """
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: UDPClientProtocol(stats), remote_addr=(host, port))
+
+    body = payload[UDP_TAG.size:]
+    sequence = 0
+    clock = time.perf_counter
+    try:
+        while clock() < deadline:
+            sequence += 1
+            protocol.tag = UDP_TAG.pack(sequence)
+            datagram = protocol.tag + body
+            protocol.waiter = loop.create_future()
+            start = clock()
+            transport.sendto(datagram)
+            try:
+                data = await asyncio.wait_for(protocol.waiter, timeout)
+            except asyncio.TimeoutError:
+                # Datagram o echo perso
+                stats.error('timeout')
+                continue
+            except OSError as e:
+                stats.error(type(e).__name__)
+                await asyncio.sleep(timeout)
+                continue
+            if data != datagram:
+                stats.error('mismatch')
+                continue
+            stats.latencies.append(clock() - start)
+            stats.bytes += len(datagram)
+    finally:
+        transport.close()
+
+
+async def run_once(protocol: str, host: str, port: int, payload_size: int,
+                   concurrency: int, duration: float, timeout: float) -> Dict[str, Any]:
+    """
+    Esegue una run con concurrency client per duration secondi.
+
+    Returns:
+        Report della run
+    """
+    payload = (b'0123456789abcdef' * (payload_size // 16 + 1))[:payload_size]
+    client = tcp_client if protocol == 'tcp' else udp_client
+    stats = RunStats()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        client(host, port, payload, deadline, stats, timeout)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'protocol': protocol,
+        'payload_bytes': payload_size,
+        'concurrency': concurrency,
+    }
+    result.update(stats.report(elapsed))
+    return result
+
+
+def find_regressions(report: Dict[str, Any], baseline: Dict[str, Any],
+                     tolerance: float) -> List[str]:
+    """
+    Confronta un report con uno precedente.
+
+    Una run regredisce se req/s cala o p99 cresce oltre la tolleranza.
+
+    Returns:
+        Descrizioni delle regressioni (vuota se nessuna)
+    """
+    previous = {
+        (r['protocol'], r['payload_bytes'], r['concurrency']): r
+        for r in baseline.get('runs', [])
+    }
+    regressions = []
+    for run in report['runs']:
+        key = (run['protocol'], run['payload_bytes'], run['concurrency'])
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = f"{key[0]} payload={key[1]} concurrency={key[2]}"
+
+        if old['req_per_s'] and run['req_per_s'] < old['req_per_s'] * (1 - tolerance):
+            regressions.append(f"{label}: req/s {old['req_per_s']} -> {run['req_per_s']}")
+
+        old_p99 = old['latency_ms']['p99']
+        new_p99 = run['latency_ms']['p99']
+        if old_p99 and new_p99 and new_p99 > old_p99 * (1 + tolerance):
+            regressions.append(f"{label}: p99 {old_p99}ms -> {new_p99}ms")
+    return regressions
+
+
+def parse_list(value: str) -> List[int]:
+    """'64,1024' -> [64, 1024]"""
+    return [int(item) for item in value.split(',') if item]
+
+
+async def run_sweep(args) -> Dict[str, Any]:
+    """Esegue tutte le combinazioni protocollo x payload x concorrenza."""
+    runs = []
+    for protocol in args.protocols:
+        port = args.ports[protocol]
+        for payload_size in args.payloads:
+            for concurrency in args.concurrency:
+                result = await run_once(protocol, args.host, port, payload_size,
+                                        concurrency, args.duration, args.timeout)
+                runs.append(result)
+                print(f"[{protocol.upper()}] payload={payload_size:<6} "
+                      f"conc={concurrency:<5} {result['req_per_s']:>10.1f} req/s "
+                      f"{result['mb_per_s']:>8.2f} MB/s "
+                      f"p50={result['latency_ms']['p50']}ms "
+                      f"p99={result['latency_ms']['p99']}ms "
+                      f"errori={result['errors']}",
+                      file=sys.stderr)
+    return {
+        'host': args.host,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'client_host': socket.gethostname(),
+        'duration_s': args.duration,
+        'engine': args.engine,
+        'runs': runs,
+    }
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Echo Daemon Benchmark")
+    parser.add_argument('--host', '-H', default='127.0.0.1',
+                        help='Server host')
+    parser.add_argument('--port', '-p', type=int,
+                        help='Server port of the selected protocol; TCP port '
+                             'with --protocol both (default: from config)')
+    parser.add_argument('--udp-port', type=int,
+                        help='UDP server port (default: from config)')
+    parser.add_argument('--protocol', '-P', choices=['tcp', 'udp', 'both'],
+                        default='tcp', help='Protocol (default: tcp)')
+    parser.add_argument('--config', '-c', default='config/config.yaml',
+                        help='Config file path')
+    parser.add_argument('--payloads', type=parse_list, default=[64, 1024],
+                        help='Payload sizes in bytes, comma separated')
+    parser.add_argument('--concurrency', type=parse_list, default=[1, 10, 100],
+                        help='Concurrent clients, comma separated')
+    parser.add_argument('--duration', '-d', type=float, default=5.0,
+                        help='Seconds per run (default: 5)')
+    parser.add_argument('--timeout', type=float, default=2.0,
+                        help='Per-request timeout in seconds')
+    parser.add_argument('--output', '-o',
+                        help='Write JSON report to file (default: stdout)')
+    parser.add_argument('--baseline',
+                        help='Previous JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed regression ratio (default: 0.10)')
+
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    args.engine = config.get('engine', 'event')
+    args.protocols = ['tcp', 'udp'] if args.protocol == 'both' else [args.protocol]
+
+    # Ogni protocollo ha la sua porta: --port non vale per entrambi
+    args.ports = {'tcp': config['port'], 'udp': config['udp_port']}
+    if args.port:
+        args.ports['udp' if args.protocol == 'udp' else 'tcp'] = args.port
+    if args.udp_port:
+        args.ports['udp'] = args.udp_port
+
+    if 'udp' in args.protocols and min(args.payloads) < UDP_TAG.size:
+        parser.error(f"UDP payloads must be at least {UDP_TAG.size} bytes "
+                     f"(sequence number)")
+
+    report = asyncio.run(run_sweep(args))
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Report scritto in {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressioni rispetto al baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            sys.exit(1)
+        print("\nNessuna regressione rispetto al baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 """
 Utils Package per Echo Daemon
 ==============================
-Moduli di utilità per daemonizzazione, signal handling e logging.
+Moduli di utilità per daemonizzazione, signal handling, logging e metriche.
 """
 
 from .daemon import (
@@ -15,17 +15,28 @@ from .daemon import (
 from .signal import (
     SignalHandler,
     GracefulShutdown,
+    create_wakeup_socket,
+    close_wakeup_socket,
     setup_signal_handlers
 )
 
 from .log import (
     setup_logging,
+    shutdown_logging,
+    dropped_log_records,
     get_logger,
     LoggerAdapter,
     log_client_connection,
     log_server_start
 )
 
+from .metrics import (
+    MetricsRegistry,
+    MetricsServer,
+    WorkerMetrics,
+    fetch_metrics
+)
+
 __all__ = [
     # Daemon utilities
     'daemonize',
@@ -37,12 +48,22 @@ __all__ = [
     # Signal handling
     'SignalHandler',
     'GracefulShutdown',
+    'create_wakeup_socket',
+    'close_wakeup_socket',
     'setup_signal_handlers',
 
     # Logging
     'setup_logging',
+    'shutdown_logging',
+    'dropped_log_records',
     'get_logger',
     'LoggerAdapter',
     'log_client_connection',
     'log_server_start',
+
+    # Metrics
+    'MetricsRegistry',
+    'MetricsServer',
+    'WorkerMetrics',
+    'fetch_metrics',
 ]
@@ -10,13 +10,229 @@ Concetti insegnati:
 - Formattazione log con timestamp
 - Thread-safe logging
 - Logging in ambiente daemon (no stdout/stderr)
+- Logging asincrono: QueueHandler e listener a blocchi, la scrittura su disco
+  avviene in un thread dedicato e non nel percorso di accept/echo
 """
 
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
 import os
-from typing import Optional
+from typing import List, Optional
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler con coda limitata e politica di overflow.
+
+    - drop: se la coda è piena il record viene scartato e contato
+      (il thread che logga non aspetta mai il disco)
+    - block: il thread attende che il listener liberi spazio
+
+    Il record viene accodato senza formattarlo: con una queue.Queue
+    (stesso processo) non serve renderlo serializzabile, quindi
+    messaggio e timestamp vengono formattati dal thread del listener.
+    """
+
+    POLICIES = ('drop', 'block')
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = 'drop'):
+        if overflow not in self.POLICIES:
+            raise ValueError(f"Politica overflow non valida: {overflow}")
+        super().__init__(log_queue)
+        self.block = overflow == 'block'
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Incremento non atomico tra thread: il conteggio è indicativo
+            self.dropped += 1
+
+
+class BatchingQueueListener:
+    """
+    Listener che scrive a blocchi i record della coda.
+
+    Un thread dedicato, dopo ogni get() bloccante, svuota la coda fino a
+    batch_size record, li passa agli handler e chiama flush() una sola
+    volta per blocco. Segnala anche i record scartati dal
+    BoundedQueueHandler.
+
+    Stessa interfaccia di logging.handlers.QueueListener (start, stop,
+    handlers), ma con un proprio thread: non dipende dai dettagli
+    interni di QueueListener.
+    """
+
+    # Accodato da stop(): il thread termina dopo aver scritto il blocco
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler,
+                 batch_size: int = 256, source: Optional[BoundedQueueHandler] = None):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.source = source
+        self._reported_dropped = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Avvia il thread di scrittura."""
+        self._thread = threading.Thread(target=self._run, name='log-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Scrive i record ancora in coda e ferma il thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self.queue.put(self._STOP)
+        thread.join()
+        self._thread = None
+
+    def is_running(self) -> bool:
+        """True se il thread è attivo (dopo un fork il child non lo eredita)."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def handle(self, record: logging.LogRecord) -> None:
+        """Passa il record agli handler che ne accettano il livello."""
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _run(self) -> None:
+        log_queue = self.queue
+        has_task_done = hasattr(log_queue, 'task_done')
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for record in batch:
+                if record is self._STOP:
+                    stop = True
+                else:
+                    self.handle(record)
+
+            self._report_dropped()
+            for handler in self.handlers:
+                handler.flush()
+
+            if has_task_done:
+                for _ in batch:
+                    log_queue.task_done()
+            if stop:
+                break
+
+    def _report_dropped(self) -> None:
+        """Scrive un warning quando il contatore dei record persi cresce."""
+        if self.source is None:
+            return
+        dropped = self.source.dropped
+        if dropped > self._reported_dropped:
+            record = logging.LogRecord(
+                'log', logging.WARNING, __file__, 0,
+                "Coda di log piena: %d record scartati (totale %d)",
+                (dropped - self._reported_dropped, dropped), None)
+            self._reported_dropped = dropped
+            self.handle(record)
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler che non fa flush a ogni record.
+
+    Pensato per il BatchingQueueListener, che chiama flush() alla fine
+    di ogni blocco: più record finiscono nella stessa write().
+
+    Ogni record è formattato una sola volta: la dimensione per la
+    rotazione viene dal messaggio già formattato e da un contatore,
+    invece che da shouldRollover() (che formatta di nuovo il record e
+    fa seek() sul file, svuotando il buffer). Il contatore è
+    risincronizzato con la fine del file dopo ogni flush, perché anche
+    gli altri processi worker scrivono sullo stesso file.
+    """
+
+    # Dimensione nota del file (None = da rileggere con seek)
+    _size: Optional[int] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self._size is None:
+                self._size = self.stream.seek(0, 2)
+            if self.maxBytes > 0 and self._size + len(msg) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                self._size = self.stream.seek(0, 2)
+            self.stream.write(msg)
+            self._size += len(msg)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        super().flush()
+        self._size = None
+
+
+# Handler installati da setup_logging() e listener attivo
+_installed_handlers: List[logging.Handler] = []
+_listener: Optional[BatchingQueueListener] = None
+_queue_handler: Optional[BoundedQueueHandler] = None
+
+
+def shutdown_logging() -> None:
+    """
+    Ferma il listener asincrono scrivendo i record ancora in coda.
+
+    Da chiamare prima di uscire da un processo (i processi
+    multiprocessing terminano con os._exit, senza atexit).
+    """
+    global _listener
+    listener = _listener
+    _listener = None
+    if listener is None:
+        return
+    # Dopo un fork il thread del parent non esiste nel child
+    if listener.is_running():
+        listener.stop()
+    for handler in listener.handlers:
+        _close_handler(handler)
+
+
+def _close_handler(handler: logging.Handler) -> None:
+    """Chiude un handler anche se il suo fd è già stato chiuso (daemonize)."""
+    try:
+        handler.close()
+    except (OSError, ValueError):
+        pass
+
+
+def dropped_log_records() -> int:
+    """Numero di record scartati per coda piena (logging asincrono)."""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+atexit.register(shutdown_logging)
 
 
 def setup_logging(
@@ -24,7 +240,11 @@ def setup_logging(
     log_level: str = "INFO",
     console: bool = False,
     max_bytes: int = 10 * 1024 * 1024,  # 10 MB
-    backup_count: int = 5
+    backup_count: int = 5,
+    async_mode: bool = False,
+    queue_size: int = 10000,
+    overflow: str = 'drop',
+    batch_size: int = 256
 ) -> logging.Logger:
     """
     Configura il sistema di logging per il daemon.
@@ -34,6 +254,11 @@ def setup_logging(
     - Backup files con numerazione
     - Formato dettagliato con timestamp, level, PID
     - Opzionale output console (per debug non-daemon)
+    - Modalità asincrona: il root logger ha solo un QueueHandler, file e
+      console sono scritti a blocchi dal thread del BatchingQueueListener
+
+    Richiamabile più volte (es. nei processi figli dopo il fork): gli
+    handler della configurazione precedente vengono rimossi.
 
     Args:
         log_file: Path del file di log
@@ -41,10 +266,15 @@ def setup_logging(
         console: Se True, log anche su console
         max_bytes: Dimensione max file prima rotation
         backup_count: Numero di backup files da mantenere
+        async_mode: Se True, logging non bloccante tramite coda
+        queue_size: Record massimi in coda (modalità asincrona)
+        overflow: Coda piena: 'drop' (scarta e conta) o 'block' (attende)
+        batch_size: Record scritti per blocco dal listener
 
     Returns:
         Logger configurato
     """
+    global _listener, _queue_handler
     # Crea directory log se non esiste
     log_dir = os.path.dirname(log_file)
     if log_dir and not os.path.exists(log_dir):
@@ -59,6 +289,18 @@ def setup_logging(
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
 
+    # Rimuovi la configurazione precedente (anche quella ereditata col fork)
+    shutdown_logging()
+    for handler in _installed_handlers:
+        logger.removeHandler(handler)
+        _close_handler(handler)
+    _installed_handlers.clear()
+    _queue_handler = None
+
+    handlers: List[logging.Handler] = []
+    file_handler_class = (BatchRotatingFileHandler if async_mode
+                          else logging.handlers.RotatingFileHandler)
+
     # Formatter con info dettagliate
     # Format: timestamp | level | PID | message
     formatter = logging.Formatter(
@@ -72,7 +314,7 @@ def setup_logging(
     # - Crea nuovo file vuoto
     # - Mantiene backup_count files
     try:
-        file_handler = logging.handlers.RotatingFileHandler(
+        file_handler = file_handler_class(
             filename=log_file,
             maxBytes=max_bytes,
             backupCount=backup_count,
@@ -80,19 +322,19 @@ def setup_logging(
         )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except OSError as e:
         sys.stderr.write(f"Impossibile aprire file log {log_file}: {e}\n")
         # Fallback a /tmp
         fallback_log = f"/tmp/echo-daemon-{os.getuid()}.log"
         try:
-            file_handler = logging.handlers.RotatingFileHandler(
+            file_handler = file_handler_class(
                 filename=fallback_log,
                 maxBytes=max_bytes,
                 backupCount=backup_count
             )
             file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except OSError:
             sys.stderr.write("Impossibile creare file log in /tmp\n")
 
@@ -102,7 +344,22 @@ def setup_logging(
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         console_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    if async_mode:
+        # Il thread che logga fa solo put_nowait(); file e console sono
+        # scritti dal thread del listener
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = BoundedQueueHandler(log_queue, overflow)
+        _listener = BatchingQueueListener(log_queue, *handlers,
+                                          batch_size=batch_size,
+                                          source=_queue_handler)
+        _listener.start()
+        handlers = [_queue_handler]
+
+    for handler in handlers:
+        logger.addHandler(handler)
+    _installed_handlers.extend(handlers)
 
     return logger
 
@@ -137,6 +394,10 @@ class LoggerAdapter:
         self.extra = extra
 
     def _log(self, level: int, msg: str, *args, **kwargs):
+        # Livello disabilitato: niente costruzione della stringa extra
+        if not self.logger.isEnabledFor(level):
+            return
+
         # Aggiunge context extra
         extra_str = " | ".join(f"{k}={v}" for k, v in self.extra.items())
         if extra_str:
@@ -169,8 +430,10 @@ def log_client_connection(logger: logging.Logger, client_addr: tuple, action: st
         client_addr: Tuple (ip, port) del client
         action: Azione (accepted, closed, error)
     """
-    ip, port = client_addr
-    logger.info(f"Client {ip}:{port} - {action}")
+    # Chiamata per ogni connessione: formattazione lazy, e nessun
+    # lavoro se INFO è disabilitato
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Client %s:%s - %s", client_addr[0], client_addr[1], action)
 
 
 def log_server_start(logger: logging.Logger, host: str, port: int, protocol: str):
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Metriche Runtime del Daemon
+===========================
+Registry di metriche condiviso tra i processi worker ed esposto in
+formato testo Prometheus su un endpoint HTTP locale.
+
+Concetti insegnati:
+- Memoria condivisa tra processi (multiprocessing.RawArray)
+- Un writer per riga: ogni worker aggiorna solo la propria riga,
+  senza lock; il lettore somma le righe
+- Contatori locali nel percorso caldo, pubblicati a blocchi
+- Counter, gauge e istogrammi (modello dati Prometheus)
+- Rate calcolati dal lettore (differenza tra due campioni)
+"""
+
+import bisect
+import http.server
+import multiprocessing
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from .log import dropped_log_records
+
+
+# Contatori per worker: solo incrementi, pubblicati come delta
+COUNTERS = (
+    'connections_total',
+    'connections_rejected',
+    'bytes_in',
+    'bytes_out',
+    'packets_in',
+    'packets_out',
+    'duration_sum',
+    'duration_count',
+)
+
+# Gauge per worker: valore istantaneo, scritto solo dal worker
+GAUGES = (
+    'connections_active',
+    'loop_lag',
+    'log_dropped',
+)
+
+# Limiti superiori dei bucket della durata connessioni (secondi)
+DURATION_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0, 300.0, 3600.0)
+
+_BUCKET_BASE = len(COUNTERS)
+_GAUGE_BASE = _BUCKET_BASE + len(DURATION_BUCKETS) + 1
+ROW_SIZE = _GAUGE_BASE + len(GAUGES)
+
+
+class WorkerMetrics:
+    """
+    Metriche di un singolo worker.
+
+    Il server incrementa attributi Python normali (nessuna memoria
+    condivisa nel percorso caldo); publish() copia i delta dei contatori
+    e il valore dei gauge nella riga del worker nel registry.
+    """
+
+    # Finestra del gauge loop_lag: massimo tempo di elaborazione di un
+    # giro del loop nella finestra corrente e in quella precedente
+    LAG_WINDOW = 1.0
+
+    def __init__(self, data=None, row: int = 0, lock=None, owns_gauges: bool = True):
+        """
+        Inizializza le metriche.
+
+        Args:
+            data: RawArray del registry (None = metriche solo locali)
+            row: Riga del worker nel registry
+            lock: Lock da usare se più processi scrivono la stessa riga
+            owns_gauges: Se False publish() non scrive i gauge
+        """
+        self._data = data
+        self._base = row * ROW_SIZE
+        self._lock = lock
+        self._owns_gauges = owns_gauges
+        self._published = [0.0] * _GAUGE_BASE
+
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.duration_buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.connections_active = 0
+        self.loop_lag = 0.0
+
+        self._lag_max = 0.0
+        self._lag_previous = 0.0
+        self._lag_window_end = 0.0
+
+    def fork(self) -> 'WorkerMetrics':
+        """
+        Metriche per un processo figlio che condivide la riga (engine fork).
+
+        Il figlio parte da zero, pubblica sotto lock e non tocca i gauge.
+        """
+        return WorkerMetrics(self._data, self._base // ROW_SIZE, self._lock, owns_gauges=False)
+
+    def observe_duration(self, seconds: float) -> None:
+        """Registra la durata di una connessione chiusa."""
+        self.duration_buckets[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.duration_sum += seconds
+        self.duration_count += 1
+
+    def observe_lag(self, busy: float, now: float) -> None:
+        """
+        Registra il tempo di un giro del loop ad eventi.
+
+        Args:
+            busy: Secondi spesi a gestire gli eventi del giro
+            now: time.monotonic() corrente
+        """
+        if now >= self._lag_window_end:
+            # Conta la finestra precedente solo se è appena terminata
+            adjacent = now < self._lag_window_end + self.LAG_WINDOW
+            self._lag_previous = self._lag_max if adjacent else 0.0
+            self._lag_max = busy
+            self._lag_window_end = now + self.LAG_WINDOW
+        elif busy > self._lag_max:
+            self._lag_max = busy
+        self.loop_lag = max(self._lag_previous, self._lag_max)
+
+    def publish(self) -> None:
+        """Scrive i valori correnti nella memoria condivisa."""
+        data = self._data
+        if data is None:
+            return
+
+        values = [getattr(self, name) for name in COUNTERS] + self.duration_buckets
+        if self._lock is not None:
+            with self._lock:
+                self._write(data, values)
+        else:
+            self._write(data, values)
+
+    def _write(self, data, values: List[float]) -> None:
+        base = self._base
+        published = self._published
+        for index, value in enumerate(values):
+            delta = value - published[index]
+            if delta:
+                data[base + index] += delta
+                published[index] = value
+
+        if self._owns_gauges:
+            base += _GAUGE_BASE
+            data[base] = self.connections_active
+            data[base + 1] = self.loop_lag
+            data[base + 2] = dropped_log_records()
+
+
+class MetricsRegistry:
+    """
+    Registry condiviso: una riga di memoria condivisa per worker.
+
+    Va creato nel processo principale prima di avviare i worker, che lo
+    ereditano col fork e ottengono la propria riga con worker().
+    """
+
+    def __init__(self, slots: List[Tuple[str, int]]):
+        """
+        Inizializza il registry.
+
+        Args:
+            slots: Coppie (protocollo, indice worker), una per riga
+        """
+        self.slots = list(slots)
+        self.data = multiprocessing.RawArray('d', ROW_SIZE * len(self.slots))
+        self.lock = multiprocessing.Lock()
+        self.started = time.time()
+
+    def worker(self, protocol: str, index: int, shared: bool = False) -> WorkerMetrics:
+        """
+        Metriche del worker (protocollo, indice).
+
+        Args:
+            protocol: 'tcp' o 'udp'
+            index: Indice del worker
+            shared: True se anche processi figli scrivono la riga (fork)
+        """
+        row = self.slots.index((protocol, index))
+        return WorkerMetrics(self.data, row, self.lock if shared else None)
+
+    def rows(self) -> List[Tuple[str, int, Dict[str, float]]]:
+        """Copia dei valori di ogni worker."""
+        result = []
+        for row, (protocol, index) in enumerate(self.slots):
+            base = row * ROW_SIZE
+            values = self.data[base:base + ROW_SIZE]
+            fields = dict(zip(COUNTERS, values))
+            fields.update(zip(GAUGES, values[_GAUGE_BASE:]))
+            fields['buckets'] = values[_BUCKET_BASE:_GAUGE_BASE]
+            result.append((protocol, index, fields))
+        return result
+
+    def totals(self, protocol: str) -> Dict[str, float]:
+        """Somma dei contatori dei worker di un protocollo."""
+        totals = dict.fromkeys(COUNTERS, 0.0)
+        for proto, _, fields in self.rows():
+            if proto == protocol:
+                for name in COUNTERS:
+                    totals[name] += fields[name]
+        return totals
+
+    def render(self, rates: Optional[Dict[str, float]] = None) -> str:
+        """
+        Metriche in formato testo Prometheus (version 0.0.4).
+
+        Args:
+            rates: Rate calcolati dal MetricsServer (es. packets/s)
+
+        Returns:
+            Testo dell'esposizione
+        """
+        rows = self.rows()
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def per_worker(name: str, kind: str, help_text: str, field: str,
+                       protocols: Tuple[str, ...] = ('tcp', 'udp')) -> None:
+            family(name, kind, help_text)
+            for protocol, index, fields in rows:
+                if protocol in protocols:
+                    lines.append(f'{name}{{protocol="{protocol}",worker="{index}"}} '
+                                 f'{_number(fields[field])}')
+
+        family('echo_uptime_seconds', 'gauge', 'Secondi dall\'avvio del daemon')
+        lines.append(f"echo_uptime_seconds {_number(time.time() - self.started)}")
+
+        per_worker('echo_connections_active', 'gauge',
+                   'Connessioni TCP aperte', 'connections_active', ('tcp',))
+        per_worker('echo_connections_total', 'counter',
+                   'Connessioni TCP accettate', 'connections_total', ('tcp',))
+        per_worker('echo_connections_rejected_total', 'counter',
+                   'Connessioni TCP rifiutate per max_clients', 'connections_rejected', ('tcp',))
+        per_worker('echo_bytes_received_total', 'counter',
+                   'Byte ricevuti dai client', 'bytes_in')
+        per_worker('echo_bytes_sent_total', 'counter',
+                   'Byte inviati ai client', 'bytes_out')
+        per_worker('echo_packets_received_total', 'counter',
+                   'Datagrammi UDP ricevuti', 'packets_in', ('udp',))
+        per_worker('echo_packets_sent_total', 'counter',
+                   'Datagrammi UDP inviati', 'packets_out', ('udp',))
+        per_worker('echo_loop_lag_seconds', 'gauge',
+                   'Tempo massimo di un giro del loop negli ultimi 1-2 secondi', 'loop_lag')
+        per_worker('echo_log_records_dropped_total', 'counter',
+                   'Record di log scartati per coda piena', 'log_dropped')
+
+        if rates:
+            family('echo_packets_per_second', 'gauge', 'Datagrammi UDP ricevuti al secondo')
+            lines.append(f'echo_packets_per_second{{protocol="udp"}} '
+                         f'{_number(rates.get("packets_in", 0.0))}')
+            family('echo_connections_per_second', 'gauge', 'Connessioni TCP accettate al secondo')
+            lines.append(f'echo_connections_per_second{{protocol="tcp"}} '
+                         f'{_number(rates.get("connections_total", 0.0))}')
+
+        # Istogramma aggregato su tutti i worker TCP (bucket cumulativi)
+        name = 'echo_connection_duration_seconds'
+        family(name, 'histogram', 'Durata delle connessioni TCP')
+        buckets = [0.0] * (len(DURATION_BUCKETS) + 1)
+        total_sum = total_count = 0.0
+        for protocol, _, fields in rows:
+            if protocol == 'tcp':
+                buckets = [a + b for a, b in zip(buckets, fields['buckets'])]
+                total_sum += fields['duration_sum']
+                total_count += fields['duration_count']
+        cumulative = 0.0
+        for bound, count in zip(DURATION_BUCKETS + ('+Inf',), buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {_number(cumulative)}')
+        lines.append(f"{name}_sum {_number(total_sum)}")
+        lines.append(f"{name}_count {_number(total_count)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    """Formato numerico compatto (interi senza .0)."""
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.6g}"
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP locale con le metriche (GET /metrics).
+
+    Gira in due thread del processo principale del daemon: il server
+    HTTP e un campionatore che ogni secondo calcola i rate (packets/s,
+    connessioni/s) dalla differenza tra due letture dei contatori.
+    """
+
+    SAMPLE_INTERVAL = 1.0
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int, logger):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logger
+        self.rates: Dict[str, float] = {}
+        self._httpd: Optional[http.server.HTTPServer] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Apre la porta e avvia i thread."""
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = server.registry.render(server.rates).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Niente log per richiesta (stderr chiuso nel daemon)
+                pass
+
+        self._httpd = http.server.HTTPServer((self.host, self.port), Handler)
+        self._threads = [
+            threading.Thread(target=self._httpd.serve_forever, name='metrics-http', daemon=True),
+            threading.Thread(target=self._sample_loop, name='metrics-sampler', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(f"Metriche su http://{self.host}:{self.port}/metrics")
+
+    def _sample_loop(self) -> None:
+        previous = self._sample()
+        previous_time = time.monotonic()
+        while not self._stop.wait(self.SAMPLE_INTERVAL):
+            current = self._sample()
+            now = time.monotonic()
+            elapsed = now - previous_time
+            self.rates = {
+                name: (current[name] - previous[name]) / elapsed
+                for name in current
+            }
+            previous, previous_time = current, now
+
+    def _sample(self) -> Dict[str, float]:
+        return {
+            'packets_in': self.registry.totals('udp')['packets_in'],
+            'connections_total': self.registry.totals('tcp')['connections_total'],
+        }
+
+    def stop(self) -> None:
+        """Ferma i thread e chiude la porta."""
+        self._stop.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+
+def fetch_metrics(host: str, port: int, timeout: float = 2.0) -> Dict[str, float]:
+    """
+    Legge le metriche di un daemon in esecuzione.
+
+    Args:
+        host: Host dell'endpoint
+        port: Porta dell'endpoint
+
+    Returns:
+        Dict 'nome{label}' -> valore (righe di commento escluse)
+
+    Raises:
+        OSError: Se l'endpoint non risponde
+    """
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=timeout) as response:
+        text = response.read().decode()
+
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        samples[name] = float(value)
+    return samples
+
+
+def sum_samples(samples: Dict[str, float], name: str, protocol: Optional[str] = None) -> float:
+    """Somma le serie di una metrica (opzionalmente di un protocollo)."""
+    total = 0.0
+    for key, value in samples.items():
+        metric = key.split('{', 1)[0]
+        if metric != name:
+            continue
+        if protocol is not None and f'protocol="{protocol}"' not in key:
+            continue
+        total += value
+    return total
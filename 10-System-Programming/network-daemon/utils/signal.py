@@ -13,9 +13,10 @@ Concetti insegnati:
 """
 
 import signal
+import socket
 import logging
 import sys
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 
 class SignalHandler:
@@ -206,6 +207,49 @@ def ignore_sigpipe() -> None:
     signal.signal(signal.SIGPIPE, signal.SIG_IGN)
 
 
+def create_wakeup_socket() -> Tuple[socket.socket, socket.socket, int]:
+    """
+    Crea un self-pipe per i segnali.
+
+    signal.set_wakeup_fd() fa scrivere all'interprete un byte sul socket
+    ad ogni segnale ricevuto: registrando il lato in lettura in un
+    selector, il loop si sveglia subito invece di aspettare un timeout
+    per controllare il flag di shutdown.
+
+    Va chiamata dal main thread, dopo aver registrato gli handler.
+    Il chiamante deve poi chiamare close_wakeup_socket(): finché il
+    wakeup fd resta impostato l'interprete continua a scriverci, e su
+    un socket chiuso ogni segnale stampa un BrokenPipeError ignorato.
+
+    Returns:
+        Tupla (reader, writer, fd precedente): il reader, non bloccante,
+        va registrato in lettura (svuotare con recv)
+    """
+    reader, writer = socket.socketpair()
+    reader.setblocking(False)
+    writer.setblocking(False)
+    previous = signal.set_wakeup_fd(writer.fileno(), warn_on_full_buffer=False)
+    return reader, writer, previous
+
+
+def close_wakeup_socket(reader: socket.socket, writer: socket.socket,
+                        previous: int = -1) -> None:
+    """
+    Ripristina il wakeup fd precedente e chiude il self-pipe.
+
+    L'ordine conta: prima set_wakeup_fd(previous) (-1 = nessuno), poi la
+    chiusura, così nessun segnale trova il writer già chiuso.
+
+    Args:
+        reader: Lato in lettura restituito da create_wakeup_socket()
+        writer: Lato in scrittura restituito da create_wakeup_socket()
+        previous: Wakeup fd da ripristinare
+    """
+    signal.set_wakeup_fd(previous)
+    writer.close()
+    reader.close()
+
+
 def setup_signal_handlers(logger: logging.Logger) -> SignalHandler:
     """
     Factory function per creare e configurare SignalHandler.
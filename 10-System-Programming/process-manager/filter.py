@@ -8,11 +8,14 @@ Concetti educativi:
 - Predicate Filtering: Funzioni che restituiscono True/False per ogni elemento
 - Lambda Functions: Funzioni anonime per filtraggio dinamico
 - List Comprehensions: Sintassi Python per trasformare e filtrare liste
+- Query Compilation: Una query testuale diventa un unico predicato
+- Hash Index: Nome, stato e PPID -> processi, per non scandire tutto
 """
 
 import re
-from typing import List, Callable, Optional
-from process import ProcessInfo, ProcessManager
+import shlex
+from typing import List, Callable, Optional, Dict, Iterable, Tuple
+from process import ProcessInfo, ProcessManager, ProcessSnapshot
 
 
 class ProcessFilter:
@@ -217,6 +220,267 @@ class ProcessFilter:
         return [p for p in processes if predicate(p)]
 
 
+class ProcessIndex:
+    """
+    Indici hash su uno snapshot dei processi.
+
+    Costruiti una volta per snapshot e riusati da tutte le query:
+    - by_name: nome -> processi (i nomi distinti sono molti meno dei processi)
+    - by_status: stato -> processi
+    - by_ppid: PPID -> figli (l'indice dello snapshot)
+
+    Concetto: un indice trasforma una scansione O(n) in una lookup O(1)
+    """
+
+    # Cache nome -> nome minuscolo, condivisa tra snapshot (i nomi si ripetono)
+    _lower_names: Dict[str, str] = {}
+    LOWER_CACHE_SIZE = 10000
+
+    def __init__(self, snapshot: ProcessSnapshot):
+        """
+        Costruisce gli indici.
+
+        Args:
+            snapshot: Snapshot da indicizzare
+        """
+        self.snapshot = snapshot
+        self.by_name: Dict[str, List[ProcessInfo]] = {}
+        self.by_status: Dict[str, List[ProcessInfo]] = {}
+        for proc in snapshot.processes:
+            self.by_name.setdefault(proc.name, []).append(proc)
+            self.by_status.setdefault(proc.status, []).append(proc)
+        self.by_ppid = snapshot.children_index()
+
+    @classmethod
+    def lower(cls, name: str) -> str:
+        """Nome in minuscolo, dalla cache"""
+        cache = cls._lower_names
+        value = cache.get(name)
+        if value is None:
+            if len(cache) >= cls.LOWER_CACHE_SIZE:
+                cache.clear()
+            value = cache[name] = name.lower()
+        return value
+
+
+class ProcessQuery:
+    """
+    Query testuale compilata in un predicato a passata singola.
+
+    Sintassi: termini 'campo operatore valore' separati da spazi (AND),
+    con virgolette per i valori con spazi:
+
+        name~nginx cpu>5 mem>200 status=running
+        name~/^python[23]?$/ ppid=1 threads>=4
+
+    Campi: pid, ppid, name, status, cpu (%), mem/memory (MB), memp (%), threads
+    Operatori numerici: = != > >= < <=
+    Operatori testuali: = != (esatto), ~ !~ (contiene, case-insensitive;
+    con /regex/ è un'espressione regolare case-insensitive)
+
+    Concetti:
+    - Parsing: la query viene analizzata una volta sola
+    - Compilazione: i termini diventano un'unica espressione Python
+      ('p.cpu_percent > 5 and ...') compilata in una lambda
+    - Indici: il termine indicizzato più selettivo sceglie i candidati,
+      gli altri termini vengono verificati in una sola passata
+    """
+
+    FIELDS = {
+        'pid': ('pid', int),
+        'ppid': ('ppid', int),
+        'name': ('name', str),
+        'status': ('status', str),
+        'cpu': ('cpu_percent', float),
+        'mem': ('memory_mb', float),
+        'memory': ('memory_mb', float),
+        'memp': ('memory_percent', float),
+        'threads': ('num_threads', int),
+    }
+
+    # Operatore della query -> operatore Python
+    NUMERIC_OPS = {
+        '=': '==',
+        '!=': '!=',
+        '>': '>',
+        '>=': '>=',
+        '<': '<',
+        '<=': '<=',
+    }
+
+    TERM_PATTERN = re.compile(r'^(?P<field>[A-Za-z_]+)(?P<op>!~|>=|<=|!=|=|>|<|~)(?P<value>.*)$')
+
+    def __init__(self, query: str):
+        """
+        Analizza e compila la query.
+
+        Args:
+            query: Testo della query
+
+        Raises:
+            ValueError: Se la query non è valida
+        """
+        self.query = query
+        self.terms: List[Tuple[str, str, object]] = []
+        # Per ogni termine: espressione Python su 'p' (costanti in self._namespace)
+        self._exprs: List[str] = []
+        self._namespace: Dict[str, object] = {'lower': ProcessIndex.lower}
+        # Per ogni termine: funzione index -> candidati (None se non indicizzabile)
+        self._lookups: List[Optional[Callable[[ProcessIndex], List[ProcessInfo]]]] = []
+        self._predicates: Dict[int, Callable[[ProcessInfo], bool]] = {}
+
+        try:
+            tokens = shlex.split(query)
+        except ValueError as e:
+            raise ValueError(f"Query non valida: {e}")
+
+        for token in tokens:
+            match = self.TERM_PATTERN.match(token)
+            if not match:
+                raise ValueError(f"Termine non valido: '{token}' (atteso campo<op>valore)")
+            self._add_term(match.group('field').lower(), match.group('op'), match.group('value'))
+
+    def _const(self, value: object) -> str:
+        """Registra una costante e restituisce il suo nome nell'espressione"""
+        name = f"v{len(self._namespace)}"
+        self._namespace[name] = value
+        return name
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[Tuple[str, str, object]]) -> 'ProcessQuery':
+        """
+        Costruisce una query da termini già separati (campo, operatore, valore).
+
+        I valori non passano da shlex né dalla sintassi /regex/: con '~'
+        sono sempre sottostringhe letterali, qualunque carattere contengano.
+
+        Args:
+            terms: Termini, es. [('name', '~', 'nginx'), ('cpu', '>=', 5)]
+
+        Returns:
+            ProcessQuery
+
+        Raises:
+            ValueError: Se un termine non è valido
+        """
+        terms = list(terms)
+        compiled = cls('')
+        compiled.query = ' '.join(f"{field}{op}{value}" for field, op, value in terms)
+        for field, op, value in terms:
+            compiled._add_term(field, op, str(value), regex=False)
+        return compiled
+
+    def _add_term(self, field: str, op: str, raw: str, regex: bool = True) -> None:
+        """Compila un termine in un'espressione e, se possibile, una lookup su indice"""
+        if field not in self.FIELDS:
+            raise ValueError(f"Campo sconosciuto: '{field}' "
+                             f"(disponibili: {', '.join(self.FIELDS)})")
+        attr, kind = self.FIELDS[field]
+        lookup = None
+
+        if kind is str:
+            if op in ('=', '!='):
+                value = raw
+                matches_name = value.__eq__
+                expr = f"p.{attr} == {self._const(value)}"
+            elif op in ('~', '!~'):
+                if regex and len(raw) >= 2 and raw.startswith('/') and raw.endswith('/'):
+                    try:
+                        value = re.compile(raw[1:-1], re.IGNORECASE)
+                    except re.error as e:
+                        raise ValueError(f"Regex non valida '{raw}': {e}")
+                    matches_name = lambda text, search=value.search: search(text) is not None
+                    expr = f"{self._const(value.search)}(p.{attr}) is not None"
+                else:
+                    value = raw.lower()
+                    lower = ProcessIndex.lower
+                    matches_name = lambda text, needle=value: needle in lower(text)
+                    expr = f"{self._const(value)} in lower(p.{attr})"
+            else:
+                raise ValueError(f"Operatore '{op}' non valido per il campo '{field}'")
+
+            if op.startswith('!'):
+                expr = f"not ({expr})"
+            elif field == 'name':
+                # Il test gira sui nomi distinti dell'indice, non su ogni processo
+                lookup = lambda index, f=matches_name: self._union(
+                    procs for name, procs in index.by_name.items() if f(name))
+            elif op == '=':
+                lookup = lambda index, v=value: index.by_status.get(v, [])
+        else:
+            if op not in self.NUMERIC_OPS:
+                raise ValueError(f"Operatore '{op}' non valido per il campo numerico '{field}'")
+            try:
+                value = kind(raw)
+            except ValueError:
+                raise ValueError(f"Valore numerico non valido per '{field}': '{raw}'")
+            expr = f"p.{attr} {self.NUMERIC_OPS[op]} {self._const(value)}"
+            if op == '=' and field == 'ppid':
+                lookup = lambda index, v=value: index.by_ppid.get(v, [])
+            elif op == '=' and field == 'pid':
+                lookup = lambda index, v=value: [index.snapshot.by_pid[v]] if v in index.snapshot.by_pid else []
+
+        self.terms.append((field, op, value))
+        self._exprs.append(expr)
+        self._lookups.append(lookup)
+
+    @staticmethod
+    def _union(groups: Iterable[List[ProcessInfo]]) -> List[ProcessInfo]:
+        """Unisce le liste di candidati mantenendo l'ordine per PID"""
+        groups = list(groups)
+        if len(groups) == 1:
+            return groups[0]
+        merged = [proc for group in groups for proc in group]
+        merged.sort(key=lambda p: p.pid)
+        return merged
+
+    def predicate(self, skip: int = -1) -> Callable[[ProcessInfo], bool]:
+        """
+        Predicato unico con tutti i termini (AND), compilato una volta.
+
+        Args:
+            skip: Indice di un termine da omettere (già garantito dai candidati)
+
+        Returns:
+            Funzione ProcessInfo -> bool
+        """
+        predicate = self._predicates.get(skip)
+        if predicate is None:
+            exprs = [expr for i, expr in enumerate(self._exprs) if i != skip]
+            body = ' and '.join(f"({expr})" for expr in exprs) or 'True'
+            # Le costanti arrivano dal namespace, mai dal testo della query
+            predicate = eval(f"lambda p: {body}", dict(self._namespace))
+            self._predicates[skip] = predicate
+        return predicate
+
+    def run(self, index: ProcessIndex) -> List[ProcessInfo]:
+        """
+        Esegue la query su uno snapshot indicizzato.
+
+        Args:
+            index: ProcessIndex dello snapshot
+
+        Returns:
+            Processi che soddisfano tutti i termini
+        """
+        # Candidati dal termine indicizzato più selettivo
+        best, candidates = -1, index.snapshot.processes
+        for i, lookup in enumerate(self._lookups):
+            if lookup is not None:
+                found = lookup(index)
+                if best < 0 or len(found) < len(candidates):
+                    best, candidates = i, found
+                    if not found:
+                        return []
+
+        if best >= 0 and len(self._exprs) == 1:
+            return list(candidates)
+        predicate = self.predicate(skip=best)
+        return [proc for proc in candidates if predicate(proc)]
+
+    def __repr__(self) -> str:
+        return f"ProcessQuery({self.query!r})"
+
 class ProcessSearcher:
     """
     Classe per la ricerca avanzata di processi.
@@ -224,17 +488,80 @@ class ProcessSearcher:
     Combina più criteri di ricerca e fornisce un'interfaccia fluente.
     """
 
-    def __init__(self):
-        """Inizializza il searcher"""
-        self.manager = ProcessManager()
+    # Query compilate tenute in cache (testo -> ProcessQuery)
+    QUERY_CACHE_SIZE = 256
+
+    def __init__(self, manager: Optional[ProcessManager] = None):
+        """
+        Inizializza il searcher
+
+        Args:
+            manager: ProcessManager da riusare (default: nuovo)
+        """
+        self.manager = manager or ProcessManager()
         self.filter = ProcessFilter()
         self._processes: Optional[List[ProcessInfo]] = None
+        self._index: Optional[ProcessIndex] = None
+        self._queries: Dict[str, ProcessQuery] = {}
 
     def load_all(self) -> 'ProcessSearcher':
-        """Carica tutti i processi"""
+        """Carica tutti i processi (nuovo snapshot)"""
         self._processes = self.manager.get_all_processes()
+        self._index = None
         return self
 
+    def index(self) -> ProcessIndex:
+        """Indici dello snapshot corrente, costruiti al primo uso"""
+        if self._processes is None:
+            self.load_all()
+        snapshot = self.manager.snapshot()
+        if self._index is None or self._index.snapshot is not snapshot:
+            self._index = ProcessIndex(snapshot)
+        return self._index
+
+    def compile(self, query: str) -> ProcessQuery:
+        """
+        Compila una query (con cache: la stessa query non viene rianalizzata).
+
+        Args:
+            query: Testo della query (es. "name~nginx cpu>5")
+
+        Returns:
+            ProcessQuery
+
+        Raises:
+            ValueError: Se la query non è valida
+        """
+        compiled = self._queries.get(query)
+        if compiled is None:
+            if len(self._queries) >= self.QUERY_CACHE_SIZE:
+                self._queries.clear()
+            compiled = self._queries[query] = ProcessQuery(query)
+        return compiled
+
+    def query(self, query: str, refresh: bool = True) -> List[ProcessInfo]:
+        """
+        Esegue una query testuale sullo snapshot.
+
+        Args:
+            query: Query, es. "name~nginx cpu>5 mem>200 status=running"
+            refresh: Se True, legge un nuovo snapshot prima della query;
+                False riusa lo snapshot corrente (più query sugli stessi dati)
+
+        Returns:
+            Lista di ProcessInfo che soddisfano la query
+
+        Raises:
+            ValueError: Se la query non è valida
+        """
+        return self._run(self.compile(query), refresh)
+
+    def _run(self, compiled: ProcessQuery, refresh: bool) -> List[ProcessInfo]:
+        """Esegue una query compilata, rileggendo i processi se richiesto"""
+        if refresh:
+            self.load_all()
+        return compiled.run(self.index())
+
     def search(self, query: str,
                search_name: bool = True,
                case_sensitive: bool = False) -> List[ProcessInfo]:
@@ -280,29 +607,25 @@ class ProcessSearcher:
             Lista filtrata
 
         Concetto: Query builder pattern per costruire query complesse
+        Nota: i criteri diventano termini di una ProcessQuery, quindi la
+        ricerca è una sola passata sugli indici invece di una catena di filtri
         """
-        if self._processes is None:
-            self.load_all()
-
-        result = self._processes
-
-        # Applica i filtri in sequenza
+        terms = []
         if name:
-            result = self.filter.by_name(result, name)
+            terms.append(('name', '~', name))
         if min_cpu is not None or max_cpu is not None:
-            min_cpu = min_cpu if min_cpu is not None else 0.0
-            max_cpu = max_cpu if max_cpu is not None else 100.0
-            result = self.filter.by_cpu(result, min_cpu, max_cpu)
+            terms.append(('cpu', '>=', min_cpu if min_cpu is not None else 0.0))
+            terms.append(('cpu', '<=', max_cpu if max_cpu is not None else 100.0))
         if min_memory is not None or max_memory is not None:
-            min_memory = min_memory if min_memory is not None else 0.0
-            max_memory = max_memory if max_memory is not None else float('inf')
-            result = self.filter.by_memory(result, min_memory, max_memory)
+            terms.append(('mem', '>=', min_memory if min_memory is not None else 0.0))
+            if max_memory is not None:
+                terms.append(('mem', '<=', max_memory))
         if status:
-            result = self.filter.by_status(result, status)
+            terms.append(('status', '=', status))
         if ppid:
-            result = self.filter.by_parent(result, ppid)
+            terms.append(('ppid', '=', ppid))
 
-        return result
+        return self._run(ProcessQuery.from_terms(terms), refresh=True)
 
 
 def highlight_match(text: str, pattern: str,
@@ -402,8 +725,15 @@ if __name__ == '__main__':
     for p in sorted(multi_results, key=lambda x: x.memory_mb, reverse=True)[:5]:
         print(f"    - {p.name}: CPU {p.cpu_percent:.1f}%, MEM {p.memory_mb:.1f} MB")
 
-    # Test 6: Evidenziazione
-    print("\nTest 6: Evidenziazione pattern")
+    # Test 6: Query language
+    print("\nTest 6: Query (name~python threads>=1)")
+    query_results = searcher.query("name~python threads>=1")
+    print(f"  Trovati {len(query_results)} processi")
+    for p in query_results[:5]:
+        print(f"    - {p.name} (PID {p.pid}): {p.num_threads} thread")
+
+    # Test 7: Evidenziazione
+    print("\nTest 7: Evidenziazione pattern")
     test_text = "python3.9 -m my_script.py"
     highlighted = highlight_match(test_text, 'py')
     print(f"  Originale: {test_text}")
@@ -10,6 +10,9 @@ Concetti educativi:
 - SIGKILL: Kill signal (9) - terminazione immediata forzata
 - Process Lifecycle: Stati di terminazione e zombie process
 - Permission Checks: UID/GID per verificare permessi di terminazione
+- Bulk Termination: segnale a tutti i target, poi un'unica attesa con
+  scadenza condivisa (psutil.wait_procs) e SIGKILL solo ai sopravvissuti
+- Process Group: killpg() invia un segnale a tutto il gruppo con una syscall
 
 AVVERTENZA: Terminare processi di sistema può causare instabilità!
 """
@@ -18,7 +21,7 @@ import os
 import signal
 import psutil
 import time
-from typing import Optional, List
+from typing import Optional, List, Dict
 from enum import Enum
 
 from process import ProcessInfo, ProcessManager
@@ -40,9 +43,20 @@ class TerminationResult(Enum):
     ACCESS_DENIED = "Permesso negato (richiede root/sudo)"
     NOT_FOUND = "Processo non trovato"
     ZOMBIE = "Processo zombie (già terminato)"
+    KILLED = "Processo terminato con SIGKILL (non rispondeva)"
     FAILED = "Terminazione fallita"
 
 
+# Segnale corrispondente a ogni metodo di terminazione
+SIGNAL_MAP = {
+    TerminateMethod.SIGTERM: signal.SIGTERM,
+    TerminateMethod.SIGKILL: signal.SIGKILL,
+    TerminateMethod.SIGINT: signal.SIGINT,
+    TerminateMethod.SIGSTOP: signal.SIGSTOP,
+    TerminateMethod.SIGCONT: signal.SIGCONT,
+}
+
+
 class ProcessKiller:
     """
     Gestore per la terminazione dei processi.
@@ -50,6 +64,12 @@ class ProcessKiller:
     Fornisce metodi sicuri per terminare processi con conferme e logging.
     """
 
+    # Attesa dopo SIGTERM/SIGINT e dopo l'escalation a SIGKILL (secondi)
+    TERM_TIMEOUT = 5
+    KILL_TIMEOUT = 2
+    # Ogni quanto ricontrollare i sopravvissuti durante l'attesa in blocco
+    POLL_INTERVAL = 0.25
+
     def __init__(self, require_confirmation: bool = True):
         """
         Inizializza il ProcessKiller.
@@ -156,7 +176,8 @@ class ProcessKiller:
 
     def kill_tree(self, root_pid: int,
                   method: TerminateMethod = TerminateMethod.SIGTERM,
-                  force: bool = False) -> List[tuple]:
+                  force: bool = False,
+                  process_group: bool = False) -> List[tuple]:
         """
         Termina un albero di processi (padre e tutti i figli).
 
@@ -164,6 +185,8 @@ class ProcessKiller:
             root_pid: PID del processo radice
             method: Metodo di terminazione
             force: Se True, salta le conferme
+            process_group: Se True e la radice è leader del suo process
+                group, segnala l'intero gruppo con killpg()
 
         Returns:
             Lista di tuple (pid, result)
@@ -171,6 +194,7 @@ class ProcessKiller:
         Concetto: Quando termini un processo, i figli possono diventare orfani
         - Terminare prima i figli previene zombie processes
         - Oppure terminare il padre e lasciare che init adotti i figli
+        - Qui tutti ricevono il segnale insieme e si attende una volta sola
         """
         try:
             root_proc = psutil.Process(root_pid)
@@ -196,13 +220,160 @@ class ProcessKiller:
                 print("   ❌ Operazione annullata")
                 return []
 
-        results = []
-        for pid in pids_to_kill:
-            result = self._terminate_by_pid(pid, method)
-            results.append((pid, result))
+        groups = [root_pid] if process_group else []
+        results = self.kill_many(pids_to_kill, method, process_groups=groups)
+        return [(pid, results[pid]) for pid in pids_to_kill]
+
+    def kill_many(self, pids: List[int],
+                  method: TerminateMethod = TerminateMethod.SIGTERM,
+                  timeout: Optional[float] = None,
+                  process_groups: Optional[List[int]] = None) -> Dict[int, TerminationResult]:
+        """
+        Termina più processi insieme (senza conferme).
+
+        Args:
+            pids: PID da terminare
+            method: Metodo di terminazione
+            timeout: Attesa massima complessiva dopo il segnale
+                (default: TERM_TIMEOUT)
+            process_groups: PID leader di process group da segnalare
+                con killpg() invece che processo per processo
+
+        Returns:
+            Dizionario PID -> TerminationResult
+
+        Algoritmo:
+        1. Invia il segnale a tutti i target (o al loro process group)
+        2. SIGTERM/SIGINT: psutil.wait_procs() con una sola scadenza
+        3. SIGKILL solo ai sopravvissuti, poi una seconda attesa breve
+
+        Il tempo totale è limitato da timeout + KILL_TIMEOUT, qualunque
+        sia il numero di processi.
+        """
+        timeout = self.TERM_TIMEOUT if timeout is None else timeout
+        sig = SIGNAL_MAP[method]
+        results: Dict[int, TerminationResult] = {}
+        targets: List[psutil.Process] = []
+
+        for pid in pids:
+            if pid in results:
+                continue
+            try:
+                proc = psutil.Process(pid)
+                if proc.status() == psutil.STATUS_ZOMBIE:
+                    results[pid] = TerminationResult.ZOMBIE
+                    continue
+            except psutil.NoSuchProcess:
+                results[pid] = TerminationResult.NOT_FOUND
+                continue
+            except psutil.AccessDenied:
+                results[pid] = TerminationResult.ACCESS_DENIED
+                continue
+            targets.append(proc)
+
+        # Process group: una killpg() per gruppo, solo se il PID è davvero il leader
+        grouped = set()
+        for leader in process_groups or []:
+            try:
+                if os.getpgid(leader) != leader:
+                    continue
+                os.killpg(leader, sig)
+            except (ProcessLookupError, PermissionError, AttributeError):
+                # AttributeError: os.killpg non esiste su Windows
+                continue
+            for proc in targets:
+                try:
+                    if os.getpgid(proc.pid) == leader:
+                        grouped.add(proc.pid)
+                except ProcessLookupError:
+                    grouped.add(proc.pid)
+
+        # Fase 1: segnale a tutti
+        signalled = []
+        for proc in targets:
+            if proc.pid not in grouped:
+                try:
+                    proc.send_signal(sig)
+                except psutil.NoSuchProcess:
+                    results[proc.pid] = TerminationResult.ALREADY_DEAD
+                    continue
+                except psutil.AccessDenied:
+                    results[proc.pid] = TerminationResult.ACCESS_DENIED
+                    continue
+            signalled.append(proc)
+
+        if method not in (TerminateMethod.SIGTERM, TerminateMethod.SIGINT):
+            # SIGKILL è immediato, SIGSTOP/SIGCONT non terminano
+            for proc in signalled:
+                results[proc.pid] = TerminationResult.SUCCESS
+            return results
+
+        # Fase 2: attesa unica con scadenza condivisa
+        gone, alive = self._wait_all(signalled, timeout)
+        for proc in gone:
+            results[proc.pid] = TerminationResult.SUCCESS
+
+        # Fase 3: escalation solo per i sopravvissuti
+        if alive:
+            for proc in alive:
+                try:
+                    proc.kill()
+                except psutil.NoSuchProcess:
+                    # Uscito tra la scadenza e il SIGKILL
+                    results[proc.pid] = TerminationResult.SUCCESS
+                except psutil.AccessDenied:
+                    results[proc.pid] = TerminationResult.ACCESS_DENIED
+            alive = [proc for proc in alive if proc.pid not in results]
+            gone, alive = self._wait_all(alive, self.KILL_TIMEOUT)
+            for proc in gone:
+                results[proc.pid] = TerminationResult.KILLED
+            for proc in alive:
+                results[proc.pid] = TerminationResult.FAILED
 
         return results
 
+    def _wait_all(self, procs: List[psutil.Process],
+                  timeout: float) -> tuple:
+        """
+        Attende la terminazione di più processi entro una scadenza comune.
+
+        Args:
+            procs: Processi da attendere
+            timeout: Secondi totali (non per processo)
+
+        Returns:
+            Tupla (terminati, ancora vivi)
+
+        Concetto: uno zombie è già terminato, aspetta solo che il padre
+        raccolga l'exit status (wait()); per chi termina non serve attenderlo
+        """
+        deadline = time.monotonic() + timeout
+        gone: List[psutil.Process] = []
+        alive = list(procs)
+
+        while alive:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, alive = psutil.wait_procs(alive, timeout=min(remaining, self.POLL_INTERVAL))
+            gone.extend(done)
+
+            survivors = []
+            for proc in alive:
+                try:
+                    if proc.status() == psutil.STATUS_ZOMBIE:
+                        gone.append(proc)
+                        continue
+                except psutil.NoSuchProcess:
+                    gone.append(proc)
+                    continue
+                except psutil.AccessDenied:
+                    pass
+                survivors.append(proc)
+            alive = survivors
+
+        return gone, alive
+
     def _terminate(self, proc: psutil.Process,
                   method: TerminateMethod) -> TerminationResult:
         """
@@ -221,15 +392,7 @@ class ProcessKiller:
                 return TerminationResult.ZOMBIE
 
             # Mappa il metodo al signal appropriato
-            signal_map = {
-                TerminateMethod.SIGTERM: signal.SIGTERM,
-                TerminateMethod.SIGKILL: signal.SIGKILL,
-                TerminateMethod.SIGINT: signal.SIGINT,
-                TerminateMethod.SIGSTOP: signal.SIGSTOP,
-                TerminateMethod.SIGCONT: signal.SIGCONT,
-            }
-
-            sig = signal_map.get(method)
+            sig = SIGNAL_MAP.get(method)
 
             if method == TerminateMethod.SIGKILL:
                 # SIGKILL: Terminazione immediata
@@ -263,15 +426,6 @@ class ProcessKiller:
             print(f"   ❌ Errore: {e}")
             return TerminationResult.FAILED
 
-    def _terminate_by_pid(self, pid: int,
-                         method: TerminateMethod) -> TerminationResult:
-        """Termina un processo per PID (wrapper interno)"""
-        try:
-            proc = psutil.Process(pid)
-            return self._terminate(proc, method)
-        except psutil.NoSuchProcess:
-            return TerminationResult.NOT_FOUND
-
     def safe_kill_list(self, pids: List[int],
                       method: TerminateMethod = TerminateMethod.SIGTERM,
                       force: bool = False) -> dict:
@@ -303,9 +457,22 @@ class ProcessKiller:
             'skipped': []
         }
 
+        if safe_pids and not force and self.require_confirmation:
+            print(f"\n⚠️  Terminazione di {len(safe_pids)} processi: "
+                  f"{', '.join(str(pid) for pid in safe_pids[:20])}"
+                  f"{' ...' if len(safe_pids) > 20 else ''}")
+            print(f"   Metodo: {method.value}")
+            response = input("\n   Continuare? (s/N): ").strip().lower()
+            if response not in ['s', 'si', 'y', 'yes']:
+                print("   ❌ Operazione annullata")
+                results['skipped'] = [(pid, TerminationResult.FAILED) for pid in safe_pids]
+                return results
+
+        # Una conferma, poi segnale e attesa in blocco
+        outcome = self.kill_many(safe_pids, method)
         for pid in safe_pids:
-            result = self.kill_by_pid(pid, method, force)
-            if result == TerminationResult.SUCCESS:
+            result = outcome[pid]
+            if result in (TerminationResult.SUCCESS, TerminationResult.KILLED):
                 results['success'].append((pid, result))
             elif result == TerminationResult.ACCESS_DENIED:
                 results['failed'].append((pid, result))
@@ -323,6 +490,7 @@ def print_termination_result(result: TerminationResult) -> None:
         TerminationResult.ACCESS_DENIED: "🔒",
         TerminationResult.NOT_FOUND: "❓",
         TerminationResult.ZOMBIE: "🧟",
+        TerminationResult.KILLED: "🔪",
         TerminationResult.FAILED: "❌"
     }
 
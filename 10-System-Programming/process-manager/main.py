@@ -31,6 +31,7 @@ from tree import ProcessTreeBuilder, ProcessTreeRenderer
 from filter import ProcessFilter, ProcessSearcher
 from sort import ProcessSorter, TopNProcesses
 from killer import ProcessKiller, TerminateMethod, TerminationResult
+from watcher import ProcessWatcher, DeltaRenderer, format_frame
 
 # Tenta di importare Rich per UI avanzata
 try:
@@ -59,7 +60,7 @@ class ProcessManagerUI:
         self.filter = ProcessFilter()
         self.sorter = ProcessSorter()
         self.killer = ProcessKiller(require_confirmation=True)
-        self.searcher = ProcessSearcher()
+        self.searcher = ProcessSearcher(self.manager)
         self.top_selector = TopNProcesses()
 
         # Configurazione console
@@ -165,7 +166,7 @@ class ProcessManagerUI:
             root_pid: PID della radice (None = albero completo)
             max_depth: Profondità massima
         """
-        builder = ProcessTreeBuilder()
+        builder = ProcessTreeBuilder(self.manager)
         renderer = ProcessTreeRenderer(use_unicode=True)
 
         if root_pid:
@@ -215,25 +216,17 @@ class ProcessManagerUI:
             interval: Secondi tra refresh
             sort_by: Campo di ordinamento
         """
-        print(f"\n🔄 Modalità Watch (refresh ogni {interval}s, ordinato per {sort_by})")
-        print("   Premi Ctrl+C per uscire\n")
+        watcher = ProcessWatcher(self.manager, sort_by=sort_by, limit=15)
+        renderer = DeltaRenderer()
 
         try:
             iteration = 0
             while True:
                 iteration += 1
 
-                # Clear screen (multipiattaforma)
-                if sys.platform == "win32":
-                    os.system('cls')
-                else:
-                    print("\033[2J\033[H", end="")
-
-                print(f"⏱️  Iterazione {iteration} - {time.strftime('%H:%M:%S')}")
-                print()
-
-                # Lista processi
-                self.list_processes(sort_by=sort_by, limit=15, show_all=False)
+                # Refresh incrementale e ridisegno delle sole righe cambiate
+                frame = watcher.refresh()
+                renderer.render(format_frame(frame, iteration, interval, sort_by))
 
                 # Attendi
                 time.sleep(interval)
@@ -241,17 +234,26 @@ class ProcessManagerUI:
         except KeyboardInterrupt:
             print("\n\n✅ Watch terminato")
 
-    def search_processes(self, query: str, case_sensitive: bool = False):
+    def search_processes(self, query: str, case_sensitive: bool = False,
+                         use_query: bool = False):
         """
         Cerca processi.
 
         Args:
-            query: Termine di ricerca
+            query: Termine di ricerca (o query, con use_query)
             case_sensitive: Ricerca case-sensitive
+            use_query: Interpreta query come espressione (es. "name~nginx cpu>5")
         """
         print(f"\n🔍 Ricerca: '{query}'\n")
 
-        results = self.searcher.search(query, search_name=True, case_sensitive=case_sensitive)
+        if use_query:
+            try:
+                results = self.searcher.query(query)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+        else:
+            results = self.searcher.search(query, search_name=True, case_sensitive=case_sensitive)
 
         if not results:
             print("Nessun risultato trovato")
@@ -270,7 +272,9 @@ class ProcessManagerUI:
 
     def kill_process(self, pid: int,
                     method: str = 'sigterm',
-                    force: bool = False):
+                    force: bool = False,
+                    tree: bool = False,
+                    group: bool = False):
         """
         Termina un processo.
 
@@ -278,6 +282,8 @@ class ProcessManagerUI:
             pid: PID del processo
             method: Metodo di terminazione
             force: Forza terminazione senza conferma
+            tree: Termina anche tutti i discendenti (in blocco)
+            group: Con tree, segnala l'intero process group se pid ne è il leader
         """
         # Mappa metodo stringa -> enum
         method_map = {
@@ -289,10 +295,6 @@ class ProcessManagerUI:
 
         terminate_method = method_map.get(method.lower(), TerminateMethod.SIGTERM)
 
-        print(f"\n⚡ Terminazione processo {pid} (metodo: {method.upper()})\n")
-
-        result = self.killer.kill_by_pid(pid, terminate_method, force)
-
         # Mostra risultato
         result_emoji = {
             TerminationResult.SUCCESS: "✅",
@@ -300,9 +302,21 @@ class ProcessManagerUI:
             TerminationResult.ACCESS_DENIED: "🔒",
             TerminationResult.NOT_FOUND: "❓",
             TerminationResult.ZOMBIE: "🧟",
+            TerminationResult.KILLED: "🔪",
             TerminationResult.FAILED: "❌"
         }
 
+        if tree:
+            print(f"\n⚡ Terminazione albero {pid} (metodo: {method.upper()})\n")
+            results = self.killer.kill_tree(pid, terminate_method, force, process_group=group)
+            for child_pid, result in results:
+                print(f"   {result_emoji.get(result, '❓')} PID {child_pid}: {result.value}")
+            return
+
+        print(f"\n⚡ Terminazione processo {pid} (metodo: {method.upper()})\n")
+
+        result = self.killer.kill_by_pid(pid, terminate_method, force)
+
         emoji = result_emoji.get(result, "❓")
         print(f"{emoji} {result.value}")
 
@@ -399,8 +413,8 @@ class ProcessManagerUI:
         # Processi
         print(f"\n📋 Processi: {stats['process_count']} totali")
 
-        # Top processi
-        processes = self.manager.get_all_processes()
+        # Top processi (stesso snapshot delle statistiche)
+        processes = self.manager.get_all_processes(cache=True)
         print("\n🔥 Top 5 CPU:")
         for p in self.top_selector.top_by_cpu(processes, 5):
             print(f"   {p.name:<25} CPU: {p.cpu_percent:5.1f}%")
@@ -424,7 +438,9 @@ Esempi:
   %(prog)s tree --pid 1234         Mostra sottoalbero
   %(prog)s watch                   Modalità auto-refresh
   %(prog)s search python           Cerca processi
+  %(prog)s search -q 'name~py cpu>5'  Cerca con una query
   %(prog)s kill 1234               Termina processo
+  %(prog)s kill 1234 --tree        Termina processo e discendenti
   %(prog)s details 1234            Mostra dettagli
   %(prog)s stats                   Statistiche di sistema
 
@@ -462,6 +478,8 @@ Concetti educativi:
     search_parser.add_argument('query', help='Termine ricerca')
     search_parser.add_argument('--case-sensitive', action='store_true',
                             help='Ricerca case-sensitive')
+    search_parser.add_argument('-q', '--query', dest='query_mode', action='store_true',
+                            help='Interpreta il termine come query (es. "name~nginx cpu>5 mem>200")')
 
     # Comando: kill
     kill_parser = subparsers.add_parser('kill', help='Termina processo')
@@ -470,6 +488,10 @@ Concetti educativi:
                            default='sigterm', help='Metodo terminazione')
     kill_parser.add_argument('--force', action='store_true',
                            help='Forza senza conferma')
+    kill_parser.add_argument('--tree', action='store_true',
+                           help='Termina anche i discendenti (segnale e attesa in blocco)')
+    kill_parser.add_argument('--group', action='store_true',
+                           help='Con --tree, usa killpg() se il PID è leader del process group')
 
     # Comando: details
     details_parser = subparsers.add_parser('details', help='Mostra dettagli processo')
@@ -504,10 +526,10 @@ Concetti educativi:
             ui.watch_processes(interval=args.interval, sort_by=args.sort)
 
         elif args.command == 'search':
-            ui.search_processes(args.query, args.case_sensitive)
+            ui.search_processes(args.query, args.case_sensitive, args.query_mode)
 
         elif args.command == 'kill':
-            ui.kill_process(args.pid, args.method, args.force)
+            ui.kill_process(args.pid, args.method, args.force, args.tree, args.group)
 
         elif args.command == 'details':
             ui.show_details(args.pid)
@@ -10,18 +10,21 @@ Concetti educativi:
 - CPU Percent: Percentuale di utilizzo della CPU
 - Memory Percent: Percentuale di memoria utilizzata
 - Process State: Stati del processo (running, sleeping, etc.)
+- Snapshot: Una sola lettura di /proc per refresh, condivisa da tutti i comandi
 """
 
+import os
+import sys
 import psutil
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessInfo:
-    """Classe dati per le informazioni del processo"""
+    """Classe dati per le informazioni del processo (con __slots__)"""
     pid: int
     name: str
     cpu_percent: float
@@ -47,6 +50,288 @@ class ProcessInfo:
         }
 
 
+# Riga grezza letta per un processo:
+# (pid, name, status, ppid, num_threads, create_time, cpu_time, rss_bytes)
+RawProcess = Tuple[int, str, str, int, int, float, float, int]
+
+# Stati del campo 'state' di /proc/<pid>/stat (stessi nomi di psutil)
+PROC_STATUSES = {
+    'R': 'running',
+    'S': 'sleeping',
+    'D': 'disk-sleep',
+    'T': 'stopped',
+    't': 'tracing-stop',
+    'Z': 'zombie',
+    'X': 'dead',
+    'x': 'dead',
+    'K': 'wake-kill',
+    'W': 'waking',
+    'I': 'idle',
+    'P': 'parked',
+}
+
+
+class ProcReader:
+    """
+    Lettore diretto di /proc (solo Linux).
+
+    Per ogni processo legge /proc/<pid>/stat e /proc/<pid>/statm una
+    sola volta: nome, stato, PPID, thread, tempi CPU, ora di avvio e RSS
+    arrivano da due read() invece che da una chiamata psutil per campo.
+
+    Il lettore è incrementale: i dati statici (nome, ora di avvio) di
+    un PID già visto vengono riusati, quindi ai refresh successivi solo
+    i processi nuovi pagano la decodifica del nome e la lettura di cmdline.
+
+    Concetti educativi:
+    - /proc/<pid>/stat: una riga con ~50 campi separati da spazi
+    - /proc/<pid>/statm: memoria in pagine (size, resident, shared, ...)
+    - Clock ticks: i tempi in stat sono in jiffies (SC_CLK_TCK al secondo)
+    - PID reuse: stesso PID ma starttime diverso = processo diverso
+    """
+
+    PROC_PATH = '/proc'
+
+    def __init__(self):
+        """Inizializza il lettore con le costanti del sistema"""
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.boot_time = psutil.boot_time()
+        # PID -> (starttime grezzo, nome, create_time) dei processi già visti
+        self._known: Dict[int, Tuple[bytes, str, float]] = {}
+
+    @classmethod
+    def available(cls) -> bool:
+        """True se /proc è leggibile (Linux)"""
+        return sys.platform.startswith('linux') and os.path.isdir(cls.PROC_PATH)
+
+    def pids(self) -> List[int]:
+        """PID presenti in /proc"""
+        return [int(entry) for entry in os.listdir(self.PROC_PATH) if entry.isdigit()]
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        # os.open/os.read: niente oggetto file bufferizzato per ogni lettura
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.read(fd, 4096)
+        finally:
+            os.close(fd)
+
+    def read(self, pid: int) -> Optional[RawProcess]:
+        """
+        Legge un processo da /proc.
+
+        Args:
+            pid: Process ID
+
+        Returns:
+            RawProcess, o None se il processo è terminato o illeggibile
+        """
+        base = f'{self.PROC_PATH}/{pid}'
+        try:
+            stat = self._read_file(f'{base}/stat')
+            statm = self._read_file(f'{base}/statm')
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            return None
+
+        # Il nome (comm) è tra parentesi e può contenere spazi o ')'
+        rpar = stat.rfind(b')')
+        if rpar < 0:
+            return None
+        fields = stat[rpar + 2:].split()
+        # fields[0] = campo 3 (state) di proc(5)
+        state = fields[0].decode()
+        ppid = int(fields[1])
+        cpu_time = (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        num_threads = int(fields[17])
+        starttime = fields[19]
+        rss_bytes = int(statm.split()[1]) * self.page_size
+
+        known = self._known.get(pid)
+        if known is not None and known[0] == starttime:
+            name, create_time = known[1], known[2]
+        else:
+            name = stat[stat.find(b'(') + 1:rpar].decode('utf-8', 'replace')
+            # comm è troncato a 15 caratteri: come psutil, si estende con cmdline
+            if len(name) >= 15:
+                name = self._extended_name(base, name)
+            create_time = int(starttime) / self.clock_ticks + self.boot_time
+            self._known[pid] = (starttime, name, create_time)
+
+        return (pid, name, PROC_STATUSES.get(state, state), ppid,
+                num_threads, create_time, cpu_time, rss_bytes)
+
+    @staticmethod
+    def _extended_name(base: str, name: str) -> str:
+        """Nome completo da cmdline quando comm è troncato"""
+        try:
+            with open(f'{base}/cmdline', 'rb') as f:
+                argv0 = f.read().split(b'\0', 1)[0]
+        except OSError:
+            return name
+        extended = os.path.basename(argv0.decode('utf-8', 'replace'))
+        return extended if extended.startswith(name) else name
+
+    def read_all(self) -> Iterator[RawProcess]:
+        """Legge tutti i processi, saltando quelli terminati nel frattempo"""
+        pids = self.pids()
+        # Dimentica i PID usciti dall'ultimo giro
+        known = self._known
+        for pid in known.keys() - set(pids):
+            del known[pid]
+
+        read = self.read
+        for pid in pids:
+            raw = read(pid)
+            if raw is not None:
+                yield raw
+
+
+class PsutilReader:
+    """
+    Lettore portabile basato su psutil (fallback fuori da Linux).
+
+    process_iter(attrs) raccoglie tutti i campi dentro oneshot(), quindi
+    ogni file/syscall del processo viene letto una sola volta.
+    """
+
+    ATTRS = ['pid', 'name', 'status', 'ppid', 'num_threads',
+             'create_time', 'cpu_times', 'memory_info']
+
+    def read(self, pid: int) -> Optional[RawProcess]:
+        """Legge un processo con psutil (None se non accessibile)"""
+        try:
+            return self._to_raw(psutil.Process(pid).as_dict(self.ATTRS))
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def read_all(self) -> Iterator[RawProcess]:
+        """Legge tutti i processi con un solo passaggio di process_iter"""
+        for proc in psutil.process_iter(self.ATTRS):
+            raw = self._to_raw(proc.info)
+            if raw is not None:
+                yield raw
+
+    @staticmethod
+    def _to_raw(info: Dict) -> Optional[RawProcess]:
+        if info['memory_info'] is None or info['cpu_times'] is None:
+            # AccessDenied: psutil mette None nei campi non leggibili
+            return None
+        cpu = info['cpu_times']
+        return (info['pid'], info['name'], info['status'], info['ppid'] or 0,
+                info['num_threads'] or 0, info['create_time'] or 0.0,
+                cpu.user + cpu.system, info['memory_info'].rss)
+
+
+def default_reader():
+    """Lettore /proc su Linux, psutil altrove"""
+    return ProcReader() if ProcReader.available() else PsutilReader()
+
+
+class ProcessSnapshot:
+    """
+    Fotografia di tutti i processi in un istante.
+
+    Raccoglie ogni processo una volta sola e serve lista, ricerca per
+    PID, figli e conteggi dallo stesso insieme di ProcessInfo. La CPU %
+    è calcolata confrontando i tempi CPU con lo snapshot precedente
+    (come psutil.cpu_percent(interval=None): 0.0 al primo giro).
+
+    Concetti educativi:
+    - Consistenza: tutti i comandi vedono lo stesso stato del sistema
+    - CPU %: delta tempo CPU del processo / delta tempo reale * 100
+    - PID reuse: un PID con create_time diverso è un processo nuovo
+    """
+
+    def __init__(self, processes: List[ProcessInfo],
+                 cpu_times: Dict[int, Tuple[float, float]],
+                 timestamp: float,
+                 memory=None):
+        """
+        Inizializza lo snapshot.
+
+        Args:
+            processes: ProcessInfo raccolti
+            cpu_times: PID -> (create_time, tempo CPU in secondi)
+            timestamp: time.monotonic() della raccolta
+            memory: psutil.virtual_memory() letta durante la raccolta
+        """
+        self.processes = processes
+        self.by_pid: Dict[int, ProcessInfo] = {p.pid: p for p in processes}
+        self.cpu_times = cpu_times
+        self.timestamp = timestamp
+        self.memory = memory
+        self._children: Optional[Dict[int, List[ProcessInfo]]] = None
+
+    @classmethod
+    def capture(cls, previous: Optional['ProcessSnapshot'] = None,
+                reader=None) -> 'ProcessSnapshot':
+        """
+        Raccoglie un nuovo snapshot.
+
+        Args:
+            previous: Snapshot precedente per calcolare la CPU %
+            reader: ProcReader o PsutilReader (default: il migliore disponibile)
+
+        Returns:
+            ProcessSnapshot
+        """
+        reader = reader or default_reader()
+        memory = psutil.virtual_memory()
+        total_mb = memory.total / (1024 * 1024)
+        previous_times = previous.cpu_times if previous else {}
+        elapsed = time.monotonic() - previous.timestamp if previous else 0.0
+
+        processes = []
+        cpu_times = {}
+        append = processes.append
+        for pid, name, status, ppid, threads, created, cpu, rss in reader.read_all():
+            cpu_percent = 0.0
+            before = previous_times.get(pid)
+            if before is not None and before[0] == created and elapsed > 0:
+                cpu_percent = round(max(cpu - before[1], 0.0) / elapsed * 100, 1)
+            memory_mb = rss / (1024 * 1024)
+            append(ProcessInfo(pid, name, cpu_percent, memory_mb / total_mb * 100,
+                               memory_mb, status, ppid, threads, created))
+            cpu_times[pid] = (created, cpu)
+
+        return cls(processes, cpu_times, time.monotonic(), memory)
+
+    def get(self, pid: int) -> Optional[ProcessInfo]:
+        """ProcessInfo per PID, None se assente"""
+        return self.by_pid.get(pid)
+
+    def children_index(self) -> Dict[int, List[ProcessInfo]]:
+        """
+        Indice PPID -> figli diretti, costruito una volta per snapshot.
+
+        Returns:
+            Dizionario condiviso (da non modificare); i figli sono in
+            ordine di PID
+        """
+        if self._children is None:
+            index: Dict[int, List[ProcessInfo]] = {}
+            for proc in sorted(self.processes, key=lambda p: p.pid):
+                if proc.ppid != proc.pid:
+                    index.setdefault(proc.ppid, []).append(proc)
+            self._children = index
+        return self._children
+
+    def children(self, pid: int) -> List[ProcessInfo]:
+        """Figli diretti di un processo (dall'indice PPID)"""
+        return list(self.children_index().get(pid, ()))
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def __iter__(self) -> Iterator[ProcessInfo]:
+        return iter(self.processes)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self.by_pid
+
+
 class ProcessManager:
     """
     Gestore principale per le operazioni sui processi.
@@ -57,52 +342,41 @@ class ProcessManager:
     def __init__(self):
         """Inizializza il ProcessManager"""
         self.cached_processes: Dict[int, ProcessInfo] = {}
+        self.reader = default_reader()
+        self._snapshot: Optional[ProcessSnapshot] = None
+
+    def snapshot(self, refresh: bool = False) -> ProcessSnapshot:
+        """
+        Restituisce lo snapshot corrente, raccogliendolo se serve.
+
+        Args:
+            refresh: Se True, rilegge tutti i processi
+
+        Returns:
+            ProcessSnapshot condiviso da lista, albero, ricerca e statistiche
+
+        Concetto: ogni refresh legge /proc una volta; i comandi che
+        seguono (statistiche, figli, ricerca) riusano gli stessi dati
+        """
+        if refresh or self._snapshot is None:
+            self._snapshot = ProcessSnapshot.capture(self._snapshot, self.reader)
+            self.cached_processes = self._snapshot.by_pid
+        return self._snapshot
 
     def get_all_processes(self, cache: bool = False) -> List[ProcessInfo]:
         """
         Ottiene tutti i processi in esecuzione.
 
         Args:
-            cache: Se True, usa la cache se disponibile
+            cache: Se True, usa lo snapshot corrente se disponibile
 
         Returns:
             Lista di ProcessInfo
 
-        Concetto: psutil.process_iter() itera su tutti i processi attivi
-        Nota: Alcuni processi potrebbero terminare durante l'iterazione
+        Concetto: /proc contiene una directory per ogni processo attivo
+        Nota: Alcuni processi potrebbero terminare durante la lettura
         """
-        processes = []
-
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent',
-                                         'status', 'ppid', 'num_threads', 'create_time']):
-            try:
-                # Ottieni le info base del processo
-                pinfo = proc.info
-
-                # Calcola memoria in MB
-                memory_mb = proc.memory_info().rss / (1024 * 1024)
-
-                # Crea oggetto ProcessInfo
-                process = ProcessInfo(
-                    pid=pinfo['pid'],
-                    name=pinfo['name'],
-                    cpu_percent=pinfo['cpu_percent'] or 0.0,
-                    memory_percent=pinfo['memory_percent'] or 0.0,
-                    memory_mb=memory_mb,
-                    status=pinfo['status'],
-                    ppid=pinfo['ppid'],
-                    num_threads=pinfo['num_threads'],
-                    create_time=pinfo['create_time']
-                )
-
-                processes.append(process)
-                self.cached_processes[process.pid] = process
-
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                # Il processo potrebbe terminare durante l'iterazione
-                continue
-
-        return processes
+        return list(self.snapshot(refresh=not cache).processes)
 
     def get_process_by_pid(self, pid: int) -> Optional[ProcessInfo]:
         """
@@ -115,28 +389,27 @@ class ProcessManager:
             ProcessInfo se trovato, None altrimenti
 
         Concetto: Ogni processo ha un PID univoco assegnato dal kernel
+        Nota: Il processo viene sempre riletto (solo quel PID, senza
+        scansione completa), così un PID terminato o riusato non viene
+        servito dallo snapshot; lo snapshot serve solo per la CPU %
         """
-        try:
-            proc = psutil.Process(pid)
-
-            memory_mb = proc.memory_info().rss / (1024 * 1024)
+        raw = self.reader.read(pid)
+        if raw is None:
+            return None
 
-            return ProcessInfo(
-                pid=proc.pid,
-                name=proc.name(),
-                cpu_percent=proc.cpu_percent(),
-                memory_percent=proc.memory_percent(),
-                memory_mb=memory_mb,
-                status=proc.status(),
-                ppid=proc.ppid(),
-                num_threads=proc.num_threads(),
-                create_time=proc.create_time()
-            )
+        pid, name, status, ppid, threads, created, cpu, rss = raw
+        cpu_percent = 0.0
+        snapshot = self._snapshot
+        if snapshot is not None:
+            before = snapshot.cpu_times.get(pid)
+            elapsed = time.monotonic() - snapshot.timestamp
+            if before is not None and before[0] == created and elapsed > 0:
+                cpu_percent = round(max(cpu - before[1], 0.0) / elapsed * 100, 1)
 
-        except psutil.NoSuchProcess:
-            return None
-        except psutil.AccessDenied:
-            return None
+        memory_mb = rss / (1024 * 1024)
+        total_mb = psutil.virtual_memory().total / (1024 * 1024)
+        return ProcessInfo(pid, name, cpu_percent, memory_mb / total_mb * 100,
+                           memory_mb, status, ppid, threads, created)
 
     def get_process_details(self, pid: int) -> Optional[Dict]:
         """
@@ -160,36 +433,41 @@ class ProcessManager:
         try:
             proc = psutil.Process(pid)
 
-            details = {
-                'basic': {
-                    'pid': proc.pid,
-                    'name': proc.name(),
-                    'exe': proc.exe() if proc.exe() else 'N/A',
-                    'cwd': proc.cwd() if proc.cwd() else 'N/A',
-                    'cmdline': proc.cmdline(),
-                    'status': proc.status(),
-                },
-                'user': {
-                    'username': proc.username(),
-                    'uids': proc.uids()._asdict(),
-                    'gids': proc.gids()._asdict(),
-                },
-                'timing': {
-                    'create_time': datetime.fromtimestamp(proc.create_time()).isoformat(),
-                    'cpu_times': proc.cpu_times()._asdict(),
-                },
-                'memory': {
-                    'rss_mb': proc.memory_info().rss / (1024 * 1024),
-                    'vms_mb': proc.memory_info().vms / (1024 * 1024),
-                    'percent': proc.memory_percent(),
-                },
-                'threads': {
-                    'num_threads': proc.num_threads(),
-                    'threads': [t.id for t in proc.threads()] if hasattr(proc, 'threads') else []
-                },
-                'files': [],
-                'connections': []
-            }
+            # oneshot(): stat/status/statm letti una volta per tutti i campi
+            with proc.oneshot():
+                exe = proc.exe()
+                cwd = proc.cwd()
+                memory = proc.memory_info()
+                details = {
+                    'basic': {
+                        'pid': proc.pid,
+                        'name': proc.name(),
+                        'exe': exe if exe else 'N/A',
+                        'cwd': cwd if cwd else 'N/A',
+                        'cmdline': proc.cmdline(),
+                        'status': proc.status(),
+                    },
+                    'user': {
+                        'username': proc.username(),
+                        'uids': proc.uids()._asdict(),
+                        'gids': proc.gids()._asdict(),
+                    },
+                    'timing': {
+                        'create_time': datetime.fromtimestamp(proc.create_time()).isoformat(),
+                        'cpu_times': proc.cpu_times()._asdict(),
+                    },
+                    'memory': {
+                        'rss_mb': memory.rss / (1024 * 1024),
+                        'vms_mb': memory.vms / (1024 * 1024),
+                        'percent': proc.memory_percent(),
+                    },
+                    'threads': {
+                        'num_threads': proc.num_threads(),
+                        'threads': [t.id for t in proc.threads()] if hasattr(proc, 'threads') else []
+                    },
+                    'files': [],
+                    'connections': []
+                }
 
             # Ottieni file aperti (richiede permessi)
             try:
@@ -221,21 +499,22 @@ class ProcessManager:
         except psutil.AccessDenied:
             return {'error': 'Access denied - insufficient permissions'}
 
-    def search_processes(self, search_term: str) -> List[ProcessInfo]:
+    def search_processes(self, search_term: str, refresh: bool = True) -> List[ProcessInfo]:
         """
         Cerca processi per nome.
 
         Args:
             search_term: Termine di ricerca (case-insensitive)
+            refresh: Se False, cerca nello snapshot corrente (può
+                contenere processi già terminati)
 
         Returns:
             Lista di ProcessInfo che corrispondono
         """
-        all_processes = self.get_all_processes()
         search_lower = search_term.lower()
 
         return [
-            proc for proc in all_processes
+            proc for proc in self.snapshot(refresh=refresh)
             if search_lower in proc.name.lower()
         ]
 
@@ -264,12 +543,13 @@ class ProcessManager:
         else:
             return processes
 
-    def get_process_children(self, pid: int) -> List[ProcessInfo]:
+    def get_process_children(self, pid: int, refresh: bool = True) -> List[ProcessInfo]:
         """
         Ottiene i processi figli di un dato processo.
 
         Args:
             pid: PID del processo padre
+            refresh: Se False, usa lo snapshot corrente
 
         Returns:
             Lista di ProcessInfo figli
@@ -279,48 +559,27 @@ class ProcessManager:
         - Ogni processo ha un processo padre (tranne init)
         - fork() crea un processo figlio
         """
-        try:
-            proc = psutil.Process(pid)
-            children = []
-
-            for child in proc.children(recursive=False):
-                try:
-                    memory_mb = child.memory_info().rss / (1024 * 1024)
-                    child_info = ProcessInfo(
-                        pid=child.pid,
-                        name=child.name(),
-                        cpu_percent=child.cpu_percent(),
-                        memory_percent=child.memory_percent(),
-                        memory_mb=memory_mb,
-                        status=child.status(),
-                        ppid=child.ppid(),
-                        num_threads=child.num_threads(),
-                        create_time=child.create_time()
-                    )
-                    children.append(child_info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            return children
-
-        except psutil.NoSuchProcess:
-            return []
-        except psutil.AccessDenied:
-            return []
+        return self.snapshot(refresh=refresh).children(pid)
 
     def get_process_count(self) -> int:
         """
         Ottiene il numero totale di processi in esecuzione.
 
         Returns:
-            Numero di processi
+            Numero di processi (dallo snapshot corrente, se presente)
         """
+        if self._snapshot is not None:
+            return len(self._snapshot)
         return len(psutil.pids())
 
-    def get_system_stats(self) -> Dict:
+    def get_system_stats(self, cpu_interval: Optional[float] = 0.1) -> Dict:
         """
         Ottiene statistiche di sistema generali.
 
+        Args:
+            cpu_interval: Secondi di campionamento della CPU; None usa il
+                delta dalla chiamata precedente (non bloccante, per il watch)
+
         Returns:
             Dizionario con statistiche CPU, memoria, etc.
 
@@ -329,19 +588,26 @@ class ProcessManager:
         - Memory Info: RAM totale, usata, disponibile
         - Swap Info: Memoria virtuale su disco
         """
+        # Una lettura di /proc/meminfo: riusa quella dello snapshot se c'è
+        if self._snapshot is not None and self._snapshot.memory is not None:
+            memory = self._snapshot.memory
+        else:
+            memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+
         return {
-            'cpu_percent': psutil.cpu_percent(interval=0.1),
+            'cpu_percent': psutil.cpu_percent(interval=cpu_interval),
             'cpu_count': psutil.cpu_count(),
             'memory': {
-                'total_gb': psutil.virtual_memory().total / (1024**3),
-                'available_gb': psutil.virtual_memory().available / (1024**3),
-                'used_gb': psutil.virtual_memory().used / (1024**3),
-                'percent': psutil.virtual_memory().percent
+                'total_gb': memory.total / (1024**3),
+                'available_gb': memory.available / (1024**3),
+                'used_gb': memory.used / (1024**3),
+                'percent': memory.percent
             },
             'swap': {
-                'total_gb': psutil.swap_memory().total / (1024**3),
-                'used_gb': psutil.swap_memory().used / (1024**3),
-                'percent': psutil.swap_memory().percent
+                'total_gb': swap.total / (1024**3),
+                'used_gb': swap.used / (1024**3),
+                'percent': swap.percent
             },
             'process_count': self.get_process_count()
         }
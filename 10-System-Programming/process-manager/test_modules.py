@@ -49,6 +49,7 @@ def main():
         ("filter", "filter"),
         ("sort", "sort"),
         ("killer", "killer"),
+        ("watcher", "watcher"),
     ]
 
     results = {}
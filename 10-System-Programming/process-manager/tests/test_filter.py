@@ -0,0 +1,116 @@
+"""
+Unit test per ProcessQuery
+Parsing e compilazione del linguaggio di query su uno snapshot fisso
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from filter import ProcessIndex, ProcessQuery, ProcessSearcher
+from process import ProcessInfo, ProcessSnapshot
+
+PROCESSES = [
+    ProcessInfo(1, 'systemd', 0.0, 0.1, 12.0, 'sleeping', 0, 1, 0.0),
+    ProcessInfo(100, 'nginx', 2.5, 0.5, 40.0, 'sleeping', 1, 1, 0.0),
+    ProcessInfo(101, 'nginx', 7.0, 1.5, 250.0, 'running', 100, 4, 0.0),
+    ProcessInfo(200, 'python3', 12.0, 3.0, 512.0, 'running', 1, 8, 0.0),
+    ProcessInfo(201, 'Python', 0.5, 0.2, 20.0, 'sleeping', 200, 2, 0.0),
+    ProcessInfo(300, '/usr/bin/my app', 1.0, 0.1, 8.0, 'zombie', 1, 1, 0.0),
+]
+
+
+def run(query):
+    index = ProcessIndex(ProcessSnapshot(PROCESSES, {}, 0.0))
+    compiled = query if isinstance(query, ProcessQuery) else ProcessQuery(query)
+    return [proc.pid for proc in compiled.run(index)]
+
+
+class TestProcessQuery(unittest.TestCase):
+    """Test per il parsing e l'esecuzione delle query"""
+
+    def test_numeric_operators(self):
+        """Operatori numerici su cpu, mem, threads, pid e ppid"""
+        self.assertEqual(run('cpu>5'), [101, 200])
+        self.assertEqual(run('cpu>=7 mem<300'), [101])
+        self.assertEqual(run('threads!=1'), [101, 200, 201])
+        self.assertEqual(run('pid=200'), [200])
+        self.assertEqual(run('ppid=1'), [100, 200, 300])
+        self.assertEqual(run('ppid=1 memory>=40'), [100, 200])
+
+    def test_text_operators(self):
+        """= esatto, ~ sottostringa case-insensitive, negazioni"""
+        self.assertEqual(run('name=nginx'), [100, 101])
+        self.assertEqual(run('name~PYTH'), [200, 201])
+        self.assertEqual(run('name!~nginx status=running'), [200])
+        self.assertEqual(run('status!=sleeping'), [101, 200, 300])
+
+    def test_regex_and_quoting(self):
+        """/regex/ e valori tra virgolette con spazi"""
+        self.assertEqual(run('name~/^python[23]?$/'), [200, 201])
+        self.assertEqual(run('"name~my app"'), [300])
+        self.assertEqual(run("name='/usr/bin/my app'"), [300])
+
+    def test_empty_query(self):
+        """Una query vuota restituisce tutti i processi"""
+        self.assertEqual(run(''), [proc.pid for proc in PROCESSES])
+
+    def test_invalid_queries(self):
+        """Errori di sintassi, campi e valori diventano ValueError"""
+        for query in ('cpu', 'foo=1', 'cpu~5', 'name>3', 'cpu>abc',
+                      'name~/[/', 'name="open'):
+            with self.assertRaises(ValueError, msg=query):
+                ProcessQuery(query)
+
+    def test_from_terms_literal(self):
+        """I termini strutturati non interpretano /.../ né le virgolette"""
+        self.assertEqual(run(ProcessQuery.from_terms([('name', '~', '/usr/')])), [300])
+        self.assertEqual(run(ProcessQuery.from_terms([('name', '~', '/^nginx$/')])), [])
+        self.assertEqual(run(ProcessQuery.from_terms([('name', '~', "my app"),
+                                                      ('cpu', '>=', 0.5)])), [300])
+
+
+class StubManager:
+    """ProcessManager minimo: conta i refresh dello snapshot"""
+
+    def __init__(self):
+        self.refreshes = 0
+        self._snapshot = None
+
+    def get_all_processes(self, cache=False):
+        return list(self.snapshot(refresh=not cache).processes)
+
+    def snapshot(self, refresh=False):
+        if refresh or self._snapshot is None:
+            self.refreshes += 1
+            self._snapshot = ProcessSnapshot(PROCESSES, {}, 0.0)
+        return self._snapshot
+
+
+class TestProcessSearcher(unittest.TestCase):
+    """Test per ProcessSearcher"""
+
+    def test_query_refreshes_by_default(self):
+        """Ogni query legge un nuovo snapshot, salvo refresh=False"""
+        manager = StubManager()
+        searcher = ProcessSearcher(manager)
+        searcher.query('cpu>5')
+        searcher.query('cpu>5')
+        self.assertEqual(manager.refreshes, 2)
+        searcher.query('cpu>1', refresh=False)
+        self.assertEqual(manager.refreshes, 2)
+
+    def test_advanced_search_name_is_literal(self):
+        """advanced_search cerca il nome come sottostringa, non come regex"""
+        searcher = ProcessSearcher(StubManager())
+        self.assertEqual([p.pid for p in searcher.advanced_search(name='/usr/')], [300])
+        self.assertEqual([p.pid for p in searcher.advanced_search(name='NGINX', min_cpu=5)],
+                         [101])
+        self.assertEqual([p.pid for p in searcher.advanced_search(name='.*')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
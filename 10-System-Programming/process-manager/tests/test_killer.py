@@ -0,0 +1,105 @@
+"""
+Unit test per ProcessKiller.kill_many
+Escalation SIGTERM -> SIGKILL con scadenza condivisa
+"""
+
+import os
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import psutil
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from killer import ProcessKiller, TerminateMethod, TerminationResult
+
+# Processo che ignora SIGTERM: termina solo con SIGKILL
+STUBBORN = ("import signal, sys, time\n"
+            "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+            "sys.stdout.write('ready\\n'); sys.stdout.flush()\n"
+            "time.sleep(60)\n")
+
+
+@unittest.skipUnless(hasattr(os, 'killpg'), "Richiede segnali POSIX")
+class TestKillMany(unittest.TestCase):
+    """Test per la terminazione in blocco"""
+
+    def setUp(self):
+        self.killer = ProcessKiller(require_confirmation=False)
+        self.children = []
+
+    def tearDown(self):
+        for child in self.children:
+            if child.poll() is None:
+                child.kill()
+            child.wait()
+            if child.stdout:
+                child.stdout.close()
+
+    def spawn(self, stubborn=False, **kwargs):
+        if stubborn:
+            child = subprocess.Popen([sys.executable, '-c', STUBBORN],
+                                     stdout=subprocess.PIPE, **kwargs)
+            child.stdout.readline()  # handler installato
+        else:
+            child = subprocess.Popen(['sleep', '60'], **kwargs)
+        self.children.append(child)
+        return child
+
+    def test_escalation_only_for_survivors(self):
+        """SIGTERM a tutti, SIGKILL solo a chi lo ignora, entro un'unica scadenza"""
+        polite = [self.spawn() for _ in range(3)]
+        stubborn = [self.spawn(stubborn=True) for _ in range(2)]
+
+        start = time.monotonic()
+        results = self.killer.kill_many([c.pid for c in polite + stubborn], timeout=0.5)
+        elapsed = time.monotonic() - start
+
+        for child in polite:
+            self.assertEqual(results[child.pid], TerminationResult.SUCCESS)
+        for child in stubborn:
+            self.assertEqual(results[child.pid], TerminationResult.KILLED)
+        for child in polite + stubborn:
+            self.assertFalse(psutil.pid_exists(child.pid))
+        # Scadenza condivisa, non timeout per processo
+        self.assertLess(elapsed, 0.5 + ProcessKiller.KILL_TIMEOUT)
+
+    def test_missing_and_duplicate_pids(self):
+        """PID inesistenti e duplicati non interrompono gli altri"""
+        child = self.spawn()
+        missing = child.pid
+        while True:
+            missing += 1000
+            try:
+                os.kill(missing, 0)
+            except ProcessLookupError:
+                break
+            except PermissionError:
+                continue
+
+        results = self.killer.kill_many([child.pid, missing, child.pid], timeout=1)
+        self.assertEqual(results, {child.pid: TerminationResult.SUCCESS,
+                                   missing: TerminationResult.NOT_FOUND})
+
+    def test_sigkill_no_wait(self):
+        """Con SIGKILL non c'è attesa né escalation"""
+        child = self.spawn(stubborn=True)
+        results = self.killer.kill_many([child.pid], method=TerminateMethod.SIGKILL)
+        self.assertEqual(results[child.pid], TerminationResult.SUCCESS)
+        self.assertEqual(child.wait(timeout=2), -9)
+
+    def test_process_group(self):
+        """Un process group viene segnalato con una sola killpg()"""
+        leader = self.spawn(start_new_session=True)
+        results = self.killer.kill_many([leader.pid], timeout=1,
+                                        process_groups=[leader.pid])
+        self.assertEqual(results[leader.pid], TerminationResult.SUCCESS)
+        self.assertFalse(psutil.pid_exists(leader.pid))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+"""
+Unit test per ProcReader e ProcessSnapshot
+Parsing di /proc/<pid>/stat e statm su file fissi e calcolo della CPU %
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import psutil
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import process
+from process import ProcReader, ProcessInfo, ProcessSnapshot
+
+# Campi dopo il nome: state(3) ppid(4) ... utime(14) stime(15) ...
+# num_threads(20) itrealvalue(21) starttime(22) vsize(23) rss(24) ...
+STAT_TAIL = ("{state} {ppid} 4242 4242 0 -1 4194560 1500 0 3 0 {utime} {stime} "
+             "7 2 20 0 {threads} 0 {starttime} 123863040 2900 18446744073709551615")
+
+
+def stat_line(pid, comm, state='S', ppid=1, utime=250, stime=50, threads=7,
+              starttime=123456):
+    return f"{pid} ({comm}) " + STAT_TAIL.format(
+        state=state, ppid=ppid, utime=utime, stime=stime,
+        threads=threads, starttime=starttime) + "\n"
+
+
+class TestProcReader(unittest.TestCase):
+    """Test per il parsing di /proc su una directory finta"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader = ProcReader()
+        self.reader.PROC_PATH = self.tmp.name
+        self.ticks = self.reader.clock_ticks
+        self.page = self.reader.page_size
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, pid, stat, statm="5000 300 120 10 0 400 0\n", cmdline=None):
+        base = os.path.join(self.tmp.name, str(pid))
+        os.makedirs(base, exist_ok=True)
+        with open(os.path.join(base, 'stat'), 'w') as f:
+            f.write(stat)
+        with open(os.path.join(base, 'statm'), 'w') as f:
+            f.write(statm)
+        if cmdline is not None:
+            with open(os.path.join(base, 'cmdline'), 'wb') as f:
+                f.write(cmdline)
+
+    def test_stat_fields(self):
+        """PPID, tempi CPU, thread, avvio e RSS dagli indici di proc(5)"""
+        self.write(4242, stat_line(4242, 'nginx', state='R', ppid=17, utime=250,
+                                   stime=50, threads=9, starttime=123456))
+        pid, name, status, ppid, threads, created, cpu, rss = self.reader.read(4242)
+
+        self.assertEqual((pid, name, status, ppid, threads), (4242, 'nginx', 'running', 17, 9))
+        self.assertAlmostEqual(cpu, 300 / self.ticks)
+        self.assertAlmostEqual(created, 123456 / self.ticks + self.reader.boot_time)
+        # statm: il secondo campo è la RSS in pagine
+        self.assertEqual(rss, 300 * self.page)
+
+    def test_comm_with_spaces_and_parenthesis(self):
+        """Il nome tra parentesi può contenere spazi e ')'"""
+        self.write(77, stat_line(77, 'a) b (c', state='Z', ppid=3, threads=1))
+        raw = self.reader.read(77)
+        self.assertEqual(raw[1:5], ('a) b (c', 'zombie', 3, 1))
+
+    def test_truncated_comm_extended_from_cmdline(self):
+        """comm a 15 caratteri viene completato con argv[0] se ne è il prefisso"""
+        self.write(10, stat_line(10, 'very-long-daemo'),
+                   cmdline=b'/usr/sbin/very-long-daemon-name\0--flag\0')
+        self.write(11, stat_line(11, 'kworker/u16:3-e'), cmdline=b'')
+        self.assertEqual(self.reader.read(10)[1], 'very-long-daemon-name')
+        self.assertEqual(self.reader.read(11)[1], 'kworker/u16:3-e')
+
+    def test_pid_reuse(self):
+        """Con lo stesso starttime il nome è riusato, con uno nuovo è riletto"""
+        self.write(5, stat_line(5, 'first', starttime=1000))
+        self.assertEqual(self.reader.read(5)[1], 'first')
+
+        # Stesso processo (es. prctl PR_SET_NAME): dati statici dalla cache
+        self.write(5, stat_line(5, 'renamed', starttime=1000, utime=999))
+        raw = self.reader.read(5)
+        self.assertEqual(raw[1], 'first')
+        self.assertAlmostEqual(raw[6], (999 + 50) / self.ticks)
+
+        # PID riusato da un altro processo
+        self.write(5, stat_line(5, 'second', starttime=2000))
+        raw = self.reader.read(5)
+        self.assertEqual(raw[1], 'second')
+        self.assertAlmostEqual(raw[5], 2000 / self.ticks + self.reader.boot_time)
+
+    def test_read_all(self):
+        """Solo le directory numeriche; i processi spariti sono saltati e dimenticati"""
+        self.write(1, stat_line(1, 'init', ppid=0))
+        self.write(2, stat_line(2, 'kthreadd', ppid=0))
+        os.makedirs(os.path.join(self.tmp.name, '3'))
+        os.makedirs(os.path.join(self.tmp.name, 'self'))
+
+        self.assertEqual(sorted(raw[0] for raw in self.reader.read_all()), [1, 2])
+        self.assertIsNone(self.reader.read(99))
+
+        shutil.rmtree(os.path.join(self.tmp.name, '2'))
+        self.assertEqual([raw[0] for raw in self.reader.read_all()], [1])
+        self.assertEqual(set(self.reader._known), {1})
+
+
+@unittest.skipUnless(ProcReader.available(), "Richiede /proc (Linux)")
+class TestProcReaderLive(unittest.TestCase):
+    """Confronto con psutil sul processo corrente"""
+
+    def test_matches_psutil(self):
+        """Stessi PPID, thread, ora di avvio e ordine di grandezza della RSS"""
+        proc = psutil.Process()
+        pid, name, status, ppid, threads, created, cpu, rss = ProcReader().read(os.getpid())
+
+        self.assertEqual((pid, name, ppid), (proc.pid, proc.name(), proc.ppid()))
+        self.assertEqual(threads, proc.num_threads())
+        self.assertAlmostEqual(created, proc.create_time(), delta=0.05)
+        self.assertAlmostEqual(rss, proc.memory_info().rss, delta=16 * 1024 * 1024)
+
+
+class FakeReader:
+    """Lettore con righe RawProcess fisse"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def read_all(self):
+        return iter(self.rows)
+
+
+class TestProcessSnapshot(unittest.TestCase):
+    """Test per la CPU % e l'indice dei figli dello snapshot"""
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = SimpleNamespace(monotonic=lambda: self.now)
+        patcher = mock.patch.object(process, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def capture(self, rows, previous=None):
+        return ProcessSnapshot.capture(previous, FakeReader(rows))
+
+    def test_cpu_percent_between_snapshots(self):
+        """Delta del tempo CPU / tempo trascorso; 0.0 al primo giro e per i PID riusati"""
+        first = self.capture([
+            (1, 'init', 'sleeping', 0, 1, 10.0, 5.0, 4096),
+            (2, 'worker', 'running', 1, 4, 20.0, 1.0, 4096),
+            (3, 'old', 'sleeping', 1, 1, 30.0, 2.0, 4096),
+        ])
+        self.assertEqual([p.cpu_percent for p in first], [0.0, 0.0, 0.0])
+
+        self.now += 2.0
+        second = self.capture([
+            (1, 'init', 'sleeping', 0, 1, 10.0, 5.0, 4096),
+            (2, 'worker', 'running', 1, 4, 20.0, 2.5, 4096),
+            (3, 'new', 'sleeping', 1, 1, 31.0, 9.0, 4096),
+            (4, 'fresh', 'running', 1, 1, 40.0, 3.0, 4096),
+        ], previous=first)
+
+        cpu = {p.pid: p.cpu_percent for p in second}
+        self.assertEqual(cpu, {1: 0.0, 2: 75.0, 3: 0.0, 4: 0.0})
+        self.assertEqual(second.get(3).name, 'new')
+        self.assertEqual(second.cpu_times[2], (20.0, 2.5))
+
+    def test_children_index(self):
+        """Figli per PPID in ordine di PID; un processo non è figlio di se stesso"""
+        processes = [ProcessInfo(pid, f'p{pid}', 0.0, 0.0, 0.0, 'sleeping', ppid, 1, 0.0)
+                     for pid, ppid in ((0, 0), (1, 0), (30, 1), (10, 1), (20, 10))]
+        snapshot = ProcessSnapshot(processes, {}, 0.0)
+
+        self.assertEqual([p.pid for p in snapshot.children(1)], [10, 30])
+        self.assertEqual([p.pid for p in snapshot.children(0)], [1])
+        self.assertEqual(snapshot.children(20), [])
+        self.assertIn(20, snapshot)
+        self.assertEqual(len(snapshot), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
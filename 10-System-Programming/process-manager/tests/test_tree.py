@@ -0,0 +1,97 @@
+"""
+Unit test per ProcessTreeBuilder e ProcessTreeRenderer
+Indice padre -> figli e visite iterative, anche su catene profonde
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from process import ProcessInfo, ProcessSnapshot
+from tree import ProcessTreeBuilder, ProcessTreeRenderer
+
+# Più profonda del limite di ricorsione predefinito (1000)
+CHAIN_LENGTH = 6000
+
+
+def proc(pid, ppid):
+    return ProcessInfo(pid, f'p{pid}', 0.0, 0.0, 1.0, 'sleeping', ppid, 1, 0.0)
+
+
+class StubManager:
+    """ProcessManager con uno snapshot fisso"""
+
+    def __init__(self, processes):
+        self.processes = processes
+
+    def snapshot(self, refresh=False):
+        return ProcessSnapshot(self.processes, {}, 0.0)
+
+
+class TestProcessTree(unittest.TestCase):
+    """Test per la costruzione e la visita dell'albero"""
+
+    def setUp(self):
+        # 1 -> (5 -> 7, 3 -> (4, 9)), 2 orfano di un padre assente
+        self.processes = [proc(9, 3), proc(1, 0), proc(5, 1), proc(3, 1),
+                          proc(4, 3), proc(7, 5), proc(2, 42)]
+        self.builder = ProcessTreeBuilder(StubManager(self.processes))
+
+    def test_subtree_from_children_index(self):
+        """Figli in ordine di PID, profondità e statistiche del sottoalbero"""
+        root = self.builder.build_subtree(1)
+        self.assertEqual([c.process.pid for c in root.children], [3, 5])
+        self.assertEqual([c.process.pid for c in root.children[0].children], [4, 9])
+        self.assertEqual(root.children[0].children[1].depth, 2)
+        self.assertEqual(self.builder.get_tree_stats(root), {
+            'total_nodes': 6, 'max_depth': 2, 'leaf_count': 3, 'direct_children': 2,
+        })
+        self.assertIsNone(self.builder.build_subtree(999))
+
+    def test_build_tree_roots(self):
+        """Radici per PID, anche se un figlio precede il padre nella lista"""
+        roots = self.builder.build_tree(self.processes)
+        self.assertEqual([r.process.pid for r in roots], [1, 2])
+        self.assertEqual(self.builder.process_map[9].depth, 2)
+
+    def test_render_preorder(self):
+        """Il rendering segue il pre-ordine con i connettori corretti"""
+        root = self.builder.build_subtree(1)
+        text = ProcessTreeRenderer(use_unicode=False).render_compact(root)
+        self.assertEqual(text.splitlines(), [
+            "p1 (1)",
+            "|- p3 (3)",
+            "| |- p4 (4)",
+            "| `- p9 (9)",
+            "`- p5 (5)",
+            "   `- p7 (7)",
+        ])
+
+    def test_deep_chain(self):
+        """Una catena oltre il limite di ricorsione: dimensione e ordine"""
+        self.assertGreater(CHAIN_LENGTH, sys.getrecursionlimit())
+        chain = [proc(pid, pid - 1) for pid in range(1, CHAIN_LENGTH + 1)]
+        builder = ProcessTreeBuilder(StubManager(chain[::-1]))
+
+        root = builder.build_subtree(1)
+        stats = builder.get_tree_stats(root)
+        self.assertEqual(stats['total_nodes'], CHAIN_LENGTH)
+        self.assertEqual(stats['max_depth'], CHAIN_LENGTH - 1)
+        self.assertEqual(stats['leaf_count'], 1)
+
+        renderer = ProcessTreeRenderer()
+        walked = [node.process.pid for node, _, _ in renderer._walk(root)]
+        self.assertEqual(walked, list(range(2, CHAIN_LENGTH + 1)))
+        self.assertEqual(len(renderer.render(root, max_depth=10).splitlines()), 11)
+
+        # build_tree sulla lista completa: profondità dalla visita iterativa
+        roots = builder.build_tree(chain[::-1])
+        self.assertEqual([r.process.pid for r in roots], [1])
+        self.assertEqual(builder.process_map[CHAIN_LENGTH].depth, CHAIN_LENGTH - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Unit test per ProcessWatcher e DeltaRenderer
+Refresh incrementale su snapshot finti e ridisegno delle sole righe cambiate
+"""
+
+import io
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Aggiungi la directory parent al path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import process
+from process import ProcessManager
+from watcher import DeltaRenderer, ProcessWatcher
+
+
+class ScriptedReader:
+    """Lettore che restituisce un giro di righe RawProcess per ogni read_all()"""
+
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+
+    def read_all(self):
+        return iter(self.rounds.pop(0))
+
+
+def row(pid, cpu, created=100.0, name=None):
+    return (pid, name or f'proc{pid}', 'running', 1, 1, created, cpu, 4096)
+
+
+class TestProcessWatcher(unittest.TestCase):
+    """Test del delta tra refresh e della CPU % campionata tra i tick"""
+
+    def setUp(self):
+        self.now = 500.0
+        clock = SimpleNamespace(monotonic=lambda: self.now)
+        patcher = mock.patch.object(process, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def watcher(self, rounds, limit=10):
+        manager = ProcessManager()
+        manager.reader = ScriptedReader(rounds)
+        watcher = ProcessWatcher(manager, sort_by='cpu', limit=limit)
+        watcher.PRIME_INTERVAL = 0
+        return watcher
+
+    def test_delta_and_cpu_sampling(self):
+        """PID nuovi e terminati tra due tick; CPU % dal delta dei tempi CPU"""
+        watcher = self.watcher([
+            # Campionamento iniziale (prime)
+            [row(1, 10.0), row(10, 1.0), row(20, 2.0), row(30, 5.0)],
+            # Primo frame, un secondo dopo
+            [row(1, 10.0), row(10, 1.5), row(20, 2.1), row(30, 5.0, created=200.0),
+             row(40, 7.0)],
+            # Secondo frame, due secondi dopo
+            [row(1, 10.5), row(10, 1.5), row(40, 9.0)],
+        ])
+        watcher.prime()
+        self.now += 1.0
+        frame = watcher.refresh()
+
+        self.assertEqual(frame.added, {40})
+        self.assertEqual(frame.exited, set())
+        self.assertEqual(frame.total, 5)
+        cpu = {p.pid: p.cpu_percent for p in frame.processes}
+        # PID 30 riusato (create_time diverso) e PID 40 nuovo: nessun campione
+        self.assertEqual(cpu, {1: 0.0, 10: 50.0, 20: 10.0, 30: 0.0, 40: 0.0})
+        self.assertEqual([p.pid for p in frame.processes][:2], [10, 20])
+
+        self.now += 2.0
+        frame = watcher.refresh()
+        self.assertEqual(frame.added, set())
+        self.assertEqual(frame.exited, {20, 30})
+        self.assertEqual(watcher.known_pids, {1, 10, 40})
+        self.assertEqual([(p.pid, p.cpu_percent) for p in frame.processes],
+                         [(40, 100.0), (1, 25.0), (10, 0.0)])
+
+    def test_limit(self):
+        """Il frame contiene solo i primi 'limit' processi, il totale è completo"""
+        rows = [row(pid, 0.0) for pid in range(1, 8)]
+        watcher = self.watcher([rows, rows], limit=3)
+        watcher.prime()
+        self.now += 1.0
+        frame = watcher.refresh()
+        self.assertEqual((len(frame.processes), frame.total), (3, 7))
+
+
+class TestDeltaRenderer(unittest.TestCase):
+    """Test del ridisegno incrementale"""
+
+    def test_only_changed_lines(self):
+        """Primo frame completo, poi solo le righe diverse o sparite"""
+        out = io.StringIO()
+        renderer = DeltaRenderer(out)
+
+        self.assertEqual(renderer.render(['a', 'b', 'c']), 3)
+        self.assertTrue(out.getvalue().startswith('\033[2J'))
+
+        out.seek(0)
+        out.truncate()
+        self.assertEqual(renderer.render(['a', 'B', 'c']), 1)
+        self.assertIn('\033[2;1HB\033[K', out.getvalue())
+        self.assertNotIn('\033[2J', out.getvalue())
+
+        # Frame più corto: le righe in eccesso vengono cancellate
+        self.assertEqual(renderer.render(['a']), 2)
+        self.assertEqual(renderer.render(['a']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,8 @@ Concetti educativi:
 - Parent-Child: fork() crea un figlio che eredita dal padre
 - Orphan Process: Processo il cui padre è terminato (adottato da init)
 - Zombie Process: Processo terminato ma ancora nella tabella dei processi
+- Adjacency Index: Mappa padre -> figli, costruita una volta per snapshot
+- Iterative Traversal: Visita con stack esplicito (nessun limite di ricorsione)
 """
 
 from typing import List, Dict, Optional
@@ -37,9 +39,14 @@ class ProcessTreeBuilder:
     Ogni altro processo è un discendente di init.
     """
 
-    def __init__(self):
-        """Inizializza il builder dell'albero"""
-        self.manager = ProcessManager()
+    def __init__(self, manager: Optional[ProcessManager] = None):
+        """
+        Inizializza il builder dell'albero
+
+        Args:
+            manager: ProcessManager da riusare (default: nuovo)
+        """
+        self.manager = manager or ProcessManager()
         self.process_map: Dict[int, TreeNode] = {}
         self.root_nodes: List[TreeNode] = []
 
@@ -53,10 +60,11 @@ class ProcessTreeBuilder:
         Returns:
             Lista di nodi radice (alberi)
 
-        Algoritmo:
+        Algoritmo (O(n)):
         1. Crea una mappa PID -> TreeNode per tutti i processi
         2. Per ogni processo, trova il padre e aggiungi se stesso come figlio
         3. I processi senza padre (o padre non trovato) diventano radici
+        4. Assegna le profondità visitando dalle radici
         """
         self.process_map = {}
         self.root_nodes = []
@@ -69,11 +77,11 @@ class ProcessTreeBuilder:
         for proc in processes:
             node = self.process_map[proc.pid]
 
-            # Cerca il padre
-            if proc.ppid in self.process_map:
+            # Cerca il padre (un processo non è mai padre di se stesso, es. PID 0)
+            parent_node = self.process_map.get(proc.ppid)
+            if parent_node is not None and proc.ppid != proc.pid:
                 # Padre trovato, aggiungi come figlio
-                parent_node = self.process_map[proc.ppid]
-                parent_node.add_child(node)
+                parent_node.children.append(node)
             else:
                 # Padre non trovato (processo radice o orfano)
                 self.root_nodes.append(node)
@@ -81,6 +89,14 @@ class ProcessTreeBuilder:
         # Ordina le radici per PID
         self.root_nodes.sort(key=lambda n: n.process.pid)
 
+        # Fase 3: Profondità, valide anche se un figlio precede il padre nella lista
+        stack = list(self.root_nodes)
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                child.depth = node.depth + 1
+            stack.extend(node.children)
+
         return self.root_nodes
 
     def build_subtree(self, root_pid: int) -> Optional[TreeNode]:
@@ -92,38 +108,30 @@ class ProcessTreeBuilder:
 
         Returns:
             TreeNode radice del sottoalbero, o None se non trovato
+
+        Algoritmo: visita iterativa sull'indice padre -> figli dello
+        snapshot, O(dimensione del sottoalbero)
         """
-        root_process = self.manager.get_process_by_pid(root_pid)
+        # Un solo snapshot: radice, mappa e figli arrivano dalla stessa lettura
+        snapshot = self.manager.snapshot(refresh=True)
+        root_process = snapshot.get(root_pid)
         if not root_process:
             return None
 
-        # Ottieni tutti i processi per costruire la mappa
-        all_processes = self.manager.get_all_processes()
-
-        # Crea mappa per ricerca veloce
-        proc_map = {p.pid: p for p in all_processes}
-
-        # Funzione ricorsiva per costruire l'albero
-        def build_node(pid: int, depth: int = 0) -> Optional[TreeNode]:
-            if pid not in proc_map:
-                return None
-
-            proc = proc_map[pid]
-            node = TreeNode(process=proc, children=[], depth=depth)
-
-            # Trovi i figli diretti
-            for p in all_processes:
-                if p.ppid == pid:
-                    child_node = build_node(p.pid, depth + 1)
-                    if child_node:
-                        node.add_child(child_node)
+        children_index = snapshot.children_index()
+        root = TreeNode(process=root_process, children=[])
 
-            # Ordina i figli per PID
-            node.children.sort(key=lambda n: n.process.pid)
+        # Stack esplicito: nessun limite di ricorsione su catene profonde
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            # I figli nell'indice sono già ordinati per PID
+            for child in children_index.get(node.process.pid, ()):
+                child_node = TreeNode(process=child, children=[], depth=node.depth + 1)
+                node.children.append(child_node)
+                stack.append(child_node)
 
-            return node
-
-        return build_node(root_pid)
+        return root
 
     def get_tree_stats(self, root: TreeNode) -> Dict:
         """
@@ -135,29 +143,26 @@ class ProcessTreeBuilder:
         Returns:
             Dizionario con statistiche (numero nodi, profondità max, etc.)
         """
-        def count_nodes(node: TreeNode) -> int:
-            """Conta ricorsivamente i nodi"""
-            count = 1
-            for child in node.children:
-                count += count_nodes(child)
-            return count
-
-        def max_depth(node: TreeNode) -> int:
-            """Calcola la profondità massima"""
-            if not node.children:
-                return node.depth
-            return max(max_depth(child) for child in node.children)
-
-        def count_leaves(node: TreeNode) -> int:
-            """Conta i nodi foglia (senza figli)"""
-            if not node.children:
-                return 1
-            return sum(count_leaves(child) for child in node.children)
+        total_nodes = 0
+        leaf_count = 0
+        max_depth = root.depth
+
+        # Una sola visita iterativa per tutte le statistiche
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            total_nodes += 1
+            if node.children:
+                stack.extend(node.children)
+            else:
+                leaf_count += 1
+                if node.depth > max_depth:
+                    max_depth = node.depth
 
         return {
-            'total_nodes': count_nodes(root),
-            'max_depth': max_depth(root),
-            'leaf_count': count_leaves(root),
+            'total_nodes': total_nodes,
+            'max_depth': max_depth,
+            'leaf_count': leaf_count,
             'direct_children': len(root.children)
         }
 
@@ -216,42 +221,52 @@ class ProcessTreeRenderer:
         Returns:
             Stringa rappresentante l'albero
         """
-        lines = []
-
-        def render_node(node: TreeNode, prefix: str = '', is_last: bool = True):
-            if max_depth >= 0 and node.depth > max_depth:
-                return
+        # Renderizza la radice
+        lines = [self._format_process(root.process, show_pid, show_cpu, show_memory)]
 
-            # Crea il prefisso per il nodo corrente
+        # Renderizza i discendenti in pre-ordine
+        for node, prefix, is_last in self._walk(root, max_depth):
             connector = self.chars['last'] if is_last else self.chars['branch']
             line = f"{prefix}{connector} "
-
-            # Aggiungi info processo
             line += self._format_process(node.process, show_pid, show_cpu, show_memory)
             lines.append(line)
 
-            # Prepara prefisso per i figli
-            new_prefix = prefix
-            if is_last:
-                new_prefix += self.chars['indent'] + ' '
-            else:
-                new_prefix += self.chars['vertical'] + ' '
+        return '\n'.join(lines)
 
-            # Renderizza i figli
-            for i, child in enumerate(node.children):
-                is_last_child = (i == len(node.children) - 1)
-                render_node(child, new_prefix, is_last_child)
+    def _walk(self, root: TreeNode, max_depth: int = -1):
+        """
+        Visita iterativa dei discendenti della radice (pre-ordine).
 
-        # Renderizza la radice
-        root_line = self._format_process(root.process, show_pid, show_cpu, show_memory)
-        lines.append(root_line)
+        Args:
+            root: Nodo radice (esclusa dalla visita)
+            max_depth: Profondità massima (-1 = illimitata)
 
-        # Renderizza i figli della radice
-        for i, child in enumerate(root.children):
-            is_last_child = (i == len(root.children) - 1)
-            render_node(child, '', is_last_child)
+        Yields:
+            Tuple (nodo, prefisso, è_ultimo_figlio)
 
-        return '\n'.join(lines)
+        Concetto: uno stack esplicito al posto della ricorsione, così
+        catene molto profonde non superano il limite di ricorsione
+        """
+        stack = self._child_entries(root, '')
+        while stack:
+            node, prefix, is_last = stack.pop()
+            if max_depth >= 0 and node.depth > max_depth:
+                continue
+            yield node, prefix, is_last
+
+            # Prepara prefisso per i figli
+            if is_last:
+                child_prefix = prefix + self.chars['indent'] + ' '
+            else:
+                child_prefix = prefix + self.chars['vertical'] + ' '
+            stack.extend(self._child_entries(node, child_prefix))
+
+    @staticmethod
+    def _child_entries(node: TreeNode, prefix: str) -> list:
+        """Voci dei figli per lo stack, in ordine inverso (il primo esce per primo)"""
+        children = node.children
+        last = len(children) - 1
+        return [(children[i], prefix, i == last) for i in range(last, -1, -1)]
 
     def _format_process(self, proc: ProcessInfo,
                        show_pid: bool,
@@ -281,25 +296,12 @@ class ProcessTreeRenderer:
         Returns:
             Stringa compatta
         """
-        lines = []
-
-        def render_node(node: TreeNode, prefix: str = '', is_last: bool = True):
-            connector = self.chars['last'] if is_last else self.chars['branch']
-            line = f"{prefix}{connector} {node.process.name} ({node.process.pid})"
-            lines.append(line)
-
-            new_prefix = prefix + (self.chars['indent'] + ' ' if is_last else self.chars['vertical'] + ' ')
-
-            for i, child in enumerate(node.children):
-                is_last_child = (i == len(child.children) - 1)
-                render_node(child, new_prefix, is_last_child)
-
         # Radice
-        lines.append(f"{root.process.name} ({root.process.pid})")
+        lines = [f"{root.process.name} ({root.process.pid})"]
 
-        for i, child in enumerate(root.children):
-            is_last_child = (i == len(root.children) - 1)
-            render_node(child, '', is_last_child)
+        for node, prefix, is_last in self._walk(root):
+            connector = self.chars['last'] if is_last else self.chars['branch']
+            lines.append(f"{prefix}{connector} {node.process.name} ({node.process.pid})")
 
         return '\n'.join(lines)
 
@@ -320,7 +322,7 @@ def print_process_tree(root_pid: Optional[int] = None,
         max_depth: Profondità massima
     """
     manager = ProcessManager()
-    builder = ProcessTreeBuilder()
+    builder = ProcessTreeBuilder(manager)
     renderer = ProcessTreeRenderer(use_unicode=True)
 
     if root_pid:
@@ -0,0 +1,209 @@
+"""
+Watcher Module - Modalità watch incrementale
+
+Questo modulo fornisce un watcher con stato per la modalità auto-refresh:
+mantiene lo snapshot precedente tra un refresh e l'altro e ridisegna
+solo le righe dello schermo che sono cambiate.
+
+Concetti educativi:
+- CPU Sampling: la CPU % è il delta dei tempi CPU cumulativi diviso il
+  tempo trascorso, quindi servono due letture (la prima vale sempre 0.0)
+- Refresh incrementale: i dati statici (nome, ora di avvio) vengono letti
+  solo per i PID nuovi; i PID usciti vengono dimenticati
+- Delta Rendering: con le sequenze ANSI si riposiziona il cursore e si
+  riscrivono solo le righe diverse dal frame precedente (come top)
+"""
+
+import sys
+import time
+from typing import List, Optional, Set, TextIO
+
+from process import ProcessInfo, ProcessManager
+from sort import ProcessSorter
+
+
+class WatchFrame:
+    """Risultato di un refresh del watcher"""
+
+    __slots__ = ('processes', 'total', 'added', 'exited', 'stats', 'elapsed')
+
+    def __init__(self, processes: List[ProcessInfo], total: int,
+                 added: Set[int], exited: Set[int], stats: dict, elapsed: float):
+        self.processes = processes
+        self.total = total
+        self.added = added
+        self.exited = exited
+        self.stats = stats
+        self.elapsed = elapsed
+
+
+class ProcessWatcher:
+    """
+    Watcher con stato per la modalità auto-refresh.
+
+    Usa un ProcessManager persistente: ogni refresh confronta i tempi CPU
+    con lo snapshot precedente, quindi la CPU % è significativa dal primo
+    frame mostrato (il watcher fa un campionamento iniziale breve).
+    """
+
+    # Intervallo del campionamento iniziale, prima del primo frame
+    PRIME_INTERVAL = 0.2
+
+    def __init__(self, manager: Optional[ProcessManager] = None,
+                 sort_by: str = 'cpu', limit: int = 15):
+        """
+        Inizializza il watcher.
+
+        Args:
+            manager: ProcessManager da riusare (default: nuovo)
+            sort_by: Campo di ordinamento
+            limit: Numero di processi per frame
+        """
+        self.manager = manager or ProcessManager()
+        self.sorter = ProcessSorter()
+        self.sort_by = sort_by
+        self.limit = limit
+        self.known_pids: Set[int] = set()
+        self._primed = False
+
+    def prime(self) -> None:
+        """Prima lettura dei tempi CPU (processi e sistema)"""
+        self.manager.snapshot(refresh=True)
+        self.manager.get_system_stats(cpu_interval=None)
+        self.known_pids = set(self.manager.snapshot().by_pid)
+        self._primed = True
+
+    def refresh(self) -> WatchFrame:
+        """
+        Esegue un refresh incrementale.
+
+        Returns:
+            WatchFrame con i top processi e i PID nuovi/terminati
+        """
+        if not self._primed:
+            self.prime()
+            time.sleep(self.PRIME_INTERVAL)
+
+        start = time.perf_counter()
+        snapshot = self.manager.snapshot(refresh=True)
+        current = snapshot.by_pid.keys()
+        added = current - self.known_pids
+        exited = self.known_pids - current
+        self.known_pids = set(current)
+
+        processes = self.sorter.sort(snapshot.processes, self.sort_by, reverse=True)
+        stats = self.manager.get_system_stats(cpu_interval=None)
+        return WatchFrame(processes[:self.limit], len(snapshot), added, exited,
+                          stats, time.perf_counter() - start)
+
+
+class DeltaRenderer:
+    """
+    Renderer che ridisegna solo le righe cambiate.
+
+    Tiene in memoria le righe del frame precedente; per ogni riga diversa
+    sposta il cursore (ESC[riga;1H), la riscrive e cancella il resto
+    (ESC[K). L'intero frame viene scritto con una sola write().
+    """
+
+    def __init__(self, stream: TextIO = sys.stdout):
+        """
+        Inizializza il renderer.
+
+        Args:
+            stream: Stream di output (terminale con supporto ANSI)
+        """
+        self.stream = stream
+        self._lines: List[str] = []
+
+    def render(self, lines: List[str]) -> int:
+        """
+        Disegna un frame.
+
+        Args:
+            lines: Righe del frame
+
+        Returns:
+            Numero di righe riscritte
+        """
+        previous = self._lines
+        out = []
+        if not previous:
+            out.append("\033[2J")
+
+        changed = 0
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                out.append(f"\033[{row + 1};1H{line}\033[K")
+                changed += 1
+
+        # Righe del frame precedente non più presenti
+        for row in range(len(lines), len(previous)):
+            out.append(f"\033[{row + 1};1H\033[K")
+            changed += 1
+
+        out.append(f"\033[{len(lines) + 1};1H")
+        self.stream.write(''.join(out))
+        self.stream.flush()
+        self._lines = lines
+        return changed
+
+
+def format_process_row(p: ProcessInfo) -> str:
+    """Riga della tabella processi (stesso formato di 'list')"""
+    cpu_color = "\033[31m" if p.cpu_percent > 50 else "\033[33m" if p.cpu_percent > 20 else "\033[0m"
+    mem_color = "\033[31m" if p.memory_mb > 1000 else "\033[33m" if p.memory_mb > 500 else "\033[0m"
+    reset = "\033[0m"
+    return (f"{p.pid:>6} {p.name[:25]:<25} "
+            f"{cpu_color}{p.cpu_percent:>6.1f}%{reset} "
+            f"{mem_color}{p.memory_mb:>7.1f}{reset} "
+            f"{p.status:<8} "
+            f"{p.num_threads:>6}")
+
+
+def format_frame(frame: WatchFrame, iteration: int, interval: float, sort_by: str) -> List[str]:
+    """
+    Converte un WatchFrame nelle righe dello schermo.
+
+    Args:
+        frame: Frame del watcher
+        iteration: Numero del refresh
+        interval: Secondi tra refresh
+        sort_by: Campo di ordinamento
+
+    Returns:
+        Lista di righe
+    """
+    stats = frame.stats
+    mem = stats['memory']
+    lines = [
+        f"🔄 Modalità Watch (refresh ogni {interval}s, ordinato per {sort_by}) - Ctrl+C per uscire",
+        f"⏱️  Iterazione {iteration} - {time.strftime('%H:%M:%S')} "
+        f"(refresh {frame.elapsed * 1000:.0f} ms)",
+        "",
+        f"💻 CPU: {stats['cpu_percent']:.1f}% ({stats['cpu_count']} cores)   "
+        f"Memory: {mem['used_gb']:.1f}GB / {mem['total_gb']:.1f}GB ({mem['percent']}%)",
+        f"   Processi totali: {frame.total} "
+        f"(+{len(frame.added)} nuovi, -{len(frame.exited)} terminati)",
+        "",
+        f"{'PID':>6} {'Nome':<25} {'CPU %':>7} {'Mem MB':>8} {'Stato':<8} {'Thread':>6}",
+        "-" * 70,
+    ]
+    lines.extend(format_process_row(p) for p in frame.processes)
+    return lines
+
+
+if __name__ == '__main__':
+    # Test del modulo
+    print("=== Test Watcher Module ===\n")
+
+    watcher = ProcessWatcher(limit=5)
+    for i in range(1, 4):
+        frame = watcher.refresh()
+        print(f"Refresh {i}: {frame.total} processi, +{len(frame.added)} "
+              f"-{len(frame.exited)}, {frame.elapsed * 1000:.1f} ms")
+        for p in frame.processes:
+            print(f"  PID {p.pid:>6}: {p.name:<25} CPU: {p.cpu_percent:>5.1f}%")
+        time.sleep(0.5)
+
+    print("\n✓ Module test completed!")